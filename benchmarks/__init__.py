@@ -0,0 +1,29 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+"""
+uHDR v6 - benchmarks
+
+Benchmarks run from the uHDR directory (preferences/prefs.json is read):
+    python -m benchmarks.allocations
+    python -m benchmarks.concurrency
+    python -m benchmarks.dtypes
+    python -m benchmarks.imports
+    python -m benchmarks.latency
+    python -m benchmarks.memory
+    python -m benchmarks.suite run -o results.json
+    python -m benchmarks.suite compare baseline.json results.json
+"""
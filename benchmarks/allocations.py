@@ -0,0 +1,101 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+"""
+uHDR v6 - steady state allocation check
+
+Command line of the steady state allocation check of the tests
+(tests/test_allocations.py): replays slider edits on a synthetic image
+(exposure, contrast, tone curve, saturation, color editor), as a drag does.
+The first round warms up the scratch buffers of the pipeline
+(hdrCore.scratch), the next rounds are traced (hdrCore.profiling memory
+tracing, numpy arrays included): a compute whose allocation high-water mark
+is over the threshold counts as a large allocation. Per-node peaks are
+printed, so that a regression can be traced to an operator.
+
+The backend is the one of the GUI by default: the C++ core if HDRip.dll
+can be loaded (a drag computes with coreCcompute, its input and result are
+copied in the arena of the pipeline), otherwise preferences.computation.
+
+Exits with code 1 if a traced round makes a large allocation or allocates a
+new scratch buffer.
+
+Usage:
+    python -m benchmarks.allocations [--size WIDTHxHEIGHT] [-b BACKEND] [--threshold MB] [-r ROUNDS]
+
+Examples:
+    python -m benchmarks.allocations
+    python -m benchmarks.allocations -b numba --threshold 4
+"""
+
+import argparse, sys
+
+from tests.test_allocations import frameSize, steadyAllocations
+
+# ------------------------------------------------------------------------------------------
+def parseArgs(argv=None):
+    """
+    Parse command line arguments.
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(prog='benchmarks.allocations', description='uHDR v6 steady state allocation check')
+    parser.add_argument('--size', default='1200x675', help='size of the synthetic image (default: 1200x675, working size)')
+    parser.add_argument('-b', '--backend', default=None, choices=['python', 'numba', 'cpp'], help='computation backend (default: backend of the GUI)')
+    parser.add_argument('--threshold', type=float, default=None, help='large allocation in MB (default: 1/16 of a float32 frame of the image)')
+    parser.add_argument('-r', '--rounds', type=int, default=2, help='number of traced rounds of edits (default: 2)')
+    return parser.parse_args(argv)
+# ------------------------------------------------------------------------------------------
+def main(argv=None):
+    """
+    Replay the edits and check the allocations of the traced rounds.
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        int: exit code, 1 if a traced round allocates
+    """
+    args = parseArgs(argv)
+
+    import preferences.preferences as pref
+    import hdrCore.coreC
+
+    # backend of the GUI (guiQt.thread.RunCompute)
+    backend = args.backend or ('cpp' if hdrCore.coreC.available() else pref.computation)
+    if backend == 'cpp' and not hdrCore.coreC.available():
+        print("ERROR[benchmarks.allocations: cpp backend, HDRip.dll cannot be loaded]")
+        return 1
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    frame = frameSize(width, height)
+    res = steadyAllocations(width, height, backend, args.threshold*2**20 if args.threshold else None, args.rounds)
+
+    for entry in res['nodes']:
+        print(f"  {entry['name']:<16} peak: {entry['peak']/2**20:8.2f}MB ({entry['peak']/frame:5.2f} frames)")
+    print(f"uHDRv6 allocations {width}x{height} ({backend}): {len(res['large'])} large allocations (threshold: {res['threshold']/2**20:.2f}MB), "
+          f"{res['misses']} new scratch buffers, arena: {res['arena']/2**20:.0f}MB")
+    for event in res['large']: print(f"ERROR[benchmarks.allocations: {event['name']} allocates {event['peak']/2**20:.2f}MB ({event['peak']/frame:.2f} frames)]")
+    if res['misses']: print(f"ERROR[benchmarks.allocations: {res['misses']} scratch buffers allocated after warm-up]")
+    return 1 if res['large'] or res['misses'] else 0
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    sys.exit(main())
+# ------------------------------------------------------------------------------------------
@@ -0,0 +1,127 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+"""
+uHDR v6 - concurrency benchmark
+
+Measures the speedup of threaded computation (guiQt.thread.pCompute computes
+the process-pipe by tiles in threads, see hdrCore.tiles): the same edited
+process-pipe is computed with 1 to N threads, for each computation backend.
+Operators computed with the 'python' backend hold the GIL in colour-science
+wrappers, operators computed with the 'numba' backend (hdrCore.numbafun,
+nogil kernels) run in parallel: speedup should be close to the number of
+threads up to the number of cores.
+
+Usage:
+    python -m benchmarks.concurrency [--size WIDTHxHEIGHT] [--grid N] [-t THREADS] [-b BACKEND ...] [-r REPEAT]
+
+Examples:
+    python -m benchmarks.concurrency
+    python -m benchmarks.concurrency --size 3840x2160 -t 8 -b numba
+"""
+
+import argparse, os, sys
+from timeit import default_timer as timer
+from tests.fixtures import syntheticImage, editedProcessPipe
+
+# ------------------------------------------------------------------------------------------
+def parseArgs(argv=None):
+    """
+    Parse command line arguments.
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(prog='benchmarks.concurrency', description='uHDR v6 concurrency benchmark')
+    parser.add_argument('--size', default='1920x1080', help='size of the synthetic image (default: 1920x1080)')
+    parser.add_argument('--grid', type=int, default=4, help='tiles per side of the image, kept whatever the number of threads (default: 4, 4x4 grid)')
+    parser.add_argument('-t', '--threads', type=int, default=0, help='maximum number of threads (0: number of cores, default: 0)')
+    parser.add_argument('-b', '--backend', action='append', choices=['python', 'numba'], help='computation backend (default: python and numba)')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='number of runs, the fastest is kept (default: 3)')
+    return parser.parse_args(argv)
+# ------------------------------------------------------------------------------------------
+def measure(img, backend, threads, tileSize, repeat):
+    """
+    Compute the edited process-pipe by tiles, return the fastest time.
+
+    Args:
+        img (hdrCore.image.Image): input image
+        backend (str): computation backend
+        threads (int): number of threads
+        tileSize ((int,int)): tile height and width
+        repeat (int): number of runs
+
+    Returns:
+        float: time (s)
+    """
+    from hdrCore import tiles
+
+    best = None
+    for _ in range(repeat):
+        processPipe = editedProcessPipe(img, backend)
+        start = timer()
+        # fixed grid: the same tiles whatever the number of threads
+        tiles.tileScheduler(workers=threads, tileSize=tileSize, split=False).compute(processPipe, toneMap=True)
+        dt = timer() - start
+        best = dt if best is None else min(best, dt)
+    return best
+# ------------------------------------------------------------------------------------------
+def main(argv=None):
+    """
+    Run the benchmark and print, for each backend and number of threads: time,
+    speedup and efficiency (speedup / threads).
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        int: exit code
+    """
+    args = parseArgs(argv)
+
+    import preferences.preferences as pref
+    pref.verbose = False
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    nbCores = os.cpu_count() or 1
+    maxThreads = args.threads if args.threads > 0 else nbCores
+    grid = max(1, args.grid)
+    tileSize = (-(-height//grid), -(-width//grid))
+    backends = args.backend if args.backend else ['python', 'numba']
+
+    img = syntheticImage(width, height)
+    print(f"uHDRv6 concurrency benchmark: {width}x{height}, {grid}x{grid} tiles of {tileSize[1]}x{tileSize[0]}px, {nbCores} cores")
+    for backend in backends:
+        try:
+            # first run compiles numba kernels (or loads them from cache): not measured
+            measure(img, backend, 1, tileSize, 1)
+        except ImportError as e:
+            print(f"WARNING[benchmarks.concurrency: backend {backend} is not available ({e})]")
+            continue
+        reference = None
+        for threads in range(1, maxThreads+1):
+            dt = measure(img, backend, threads, tileSize, args.repeat)
+            if reference is None: reference = dt
+            speedup = reference/dt
+            print(f"{backend:>8} threads: {threads:2d} time: {dt:7.3f}s speedup: {speedup:5.2f} efficiency: {100*speedup/threads:5.1f}%")
+    return 0
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    sys.exit(main())
+# ------------------------------------------------------------------------------------------
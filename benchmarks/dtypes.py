@@ -0,0 +1,159 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+"""
+uHDR v6 - data type check
+
+Checks the data type policy of hdrCore.context: operators compute in float32
+and do not emit float64 (colour-science conversions, skimage resize/rotate,
+numpy defaults). Each operator of hdrCore.processing is computed on float32
+images (linear, sRGB encoded, Lch for the color editor) with each backend,
+branches that convert color space or encoding included. Then the edited
+default process-pipe is computed with strictDtype set (a node that emits
+another type raises TypeError), with outputs kept in float32 and in float16
+(storage): node outputs must have the storage type, the output of the
+pipeline float32. Image.split/merge is checked too.
+
+Tiled computes (hdrCore.tiles) are checked with strictDtype set: each case
+is computed by the stage of export (pixelStage, geometryStage for geometry,
+resizeStage for resize), then the edited process-pipe with a rotation.
+
+Raw decoding (Image.readRaw: rawpy postprocess, embedded preview) is checked
+on the file given with --raw, in each decoding mode.
+
+Cases and checks are those of the tests (tests/dtypecases.py).
+
+Exits with code 1 if an operator emits another type than float32, if a
+pipeline or a tile stage raises or if an operator of hdrCore.processing has
+no case.
+
+Usage:
+    python -m benchmarks.dtypes [--size WIDTHxHEIGHT] [-b BACKEND ...] [--raw FILE]
+
+Examples:
+    python -m benchmarks.dtypes
+    python -m benchmarks.dtypes -b python --size 320x180
+    python -m benchmarks.dtypes --raw ./images/DSC00001.ARW
+"""
+
+import argparse, copy, sys
+from tests.dtypecases import cases, inputImages, tileStage, computeTiles, checkTiledPipe, checkRaw, checkPipe
+
+# ------------------------------------------------------------------------------------------
+def parseArgs(argv=None):
+    """
+    Parse command line arguments.
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(prog='benchmarks.dtypes', description='uHDR v6 data type check')
+    parser.add_argument('--size', default='640x360', help='size of the synthetic image (default: 640x360)')
+    parser.add_argument('-b', '--backend', action='append', choices=['python', 'numba'], help='backend, can be repeated (default: all available)')
+    parser.add_argument('--raw', default=None, help='raw file decoded in each mode (requires rawpy)')
+    return parser.parse_args(argv)
+# ------------------------------------------------------------------------------------------
+def main(argv=None):
+    """
+    Check the data types of operators and pipelines.
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        int: exit code, 1 if an operator or a pipeline emits another type than float32
+    """
+    args = parseArgs(argv)
+
+    import numpy as np
+    import preferences.preferences as pref
+    from hdrCore import processing, image
+    from hdrCore.context import ExecutionContext
+    from tests.fixtures import syntheticImage, availableBackends
+    pref.verbose = False
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    backends = args.backend if args.backend else [b for b in availableBackends() if b in ('python', 'numba')]
+    img = syntheticImage(width, height)
+    inputs = inputImages(img)
+    errors = []
+
+    # every operator has a case
+    operators = [cls.__name__ for cls in processing.Processing.__subclasses__()]
+    for name in operators:
+        if name not in [case[0] for case in cases]: errors.append(f"operator {name} has no case")
+
+    # operators
+    for backend in backends:
+        ctx = ExecutionContext(computation=backend, autoResize=False, diskCache=False, verbose=False)
+        with ctx.activate():
+            for name, params, kinds in cases:
+                results = []
+                for kind in kinds:
+                    res = getattr(processing, name)().compute(copy.deepcopy(inputs[kind]), **copy.deepcopy(params))
+                    dtype = res.colorData.dtype
+                    results.append(f"{kind}: {dtype.name}")
+                    if dtype != np.float32: errors.append(f"{name}({backend}, {kind} input) emits {dtype.name}")
+                print(f"  {name:<20} {backend:<6} {', '.join(results)}")
+
+    # pipelines
+    for backend in backends:
+        for storage in (None, np.float16):
+            pipeErrors = checkPipe(img, backend, storage)
+            print(f"  {'processpipe':<20} {backend:<6} storage: {np.dtype(storage or np.float32).name}: {'ok' if not pipeErrors else 'failed'}")
+            errors += [f"processpipe({backend}, storage {np.dtype(storage or np.float32).name}): {e}" for e in pipeErrors]
+
+    # tiles
+    for backend in backends:
+        ctx = ExecutionContext(computation=backend, autoResize=False, diskCache=False, verbose=False, strictDtype=True)
+        with ctx.activate():
+            for name, params, kinds in cases:
+                results = []
+                for kind in kinds:
+                    stage = tileStage(name, params, inputs[kind])
+                    try:
+                        computeTiles(stage, inputs[kind])
+                        results.append(f"{kind}: ok")
+                    except TypeError as e:
+                        results.append(f"{kind}: failed")
+                        errors.append(f"{name}({backend}, {kind} input, tiles): {e}")
+                print(f"  {name:<20} {backend:<6} {type(stage).__name__}: {', '.join(results)}")
+        pipeErrors = checkTiledPipe(img, backend)
+        print(f"  {'processpipe':<20} {backend:<6} tiles: {'ok' if not pipeErrors else 'failed'}")
+        errors += [f"processpipe({backend}, tiles): {e}" for e in pipeErrors]
+
+    # split/merge
+    merged = image.Image.merge(img.split(2, 2))
+    if merged.colorData.dtype != np.float32: errors.append(f"Image.merge emits {merged.colorData.dtype.name}")
+
+    # raw decoding
+    if args.raw:
+        try:
+            errors += checkRaw(args.raw)
+        except ImportError as e:
+            errors.append(f"raw file {args.raw}: {e}")
+    else: print(f"  {'readRaw':<20} skipped (no --raw file)")
+
+    print(f"uHDRv6 dtypes {width}x{height} ({', '.join(backends)}): {len(operators)} operators, {len(errors)} errors")
+    for error in errors: print(f"ERROR[benchmarks.dtypes: {error}]")
+    return 1 if errors else 0
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    sys.exit(main())
+# ------------------------------------------------------------------------------------------
@@ -0,0 +1,115 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+"""
+uHDR v6 - import budget check
+
+Imports hdrCore modules in a fresh interpreter (as a worker process does)
+and checks that:
+    - guiQt and heavy optional packages (PyQt5, torch, sklearn, rawpy, geomdl,
+      pathos) are not imported: they are imported on first use
+    - the import time is within budget
+
+Exits with code 1 if a check fails, so that it can run in a CI job.
+
+Usage:
+    python -m benchmarks.imports [-m MODULE ...] [--budget SECONDS] [-r REPEAT]
+
+Examples:
+    python -m benchmarks.imports
+    python -m benchmarks.imports -m hdrCore.processing -m hdrCore.export --budget 1.2
+"""
+
+import argparse, os, subprocess, sys
+
+# modules that hdrCore must not import at load
+forbidden = ['guiQt', 'PyQt5', 'torch', 'sklearn', 'rawpy', 'geomdl', 'pathos']
+
+# ------------------------------------------------------------------------------------------
+def parseArgs(argv=None):
+    """
+    Parse command line arguments.
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(prog='benchmarks.imports', description='uHDR v6 import budget check')
+    parser.add_argument('-m', '--module', action='append', help='module to import (default: hdrCore.processing)')
+    # hdrCore.processing: 0.6s with lazy imports, 1.7s before: a regression is over budget
+    parser.add_argument('--budget', type=float, default=1.0, help='maximum import time in seconds (default: 1.0)')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='number of imports, the fastest is kept (default: 3)')
+    return parser.parse_args(argv)
+# ------------------------------------------------------------------------------------------
+def importModule(module):
+    """
+    Import a module in a fresh interpreter (-X importtime).
+
+    Args:
+        module (str): module name
+
+    Returns:
+        (float, list of str): import time (s), top-level packages imported
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = "import sys, "+module+"; print('\\n'.join(sorted(set(name.split('.')[0] for name in sys.modules))))"
+    res = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=root, capture_output=True, text=True)
+    if res.returncode != 0: raise ImportError(res.stderr.strip().splitlines()[-1] if res.stderr.strip() else module)
+
+    # -X importtime: 'import time: self [us] | cumulative | name', one line per module
+    cumulative = 0
+    for line in res.stderr.splitlines():
+        if not line.startswith('import time:'): continue
+        fields = line[len('import time:'):].split('|')
+        if fields[2].strip() == module: cumulative = int(fields[1])
+    return cumulative/1e6, res.stdout.split()
+# ------------------------------------------------------------------------------------------
+def main(argv=None):
+    """
+    Run the checks and print import times and forbidden imports.
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        int: exit code, 1 if a check fails
+    """
+    args = parseArgs(argv)
+    modules = args.module if args.module else ['hdrCore.processing']
+
+    failed = False
+    for module in modules:
+        times, packages = [], []
+        for _ in range(max(1, args.repeat)):
+            dt, packages = importModule(module)
+            times.append(dt)
+        dt = min(times)
+        imported = [name for name in forbidden if name in packages]
+
+        print(f"{module}: {dt:.3f}s (budget: {args.budget:.3f}s)")
+        if dt > args.budget:
+            print(f"ERROR[benchmarks.imports: {module} import time {dt:.3f}s is over budget {args.budget:.3f}s]")
+            failed = True
+        if imported:
+            print(f"ERROR[benchmarks.imports: {module} imports {', '.join(imported)}]")
+            failed = True
+    return 1 if failed else 0
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    sys.exit(main())
+# ------------------------------------------------------------------------------------------
@@ -0,0 +1,252 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+"""
+uHDR v6 - interactive latency replay
+
+Starts uHDR headless (QT_QPA_PLATFORM=offscreen), loads an image in the
+editing dock and replays a sequence of control events at their recorded
+times. The latency of each event, from the controller callback to the
+display of the edited image (hdrCore.profiling.latency), is summarized per
+control: p50, p95, p99 and the median of the update stages (compute, tone
+mapping, display).
+
+Sequences:
+    - a Chrome trace exported from the Profiling dock (events of category
+      'latency' carry the control values): record by editing in uHDR
+    - a JSON file: {"events": [{"t": seconds, "control": name, "value": value}, ...]}
+    - default: sweeps of the exposure, contrast and saturation sliders and
+      of the first LCH color editor
+
+Control names: 'exposure', 'contrast', 'saturation' (slider value) and
+'colorEditorN.KEY' with KEY among hue, chroma, lightness ([min, max]),
+exposure, saturation, contrast, hueShift (value), mask (bool).
+
+Exits with code 1 if the p95 latency of a control is over budget: default
+budgets per control (p95Budgets), or the budget given with --p95 for all
+controls.
+
+Usage:
+    python -m benchmarks.latency [SEQUENCE] [--image IMAGE] [--rate HZ] [--p95 MS | --no-budget] [-o RESULTS]
+
+Examples:
+    python -m benchmarks.latency --p95 250
+    python -m benchmarks.latency uHDR-trace.json --image monkstown_castle_1k.hdr -o latency.json
+"""
+
+import argparse, datetime, json, os, sys, time
+from timeit import default_timer as timer
+
+# LchColorSelectorController callbacks of the color editor controls
+lchCallBacks = {'hue': 'sliderHueChange', 'chroma': 'sliderChromaChange', 'lightness': 'sliderLightnessChange',
+                'exposure': 'sliderExposureChange', 'saturation': 'sliderSaturationChange', 'contrast': 'sliderContrastChange',
+                'hueShift': 'sliderHueShiftChange', 'mask': 'checkboxMaskChange'}
+
+# default p95 latency budgets in ms, per control (color editors: any key), other controls: 'default'
+# (measured with the python backend, 1k image, 30 events/s: exposure 660, contrast 960, saturation 1450, color editor 1550)
+p95Budgets = {'exposure': 1000, 'contrast': 1500, 'saturation': 2000, 'colorEditor': 2500, 'default': 2500}
+
+# ------------------------------------------------------------------------------------------
+def parseArgs(argv=None):
+    """
+    Parse command line arguments.
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(prog='benchmarks.latency', description='uHDR v6 interactive latency replay')
+    parser.add_argument('sequence', nargs='?', help='Chrome trace of the Profiling dock or JSON sequence (default: slider sweeps)')
+    parser.add_argument('--image', default='monkstown_castle_1k.hdr', help='edited image (default: monkstown_castle_1k.hdr)')
+    parser.add_argument('--rate', type=float, default=30.0, help='events per second of the default sequence (default: 30)')
+    parser.add_argument('--p95', type=float, default=None, help='p95 latency budget of every control in ms (default: per control, see p95Budgets)')
+    parser.add_argument('--no-budget', action='store_true', help='report latencies without checking budgets')
+    parser.add_argument('--timeout', type=float, default=60.0, help='maximum wait for loading and for the last image in seconds (default: 60)')
+    parser.add_argument('-o', '--output', default=None, help='results file (JSON)')
+    return parser.parse_args(argv)
+# ------------------------------------------------------------------------------------------
+def budget(control, p95=None):
+    """
+    Get the p95 latency budget of a control.
+
+    Args:
+        control (str): control name
+        p95 (float, optional): budget of every control in ms (default: p95Budgets)
+
+    Returns:
+        float: budget in ms
+    """
+    if p95 is not None: return p95
+    name = control.partition('.')[0].rstrip('0123456789')
+    return p95Budgets.get(name, p95Budgets['default'])
+# ------------------------------------------------------------------------------------------
+def defaultSequence(rate):
+    """
+    Build the default sequence: back and forth sweeps of sliders.
+
+    Args:
+        rate (float): events per second
+
+    Returns:
+        list of dict: events {'t', 'control', 'value'}
+    """
+    sweeps = [('exposure', [0.25*k for k in range(0, 9)]+[0.25*k for k in range(8, -9, -1)]+[0.25*k for k in range(-8, 1)]),
+              ('contrast', list(range(0, 51, 5))+list(range(50, -1, -5))),
+              ('saturation', list(range(0, 51, 5))+list(range(50, -1, -5))),
+              ('colorEditor0.hue', [[0, h] for h in range(30, 361, 30)]),
+              ('colorEditor0.exposure', [0.1*k for k in range(0, 11)]+[0.1*k for k in range(10, -1, -1)])]
+    events = []
+    for control, values in sweeps:
+        for value in values: events.append({'t': len(events)/rate, 'control': control, 'value': value})
+    return events
+# ------------------------------------------------------------------------------------------
+def readSequence(filename):
+    """
+    Read a sequence: Chrome trace of the Profiling dock or JSON sequence.
+
+    Args:
+        filename (str): sequence file
+
+    Returns:
+        list of dict: events {'t', 'control', 'value'} sorted by time
+    """
+    with open(filename) as f: data = json.load(f)
+    if 'traceEvents' in data:
+        recorded = [e for e in data['traceEvents'] if e.get('cat') == 'latency' and e.get('args', {}).get('value') is not None]
+        origin = min((e['ts'] for e in recorded), default=0)
+        events = [{'t': (e['ts']-origin)/1e6, 'control': e['name'], 'value': e['args']['value']} for e in recorded]
+    else:
+        events = data['events']
+    return sorted(events, key=lambda e: e['t'])
+# ------------------------------------------------------------------------------------------
+def fire(editView, control, value):
+    """
+    Send a control event to the editing dock, as the widget does.
+
+    Args:
+        editView (guiQt.view.EditImageView): editing dock view
+        control (str): control name
+        value: control value
+    """
+    name, _, key = control.partition('.')
+    controller = getattr(editView, name)
+    if key:
+        callBack = getattr(controller, lchCallBacks[key])
+        if isinstance(value, (list, tuple)): callBack(*value)
+        else: callBack(value)
+    else:
+        # slider: valueChanged signal calls AdvanceSliderController.sliderChange
+        controller.view.slider.setValue(int(round(value/controller.step)))
+# ------------------------------------------------------------------------------------------
+def waitFor(app, condition, timeout):
+    """
+    Process Qt events until a condition is true.
+
+    Args:
+        app (QApplication): application
+        condition (function): condition without argument
+        timeout (float): maximum wait (seconds)
+
+    Returns:
+        bool: condition is true
+    """
+    deadline = timer()+timeout
+    while not condition():
+        if timer() > deadline: return False
+        app.processEvents()
+        time.sleep(0.005)
+    return True
+# ------------------------------------------------------------------------------------------
+def main(argv=None):
+    """
+    Replay the sequence and print latency percentiles per control.
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        int: exit code, 1 if the replay fails or a p95 latency is over budget
+    """
+    args = parseArgs(argv)
+    events = readSequence(args.sequence) if args.sequence else defaultSequence(args.rate)
+    if not events:
+        print("ERROR[benchmarks.latency: no event to replay]")
+        return 1
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QThreadPool
+    import preferences.preferences as pref
+    import hdrCore.processing, hdrCore.profiling, hdrCore.coreC
+    import guiQt.controller
+    from .suite import machineInfo
+    pref.verbose = False
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    appController = guiQt.controller.AppController(app)
+    gallery = appController.view.imageGalleryController
+
+    # load the image as uHDR does: gallery, then selection
+    gallery.setImages([os.path.abspath(args.image)])
+    if not waitFor(app, lambda: isinstance(gallery.model.processPipes[0], hdrCore.processing.ProcessPipe), args.timeout):
+        print(f"ERROR[benchmarks.latency: {args.image} not loaded]")
+        return 1
+    gallery.selectImage(0)
+    editController = appController.view.dock.view.childController
+    requestCompute = editController.model.requestCompute
+    pool = QThreadPool.globalInstance()
+
+    hdrCore.profiling.profiler.enable()
+    hdrCore.profiling.profiler.clear()
+    start = timer()
+    for event in events:
+        waitFor(app, lambda: timer()-start >= event['t'], float('inf'))
+        fire(editController.view, event['control'], event['value'])
+        app.processEvents()
+    done = waitFor(app, lambda: requestCompute.readyToRun and not requestCompute.waitingUpdate and not requestCompute.latencyStamps and pool.activeThreadCount() == 0, args.timeout)
+    hdrCore.profiling.profiler.enable(False)
+    if not done: print("WARNING[benchmarks.latency: last image not displayed before timeout]")
+
+    with hdrCore.profiling.profiler.lock: recorded = [e for e in hdrCore.profiling.profiler.events if e['category'] == 'latency']
+    results, failed = [], False
+    # guiQt.thread.RunCompute: C++ core if HDRip.dll loads, process-pipe backend otherwise
+    backend = 'cpp' if hdrCore.coreC.available() else requestCompute.processpipe.context.computation
+    print(f"uHDRv6 latency replay: {len(events)} events, {len(recorded)} displayed, image: {args.image}, backend: {backend}")
+    for entry in hdrCore.profiling.latency.summary(window=len(recorded) or 1):
+        stages = {}
+        for stage in ('compute', 'toneMap', 'display'):
+            values = [e['args'][stage] for e in recorded if e['name'] == entry['name'] and stage in e.get('args', {})]
+            stages[stage] = hdrCore.profiling.percentile(values, 50)
+        res = {'control': entry['name'], 'count': entry['count'], 'p50': entry['p50'], 'p95': entry['p95'], 'p99': entry['p99'], 'max': entry['max'], 'stages': stages,
+               'budget': None if args.no_budget else budget(entry['name'], args.p95)/1000}
+        results.append(res)
+        print(f"{res['control']:<24} n: {res['count']:4d} p50: {res['p50']*1000:8.1f}ms p95: {res['p95']*1000:8.1f}ms p99: {res['p99']*1000:8.1f}ms"
+              f" (compute: {(stages['compute'] or 0)*1000:.1f}ms, tone mapping: {(stages['toneMap'] or 0)*1000:.1f}ms, display: {(stages['display'] or 0)*1000:.1f}ms)")
+        if res['budget'] is not None and res['p95'] > res['budget']:
+            print(f"ERROR[benchmarks.latency: {res['control']} p95 latency {res['p95']*1000:.1f}ms is over budget {res['budget']*1000:.1f}ms]")
+            failed = True
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'date': datetime.datetime.now().isoformat(timespec='seconds'), 'machine': machineInfo(), 'image': args.image, 'backend': backend,
+                       'events': len(events), 'results': results}, f, indent=1)
+    return 1 if failed or not recorded else 0
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    sys.exit(main())
+# ------------------------------------------------------------------------------------------
@@ -0,0 +1,101 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+"""
+uHDR v6 - export memory check
+
+Command line of the export memory check of the tests (tests/test_memory.py):
+exports a synthetic edited image (default: 4K) as uHDRexport does, by tiles
+in worker processes (hdrCore.tiles), and checks the memory high-water mark of
+the export against a ceiling. Memory is sampled during the export: private
+RSS of this process and of the tile workers, plus the shared memory frames
+(counted once), above the memory before the export.
+
+With --untiled, the export is computed in this process with memory tracing
+(hdrCore.profiling): the allocation high-water mark is checked and per-node
+peaks are printed, so that a regression can be traced to an operator.
+
+Exits with code 1 if the peak is over the ceiling.
+
+Usage:
+    python -m benchmarks.memory [--size WIDTHxHEIGHT] [--untiled] [--ceiling MB]
+
+Examples:
+    python -m benchmarks.memory
+    python -m benchmarks.memory --untiled
+    python -m benchmarks.memory --size 7680x4320 --ceiling 4000
+"""
+
+import argparse, sys
+from tests.test_memory import tiledFrames, workerMB, untiledFrames
+
+# ------------------------------------------------------------------------------------------
+def parseArgs(argv=None):
+    """
+    Parse command line arguments.
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(prog='benchmarks.memory', description='uHDR v6 export memory check')
+    parser.add_argument('--size', default='3840x2160', help='size of the synthetic image (default: 3840x2160)')
+    parser.add_argument('--untiled', action='store_true', help='export in this process without tiles, with memory tracing')
+    parser.add_argument('--ceiling', type=float, default=None, help=f'maximum memory peak of the export in MB (default: {tiledFrames} float32 frames of the image + {workerMB}MB per worker, {untiledFrames} frames with --untiled)')
+    return parser.parse_args(argv)
+# ------------------------------------------------------------------------------------------
+def main(argv=None):
+    """
+    Run the export and check its allocation peak.
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        int: exit code, 1 if the peak is over the ceiling
+    """
+    args = parseArgs(argv)
+
+    from tests.test_memory import exportPeak, ceiling, frameSize
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    frame = frameSize(width, height)
+    limit = args.ceiling*2**20 if args.ceiling else ceiling(width, height, args.untiled)
+    try:
+        res = exportPeak(width, height, args.untiled)
+    except RuntimeError as e:
+        print(f"ERROR[benchmarks.memory: {e}]")
+        return 1
+
+    peak = res['peak']
+    if args.untiled:
+        for entry in res['nodes']:
+            print(f"  {entry['name']:<16} peak: {entry['peak']/2**20:8.1f}MB ({entry['peak']/frame:4.1f} frames)")
+        print(f"export {width}x{height} (untiled): peak: {peak/2**20:.1f}MB ({peak/frame:.1f} frames), "
+              f"RSS growth: {res['rssGrowth']/2**20:.0f}MB, ceiling: {limit/2**20:.0f}MB")
+    else:
+        print(f"export {width}x{height} (tiled, {res['workers']} workers): peak: {peak/2**20:.1f}MB ({peak/frame:.1f} frames), "
+              f"ceiling: {limit/2**20:.0f}MB")
+    if peak > limit:
+        print(f"ERROR[benchmarks.memory: export peak {peak/2**20:.1f}MB is over ceiling {limit/2**20:.0f}MB]")
+        return 1
+    return 0
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    sys.exit(main())
+# ------------------------------------------------------------------------------------------
@@ -0,0 +1,276 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+"""
+uHDR v6 - benchmark suite
+
+Times each operator of hdrCore.processing and full process-pipes (the
+default pipe of EditImageModel.buildProcessPipe / ProcessPipe.buildDefault,
+with and without edits) on a synthetic image and the bundled images, at
+several sizes and for every available backend:
+    - python: colour-science / numpy operators
+    - numba: hdrCore.numbafun kernels (if numba is installed)
+    - cpp: C++ core HDRip.dll (full process-pipe only, if the library loads)
+
+Results are written to a JSON file with machine information. The compare
+command flags cases slower than a stored baseline.
+
+Usage:
+    python -m benchmarks.suite run [-o RESULTS] [--sizes SIZES] [--images IMAGES] [-b BACKEND ...] [-c CASE ...] [-r REPEAT]
+    python -m benchmarks.suite compare BASELINE RESULTS [--threshold RATIO] [--min-delta SECONDS]
+
+Examples:
+    python -m benchmarks.suite run -o baseline.json
+    python -m benchmarks.suite run --sizes 1200 --images synthetic,grey.hdr -b python -o results.json
+    python -m benchmarks.suite compare baseline.json results.json --threshold 0.15
+"""
+
+import argparse, copy, datetime, json, os, platform, sys
+from timeit import default_timer as timer
+from tests.fixtures import syntheticImage, editedProcessPipe, availableBackends
+
+# sizes: longest side of the image (width x height of 16:9 displays for 4k and 8k)
+sizes = {'1200': 1200, '4k': 3840, '8k': 7680}
+# bundled images (uHDR directory)
+bundledImages = ['grey.hdr', 'monkstown_castle_1k.hdr', 'compOrigFinal.hdr']
+# parameters of timed operators: edits, default values return the input
+operatorParameters = {
+    'exposure':      {'EV': 1.0},
+    'contrast':      {'contrast': 20},
+    'Ycurve':        {'start':[0,0], 'shadows': [10,12], 'blacks': [30,33], 'mediums': [50,52], 'whites': [70,72], 'highlights': [90,90], 'end': [100,100]},
+    'saturation':    {'saturation': 20.0, 'method': 'gamma'},
+    'colorEditor':   {'selection': {'lightness': (20,80), 'chroma': (10,100), 'hue': (0,120)}, 'tolerance': 0.1,
+                      'edit': {'hue': 10.0, 'exposure': 0.5, 'contrast': 10.0, 'saturation': 10.0}, 'mask': False},
+    'lightnessMask': {'shadows': True, 'blacks': False, 'mediums': True, 'whites': False, 'highlights': True},
+    'geometry':      {'ratio': (16,9), 'up': 10, 'rotation': 2.0},
+    'resize':        {'scale': 0.5, 'anti_aliasing': True},
+    'clip':          {'min': 0.0, 'max': 1.0},
+}
+pipelines = ['pipeline-default', 'pipeline-edited']
+
+# ------------------------------------------------------------------------------------------
+def parseArgs(argv=None):
+    """
+    Parse command line arguments.
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(prog='benchmarks.suite', description='uHDR v6 benchmark suite')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run benchmarks and write results')
+    run.add_argument('-o', '--output', default='benchmark-results.json', help='results file (default: benchmark-results.json)')
+    run.add_argument('--sizes', default='1200,4k,8k', help='comma separated sizes among '+', '.join(sizes)+' (default: all)')
+    run.add_argument('--images', default='synthetic,'+','.join(bundledImages), help='comma separated images: synthetic or image files (default: synthetic and bundled images)')
+    run.add_argument('-b', '--backend', action='append', choices=['python', 'numba', 'cpp'], help='backend, can be repeated (default: all available)')
+    run.add_argument('-c', '--case', action='append', choices=list(operatorParameters)+pipelines, help='operator or pipeline, can be repeated (default: all)')
+    run.add_argument('-r', '--repeat', type=int, default=3, help='number of runs of a case (default: 3)')
+
+    compare = commands.add_parser('compare', help='compare results with a baseline, exit code 1 if a case regressed')
+    compare.add_argument('baseline', help='baseline results file')
+    compare.add_argument('results', help='results file')
+    compare.add_argument('--threshold', type=float, default=0.10, help='relative slowdown flagged as regression (default: 0.10)')
+    compare.add_argument('--min-delta', type=float, default=0.002, help='absolute slowdown below which a case is not flagged, in seconds (default: 0.002)')
+    return parser.parse_args(argv)
+# ------------------------------------------------------------------------------------------
+def machineInfo():
+    """
+    Returns:
+        dict: machine, OS, Python and library versions
+    """
+    import numpy as np, colour, skimage
+    from hdrCore import export
+    info = {'node': platform.node(), 'system': platform.system(), 'release': platform.release(),
+            'machine': platform.machine(), 'processor': platform.processor(), 'cores': os.cpu_count(),
+            'memory': export.physicalMemory(), 'python': platform.python_version(),
+            'numpy': np.__version__, 'colour': colour.__version__, 'skimage': skimage.__version__}
+    try:
+        import numba
+        info['numba'] = numba.__version__
+    except ImportError:
+        info['numba'] = None
+    return info
+# ------------------------------------------------------------------------------------------
+def loadImage(name, size):
+    """
+    Load a benchmark image resized to a size.
+
+    Args:
+        name (str): 'synthetic' or image filename
+        size (int): longest side
+
+    Returns:
+        hdrCore.image.Image: linear HDR image
+    """
+    from hdrCore import image, processing
+
+    if name == 'synthetic': return syntheticImage(size, size*9//16)
+
+    img = image.Image.read(name)
+    h, w = img.shape[:2]
+    scale = size/max(h, w)
+    return img.process(processing.resize(), size=(int(round(h*scale)), int(round(w*scale))), anti_aliasing=scale < 1)
+# ------------------------------------------------------------------------------------------
+def buildCase(case, img, backend):
+    """
+    Build the preparation of a case: it sets up a run (process-pipe, copy of
+    the image) and returns the function timed by the run.
+
+    Args:
+        case (str): operator name or pipeline
+        img (hdrCore.image.Image): input image
+        backend (str): computation backend
+
+    Returns:
+        function or None: function without argument returning the timed function (without
+            argument), None if the case does not run on the backend
+    """
+    from hdrCore import processing
+    from hdrCore.context import ExecutionContext
+
+    if case in pipelines:
+        def pipe():
+            if case == 'pipeline-edited': return editedProcessPipe(img, 'python' if backend == 'cpp' else backend)
+            processPipe = processing.ProcessPipe.buildDefault()
+            processPipe.context = processPipe.context.derive(autoResize=False, computation='python' if backend == 'cpp' else backend, diskCache=False, verbose=False)
+            processPipe.setImage(copy.deepcopy(img))
+            return processPipe
+        # a new process-pipe per run: a computed one would not compute again
+        def prepare():
+            processPipe = pipe()
+            if backend == 'cpp':
+                import hdrCore.coreC
+                imgCopy = copy.deepcopy(img)
+                return lambda: hdrCore.coreC.coreCcompute(imgCopy, processPipe)
+            return processPipe.compute
+        return prepare
+
+    if backend == 'cpp': return None    # the C++ core only runs full process-pipes
+    context = ExecutionContext(autoResize=False, computation=backend, verbose=False, diskCache=False)
+    params = copy.deepcopy(operatorParameters[case])
+    if case == 'resize':
+        scale = params.pop('scale')
+        params['size'] = (int(img.shape[0]*scale), int(img.shape[1]*scale))
+    process = getattr(processing, case)()
+
+    def compute():
+        with context.activate(): process.compute(img, **copy.deepcopy(params))
+    return lambda: compute
+# ------------------------------------------------------------------------------------------
+def run(args):
+    """
+    Run the benchmarks and write the results file.
+
+    Args:
+        args (argparse.Namespace): see parseArgs()
+
+    Returns:
+        int: exit code
+    """
+    import preferences.preferences as pref
+    pref.verbose = False
+
+    available = availableBackends()
+    backends = [backend for backend in (args.backend if args.backend else available) if backend in available]
+    for backend in set(args.backend or []) - set(backends): print(f"WARNING[benchmarks.suite: backend {backend} is not available]")
+    cases = args.case if args.case else list(operatorParameters)+pipelines
+
+    results = []
+    for name in args.images.split(','):
+        for sizeName in args.sizes.split(','):
+            try:
+                img = loadImage(name, sizes[sizeName])
+            except Exception as e:
+                print(f"WARNING[benchmarks.suite: {name} at {sizeName} skipped ({e})]")
+                continue
+            for backend in backends:
+                for case in cases:
+                    prepare = buildCase(case, img, backend)
+                    if prepare is None: continue
+                    prepare()()                             # warm-up: numba compilation, caches
+                    times = []
+                    for _ in range(max(1, args.repeat)):
+                        function = prepare()                # not timed: process-pipe, image copy
+                        start = timer()
+                        function()
+                        times.append(timer()-start)
+                    times.sort()
+                    res = {'case': '/'.join([os.path.basename(name), sizeName, backend, case]), 'image': os.path.basename(name), 'size': sizeName,
+                           'shape': list(img.shape), 'backend': backend, 'operator': case,
+                           'min': times[0], 'median': times[len(times)//2], 'runs': len(times)}
+                    results.append(res)
+                    print(f"{res['case']:<60} min: {res['min']*1000:9.1f}ms median: {res['median']*1000:9.1f}ms")
+
+    with open(args.output, 'w') as f:
+        json.dump({'date': datetime.datetime.now().isoformat(timespec='seconds'), 'machine': machineInfo(), 'results': results}, f, indent=1)
+    print(f"uHDRv6 benchmark suite: {len(results)} cases written to {args.output}")
+    return 0
+# ------------------------------------------------------------------------------------------
+def compare(args):
+    """
+    Compare results with a baseline: a case regresses if its minimum time is
+    slower than the baseline by more than threshold (relative) and min-delta
+    (absolute).
+
+    Args:
+        args (argparse.Namespace): see parseArgs()
+
+    Returns:
+        int: exit code, 1 if a case regressed
+    """
+    with open(args.baseline) as f: baseline = json.load(f)
+    with open(args.results) as f: results = json.load(f)
+
+    for key in ('node', 'processor', 'cores', 'python', 'numpy', 'numba'):
+        if baseline['machine'].get(key) != results['machine'].get(key):
+            print(f"WARNING[benchmarks.suite: machine differs from baseline ({key}: {baseline['machine'].get(key)} -> {results['machine'].get(key)})]")
+
+    base = {res['case']: res for res in baseline['results']}
+    regressions = 0
+    for res in results['results']:
+        ref = base.get(res['case'])
+        if not ref:
+            print(f"{res['case']:<60} new")
+            continue
+        ratio = res['min']/ref['min'] if ref['min'] > 0 else float('inf')
+        regressed = ratio > 1+args.threshold and res['min']-ref['min'] > args.min_delta
+        regressions += regressed
+        print(f"{res['case']:<60} {ref['min']*1000:9.1f}ms -> {res['min']*1000:9.1f}ms ({ratio:5.2f}x){' REGRESSION' if regressed else ''}")
+    for case in set(base)-set(res['case'] for res in results['results']): print(f"{case:<60} missing")
+
+    print(f"uHDRv6 benchmark suite: {regressions} regressions")
+    return 1 if regressions else 0
+# ------------------------------------------------------------------------------------------
+def main(argv=None):
+    """
+    Run a command of the benchmark suite.
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        int: exit code
+    """
+    args = parseArgs(argv)
+    return run(args) if args.command == 'run' else compare(args)
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    sys.exit(main())
+# ------------------------------------------------------------------------------------------
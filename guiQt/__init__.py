@@ -10,6 +10,6 @@ from . import model
 from . import view  
 from . import thread
 from . import controller
-from . import viewUseCase
+# viewUseCase (legacy views) imports matplotlib: imported on use, not at startup
 
 __all__ = ['model', 'view', 'thread', 'controller', 'viewUseCase']
\ No newline at end of file
@@ -40,6 +40,7 @@ Classes:
     - ImageGalleryController: Image gallery navigation and selection
     - AppController: Main application controller and workflow coordination
     - MultiDockController: Multi-panel interface management
+    - ProfilingController: Profiling dock (per-node timings, Chrome trace export, execution plan)
     - EditImageController: HDR image editing controls and parameters
     - ImageInfoController: Image metadata and information display
     - AdvanceSliderController: Advanced slider control with auto-adjustment
@@ -68,16 +69,14 @@ import numpy as np
 # pyQT5 import
 from PyQt5.QtWidgets import QFileDialog, QApplication
 from PyQt5.QtWidgets import QMessageBox
+from PyQt5.QtCore import QTimer
 
 from . import model, view, thread
-import hdrCore.image, hdrCore.processing, hdrCore.utils
+import hdrCore.image, hdrCore.processing, hdrCore.utils, hdrCore.metadata, hdrCore.profiling, hdrCore.plan, hdrCore.export
 import hdrCore.coreC
 import preferences.preferences as pref
 
-# zj add for semi-auto curve 
-import torch
-from hdrCore.net import Net
-from torch.autograd import Variable
+# zj add for semi-auto curve: torch and hdrCore.net are imported on first prediction (see ToneCurveController.autoCurve)
 
 # -----------------------------------------------------------------------------
 # --- package methods ---------------------------------------------------------
@@ -490,15 +489,32 @@ class AppController(object):
 
         self.screenSize = getScreenSize(app)# get screens size
 
+        # numba backend: kernels are compiled while the gallery loads, not on first edit
+        if pref.computation in ('numba', 'cuda'): thread.warmupNumba()
+
         # attributes
-        self.hdrDisplay = HDRviewerController(self)
-        self.view =  view.AppView(self, HDRcontroller = self.hdrDisplay)                         
+        self.hdrDisplay = HDRviewerController(self, splash=False)
+        with hdrCore.profiling.profiler.span('AppView', category='startup'):
+            self.view =  view.AppView(self, HDRcontroller = self.hdrDisplay)                         
         self.model = model.AppModel(self)
 
         self.dirName = None
         self.imagesName = []
         
-        self.view.show()
+        with hdrCore.profiling.profiler.span('show', category='startup'):
+            self.view.show()
+        # window and gallery first: docks and HDR display splash are built in the event loop
+        QTimer.singleShot(0, self.buildDeferred)
+    # -----------------------------------------------------------------------------
+    def buildDeferred(self):
+        """
+        Build the parts of the interface that are not needed to show the window:
+        editing docks (AppView.buildDocks()) and HDR display splash.
+        """
+        if pref.verbose: print(" [CONTROL] >> AppController.buildDeferred()")
+        self.view.buildDocks()
+        with hdrCore.profiling.profiler.span('HDR display splash', category='startup'):
+            self.hdrDisplay.displaySplash()
     # -----------------------------------------------------------------------------
 
     def callBackSelectDir(self):
@@ -546,6 +562,7 @@ class AppController(object):
         """
         if pref.verbose: print(" [CB] >> AppController.callBackQuit()")
         self.view.imageGalleryController.save()
+        hdrCore.metadata.metadataWriter.flushAll()
         self.hdrDisplay.close()
         sys.exit()
     # -----------------------------------------------------------------------------
@@ -574,18 +591,18 @@ class AppController(object):
         if selectedProcessPipe:
             self.view.statusBar().showMessage('displaying HDR image, full size image computation: start, please wait !')
             self.view.statusBar().repaint()
-            # save current processpipe metada
-            originalImage = copy.deepcopy(selectedProcessPipe.originalImage)
+            # save current processpipe metada (deferred, written only if changed)
+            originalImage = selectedProcessPipe.originalImage
             originalImage.metadata.metadata['processpipe'] = selectedProcessPipe.toDict()
             originalImage.metadata.save()
 
             # load full size image
             img = hdrCore.image.Image.read(originalImage.path+'/'+originalImage.name)
 
-            # turn off: autoResize
-            hdrCore.processing.ProcessPipe.autoResize = False 
             # make a copy of selectedProcessPipe  
             processpipe = copy.deepcopy(selectedProcessPipe)
+            # turn off: autoResize (only for the copy, the interactive process-pipe is not changed)
+            processpipe.context.autoResize = False 
 
             # set size to display size
             size = pref.getDisplayShape()
@@ -614,9 +631,6 @@ class AppController(object):
 
         if pref.verbose:  print(" [CONTROL] >> AppController.callBackEndDisplay()")
 
-        # turn off: autoResize
-        hdrCore.processing.ProcessPipe.autoResize = True  
-        
         self.view.statusBar().showMessage('displaying HDR image, full size image computation: done !')
 
         # clip, scale
@@ -679,7 +693,7 @@ class AppController(object):
 
             # build process pipe from selected one them compute
             pp = hdrCore.processing.ProcessPipe()
-            hdrCore.processing.ProcessPipe.autoResize = False   # stop autoResize
+            pp.context.autoResize = False   # stop autoResize
             params= []
             for p in selectedProcessPipe.processNodes: 
                 pp.append(copy.deepcopy(p.process),paramDict=None, name=copy.deepcopy(p.name))
@@ -692,8 +706,6 @@ class AppController(object):
             
             imgYres, imgXres, _ = res.colorData.shape
 
-            hdrCore.processing.ProcessPipe.autoResize = True    # return to autoResize
-
             # make comparison image
             oriColorData = ori.colorData*pref.getDisplayScaling()
             resColorData = res.colorData*pref.getDisplayScaling()
@@ -737,18 +749,18 @@ class AppController(object):
             self.view.statusBar().showMessage('exporting HDR image ('+pref.getHDRdisplay()['tag']+'), full size image computation: start, please wait !')
             self.view.statusBar().repaint()
 
-            # save current processpipe metada
-            originalImage = copy.deepcopy(selectedProcessPipe.originalImage)
+            # save current processpipe metada (deferred, written only if changed)
+            originalImage = selectedProcessPipe.originalImage
             originalImage.metadata.metadata['processpipe'] = selectedProcessPipe.toDict()
             originalImage.metadata.save()
 
             # load full size image
             img = hdrCore.image.Image.read(originalImage.path+'/'+originalImage.name)
 
-            # turn off: autoResize
-            hdrCore.processing.ProcessPipe.autoResize = False 
             # make a copy of selectedProcessPipe  
             processpipe = copy.deepcopy(selectedProcessPipe)
+            # turn off: autoResize (only for the copy, the interactive process-pipe is not changed)
+            processpipe.context.autoResize = False 
 
             # set image to process-pipe
             processpipe.setImage(img)
@@ -766,9 +778,6 @@ class AppController(object):
         Args:
             img (hdrCore.image.Image): Processed HDR image ready for export
         """
-        # turn off: autoResize
-        hdrCore.processing.ProcessPipe.autoResize = True  
-        
         self.view.statusBar().showMessage('exporting HDR image ('+pref.getHDRdisplay()['tag']+'), full size image computation: done !')
 
         # clip, scale
@@ -793,98 +802,51 @@ class AppController(object):
         Starts the batch export process for all images in the current gallery,
         allowing users to export multiple processed HDR images with a single
         operation. Provides progress feedback during the batch operation.
+
+        Note:
+            Images are exported in parallel worker processes (hdrCore.export.exportParallel):
+            process-pipe parameters are saved to metadata first, workers read them back.
+            Images already exported with the same parameters (export manifest of the
+            output directory) are skipped.
         """
         if pref.verbose:  print(" [CONTROL] >> AppController.callBackExportAllHDR()")
 
-        self.processPipes = self.view.imageGalleryController.getProcessPipes()
-
         # select dir where to save export
         self.dirName = QFileDialog.getExistingDirectory(None, 'Select Directory where to export HDR file', self.model.directory)
-        self.view.statusBar().showMessage('exporting '+str(len(self.processPipes))+' HDR images ... please wait')
-        self.view.statusBar().repaint()
-        self.imageToExport = len(self.processPipes) ; self.imageExportDone = 0
-
-        pp = self.processPipes[0]
-
-        # save current processpipe metada
-        originalImage = copy.deepcopy(pp.originalImage)
-        originalImage.metadata.metadata['processpipe'] = pp.toDict()
-        originalImage.metadata.save()
+        if not self.dirName: return
 
-        # load full size image
-        img = hdrCore.image.Image.read(originalImage.path+'/'+originalImage.name)
+        # save current processpipes metadata: read by export workers
+        self.view.imageGalleryController.save()
 
-        # turn off: autoResize
-        hdrCore.processing.ProcessPipe.autoResize = False 
-        # make a copy of selectedProcessPipe  
-        processpipe = copy.deepcopy(pp)
+        self.imageToExport = len(self.imagesName)
+        self.view.statusBar().showMessage('exporting '+str(self.imageToExport)+' HDR images ... please wait')
+        self.view.statusBar().repaint()
 
-        # set image to process-pipe
-        processpipe.setImage(img)
+        thread.pExport(self.callBackEndAllExportHDR, list(self.imagesName), self.dirName, pref.getHDRdisplay(), 
+                       backend='cpp', progress=self.callBackProgressAllExportHDR)
+    # -----------------------------------------------------------------------------
+    def callBackProgressAllExportHDR(self, done, total, filename, outputFilenames):
+        """
+        Report progress of batch export.
 
-        thread.cCompute(self.callBackEndAllExportHDR, processpipe, toneMap=False, progress=self.view.statusBar().showMessage)            
+        Args:
+            done (int): number of images exported
+            total (int): number of images to export
+            filename (str): last exported image
+            outputFilenames (list of str or None): exported files, None if export failed
+        """
+        self.view.statusBar().showMessage('exporting HDR images ('+pref.getHDRdisplay()['tag']+'):'+str(int(100*done/total))+'% done !')
     # -----------------------------------------------------------------------------
-    def callBackEndAllExportHDR(self, img):
+    def callBackEndAllExportHDR(self, res):
         """
-        Process single image in batch export and continue to next.
-        
-        Handles the completion of each individual image in the batch export
-        process, saves the current image, updates progress, and initiates
-        processing of the next image in the queue.
+        Complete batch export.
         
         Args:
-            img (hdrCore.image.Image): Current processed HDR image in batch
-            
-        Note:
-            Recursively processes all images in the batch until completion,
-            providing progress updates throughout the operation.
+            res (dict): exported filenames (None if failed) keyed by image filename
         """
-        # last image ?
-        self.imageExportDone +=1
-
-        self.view.statusBar().showMessage('exporting HDR images ('+pref.getHDRdisplay()['tag']+'):'+str(int(100*self.imageExportDone/self.imageToExport))+'% done !')
-
-        # clip, scale
-        img = img.process(hdrCore.processing.clip())
-        img.colorData = img.colorData*pref.getDisplayScaling()
-
-        if self.dirName:
-            pathExport = os.path.join(self.dirName, img.name[:-4]+pref.getHDRdisplay()['post']+'.hdr')
-            img.type = hdrCore.image.imageType.HDR
-            img.metadata.metadata['processpipe'] = None
-            img.metadata.metadata['display'] = pref.getHDRdisplay()['tag']
-
-            img.write(pathExport)
-
-        if self.imageExportDone == self.imageToExport :
-            # turn off: autoResize
-            hdrCore.processing.ProcessPipe.autoResize = True
-        else:
-            pp = self.processPipes[self.imageExportDone]
-
-            if not pp:
-                img = hdrCore.image.Image.read(self.imagesName[self.imageExportDone], thumb=True)
-                pp = model.EditImageModel.buildProcessPipe()
-                pp.setImage(img)                      
-
-
-            # save current processpipe metada
-            originalImage = copy.deepcopy(pp.originalImage)
-            originalImage.metadata.metadata['processpipe'] = pp.toDict()
-            originalImage.metadata.save()
-
-            # load full size image
-            img = hdrCore.image.Image.read(originalImage.path+'/'+originalImage.name)
-
-            # turn off: autoResize
-            hdrCore.processing.ProcessPipe.autoResize = False 
-            # make a copy of selectedProcessPipe  
-            processpipe = copy.deepcopy(pp)
-
-            # set image to process-pipe
-            processpipe.setImage(img)
-
-            thread.cCompute(self.callBackEndAllExportHDR, processpipe, toneMap=False, progress=self.view.statusBar().showMessage)            
+        failed = [f for f, out in res.items() if out == None]
+        self.view.statusBar().showMessage('exporting HDR images ('+pref.getHDRdisplay()['tag']+'): done, '+
+                                          str(len(res)-len(failed))+' exported, '+str(len(failed))+' failed !')
 # ------------------------------------------------------------------------------------------
 # --- class MultiDockController() ----------------------------------------------------------
 # ------------------------------------------------------------------------------------------
@@ -974,6 +936,95 @@ class MultiDockController():
 
         return self.view.setProcessPipe(processPipe)
 # ------------------------------------------------------------------------------------------
+# --- class ProfilingController ------------------------------------------------------------
+# ------------------------------------------------------------------------------------------
+class ProfilingController():
+    """
+    Controller of the profiling dock: rolling per-node timings and memory, Chrome trace export,
+    execution plan of the selected image (hdrCore.plan).
+
+    Showing the dock enables hdrCore.profiling.profiler, hiding it disables
+    recording (unless enabled by preferences).
+
+    Attributes:
+        - parent (view.AppView): main window
+        - view (view.ProfilingView): profiling dock
+    """
+    def __init__(self, parent=None):
+        """
+        Initialize the profiling controller.
+
+        Args:
+            parent (view.AppView): main window
+        """
+        if pref.verbose: print(" [CONTROL] >> ProfilingController.__init__()")
+
+        self.parent = parent
+        self.view = view.ProfilingView(self)
+    # ---------------------------------------------------------------------------------------
+    def activate(self, visible=True):
+        """
+        Show or hide the profiling dock, recording follows the dock visibility.
+
+        Args:
+            visible (bool, optional): show the dock (default: True)
+        """
+        if pref.verbose: print(" [CONTROL] >> ProfilingController.activate(",visible,")")
+        hdrCore.profiling.profiler.enable(visible or pref.profiling, memory=(visible or pref.profiling) and self.view.memory.isChecked())
+        self.view.setVisible(visible)
+    # ---------------------------------------------------------------------------------------
+    def getSummary(self):
+        """
+        Returns:
+            list of dict: rolling timings per name (hdrCore.profiling.profiler.summary()), then
+                latency percentiles per control over a longer window (hdrCore.profiling.latency.summary())
+        """
+        timings = [entry for entry in hdrCore.profiling.profiler.summary() if entry['category'] != 'latency']
+        return timings + hdrCore.profiling.latency.summary()
+    # ---------------------------------------------------------------------------------------
+    def callBackTraceMemory(self, checked):
+        """
+        Start or stop memory tracing (tracemalloc) of nodes and exports.
+
+        Args:
+            checked (bool): trace memory
+        """
+        if pref.verbose: print(" [CONTROL] >> ProfilingController.callBackTraceMemory(",checked,")")
+        hdrCore.profiling.profiler.enable(hdrCore.profiling.profiler.enabled, memory=checked and hdrCore.profiling.profiler.enabled)
+    # ---------------------------------------------------------------------------------------
+    def callBackClear(self):
+        """Remove recorded events."""
+        if pref.verbose: print(" [CONTROL] >> ProfilingController.callBackClear()")
+        hdrCore.profiling.profiler.clear()
+        self.view.refresh()
+    # ---------------------------------------------------------------------------------------
+    def callBackExportTrace(self):
+        """Export recorded events to a Chrome trace JSON file (chrome://tracing, Perfetto)."""
+        if pref.verbose: print(" [CONTROL] >> ProfilingController.callBackExportTrace()")
+        filename, _ = QFileDialog.getSaveFileName(None, 'Export profiling trace', 'uHDR-trace.json', 'Chrome trace (*.json)')
+        if filename:
+            nbEvents = hdrCore.profiling.profiler.exportChromeTrace(filename)
+            self.parent.statusBar().showMessage("profiling trace: "+str(nbEvents)+" events exported to "+filename)
+    # ---------------------------------------------------------------------------------------
+    def callBackExplain(self):
+        """
+        Show the execution plan of the selected image: next compute at working size
+        (dirty nodes only), then full size export (exportParallel: untiled, one image
+        per worker), without computing.
+        """
+        if pref.verbose: print(" [CONTROL] >> ProfilingController.callBackExplain()")
+        processPipe = self.parent.imageGalleryController.model.getSelectedProcessPipe()
+        if not isinstance(processPipe, hdrCore.processing.ProcessPipe):
+            self.view.setPlan('no image selected')
+            return
+        text = ''
+        # edits are computed by the C++ core when HDRip.dll loads (see guiQt.thread.RunCompute)
+        if hdrCore.coreC.available(): text = 'WARNING: edits and exports are computed by the C++ core, plans describe the '+processPipe.context.computation+' pipeline\n\n'
+        text += 'next compute, '+hdrCore.plan.formatPlan(processPipe.explain())
+        original = processPipe.originalImage
+        shape = hdrCore.export.estimateShape(os.path.join(original.path, original.name))
+        if shape: text += '\n\nexport, '+hdrCore.plan.formatPlan(processPipe.explain(shape=shape))
+        self.view.setPlan(text)
 # ------------------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------------------
 class EditImageController:
@@ -1289,6 +1340,7 @@ class AdvanceSliderController():
     
     Attributes:
         - parent: Parent controller for coordination
+        - name (str): Name of the slider (latency telemetry control name)
         - view (view.AdvanceSliderView): Slider interface component
         - model (model.AdvanceSliderModel): Slider data model
         - step (float): Step size for slider increments
@@ -1313,6 +1365,7 @@ class AdvanceSliderController():
         """
         if pref.verbose: print(" [CONTROL] >> AdvanceSliderController.__init__(",") ")
         self.parent = parent
+        self.name = name
 
         self.view = view.AdvanceSliderView(self,  name, defaultValue, range, step)
         self.model = model.AdvanceSliderModel(self, value=defaultValue)
@@ -1340,7 +1393,9 @@ class AdvanceSliderController():
 
         self.model.value = value
         self.view.editValue.setText(str(value))
-        if self.callBackActive and self.callBackValueChange: self.callBackValueChange(value)
+        if self.callBackActive and self.callBackValueChange:
+            hdrCore.profiling.latency.input(self.name, value)
+            self.callBackValueChange(value)
     # -----------------------------------------------------------------------------
     def setValue(self, value, callBackActive = True):
         """
@@ -1546,7 +1601,10 @@ class ToneCurveController():
             npImgHistCumuNorm = npImgHistCumu/np.max(npImgHistCumu)
             
             #predict keypoint value
+            import torch
+            from torch.autograd import Variable
             if self.networkModel == None:
+                from hdrCore.net import Net
                 self.networkModel = Net(50,5)
                 self.networkModel.load_state_dict(torch.load(self.weightFile))
                 self.networkModel.eval()
@@ -1753,12 +1811,13 @@ class HDRviewerController():
         - view: View component (set externally)
         - viewerProcess: External HDR viewer process handle
     """
-    def __init__(self, parent):
+    def __init__(self, parent, splash=True):
         """
         Initialize the HDR viewer controller.
         
         Args:
             parent: Parent controller for coordination and image access
+            splash (bool, optional): display the splash screen now, default True
         """
         if pref.verbose: print(" [CONTROL] >> HDRviewerController.__init__(",")")
 
@@ -1768,7 +1827,7 @@ class HDRviewerController():
 
         self.viewerProcess = None
 
-        self.displaySplash()
+        if splash: self.displaySplash()
 
     def setView(self, view): 
         """
@@ -1852,9 +1911,11 @@ class HDRviewerController():
             HDRfilename (str): Path to HDR file to display
             
         Note:
-            Uses HDRImageViewer.exe for Windows-based HDR display.
-            Includes automatic process restart if initial launch fails.
+            Uses HDRImageViewer.exe for Windows-based HDR display (no HDR
+            display on other systems). Includes automatic process restart if
+            initial launch fails.
         """
+        if os.name != 'nt': return
 
          # check that no current display process already open
         if self.viewerProcess:
@@ -1973,7 +2034,9 @@ class LchColorSelectorController:
             vMax (float): Maximum hue value for selection (0-360 degrees)
         """
         values  = self.model.setHueSelection(vMin,vMax)
-        if self.callBackActive : self.parent.controller.changeColorEditor(values, self.idName)
+        if self.callBackActive :
+            hdrCore.profiling.latency.input(self.idName+'.hue', (vMin, vMax))
+            self.parent.controller.changeColorEditor(values, self.idName)
 
     def sliderChromaChange(self, vMin, vMax):
         """
@@ -1984,7 +2047,9 @@ class LchColorSelectorController:
             vMax (float): Maximum chroma value for selection (0-100)
         """
         values  = self.model.setChromaSelection(vMin,vMax)
-        if self.callBackActive : self.parent.controller.changeColorEditor(values, self.idName)
+        if self.callBackActive :
+            hdrCore.profiling.latency.input(self.idName+'.chroma', (vMin, vMax))
+            self.parent.controller.changeColorEditor(values, self.idName)
 
     def sliderLightnessChange(self, vMin, vMax):
         """
@@ -1995,7 +2060,9 @@ class LchColorSelectorController:
             vMax (float): Maximum lightness value for selection (0-100)
         """
         values  = self.model.setLightnessSelection(vMin,vMax)
-        if self.callBackActive : self.parent.controller.changeColorEditor(values, self.idName)
+        if self.callBackActive :
+            hdrCore.profiling.latency.input(self.idName+'.lightness', (vMin, vMax))
+            self.parent.controller.changeColorEditor(values, self.idName)
 
     def sliderExposureChange(self, ev):
         """
@@ -2005,7 +2072,9 @@ class LchColorSelectorController:
             ev (float): Exposure adjustment in EV stops for selected color range
         """
         values = self.model.setExposure(ev)
-        if self.callBackActive : self.parent.controller.changeColorEditor(values, self.idName)
+        if self.callBackActive :
+            hdrCore.profiling.latency.input(self.idName+'.exposure', ev)
+            self.parent.controller.changeColorEditor(values, self.idName)
 
     def sliderSaturationChange(self, sat):
         """
@@ -2015,7 +2084,9 @@ class LchColorSelectorController:
             sat (float): Saturation adjustment for selected color range
         """
         values = self.model.setSaturation(sat)
-        if self.callBackActive : self.parent.controller.changeColorEditor(values, self.idName)
+        if self.callBackActive :
+            hdrCore.profiling.latency.input(self.idName+'.saturation', sat)
+            self.parent.controller.changeColorEditor(values, self.idName)
 
     def sliderContrastChange(self, cc):
         """
@@ -2025,7 +2096,9 @@ class LchColorSelectorController:
             cc (float): Contrast adjustment for selected color range
         """
         values = self.model.setContrast(cc)
-        if self.callBackActive : self.parent.controller.changeColorEditor(values, self.idName)
+        if self.callBackActive :
+            hdrCore.profiling.latency.input(self.idName+'.contrast', cc)
+            self.parent.controller.changeColorEditor(values, self.idName)
 
     def sliderHueShiftChange(self, hs):
         """
@@ -2035,7 +2108,9 @@ class LchColorSelectorController:
             hs (float): Hue shift amount in degrees for selected color range
         """
         values = self.model.setHueShift(hs)
-        if self.callBackActive : self.parent.controller.changeColorEditor(values, self.idName)
+        if self.callBackActive :
+            hdrCore.profiling.latency.input(self.idName+'.hueShift', hs)
+            self.parent.controller.changeColorEditor(values, self.idName)
 
     def checkboxMaskChange(self,value): 
         """
@@ -2045,7 +2120,9 @@ class LchColorSelectorController:
             value (bool): Enable (True) or disable (False) mask visualization
         """
         values = self.model.setMask(value)
-        if self.callBackActive : self.parent.controller.changeColorEditor(values, self.idName)
+        if self.callBackActive :
+            hdrCore.profiling.latency.input(self.idName+'.mask', value)
+            self.parent.controller.changeColorEditor(values, self.idName)
 
     def setValues(self, values, callBackActive = False):
         """
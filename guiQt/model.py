@@ -54,15 +54,13 @@ Threading Models:
 # --- Import ------------------------------------------------------------------
 # -----------------------------------------------------------------------------
 
-import os, colour, copy, json, time, sklearn.cluster, math
-import pathos.multiprocessing, multiprocessing, functools
+import os, colour, copy, json, time, math
+import multiprocessing, functools
 import numpy as np
-from geomdl import BSpline
-from geomdl import utilities
 
 from datetime import datetime
 
-import hdrCore.image, hdrCore.utils, hdrCore.aesthetics, hdrCore.image
+import hdrCore.image, hdrCore.utils, hdrCore.aesthetics, hdrCore.image, hdrCore.metadata
 from . import controller, thread
 import hdrCore.processing, hdrCore.quality
 import preferences.preferences as pref
@@ -130,6 +128,7 @@ class ImageGalleryModel:
         - processPipes (list[ProcessPipe]): HDR processing pipelines for each image
         - _selectedImage (int): Index of currently selected image (-1 if none)
         - aestheticsModels (list): Aesthetic analysis models for images
+        - loadRequest (thread.AsyncLoadImage): loading of the images of the last loaded page
     """
 
     def __init__(self, _controller):
@@ -147,6 +146,7 @@ class ImageGalleryModel:
         self._selectedImage= -1
 
         self.aesthetics = []
+        self.loadRequest = None
 
     def setSelectedImage(self,id): 
         """
@@ -207,8 +207,9 @@ class ImageGalleryModel:
         Load and process images for a specific page.
         
         Loads images for the specified page number, creating ProcessPipes
-        for new images and updating existing ones. Uses threading for
-        efficient parallel loading.
+        for new images and updating existing ones. New images are loaded by
+        thread.AsyncLoadImage: reading on I/O threads, process-pipe computation
+        in worker processes.
         
         Args:
             nb (int): Page number to load (0-indexed)
@@ -217,29 +218,43 @@ class ImageGalleryModel:
         nbImagePage = controller.GalleryMode.nbRow(self.controller.view.shapeMode)*controller.GalleryMode.nbCol(self.controller.view.shapeMode)
         min_,max_ = (nb*nbImagePage), ((nb+1)*nbImagePage)
 
-        loadThreads = thread.RequestLoadImage(self)
+        # bulk read of page metadata: a single query instead of one per image
+        toLoad = [f for i,f in enumerate(self.imageFilenames[min_:max_]) if not isinstance(self.processPipes[min_+i],hdrCore.processing.ProcessPipe)]
+        if pref.metadataStore and toLoad: hdrCore.metadata.metadataStore.open(os.path.dirname(toLoad[0])).getMany(toLoad)
 
+        idxToLoad = []
         for i,f in enumerate(self.imageFilenames[min_:max_]): # load only the current page nb
             if not isinstance(self.processPipes[min_+i],hdrCore.processing.ProcessPipe):
-                self.controller.parent.statusBar().showMessage("read image: "+f)
-                self.controller.parent.statusBar().repaint()
-                loadThreads.requestLoad(min_,i, f)
+                idxToLoad.append(i)
             else:
                 self.controller.view.updateImage(i, self.processPipes[min_+i], f)
 
+        if idxToLoad:
+            self.controller.parent.statusBar().showMessage("read "+str(len(idxToLoad))+" images ...")
+            self.controller.parent.statusBar().repaint()
+            # keep a reference: results are delivered to this object
+            self.loadRequest = thread.AsyncLoadImage(self)
+            self.loadRequest.requestLoad(min_, idxToLoad, toLoad)
+
     def save(self):
         """
         Save all ProcessPipe configurations to their associated image metadata.
         
         Iterates through all ProcessPipes and saves their parameters as metadata
-        in the corresponding image files for persistence.
+        in the corresponding image files for persistence. When the metadata store
+        is enabled, all changes are written in one transaction per directory.
         """
         if pref.verbose:  print(" [MODEL] >> ImageGalleryModel.save()")
 
+        storeMetas = {}
         for i,p in enumerate(self.processPipes):
             if isinstance(p, hdrCore.processing.ProcessPipe): 
                 p.getImage().metadata.metadata['processpipe'] = p.toDict()            
-                p.getImage().metadata.save()
+                if pref.metadataStore:
+                    img = p.getImage()
+                    storeMetas.setdefault(img.path, {})[img.name] = img.metadata.metadata
+                else: p.getImage().metadata.save()
+        for path, metas in storeMetas.items(): hdrCore.metadata.metadataStore.open(path).putMany(metas)
 
     def getFilenamesOfCurrentPage(self):
         """
@@ -400,86 +415,12 @@ class EditImageModel(object):
         
         Returns:
             ProcessPipe: Configured processing pipeline with default parameters
+
+        Note:
+            The pipeline is defined in hdrCore.processing.ProcessPipe.buildDefault()
+            so that it can be built without the GUI (headless export).
         """
-        processPipe = hdrCore.processing.ProcessPipe()
-
-        # exposure ---------------------------------------------------------------------------------------------------------
-        defaultParameterEV = {'EV': 0}                                              
-        idExposureProcessNode = processPipe.append(hdrCore.processing.exposure(), paramDict=None,name="exposure")   
-        processPipe.setParameters(idExposureProcessNode, defaultParameterEV)                                        
-
-        # contrast ---------------------------------------------------------------------------------------------------------
-        defaultParameterContrast = {'contrast': 0}                                  
-        idContrastProcessNode = processPipe.append(hdrCore.processing.contrast(), paramDict=None,  name="contrast") 
-        processPipe.setParameters(idContrastProcessNode, defaultParameterContrast)                                  
-
-        #tonecurve ---------------------------------------------------------------------------------------------------------
-        defaultParameterYcurve = {'start':[0,0], 
-                                  'shadows': [10,10],
-                                  'blacks': [30,30], 
-                                  'mediums': [50,50], 
-                                  'whites': [70,70], 
-                                  'highlights': [90,90], 
-                                  'end': [100,100]}                         
-        idYcurveProcessNode = processPipe.append(hdrCore.processing.Ycurve(), paramDict=None,name="tonecurve")      
-        processPipe.setParameters(idYcurveProcessNode, defaultParameterYcurve)   
-        
-        # masklightness ---------------------------------------------------------------------------------------------------------
-        defaultMask = { 'shadows': False, 
-                       'blacks': False, 
-                       'mediums': False, 
-                       'whites': False, 
-                       'highlights': False}
-        idLightnessMaskProcessNode = processPipe.append(hdrCore.processing.lightnessMask(), paramDict=None, name="lightnessmask")  
-        processPipe.setParameters(idLightnessMaskProcessNode, defaultMask)  
-
-        # saturation ---------------------------------------------------------------------------------------------------------
-        defaultValue = {'saturation': 0.0,  'method': 'gamma'}
-        idSaturationProcessNode = processPipe.append(hdrCore.processing.saturation(), paramDict=None, name="saturation")    
-        processPipe.setParameters(idSaturationProcessNode, defaultValue)                     
-
-        # colorEditor0 ---------------------------------------------------------------------------------------------------------
-        defaultParameterColorEditor0= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
-                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
-                                       'mask': False}        
-        idColorEditor0ProcessNode = processPipe.append(hdrCore.processing.colorEditor(), paramDict=None, name="colorEditor0")  
-        processPipe.setParameters(idColorEditor0ProcessNode, defaultParameterColorEditor0)
-
-        # colorEditor1 ---------------------------------------------------------------------------------------------------------
-        defaultParameterColorEditor1= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
-                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
-                                       'mask': False}        
-        idColorEditor1ProcessNode = processPipe.append(hdrCore.processing.colorEditor(), paramDict=None, name="colorEditor1")  
-        processPipe.setParameters(idColorEditor1ProcessNode, defaultParameterColorEditor1)
-        
-        # colorEditor2 ---------------------------------------------------------------------------------------------------------
-        defaultParameterColorEditor2= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
-                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
-                                       'mask': False}        
-        idColorEditor2ProcessNode = processPipe.append(hdrCore.processing.colorEditor(), paramDict=None, name="colorEditor2")  
-        processPipe.setParameters(idColorEditor2ProcessNode, defaultParameterColorEditor2)
-        
-        # colorEditor3 ---------------------------------------------------------------------------------------------------------
-        defaultParameterColorEditor3= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
-                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
-                                       'mask': False}        
-        idColorEditor3ProcessNode = processPipe.append(hdrCore.processing.colorEditor(), paramDict=None, name="colorEditor3")  
-        processPipe.setParameters(idColorEditor3ProcessNode, defaultParameterColorEditor3)
-        
-        # colorEditor4 ---------------------------------------------------------------------------------------------------------
-        defaultParameterColorEditor4= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
-                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
-                                       'mask': False}        
-        idColorEditor4ProcessNode = processPipe.append(hdrCore.processing.colorEditor(), paramDict=None, name="colorEditor4")  
-        processPipe.setParameters(idColorEditor4ProcessNode, defaultParameterColorEditor4)
-
-        # geometry ---------------------------------------------------------------------------------------------------------
-        defaultValue = { 'ratio': (16,9), 'up': 0,'rotation': 0.0}
-        idGeometryNode = processPipe.append(hdrCore.processing.geometry(), paramDict=None, name="geometry")    
-        processPipe.setParameters(idGeometryNode, defaultValue)
-        # ------------ --------------------------------------------------------------------------------------------------------- 
-
-        return processPipe
+        return hdrCore.processing.ProcessPipe.buildDefault()
 
     def autoExposure(self):
         """
@@ -707,6 +648,7 @@ class ToneCurveModel():
         self.control = {'start':[0.0,0.0], 'shadows': [10.0,10.0], 'blacks': [30.0,30.0], 'mediums': [50.0,50.0], 'whites': [70.0,70.0], 'highlights': [90.0,90.0], 'end': [100.0,100.0]}
         self.default = {'start':[0.0,0.0], 'shadows': [10.0,10.0], 'blacks': [30.0,30.0], 'mediums': [50.0,50.0], 'whites': [70.0,70.0], 'highlights': [90.0,90.0], 'end': [100.0,100.0]}
 
+        from geomdl import BSpline
         self.curve =    BSpline.Curve()
         self.curve.degree = 2
         self.points =None
@@ -726,6 +668,7 @@ class ToneCurveModel():
         #self.curve.ctrlpts = copy.deepcopy([self.control['start'],self.control['shadows'],self.control['blacks'],self.control['mediums'], self.control['whites'], self.control['highlights'], self.control['end']])
         self.curve.ctrlpts = copy.deepcopy([self.control['start'],self.control['shadows'],self.control['blacks'],self.control['mediums'], self.control['whites'], self.control['highlights'], [200, self.control['end'][1]]])
         # auto-generate knot vector
+        from geomdl import utilities
         self.curve.knotvector = utilities.generate_knot_vector(self.curve.degree, len(self.curve.ctrlpts))
         # evaluate curve and get points
         self.points = np.asarray(self.curve.evalpts)
@@ -1425,6 +1368,7 @@ class ColorEditorsAutoModel:
             LabPixelsVector = hdrCore.utils.ndarray2vector(LabPixels)
 
             # k-means: nb cluster = nbColors + 1
+            import sklearn.cluster
             kmeans_cluster_Lab = sklearn.cluster.KMeans(n_clusters=self.nbColors+1)
             kmeans_cluster_Lab.fit(LabPixelsVector)
             cluster_centers_Lab = kmeans_cluster_Lab.cluster_centers_
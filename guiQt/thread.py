@@ -27,19 +27,23 @@ interaction. It implements several threading patterns for different use cases:
 Threading Classes:
     - RequestCompute: Real-time HDR editing with single-threaded sequential processing
     - RunCompute: Worker thread for HDR processing pipeline execution
-    - RequestLoadImage: Parallel image loading and thumbnail generation
-    - RunLoadImage: Worker thread for individual image loading
-    - pCompute: Multi-threaded HDR processing with image splitting
-    - pRun: Worker thread for processing image splits
+    - AsyncLoadImage: Gallery image loading (asyncio loader, Qt signal bridge)
+    - pCompute: Multi-threaded HDR processing by tiles (hdrCore.tiles)
+    - pRun: Worker thread running the tile scheduler
     - cCompute: C++ accelerated HDR processing (single-threaded)
     - cRun: Worker thread for C++ pipeline execution
+    - pExport: Parallel batch export in worker processes
+    - pExportRun: Worker thread driving the batch export
     - RequestAestheticsCompute: Aesthetics analysis threading
     - RunAestheticsCompute: Worker thread for aesthetics computation
 
+Functions:
+    - warmupNumba: Background compilation of numba kernels at startup
+
 Threading Patterns:
 1. Real-time Editing: Uses RequestCompute for immediate UI feedback during editing
-2. Parallel Loading: Uses RequestLoadImage for efficient gallery thumbnail generation  
-3. Split Processing: Uses pCompute for large image processing with progress feedback
+2. Parallel Loading: Uses AsyncLoadImage (I/O threads, compute processes) for gallery thumbnails
+3. Tiled Processing: Uses pCompute for large image processing with progress feedback
 4. C++ Acceleration: Uses cCompute for hardware-accelerated processing
 5. Background Analysis: Uses RequestAestheticsCompute for non-blocking analysis
 
@@ -49,13 +53,35 @@ and provide callback mechanisms for result delivery and progress updates.
 # -----------------------------------------------------------------------------
 # --- Import ------------------------------------------------------------------
 # -----------------------------------------------------------------------------
-import copy, time, random
-import hdrCore
+import copy, time, random, threading
+import hdrCore, hdrCore.export, hdrCore.loader, hdrCore.tiles, hdrCore.profiling
 from . import model
-from PyQt5.QtCore import QRunnable, Qt, QThreadPool
+from PyQt5.QtCore import QRunnable, Qt, QThreadPool, QObject, pyqtSignal
 from timeit import default_timer as timer
 import preferences.preferences as pref
 
+# -----------------------------------------------------------------------------
+# --- Functions ---------------------------------------------------------------
+# -----------------------------------------------------------------------------
+def warmupNumba():
+    """
+    Compile numba kernels (hdrCore.numbafun.warmup()) in a background thread,
+    so that the first edit does not wait for the JIT. numba is imported in
+    the thread. An edit requested meanwhile waits for the compilation in
+    progress (numba compiler lock) then uses the compiled kernels.
+
+    Returns:
+        threading.Thread: warm-up thread (daemon)
+    """
+    def run():
+        try:
+            from hdrCore import numbafun
+            numbafun.warmup()
+        except Exception as e:
+            print("WARNING[warmupNumba: numba kernels not compiled (",e,")]")
+    warmup = threading.Thread(target=run, name='numbaWarmup', daemon=True)
+    warmup.start()
+    return warmup
 # -----------------------------------------------------------------------------
 # --- Class RequestCompute ----------------------------------------------------
 # -----------------------------------------------------------------------------
@@ -82,6 +108,7 @@ class RequestCompute(object):
         - processpipe (ProcessPipe): Active processing pipeline reference
         - readyToRun (bool): Processing availability flag
         - waitingUpdate (bool): Pending update flag during processing
+        - latencyStamps (list): GUI event stamps of pending requests (hdrCore.profiling.latency)
     """
 
     def __init__(self, parent):
@@ -101,6 +128,9 @@ class RequestCompute(object):
         self.readyToRun = True
         self.waitingUpdate = False
 
+        self.latencyStamps = []
+        self.latencyLock = threading.Lock()
+
     def setProcessPipe(self,pp):
         """
         Set the current active processing pipeline.
@@ -123,6 +153,9 @@ class RequestCompute(object):
             params (dict, Required): Updated parameters for process-node
         """
         self.requestDict[id] = copy.deepcopy(params)
+        stamp = hdrCore.profiling.latency.take(self.processpipe.processNodes[id].name)
+        if stamp:
+            with self.latencyLock: self.latencyStamps.append(stamp)
 
         if self.readyToRun:
             # start processing processpipe
@@ -131,16 +164,24 @@ class RequestCompute(object):
             # if a computation is already running
             self.waitingUpdate = True
 
-    def endCompute(self):
+    def endCompute(self, stamps=None, computeTime=0.0):
         """
         Handle processing completion and manage restart.
         
         Called when process-node computation finishes. Retrieves processed
         image, sends it to parent model, and restarts computation if there
-        are pending parameter updates.
+        are pending parameter updates. The latency of the GUI events of the
+        computed requests is recorded once the image is displayed.
+
+        Args:
+            stamps (list, optional): GUI event stamps of the computed requests
+            computeTime (float, optional): process-pipe computation time (seconds)
         """
+        start = timer()
         imgTM = self.processpipe.getImage(toneMap=True)
+        toneMapped = timer()
         self.parent.updateImage(imgTM)
+        if stamps: hdrCore.profiling.latency.displayed(stamps, compute=computeTime, toneMap=toneMapped-start, display=timer()-toneMapped)
         if self.waitingUpdate:
             self.pool.start(RunCompute(self))
             self.waitingUpdate = False
@@ -172,275 +213,204 @@ class RunCompute(QRunnable):
         """
         Main thread execution method.
         
-        Executes ProcessPipe computation using either C++ acceleration
-        or Python processing. Updates pipeline parameters, performs
+        Executes ProcessPipe computation using C++ acceleration when
+        HDRip.dll can be loaded, otherwise ProcessPipe.compute (backend of the
+        process-pipe context). Updates pipeline parameters, performs
         computation, and triggers completion callback.
         """
         self.parent.readyToRun = False
+        with self.parent.latencyLock: stamps, self.parent.latencyStamps = self.parent.latencyStamps, []
         for k in self.parent.requestDict.keys(): self.parent.processpipe.setParameters(k,self.parent.requestDict[k])
-        cpp = True
+        import hdrCore.coreC
+        cpp = hdrCore.coreC.available()
+        start = timer()
         if cpp:
-            img  = copy.deepcopy(self.parent.processpipe.getInputImage())
-            imgRes = hdrCore.coreC.coreCcompute(img, self.parent.processpipe)
-            self.parent.processpipe.setOutput(imgRes)
+            # the input and the result are buffers of the pipeline arena (reuseBuffers)
+            processpipe = self.parent.processpipe
+            img = processpipe.getInputImage() if processpipe.context.reuseBuffers else copy.deepcopy(processpipe.getInputImage())
+            imgRes = hdrCore.coreC.coreCcompute(img, processpipe)
+            processpipe.setOutput(imgRes, share=processpipe.context.reuseBuffers)
+            dt = timer() - start
             self.parent.readyToRun = True
-            self.parent.endCompute()
+            self.parent.endCompute(stamps, dt)
         else:
-            start = timer()
             self.parent.processpipe.compute()
             dt = timer() - start
             self.parent.readyToRun = True
-            self.parent.endCompute()
+            self.parent.endCompute(stamps, dt)
 # -----------------------------------------------------------------------------
 # --- Class RequestLoadImage --------------------------------------------------
 # -----------------------------------------------------------------------------
-class RequestLoadImage(object):
+class AsyncLoadImage(QObject):
     """
-    Parallel image loading coordinator for gallery thumbnail generation.
-    
-    Manages multi-threaded loading of images for gallery display, creating
-    new threads for each image load operation. Handles load completion
-    callbacks and error recovery with automatic retry mechanisms.
-    
+    Gallery image loading through the asyncio loader (hdrCore.loader.asyncLoader).
+
+    Images of a page are read on I/O threads and their process-pipes computed
+    in worker processes. Results are emitted from the loader thread with the
+    loaded signal and handled in the Qt event loop (queued connection), so
+    that the model and the view are only updated from the GUI thread.
+
     Attributes:
         - parent (ImageGalleryModel): Parent model for image registration
-        - pool (QThreadPool): Qt thread pool for worker management
         - requestsDone (dict): Load completion tracking {imageIndex: completed}
+        - future (concurrent.futures.Future): loading of the requested images
+
+    Signals:
+        loaded (object): (idx0, idx, processPipe, filename), processPipe is None if loading failed
     """
 
+    loaded = pyqtSignal(object)
+
     def __init__(self, parent):
         """
-        Initialize image loading coordinator.
+        Initialize image loading coordinator (must be created in the GUI thread).
         
         Args:
             parent (ImageGalleryModel): Parent gallery model
         """
+        super().__init__()
         self.parent = parent
-        self.pool = QThreadPool.globalInstance()        # get a global pool
         self.requestsDone = {}
+        self.future = None
+        self.loaded.connect(self.endLoadImage, Qt.QueuedConnection)
 
-    def requestLoad(self, minIdxInPage, imgIdxInPage, filename):
+    def requestLoad(self, minIdxInPage, imgIdxs, filenames):
         """
-        Start image loading for specified gallery position.
+        Start loading of images of the current page.
         
         Args:
             minIdxInPage (int, Required): First image index in current page
-            imgIdxInPage (int, Required): Relative image index within page
-            filename (str, Required): Image file path to load
+            imgIdxs (list of int, Required): Relative image indexes within page
+            filenames (list of str, Required): Image file paths to load
         """
-        self.requestsDone[minIdxInPage+ imgIdxInPage] = False
-        self.pool.start(RunLoadImage(self,minIdxInPage, imgIdxInPage,filename))
+        idxOfFilename = dict(zip(filenames, imgIdxs))
+        for idx in imgIdxs: self.requestsDone[minIdxInPage + idx] = False
 
-    def endLoadImage(self,error,idx0, idx,processPipe, filename):
+        def callBack(filename, processPipe, error):
+            # loader thread: forward to GUI thread
+            self.loaded.emit((minIdxInPage, idxOfFilename[filename], processPipe, filename))
+
+        self.future = hdrCore.loader.asyncLoader.get().loadMany(filenames, callBack)
+
+    def endLoadImage(self, result):
         """
-        Handle image loading completion or error recovery.
-        
-        Called when loading completes or fails (IOError, ValueError).
-        Updates parent model with ProcessPipe and refreshes view on success.
-        Automatically retries loading on failure.
+        Handle image loading completion (GUI thread).
+
+        Registers the ProcessPipe in the parent model (if the image list has not
+        changed meanwhile) and refreshes the view if the page of the image is
+        still displayed.
 
         Args:
-            error (bool, Required): True if loading failed
-            idx0 (int, Required): First image index in current page
-            idx (int, Required): Relative image index within page
-            processPipe (ProcessPipe, Required): Loaded image processing pipeline
-            filename (str, Required): Image filename
-        """
-        if not error:
-            self.requestsDone[idx0 + idx] = True
-            self.parent.processPipes[idx0 + idx]= processPipe
+            result (tuple): (idx0, idx, processPipe, filename)
+        """
+        idx0, idx, processPipe, filename = result
+        if processPipe == None:
+            self.parent.controller.parent.statusBar().showMessage("loading of image "+filename+" failed!")
+            return
+        if (idx0 + idx >= len(self.parent.imageFilenames)) or (self.parent.imageFilenames[idx0 + idx] != filename): return
+        self.requestsDone[idx0 + idx] = True
+        self.parent.processPipes[idx0 + idx]= processPipe
+        if self.parent.controller.pageIdx()[0] == idx0:
             self.parent.controller.view.updateImage(idx,processPipe, filename)
-        else:
-            self.requestLoad(idx0, idx, filename)
-# -----------------------------------------------------------------------------
-# --- Class RunLoadImage ------------------------------------------------------
-# -----------------------------------------------------------------------------
-class RunLoadImage(QRunnable):
-    """
-    Worker thread for individual image loading and ProcessPipe creation.
-    
-    Loads HDR images, creates associated ProcessPipes with default parameters,
-    and performs initial computation for thumbnail generation. Handles
-    loading errors gracefully with error reporting.
-    
-    Attributes:
-        - parent (RequestLoadImage): Parent coordinator for completion callback
-        - minIdxInPage (int): First image index in current page
-        - imgIdxInPage (int): Relative image index within page
-        - filename (str): Image file path to load
-    """
-    def __init__(self,parent, minIdxInPage, imgIdxInPage, filename):
-        """
-        Initialize image loading worker thread.
-        
-        Args:
-            parent (RequestLoadImage): Parent coordinator instance
-            minIdxInPage (int): First image index in current page
-            imgIdxInPage (int): Relative image index within page
-            filename (str): Image file path to load
-        """
-        super().__init__()
-        self.parent = parent
-        self.minIdxInPage = minIdxInPage
-        self.imgIdxInPage = imgIdxInPage
-        self.filename = filename
-
-    def run(self):
-        """
-        Main thread execution for image loading.
-        
-        Loads image file, creates default ProcessPipe, performs initial
-        computation, and reports completion or error to parent coordinator.
-        Handles IOError and ValueError exceptions gracefully.
-        """
-        try:
-            image_ = hdrCore.image.Image.read(self.filename, thumb=True)
-            processPipe = model.EditImageModel.buildProcessPipe()
-            processPipe.setImage(image_)                      
-            processPipe.compute()
-            self.parent.endLoadImage(False, self.minIdxInPage, self.imgIdxInPage, processPipe, self.filename)
-        except(IOError, ValueError) as e:
-            self.parent.endLoadImage(True, self.minIdxInPage, self.imgIdxInPage, None, self.filename)
 # -----------------------------------------------------------------------------
 # --- Class pCompute ----------------------------------------------------------
 # -----------------------------------------------------------------------------
 class pCompute(object):
     """
-    Multi-threaded HDR processing with image splitting for large images.
+    Multi-threaded HDR processing of full size images by tiles.
     
-    Manages parallel computation of ProcessPipe operations for HDR display
-    or export by splitting large images into multiple parts and processing
-    them concurrently. Provides progress feedback and handles geometry
-    processing separately at the end for optimal performance.
+    Computes a ProcessPipe for HDR display or export with the tile scheduler
+    of hdrCore.tiles: the image is split into many cache-sized tiles that
+    worker threads take dynamically (work stealing), finished tiles are
+    written directly to the output image. The geometry node is computed by
+    tiles too, each tile reading its rotated footprint plus a halo.
     
     Processing Workflow:
-    1. Split input image into grid of smaller sections
-    2. Create duplicate ProcessPipes for each split
-    3. Process splits in parallel using thread pool
-    4. Merge processed splits back into complete image
-    5. Apply geometry processing to final merged result
-    6. Callback with final processed image
+    1. Tile size is calibrated (first computation of the process)
+    2. Pixel-wise nodes are computed by tiles in parallel
+    3. Geometry node is computed by tiles in parallel
+    4. Callback with final processed image
     
     Attributes:
         - callBack (function): Completion callback function
         - progress (function): Progress update callback function
-        - nbSplits (int): Total number of image splits to process
-        - nbDone (int): Number of completed split processing operations
-        - geometryNode (ProcessNode): Geometry processing node for final step
         - meta (metadata): Image metadata for preservation
+        - pool (QThreadPool): Qt thread pool running the scheduler
     """
 
-    def __init__(self, callBack, processpipe,nbWidth,nbHeight, toneMap=True, progress=None, meta=None):
+    def __init__(self, callBack, processpipe, nbWidth=None, nbHeight=None, toneMap=True, progress=None, meta=None):
         """
-        Initialize parallel HDR processing with image splitting.
+        Initialize parallel HDR processing by tiles.
         
         Args:
             callBack (function): Function called when processing completes
             processpipe (ProcessPipe): HDR processing pipeline to apply
-            nbWidth (int): Number of horizontal splits
-            nbHeight (int): Number of vertical splits  
+            nbWidth (int, optional): unused, tiles are sized by hdrCore.tiles (kept for compatibility)
+            nbHeight (int, optional): unused, tiles are sized by hdrCore.tiles (kept for compatibility)
             toneMap (bool): Apply tone mapping to final result
             progress (function, optional): Progress callback function
             meta (metadata, optional): Image metadata to preserve
         """
         self.callBack = callBack
         self.progress =progress
-        self.nbSplits = nbWidth*nbHeight
-        self.nbDone = 0
-        self.geometryNode = None
         self.meta = meta
-        # recover and split image
-        input =  processpipe.getInputImage()
-
-        # store last processNode (geometry) and remove it from processpipe
-        if isinstance(processpipe.processNodes[-1].process,hdrCore.processing.geometry):
-            self.geometryNode = copy.deepcopy(processpipe.processNodes[-1]) 
-
-            # remove geometry node (the last one) 
-            processpipe.processNodes = processpipe.processNodes[:-1]
-       
-        # split image and store splited images
-        self.splits = input.split(nbWidth,nbHeight)
 
         self.pool = QThreadPool.globalInstance() 
+        self.pool.start(pRun(self,processpipe,toneMap))
 
-        # duplicate processpipe, set image split and start
-        for idxY,line in enumerate(self.splits):
-            for idxX,split in enumerate(line):
-                pp = copy.deepcopy(processpipe)
-                pp.setImage(split)
-                # start compute
-                self.pool.start(pRun(self,pp,toneMap,idxX,idxY))
+    def progressCompute(self, done, total):
+        """
+        Report progress of tiles.
 
-    def endCompute(self,idx,idy, split):
+        Args:
+            done (int): number of computed tiles
+            total (int): number of tiles
         """
-        Handle completion of individual split processing.
-        
-        Called when each split finishes processing. Tracks completion progress,
-        updates progress callback, and triggers final merge and geometry
-        processing when all splits are complete.
+        if self.progress and (done == total or done % max(1, total//20) == 0):
+            self.progress('HDR image process-pipe computation:'+str(int(done*100/total))+'%')
+
+    def endCompute(self, img):
+        """
+        Handle processing completion and deliver result.
         
         Args:
-            idx (int): X-coordinate of completed split
-            idy (int): Y-coordinate of completed split
-            split (Image): Processed image split result
-        """
-        self.splits[idy][idx]= copy.deepcopy(split)
-        self.nbDone += 1
-        if self.progress:
-            percent = str(int(self.nbDone*100/self.nbSplits))+'%'
-            self.progress('HDR image process-pipe computation:'+percent)
-        if self.nbDone == self.nbSplits:
-            res = hdrCore.image.Image.merge(self.splits)
-            # process geometry
-            if self.geometryNode:
-                res = self.geometryNode.process.compute(res,**self.geometryNode.params)
-            # callBack caller
-            self.callBack(res, self.meta)
+            img (Image): Processed image
+        """
+        self.callBack(img, self.meta)
 # -----------------------------------------------------------------------------
 # --- Class pRun --------------------------------------------------------------
 # -----------------------------------------------------------------------------
 class pRun(QRunnable):
     """
-    Worker thread for processing individual image splits in parallel.
-    
-    Executes ProcessPipe computation on a single image split, supporting
-    both tone-mapped and HDR output modes. Reports completion back to
-    parent pCompute coordinator.
+    Worker thread running the tile scheduler (hdrCore.tiles.tileScheduler).
     
     Attributes:
         - parent (pCompute): Parent coordinator for completion callback
-        - processpipe (ProcessPipe): Processing pipeline to apply to split
-        - idx (tuple): (x, y) coordinates of split in grid
+        - processpipe (ProcessPipe): Processing pipeline to compute
         - toneMap (bool): Apply tone mapping to result
     """
-    def __init__(self,parent,processpipe,toneMap, idxX,idxY):
+    def __init__(self,parent,processpipe,toneMap):
         """
-        Initialize split processing worker thread.
+        Initialize tiled processing worker thread.
         
         Args:
             parent (pCompute): Parent coordinator instance
-            processpipe (ProcessPipe): Processing pipeline to apply
+            processpipe (ProcessPipe): Processing pipeline to compute
             toneMap (bool): Apply tone mapping to result
-            idxX (int): X-coordinate of split in grid
-            idxY (int): Y-coordinate of split in grid
         """
         super().__init__()
         self.parent = parent
         self.processpipe = processpipe
-        self.idx = (idxX,idxY)
         self.toneMap = toneMap
 
     def run(self):
         """
-        Main thread execution for split processing.
-        
-        Executes ProcessPipe computation on the assigned image split
-        and reports completion with processed result to parent coordinator.
+        Main thread execution: compute the process-pipe by tiles and report
+        completion with processed result to parent coordinator.
         """
-        self.processpipe.compute()
-        pRes = self.processpipe.getImage(toneMap=self.toneMap)
-        self.parent.endCompute(self.idx[0],self.idx[1], pRes)
+        scheduler = hdrCore.tiles.tileScheduler(workers=self.processpipe.context.threads)
+        pRes = scheduler.compute(self.processpipe, toneMap=self.toneMap, progress=self.parent.progressCompute)
+        self.parent.endCompute(pRes)
 # -----------------------------------------------------------------------------
 # -----------------------------------------------------------------------------
 
@@ -535,6 +505,87 @@ class cRun(QRunnable):
 # -----------------------------------------------------------------------------
 # -----------------------------------------------------------------------------
 
+# -----------------------------------------------------------------------------
+# --- Class pExport -----------------------------------------------------------
+# -----------------------------------------------------------------------------
+class pExport(object):
+    """
+    Parallel batch export of images in worker processes.
+
+    The batch is driven from a QThreadPool thread so that the GUI stays
+    responsive; images are exported by hdrCore.export.exportParallel.
+
+    Attributes:
+        - callBack (function): Completion callback function (results dict)
+        - progress (function): Progress callback function (done, total, filename, outputFilenames)
+        - pool (QThreadPool): Qt thread pool for worker management
+    """
+
+    def __init__(self, callBack, filenames, dirName, display, backend='cpp', progress=None):
+        """
+        Start the batch export.
+
+        Args:
+            callBack (function): Function called when all images are exported
+            filenames (list of str): images to export
+            dirName (str): output directory
+            display (dict or list of dict): HDR display configuration(s)
+            backend (str): 'cpp' or 'python'
+            progress (function, optional): Progress callback function
+        """
+        self.callBack = callBack
+        self.progress = progress
+
+        self.pool = QThreadPool.globalInstance() 
+        self.pool.start(pExportRun(self, filenames, dirName, display, backend))
+
+    def endExport(self, res):
+        """
+        Handle batch completion and deliver results.
+
+        Args:
+            res (dict): exported filenames (None if failed) keyed by image filename
+        """
+        self.callBack(res)
+# -----------------------------------------------------------------------------
+# --- Class pExportRun --------------------------------------------------------
+# -----------------------------------------------------------------------------
+class pExportRun(QRunnable):
+    """
+    Worker thread driving a parallel batch export.
+
+    Attributes:
+        - parent (pExport): Parent coordinator for completion callback
+        - filenames (list of str): images to export
+        - dirName (str): output directory
+        - display (dict or list of dict): HDR display configuration(s)
+        - backend (str): 'cpp' or 'python'
+    """
+    def __init__(self, parent, filenames, dirName, display, backend):
+        """
+        Initialize batch export worker thread.
+
+        Args:
+            parent (pExport): Parent coordinator instance
+            filenames (list of str): images to export
+            dirName (str): output directory
+            display (dict or list of dict): HDR display configuration(s)
+            backend (str): 'cpp' or 'python'
+        """
+        super().__init__()
+        self.parent = parent
+        self.filenames = filenames
+        self.dirName = dirName
+        self.display = display
+        self.backend = backend
+
+    def run(self):
+        """
+        Run the batch export and report completion to parent coordinator.
+        """
+        res = hdrCore.export.exportParallel(self.filenames, self.dirName, self.display, 
+                                            backend=self.backend, progress=self.parent.progress)
+        self.parent.endExport(res)
 # -----------------------------------------------------------------------------
 # --- Class RequestAestheticsCompute ----------------------------------------------------
 # -----------------------------------------------------------------------------
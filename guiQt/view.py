@@ -47,6 +47,7 @@ Key View Classes:
     - LchColorSelectorView: LCH color space selection interface
     - HDRviewerView: HDR display controls and preview
     - ImageAestheticsView: Color palette and aesthetics visualization
+    - ProfilingView: Rolling per-node timings (hdrCore.profiling)
 
 Widget Utilities:
     - ImageWidgetView: Basic image display widget
@@ -68,13 +69,11 @@ from PyQt5.QtWidgets import QSplitter, QFrame, QSlider, QCheckBox, QGroupBox
 from PyQt5.QtWidgets import QHBoxLayout, QVBoxLayout, QGridLayout, QLayout, QScrollArea, QFormLayout
 from PyQt5.QtWidgets import QPushButton, QTextEdit,QLineEdit, QComboBox, QSpinBox
 from PyQt5.QtWidgets import QAction, QProgressBar, QDialog
+from PyQt5.QtWidgets import QTableWidget, QTableWidgetItem, QAbstractItemView
 from PyQt5.QtGui import QPixmap, QImage, QDoubleValidator
 from PyQt5.QtCore import Qt
 from PyQt5 import QtCore, QtWidgets 
 
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-
 from datetime import datetime
 import time
 
@@ -84,7 +83,7 @@ import math, enum
 import functools
 
 from . import controller, model
-import hdrCore.metadata
+import hdrCore.metadata, hdrCore.profiling
 import preferences.preferences as pref
 
 # ------------------------------------------------------------------------------------------
@@ -189,17 +188,23 @@ class ImageWidgetView(QWidget):
 # ------------------------------------------------------------------------------------------
 # --- class FigureWidget(FigureCanvas ------------------------------------------------------
 # ------------------------------------------------------------------------------------------
-class FigureWidget(FigureCanvas):
+class FigureWidget(QWidget):
     """
     Matplotlib figure widget for embedding plots in Qt interface.
     
     Provides matplotlib integration for displaying curves, histograms,
     and other plots within the Qt GUI. Used primarily for tone curve
     visualization and editing.
+
+    The matplotlib canvas is built when the widget is first shown (matplotlib
+    is imported then, not at uHDR startup): plots drawn before are kept and
+    drawn on the canvas.
     
     Attributes:
-        - fig (Figure): Matplotlib figure object
-        - axes: Matplotlib axes for plotting
+        - fig (Figure): Matplotlib figure object, None until shown
+        - axes: Matplotlib axes for plotting, None until shown
+        - canvas (FigureCanvasQTAgg): Qt canvas of the figure, None until shown
+        - pending (list): plots (X, Y, mode) drawn before the canvas is built
     """
 
     def __init__(self, parent=None, width=5, height=5, dpi=100):
@@ -212,14 +217,40 @@ class FigureWidget(FigureCanvas):
             height (int): Figure height in inches
             dpi (int): Figure resolution in dots per inch
         """
-        # create Figure
-        self.fig = Figure(figsize=(width, height), dpi=dpi)
-        self.axes = self.fig.add_subplot(111)
-        FigureCanvas.__init__(self, self.fig)    # explicite call of super constructor
-        self.setParent(parent)
-        FigureCanvas.updateGeometry(self)
+        super().__init__(parent)
+        self.figsize, self.dpi = (width, height), dpi
+        self.fig, self.axes, self.canvas = None, None, None
+        self.pending = []
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
         self.setMinimumSize(200, 200)
 
+    def showEvent(self, event):
+        """
+        Build the canvas once the widget is shown (after the pending paint events).
+
+        Args:
+            event: Qt show event
+        """
+        super().showEvent(event)
+        if self.canvas is None: QtCore.QTimer.singleShot(0, self.buildCanvas)
+
+    def buildCanvas(self):
+        """Import matplotlib, build the figure and its canvas, draw pending plots."""
+        if self.canvas is not None: return
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+
+        self.fig = Figure(figsize=self.figsize, dpi=self.dpi)
+        self.axes = self.fig.add_subplot(111)
+        self.canvas = FigureCanvas(self.fig)
+        self.layout().addWidget(self.canvas)
+        pending, self.pending = self.pending, []
+        for X, Y, mode in pending: self.axes.plot(X,Y,mode)
+        self.canvas.draw()
+
     def plot(self,X,Y,mode, clear=False):
         """
         Draw line plot with specified data and style.
@@ -230,6 +261,11 @@ class FigureWidget(FigureCanvas):
             mode (str): Matplotlib line style (e.g., 'r--', 'b-')
             clear (bool): Clear previous plots before drawing
         """
+        if self.canvas is None:
+            # not shown yet: plots are drawn when the canvas is built
+            if clear: self.pending = []
+            self.pending.append((X, Y, mode))
+            return
         if clear: self.axes.clear()
         self.axes.plot(X,Y,mode)
         try:
@@ -496,14 +532,16 @@ class AppView(QMainWindow):
     
     Window Structure:
     - Central Widget: Image gallery with pagination
-    - Right Dock: Multi-panel interface (Edit/Info/Aesthetics)
+    - Right Dock: Multi-panel interface (Edit/Info/Aesthetics), built by
+      buildDocks() once the window is shown
     - Menu Bar: File, Display HDR, Export, Dock, Preferences
     - Status Bar: Real-time operation feedback
     
     Attributes:
         - controller (AppController): Parent application controller
         - imageGalleryController (ImageGalleryController): Central gallery management
-        - dock (MultiDockController): Right panel controller
+        - dock (MultiDockController): Right panel controller, None until buildDocks()
+        - profiling (ProfilingController): Profiling dock controller, None until buildDocks()
         - topContainer (QWidget): Central widget container
         - menuExport (QAction): Export menu action reference
         - menuExportAll (QAction): Export all menu action reference
@@ -527,27 +565,49 @@ class AppView(QMainWindow):
         self.setWindowTitle('uHDR - Rémi Cozot (c) 2020-2021')      # title  
         self.statusBar().showMessage('Welcome to uHDR!')         # status bar
 
+        self.scale = scale
+        self.HDRcontroller = HDRcontroller
+
         self.topContainer = QWidget()
         self.topLayout = QHBoxLayout()
 
-        self.imageGalleryController = controller.ImageGalleryController(self)
+        with hdrCore.profiling.profiler.span('ImageGalleryController', category='startup'):
+            self.imageGalleryController = controller.ImageGalleryController(self)
 
         self.topLayout.addWidget(self.imageGalleryController.view)
 
         self.topContainer.setLayout(self.topLayout)
         self.setCentralWidget(self.topContainer)
         # ----------------------------------
-        self.dock = controller.MultiDockController(self, HDRcontroller)
-        self.addDockWidget(Qt.RightDockWidgetArea,self.dock.view)
-        self.resizeDocks([self.dock.view],[int(self.controller.screenSize[0].width()*scale//4)],Qt.Horizontal)
+        # docks: see buildDocks()
+        self.dock = None
+        self.profiling = None
 
         # ----------------------------------
         # build menu
-        self.buildFileMenu()
-        self.buildDockMenu()
-        self.buildDisplayHDR()
-        self.buildExport()
-        self.buildPreferences()
+        with hdrCore.profiling.profiler.span('menus', category='startup'):
+            self.buildFileMenu()
+            self.buildDockMenu()
+            self.buildDisplayHDR()
+            self.buildExport()
+            self.buildPreferences()
+    # ------------------------------------------------------------------------------------------
+    def buildDocks(self):
+        """
+        Build the right dock (edit/info/aesthetics panels) and the profiling dock.
+
+        Called by AppController once the window is shown, so that the window and
+        the gallery appear first.
+        """
+        if self.dock: return
+        with hdrCore.profiling.profiler.span('MultiDockController', category='startup'):
+            self.dock = controller.MultiDockController(self, self.HDRcontroller)
+        self.addDockWidget(Qt.RightDockWidgetArea,self.dock.view)
+        self.resizeDocks([self.dock.view],[int(self.controller.screenSize[0].width()*self.scale//4)],Qt.Horizontal)
+        # profiling dock: hidden, shown from Dock menu, recording follows pref.profiling
+        self.profiling = controller.ProfilingController(self)
+        self.addDockWidget(Qt.BottomDockWidgetArea,self.profiling.view)
+        self.profiling.view.setVisible(pref.profiling)
     # ------------------------------------------------------------------------------------------
     def getImageGalleryController(self): 
         """
@@ -709,6 +769,7 @@ class AppView(QMainWindow):
         - Info and Metadata (Ctrl+I): Image information panel
         - Edit (Ctrl+E): HDR editing controls panel  
         - Image Aesthetics (Ctrl+A): Aesthetics analysis panel
+        - Profiling (Ctrl+Shift+P): per-node timings dock, records timings while shown
         """
         menubar = self.menuBar()# get menubar
         dockMenu = menubar.addMenu('&Dock')# file menu
@@ -716,20 +777,26 @@ class AppView(QMainWindow):
         info = QAction('&Info. and Metadata', self)        
         info.setShortcut('Ctrl+I')
         info.setStatusTip('[Dock] image information dock')
-        info.triggered.connect(self.dock.activateINFO)
+        info.triggered.connect(lambda: self.dock.activateINFO())
         dockMenu.addAction(info)
 
         edit = QAction('&Edit', self)        
         edit.setShortcut('Ctrl+E')
         edit.setStatusTip('[Dock] image editing dock')
-        edit.triggered.connect(self.dock.activateEDIT)
+        edit.triggered.connect(lambda: self.dock.activateEDIT())
         dockMenu.addAction(edit)
 
         iqa = QAction('&Image Aesthetics', self)        
         iqa.setShortcut('Ctrl+A')
         iqa.setStatusTip('[Dock] image aesthetics dock')
-        iqa.triggered.connect(self.dock.activateMIAM)
+        iqa.triggered.connect(lambda: self.dock.activateMIAM())
         dockMenu.addAction(iqa)
+
+        profiling = QAction('&Profiling', self)        
+        profiling.setShortcut('Ctrl+Shift+P')
+        profiling.setStatusTip('[Dock] per-node timings, export to Chrome trace')
+        profiling.triggered.connect(lambda: self.profiling.activate(not self.profiling.view.isVisible()))
+        dockMenu.addAction(profiling)
     # ------------------------------------------------------------------------------------------
     def closeEvent(self, event):
         """
@@ -1361,7 +1428,7 @@ class MultiDockView(QDockWidget):
     
     Attributes:
         - controller (MultiDockController): Parent controller for dock management
-        - childControllers (list): List of three child controllers:
+        - childControllers (list): List of three child controllers (None until first shown):
             [0] EditImageController - editing interface
             [1] ImageInfoController - metadata interface  
             [2] ImageAestheticsController - aesthetics interface
@@ -1409,11 +1476,13 @@ class MultiDockView(QDockWidget):
 
         self.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
       
-        self.childControllers = [
-            controller.EditImageController(self, HDRcontroller), 
-            controller.ImageInfoController(self), 
-            controller.ImageAestheticsController(self)]
-            #controller.ImageQualityController(self, HDRcontroller)]
+        # edit panel is built now, info and aesthetics panels on first use (see switch())
+        with hdrCore.profiling.profiler.span('EditImageController', category='startup'):
+            self.childControllers = [
+                controller.EditImageController(self, HDRcontroller), 
+                None, 
+                None]
+                #controller.ImageQualityController(self, HDRcontroller)]
         self.childController = self.childControllers[0]
         self.active = 0
         self.setWidget(self.childController.view)
@@ -1463,10 +1532,16 @@ class MultiDockView(QDockWidget):
      
             self.active = (nb)%len(self.childControllers)
             self.childController.view.deleteLater()
-            self.childController = self.childControllers[self.active]
-            # rebuild view 
             processPipe = self.controller.parent.imageGalleryController.getSelectedProcessPipe()
-            self.childController.buildView(processPipe)
+            if self.childControllers[self.active] is None:
+                # first use: the controller builds its view
+                self.childControllers[self.active] = [None, controller.ImageInfoController, controller.ImageAestheticsController][self.active](self)
+                self.childController = self.childControllers[self.active]
+                if processPipe: self.childController.setProcessPipe(processPipe)
+            else:
+                self.childController = self.childControllers[self.active]
+                # rebuild view 
+                self.childController.buildView(processPipe)
             self.setWidget(self.childController.view)
             self.repaint()
     # ------------------------------------------------------------------------------------------
@@ -1500,6 +1575,125 @@ class MultiDockView(QDockWidget):
         if pref.verbose:  print(" [VIEW] >> MultiDockView.setProcessPipe(",processPipe.getImage().name,")")
         return self.childController.setProcessPipe(processPipe)
 # ------------------------------------------------------------------------------------------
+# --- class ProfilingView(QDockWidget) -----------------------------------------------------
+# ------------------------------------------------------------------------------------------
+class ProfilingView(QDockWidget):
+    """
+    Dock showing rolling timings of process nodes, C++ core, tiles and exports
+    (hdrCore.profiling): last, mean, max and percentiles of wall time over the
+    last events, bytes allocated, input shape and backend, and, if memory is
+    traced, the allocation high-water mark and the RSS growth of the process.
+    Rows 'latency: <control>' are the times from GUI events to the display of
+    the edited image. 'explain' shows the execution plan of the selected image
+    (hdrCore.plan): kernels and estimated costs of the next compute and of
+    its full size export.
+
+    The table is refreshed by a timer while the dock is visible.
+
+    Attributes:
+        - controller (ProfilingController): profiling controller
+        - table (QTableWidget): timings, one row per node
+        - memory (QCheckBox): trace memory
+        - plan (QTextEdit): execution plan, filled by 'explain'
+        - timer (QtCore.QTimer): refresh timer
+    """
+
+    columns = ['node', 'backend', 'shape', 'last (ms)', 'mean (ms)', 'max (ms)', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'MB', 'peak MB', 'RSS +MB']
+
+    def __init__(self, _controller):
+        """
+        Args:
+            _controller (ProfilingController): profiling controller
+        """
+        if pref.verbose:  print(" [VIEW] >> ProfilingView.__init__(",")")
+
+        super().__init__("Profiling")
+        self.controller = _controller
+        self.setAllowedAreas(Qt.BottomDockWidgetArea | Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
+
+        container = QWidget()
+        layout = QVBoxLayout()
+
+        self.table = QTableWidget(0, len(ProfilingView.columns))
+        self.table.setHorizontalHeaderLabels(ProfilingView.columns)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        self.memory = QCheckBox('trace memory (slower)')
+        self.memory.toggled.connect(self.controller.callBackTraceMemory)
+        buttons.addWidget(self.memory)
+        clear = QPushButton('clear')
+        clear.clicked.connect(self.controller.callBackClear)
+        export = QPushButton('export Chrome trace')
+        export.clicked.connect(self.controller.callBackExportTrace)
+        explain = QPushButton('explain')
+        explain.setToolTip('execution plan of the selected image: kernels, estimated time and memory')
+        explain.clicked.connect(self.controller.callBackExplain)
+        buttons.addWidget(clear)
+        buttons.addWidget(export)
+        buttons.addWidget(explain)
+        layout.addLayout(buttons)
+
+        self.plan = QTextEdit()
+        self.plan.setReadOnly(True)
+        self.plan.setLineWrapMode(QTextEdit.NoWrap)
+        self.plan.setStyleSheet('font-family: monospace')
+        self.plan.setVisible(False)
+        layout.addWidget(self.plan)
+
+        container.setLayout(layout)
+        self.setWidget(container)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(500)
+        self.timer.timeout.connect(self.refresh)
+        self.visibilityChanged.connect(self.onVisibilityChanged)
+    # ------------------------------------------------------------------------------------------
+    def onVisibilityChanged(self, visible):
+        """
+        Refresh only while visible.
+
+        Args:
+            visible (bool): dock visibility
+        """
+        if visible: self.timer.start()
+        else:       self.timer.stop()
+    # ------------------------------------------------------------------------------------------
+    def closeEvent(self, event):
+        """
+        Closing the dock stops recording.
+
+        Args:
+            event: Qt close event
+        """
+        self.controller.activate(False)
+        super().closeEvent(event)
+    # ------------------------------------------------------------------------------------------
+    def refresh(self):
+        """Fill the table with the rolling timings of the controller."""
+        summary = self.controller.getSummary()
+        self.table.setRowCount(len(summary))
+        for row, entry in enumerate(summary):
+            name = entry['name'] if entry['category'] == 'node' else entry['category']+': '+entry['name']
+            values = [name, str(entry['backend']) if entry['backend'] else '', 
+                      'x'.join(str(v) for v in entry['shape']) if entry['shape'] else '',
+                      f"{entry['last']*1000:.1f}", f"{entry['mean']*1000:.1f}", f"{entry['max']*1000:.1f}",
+                      f"{entry['p50']*1000:.1f}", f"{entry['p95']*1000:.1f}", f"{entry['p99']*1000:.1f}", f"{entry['nbytes']/2**20:.1f}",
+                      f"{entry['peak']/2**20:.1f}" if entry['peak'] is not None else '', f"{entry['rssGrowth']/2**20:.0f}" if entry['rssGrowth'] is not None else '']
+            for col, value in enumerate(values): self.table.setItem(row, col, QTableWidgetItem(value))
+    # ------------------------------------------------------------------------------------------
+    def setPlan(self, text):
+        """
+        Show an execution plan.
+
+        Args:
+            text (str): plan (hdrCore.plan.formatPlan())
+        """
+        self.plan.setPlainText(text)
+        self.plan.setVisible(True)
+# ------------------------------------------------------------------------------------------
 
 # ------------------------------------------------------------------------------------------
 # --- class AdvanceSliderView(QFrame) ------------------------------------------------------
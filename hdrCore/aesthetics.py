@@ -38,7 +38,6 @@ Classes:
 # --- Import ------------------------------------------------------------------
 # -----------------------------------------------------------------------------
 import copy, colour, skimage.transform, math, os
-import sklearn.cluster, skimage.transform
 import numpy as np
 import functools
 from . import processing, utils, image
@@ -158,6 +157,7 @@ class Palette(ImageAestheticsModel):
 
 
             # to Lab then to Vector
+            import sklearn.cluster
             imageLab = processing.ColorSpaceTransform().compute(image_,dest='Lab')
             imgLabDataVector = utils.ndarray2vector(imageLab.colorData)
 
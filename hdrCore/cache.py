@@ -0,0 +1,371 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+HDR Core On-Disk Cache Module
+
+This module provides a memory-mappable on-disk format for linear image data
+and a cache built on it. Decoded full resolution inputs and intermediate
+process node outputs are kept between sessions, so that exporting or
+displaying an image again maps the cached data instead of decoding and
+processing it again.
+
+Two layouts, selected by the storage type (context.storage, pref.storage):
+    - plain (default, float32): data stored in the type it is computed in, a
+      cached export is identical to an uncached one, whole images and regions
+      are mapped without copy
+    - tiled (float16 storage): float16 tiles stored contiguously, half the
+      disk space and read bandwidth, reading a region only touches the pages
+      of the tiles it overlaps (values rounded to 11 bits of precision)
+
+The cache of a directory is bounded (pref.diskCacheSize): least recently
+used entries are removed.
+
+File format:
+    - <name>.npy: plain: image data (height, width, channels), tiled: tiles
+      (tilesY, tilesX, tileSize, tileSize, channels), readable with numpy.load(mmap_mode='r')
+    - <name>.json: header (image shape, layout, tile size, type, source key, user info)
+
+Classes:
+    - cachedImage: memory-mappable image file
+    - imageCache: cache of image data keyed by source file and processing stage
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import os, json, hashlib, shutil, tempfile
+import numpy as np
+import preferences.preferences as pref
+
+# -----------------------------------------------------------------------------
+# --- Class cachedImage -------------------------------------------------------
+# -----------------------------------------------------------------------------
+class cachedImage(object):
+    """
+    Memory-mappable image file, plain or float16 tiled.
+
+    Attributes:
+        - filename (str): file name without extension
+        - data (numpy.memmap): memory-mapped image data or tiles (read only)
+        - shape (tuple): image shape (height, width, channels)
+        - layout (str): 'plain' or 'tiled'
+        - tileSize (int or None): tile size in pixels of the tiled layout
+        - source (str): key of the source the data derives from
+        - info (dict): user information stored in header
+
+    Class Attributes:
+        tileSize (int): default tile size of the tiled layout (256x256x3 float16 = 384 KB)
+        maxValue (float): largest float16 value, tiled data is clipped to it
+    """
+
+    tileSize = 256
+    maxValue = float(np.finfo(np.float16).max)
+
+    def __init__(self, filename, data, header):
+        """
+        Initialize a cached image from an opened file.
+
+        Args:
+            filename (str): file name without extension
+            data (numpy.memmap): memory-mapped data
+            header (dict): file header
+        """
+        self.filename = filename
+        self.data = data
+        self.shape = tuple(header['shape'])
+        self.layout = header.get('layout', 'plain')
+        self.tileSize = header.get('tileSize', None)
+        self.source = header.get('source', None)
+        self.info = header.get('info', {})
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def write(filename, colorData, source=None, info=None, storage=None, tileSize=None):
+        """
+        Write image data as a memory-mappable file.
+
+        Data and header are written in temporary files of the cache directory
+        then renamed: readers never see partial files, and processes writing the
+        same entry (parallel export workers) do not share a temporary file.
+
+        Args:
+            filename (str): file name without extension
+            colorData (numpy.ndarray): image data (height, width, channels)
+            source (str, optional): key of the source the data derives from
+            info (dict, optional): user information (JSON serializable)
+            storage (numpy.dtype, optional): stored type, float16: tiled layout,
+                default: type of colorData, plain layout
+            tileSize (int, optional): tile size of the tiled layout (default: cachedImage.tileSize)
+        """
+        directory = os.path.dirname(filename)
+        height, width, channels = colorData.shape
+        tiled = np.dtype(storage or colorData.dtype) == np.float16
+        if tiled:
+            tileSize = tileSize if tileSize else cachedImage.tileSize
+            dtype, shape = np.dtype(np.float16), (-(-height//tileSize), -(-width//tileSize), tileSize, tileSize, channels)
+        else:
+            dtype, shape = colorData.dtype, colorData.shape
+        header = {'shape': [height, width, channels], 'layout': 'tiled' if tiled else 'plain', 'tileSize': tileSize if tiled else None,
+                  'dtype': dtype.name, 'source': source, 'info': info if info else {}}
+        temporaries = []
+        try:
+            fd, tmpData = tempfile.mkstemp(suffix='.npy.tmp', dir=directory)
+            os.close(fd)
+            temporaries.append(tmpData)
+            data = np.lib.format.open_memmap(tmpData, mode='w+', dtype=dtype, shape=shape)
+            if tiled:
+                # tile by tile: memory bounded by one tile
+                for ty in range(shape[0]):
+                    for tx in range(shape[1]):
+                        y0, x0 = ty*tileSize, tx*tileSize
+                        block = colorData[y0:y0+tileSize, x0:x0+tileSize, :]
+                        h, w, _ = block.shape
+                        data[ty, tx, :h, :w, :] = np.clip(block, -cachedImage.maxValue, cachedImage.maxValue)
+            else:
+                data[...] = colorData
+            data.flush()
+            del data
+            fd, tmpHeader = tempfile.mkstemp(suffix='.json.tmp', dir=directory)
+            temporaries.append(tmpHeader)
+            with os.fdopen(fd, "w") as file: json.dump(header, file)
+            os.replace(tmpData, filename+'.npy')
+            os.replace(tmpHeader, filename+'.json')
+        finally:
+            for tmp in temporaries:
+                if os.path.exists(tmp): os.remove(tmp)
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def open(filename):
+        """
+        Open a cached image file (memory-mapped, read only).
+
+        Args:
+            filename (str): file name without extension
+
+        Returns:
+            cachedImage or None: None if file does not exist or is invalid
+        """
+        if not (os.path.isfile(filename+'.npy') and os.path.isfile(filename+'.json')): return None
+        try:
+            with open(filename+'.json', "r") as file: header = json.load(file)
+            data = np.load(filename+'.npy', mmap_mode='r')
+        except (OSError, ValueError) as e:
+            print("WARNING[cachedImage.open(",filename,"): invalid cache file (",e,")]")
+            return None
+        # header and data renamed by another writer in between
+        height, width, channels = header['shape']
+        if header.get('layout', 'plain') == 'tiled':
+            T = header['tileSize']
+            expected = (-(-height//T), -(-width//T), T, T, channels)
+        else:
+            expected = (height, width, channels)
+        if tuple(data.shape) != expected: return None
+        return cachedImage(filename, data, header)
+    # -------------------------------------------------------------------------
+    def getRegion(self, y0, y1, x0, x1, dtype=None):
+        """
+        Read a region of the image, only the overlapped rows (plain) or tiles
+        (tiled) are read.
+
+        Args:
+            y0, y1 (int): first and last+1 rows
+            x0, x1 (int): first and last+1 columns
+            dtype (numpy.dtype, optional): output type, default: stored type
+
+        Returns:
+            numpy.ndarray: region data (y1-y0, x1-x0, channels), a read only view
+                of the mapped file if the layout is plain and dtype is the stored
+                type, else a copy
+        """
+        if self.layout == 'plain':
+            region = self.data[y0:y1, x0:x1, :]
+            if dtype is None or np.dtype(dtype) == region.dtype: return region
+            return region.astype(dtype)
+
+        T = self.tileSize
+        res = np.empty((y1-y0, x1-x0, self.shape[2]), dtype=dtype if dtype else self.data.dtype)
+        for ty in range(y0//T, -(-y1//T)):
+            for tx in range(x0//T, -(-x1//T)):
+                # intersection of tile and region in image coordinates
+                iy0, iy1 = max(y0, ty*T), min(y1, (ty+1)*T)
+                ix0, ix1 = max(x0, tx*T), min(x1, (tx+1)*T)
+                res[iy0-y0:iy1-y0, ix0-x0:ix1-x0, :] = self.data[ty, tx, iy0-ty*T:iy1-ty*T, ix0-tx*T:ix1-tx*T, :]
+        return res
+    # -------------------------------------------------------------------------
+    def toArray(self, dtype=None):
+        """
+        Get the whole image.
+
+        Args:
+            dtype (numpy.dtype, optional): output type, default: stored type
+
+        Returns:
+            numpy.ndarray: image data (height, width, channels), see getRegion()
+        """
+        height, width, _ = self.shape
+        return self.getRegion(0, height, 0, width, dtype)
+# -----------------------------------------------------------------------------
+# --- Class imageCache --------------------------------------------------------
+# -----------------------------------------------------------------------------
+class imageCache(object):
+    """
+    Cache of image data keyed by source image file and processing stage.
+
+    Entries are stored as cachedImage files in a 'cache' directory next to the
+    source image (as thumbnails are). An entry is valid as long as the source
+    file is unchanged (path, size and modification time).
+
+    The size of a cache directory is bounded by pref.diskCacheSize (MB): the
+    modification time of an entry is its last use (set by get() and put()),
+    put() removes least recently used entries beyond the budget.
+
+    Class Attributes:
+        dirName (str): cache directory name
+    """
+
+    dirName = 'cache'
+
+    @staticmethod
+    def sourceKey(sourceFilename):
+        """
+        Compute the key of a source file.
+
+        Args:
+            sourceFilename (str): source image file
+
+        Returns:
+            str or None: key, None if the file does not exist
+        """
+        if not os.path.isfile(sourceFilename): return None
+        stat = os.stat(sourceFilename)
+        return imageCache.stageKey(os.path.abspath(sourceFilename), stat.st_size, stat.st_mtime_ns)
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def stageKey(*parts):
+        """
+        Compute a key from JSON serializable parts (parameters, shapes, ...).
+
+        Returns:
+            str: key
+        """
+        return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def entryFilename(sourceFilename, stage):
+        """
+        Return the file name (without extension) of a cache entry.
+
+        Args:
+            sourceFilename (str): source image file
+            stage (str): processing stage (e.g. 'decoded')
+
+        Returns:
+            str: file name
+        """
+        path, name = os.path.split(sourceFilename)
+        return os.path.join(path, imageCache.dirName, name+'.'+stage)
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def get(sourceFilename, stage):
+        """
+        Get a cache entry.
+
+        Args:
+            sourceFilename (str): source image file
+            stage (str): processing stage
+
+        Returns:
+            cachedImage or None: memory-mapped entry, None if missing or outdated
+        """
+        filename = imageCache.entryFilename(sourceFilename, stage)
+        entry = cachedImage.open(filename)
+        if entry and (entry.source == imageCache.sourceKey(sourceFilename)):
+            if pref.verbose: print(" [CACHE] >> imageCache.get(",os.path.basename(sourceFilename),",",stage,"): hit")
+            # last use (LRU)
+            try: os.utime(filename+'.npy')
+            except OSError: pass
+            return entry
+        return None
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def put(sourceFilename, stage, colorData, info=None, storage=None):
+        """
+        Add (or replace) a cache entry.
+
+        Args:
+            sourceFilename (str): source image file
+            stage (str): processing stage
+            colorData (numpy.ndarray): image data
+            info (dict, optional): user information (JSON serializable)
+            storage (numpy.dtype, optional): stored type, float16: tiled layout,
+                default: pref.storage, None: type of colorData
+        """
+        if storage is None: storage = pref.storage
+        if pref.verbose: print(" [CACHE] >> imageCache.put(",os.path.basename(sourceFilename),",",stage,")")
+        filename = imageCache.entryFilename(sourceFilename, stage)
+        try:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            cachedImage.write(filename, colorData, source=imageCache.sourceKey(sourceFilename), info=info, storage=storage)
+        except OSError as e:
+            print("WARNING[imageCache.put(",filename,"): cannot write cache entry (",e,")]")
+            return
+        imageCache.evict(os.path.dirname(filename), pref.diskCacheSize*2**20, keep=filename)
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def evict(cacheDir, budget, keep=None):
+        """
+        Remove least recently used entries of a cache directory beyond a size budget.
+
+        Args:
+            cacheDir (str): cache directory
+            budget (int): maximum size in bytes
+            keep (str, optional): entry (file name without extension) never removed,
+                e.g. the entry just written
+        """
+        entries = []
+        for name in os.listdir(cacheDir):
+            if not name.endswith('.npy'): continue
+            filename = os.path.join(cacheDir, name[:-len('.npy')])
+            try:
+                stat = os.stat(filename+'.npy')
+                size = stat.st_size + (os.path.getsize(filename+'.json') if os.path.isfile(filename+'.json') else 0)
+            except OSError: continue # removed by another process
+            entries.append((stat.st_mtime_ns, size, filename))
+        total = sum(size for _, size, _ in entries)
+        for _, size, filename in sorted(entries):
+            if total <= budget: break
+            if filename == keep: continue
+            try:
+                os.remove(filename+'.npy')
+                if os.path.isfile(filename+'.json'): os.remove(filename+'.json')
+                total -= size
+                if pref.verbose: print(" [CACHE] >> imageCache.evict(",os.path.basename(filename),")")
+            except OSError: pass # mapped by a reader (Windows) or removed by another process
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def clear(directory):
+        """
+        Remove the cache of an image directory.
+
+        Args:
+            directory (str): image directory
+        """
+        cacheDir = os.path.join(directory, imageCache.dirName)
+        if os.path.isdir(cacheDir): shutil.rmtree(cacheDir)
+# -----------------------------------------------------------------------------
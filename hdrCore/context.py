@@ -0,0 +1,161 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+HDR Core Execution Context Module
+
+This module gathers the settings a processing pipeline runs with (working
+resolution, computation backend, data type, threads, verbosity, disk cache,
+buffer reuse) in one object. Each ProcessPipe owns its context, so that
+pipelines with different settings (e.g. interactive editing at working size
+and export at full size) can run concurrently in one process without
+changing module or class level globals.
+
+Processing operators get the context of the running pipeline with
+ExecutionContext.current(): ProcessPipe activates its context (per thread)
+while its nodes are computed. Operators called outside of a pipeline get a
+context built from the preferences.
+
+Data type policy: operators compute in dtype (float32), node outputs are kept
+in storage (default: dtype, float16 halves the memory of the outputs kept
+between computes). ProcessPipe casts node outputs of another type (e.g.
+float64 of a colour-science conversion), or raises TypeError if strictDtype
+is set (debug: locates the operator that promotes).
+
+Classes:
+    - ExecutionContext: settings of a processing pipeline
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import os, copy, threading, contextlib
+import numpy as np
+import preferences.preferences as pref
+from . import cache
+
+# -----------------------------------------------------------------------------
+# --- Class ExecutionContext --------------------------------------------------
+# -----------------------------------------------------------------------------
+class ExecutionContext(object):
+    """
+    Settings of a processing pipeline.
+
+    Attributes:
+        - autoResize (bool): resize input image to maxWorking
+        - maxWorking (int): maximum size of working image
+        - computation (str): computation backend ('python', 'numba', 'cuda')
+        - dtype (numpy.dtype): type of image data computed by operators
+        - storage (numpy.dtype or None): type of node outputs kept between computes, None: dtype
+        - strictDtype (bool): raise TypeError if a node emits data of another type than dtype
+        - threads (int): number of threads/processes used by an operator
+        - verbose (bool): print function calls and profiling
+        - diskCache (bool): use the on-disk cache of node outputs
+        - cache (hdrCore.cache.imageCache or None): cache handle, None if diskCache is False
+        - reuseBuffers (bool): nodes reuse their arrays across computes (ProcessPipe.arena,
+          see hdrCore.scratch)
+
+    Class Attributes:
+        local (threading.local): stack of active contexts of each thread
+    """
+
+    local = threading.local()
+
+    def __init__(self, autoResize=True, maxWorking=None, computation=None, dtype=np.float32, threads=None, verbose=None, diskCache=None, reuseBuffers=False,
+                 storage=None, strictDtype=None):
+        """
+        Initialize a context, unspecified settings are read from preferences.
+
+        Args:
+            autoResize (bool, optional): resize input image to maxWorking (default: True)
+            maxWorking (int, optional): maximum size of working image (default: pref.maxWorking)
+            computation (str, optional): computation backend (default: pref.computation)
+            dtype (numpy.dtype, optional): type of image data (default: numpy.float32)
+            threads (int, optional): number of threads (default: number of cores)
+            verbose (bool, optional): verbose mode (default: pref.verbose)
+            diskCache (bool, optional): use the on-disk cache (default: pref.diskCache)
+            reuseBuffers (bool, optional): reuse node arrays across computes (default: False)
+            storage (numpy.dtype, optional): type of node outputs, e.g. numpy.float16 (default: pref.storage, None: dtype)
+            strictDtype (bool, optional): raise on node outputs of another type (default: pref.strictDtype)
+        """
+        self.autoResize = autoResize
+        self.maxWorking = maxWorking if maxWorking else pref.maxWorking
+        self.computation = computation if computation else pref.computation
+        self.dtype = dtype
+        self.threads = threads if threads else (os.cpu_count() or 1)
+        self.verbose = pref.verbose if verbose is None else verbose
+        self.diskCache = pref.diskCache if diskCache is None else diskCache
+        self.cache = cache.imageCache if self.diskCache else None
+        self.reuseBuffers = reuseBuffers
+        self.storage = storage if storage else pref.storage
+        self.strictDtype = pref.strictDtype if strictDtype is None else strictDtype
+    # -------------------------------------------------------------------------
+    def derive(self, **kwargs):
+        """
+        Return a copy of the context with some settings changed.
+
+        Args:
+            **kwargs: settings to change (same names as __init__ arguments)
+
+        Returns:
+            ExecutionContext: new context
+
+        Example:
+            exportContext = pipe.context.derive(autoResize=False)
+        """
+        res = copy.copy(self)
+        for key, value in kwargs.items():
+            if not hasattr(res, key): raise AttributeError("ExecutionContext has no setting '"+key+"'")
+            setattr(res, key, value)
+        if 'diskCache' in kwargs: res.cache = cache.imageCache if res.diskCache else None
+        return res
+    # -------------------------------------------------------------------------
+    @contextlib.contextmanager
+    def activate(self):
+        """
+        Make the context the current one of the calling thread.
+
+        Contexts can be nested, the previous context is restored on exit.
+
+        Example:
+            with pipe.context.activate():
+                res = exposure().compute(img, EV=1.0)
+        """
+        stack = ExecutionContext.local.__dict__.setdefault('stack', [])
+        stack.append(self)
+        try: yield self
+        finally: stack.pop()
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def current():
+        """
+        Return the current context of the calling thread.
+
+        Returns:
+            ExecutionContext: active context, or a context built from preferences
+        """
+        stack = getattr(ExecutionContext.local, 'stack', None)
+        return stack[-1] if stack else ExecutionContext()
+    # -------------------------------------------------------------------------
+    def __repr__(self):
+        return "<class ExecutionContext: autoResize: "+str(self.autoResize)+", maxWorking: "+str(self.maxWorking)+ \
+               ", computation: "+str(self.computation)+", dtype: "+np.dtype(self.dtype).name+", threads: "+str(self.threads)+ \
+               ", verbose: "+str(self.verbose)+", diskCache: "+str(self.diskCache)+", reuseBuffers: "+str(self.reuseBuffers)+ \
+               ", storage: "+np.dtype(self.storage or self.dtype).name+", strictDtype: "+str(self.strictDtype)+">"
+# -----------------------------------------------------------------------------
@@ -29,17 +29,40 @@ speed, including exposure adjustment, contrast control, tone curves, lightness
 masking, saturation adjustment, and multiple color editors.
 
 Functions:
+    available: Check that the C++ library can be loaded
     coreCcompute: Main C++ processing pipeline execution function
 """
 
 # -----------------------------------------------------------------------------
 # --- Import ------------------------------------------------------------------
 # -----------------------------------------------------------------------------
-import ctypes, copy
+import ctypes, copy, contextlib
 import numpy as np
-import hdrCore.image, hdrCore.processing, hdrCore.utils
+from timeit import default_timer as timer
+import hdrCore.image, hdrCore.processing, hdrCore.utils, hdrCore.profiling, hdrCore.scratch
 import preferences.preferences as pref
 
+# -----------------------------------------------------------------------------
+# --- available ---------------------------------------------------------------
+# -----------------------------------------------------------------------------
+_available = None
+
+def available():
+    """
+    Check that the C++ library (HDRip.dll in the current directory) can be
+    loaded on this machine (checked once).
+
+    Returns:
+        bool: True if coreCcompute can run
+    """
+    global _available
+    if _available is None:
+        try:
+            ctypes.cdll.LoadLibrary('./HDRip.dll')
+            _available = True
+        except OSError:
+            _available = False
+    return _available
 # -----------------------------------------------------------------------------
 # --- coreCcompute ------------------------------------------------------------
 # -----------------------------------------------------------------------------
@@ -72,6 +95,10 @@ def coreCcompute(img, processPipe):
         
     Note:
         This function requires HDRip.dll to be present in the current directory.
+        If processPipe.context.reuseBuffers is set (interactive pipelines), img is
+        not modified: its data and the result are copied in buffers of
+        processPipe.arena (see hdrCore.scratch), the result is valid until the next
+        compute. Otherwise img gets the result.
         The processing pipeline architecture is fixed and cannot be modified.
         Each color editor supports selection by lightness, chroma, and hue ranges
         with tolerance-based masking and independent edit controls for hue,
@@ -81,7 +108,9 @@ def coreCcompute(img, processPipe):
         OSError: If HDRip.dll cannot be loaded
         ctypes.ArgumentError: If parameter types don't match expected C++ interface
     """
-    if pref.verbose:  print(f"[hdrCore] >> coreCcompute({img})") 
+    if processPipe.context.verbose:  print(f"[hdrCore] >> coreCcompute({img})") 
+    start = timer()
+    memory = hdrCore.profiling.profiler.memoryStart() if hdrCore.profiling.profiler.traceMemory else None
 
     ppDict = processPipe.toDict()
 
@@ -170,21 +199,38 @@ def coreCcompute(img, processPipe):
     ]
     mylib.full_process_5CO.restype = np.ctypeslib.ndpointer(dtype=ctypes.c_float, shape=(img.colorData.shape[0],img.colorData.shape[1],3))
 
-    resDLL = mylib.full_process_5CO(img.colorData,
-                                img.colorData.shape[1],
-                                img.colorData.shape[0],
-                                exposure,
-                                contrast,
-                                tonecurveS, tonecurveB, tonecurveM, tonecurveW, tonecurveH,
-                                lightnessMaskS, lightnessMaskB, lightnessMaskM, lightnessMaskW, lightnessMaskH,
-                                saturation,
-                                ce1_sel_lightness[0], ce1_sel_lightness[1], ce1_sel_chroma[0], ce1_sel_chroma[1], ce1_sel_hue[0], ce1_sel_hue[1], ce1_tolerance, ce1_edit_hue, ce1_edit_exposure, ce1_edit_contrast, ce1_edit_saturation, ce1_mask,
-                                ce2_sel_lightness[0], ce2_sel_lightness[1], ce2_sel_chroma[0], ce2_sel_chroma[1], ce2_sel_hue[0], ce2_sel_hue[1], ce2_tolerance, ce2_edit_hue, ce2_edit_exposure, ce2_edit_contrast, ce2_edit_saturation, ce2_mask,
-                                ce3_sel_lightness[0], ce3_sel_lightness[1], ce3_sel_chroma[0], ce3_sel_chroma[1], ce3_sel_hue[0], ce3_sel_hue[1], ce3_tolerance, ce3_edit_hue, ce3_edit_exposure, ce3_edit_contrast, ce3_edit_saturation, ce3_mask,
-                                ce4_sel_lightness[0], ce4_sel_lightness[1], ce4_sel_chroma[0], ce4_sel_chroma[1], ce4_sel_hue[0], ce4_sel_hue[1], ce4_tolerance, ce4_edit_hue, ce4_edit_exposure, ce4_edit_contrast, ce4_edit_saturation, ce4_mask,
-                                ce5_sel_lightness[0], ce5_sel_lightness[1], ce5_sel_chroma[0], ce5_sel_chroma[1], ce5_sel_hue[0], ce5_sel_hue[1], ce5_tolerance, ce5_edit_hue, ce5_edit_exposure, ce5_edit_contrast, ce5_edit_saturation, ce5_mask
-                                )
-
-    img.colorData = copy.deepcopy(resDLL)
-
+    # with reuseBuffers (interactive pipelines), the input and the result are
+    # copied in buffers of the pipeline arena: img is not modified
+    reuse = processPipe.context.reuseBuffers
+    with processPipe.arena.activate('coreCcompute') if reuse else contextlib.nullcontext():
+        colorData = img.colorData
+        if reuse:
+            colorData = hdrCore.scratch.empty(img.colorData.shape, np.float32, 'input')
+            np.copyto(colorData, img.colorData)
+
+        resDLL = mylib.full_process_5CO(colorData,
+                                    img.colorData.shape[1],
+                                    img.colorData.shape[0],
+                                    exposure,
+                                    contrast,
+                                    tonecurveS, tonecurveB, tonecurveM, tonecurveW, tonecurveH,
+                                    lightnessMaskS, lightnessMaskB, lightnessMaskM, lightnessMaskW, lightnessMaskH,
+                                    saturation,
+                                    ce1_sel_lightness[0], ce1_sel_lightness[1], ce1_sel_chroma[0], ce1_sel_chroma[1], ce1_sel_hue[0], ce1_sel_hue[1], ce1_tolerance, ce1_edit_hue, ce1_edit_exposure, ce1_edit_contrast, ce1_edit_saturation, ce1_mask,
+                                    ce2_sel_lightness[0], ce2_sel_lightness[1], ce2_sel_chroma[0], ce2_sel_chroma[1], ce2_sel_hue[0], ce2_sel_hue[1], ce2_tolerance, ce2_edit_hue, ce2_edit_exposure, ce2_edit_contrast, ce2_edit_saturation, ce2_mask,
+                                    ce3_sel_lightness[0], ce3_sel_lightness[1], ce3_sel_chroma[0], ce3_sel_chroma[1], ce3_sel_hue[0], ce3_sel_hue[1], ce3_tolerance, ce3_edit_hue, ce3_edit_exposure, ce3_edit_contrast, ce3_edit_saturation, ce3_mask,
+                                    ce4_sel_lightness[0], ce4_sel_lightness[1], ce4_sel_chroma[0], ce4_sel_chroma[1], ce4_sel_hue[0], ce4_sel_hue[1], ce4_tolerance, ce4_edit_hue, ce4_edit_exposure, ce4_edit_contrast, ce4_edit_saturation, ce4_mask,
+                                    ce5_sel_lightness[0], ce5_sel_lightness[1], ce5_sel_chroma[0], ce5_sel_chroma[1], ce5_sel_hue[0], ce5_sel_hue[1], ce5_tolerance, ce5_edit_hue, ce5_edit_exposure, ce5_edit_contrast, ce5_edit_saturation, ce5_mask
+                                    )
+
+        if reuse:
+            colorRes = hdrCore.scratch.empty(resDLL.shape, np.float32, 'output')
+            np.copyto(colorRes, resDLL)
+            img = hdrCore.scratch.copyImage(img, colorData=colorRes)
+        else:
+            img.colorData = copy.deepcopy(resDLL)
+
+    if hdrCore.profiling.profiler.enabled:
+        hdrCore.profiling.profiler.record('coreCcompute', start, timer()-start, category='core', nbytes=img.colorData.nbytes, shape=img.colorData.shape, backend='cpp',
+                                          memory=hdrCore.profiling.profiler.memoryEnd(memory))
     return img
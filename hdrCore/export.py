@@ -0,0 +1,768 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+HDR Core Export Module
+
+This module provides headless export of edited images: each image is read at
+full resolution, processed with the default uHDR pipeline configured from its
+'processpipe' metadata, and written as '<name><post>.hdr' for one or several
+HDR displays of the preferences. It does not depend on the GUI (PyQt5,
+matplotlib, torch).
+
+Several displays are exported from one decoding and processing of the image:
+display outputs are derived from the processed image (resized to the display
+shape in fit mode, scaled) in parallel threads.
+
+Batch exports are resumable: a manifest (uHDR-export.json) in the output
+directory records the state of each (image, display) export, so that running
+the export again skips up-to-date outputs and retries failed ones.
+
+Functions:
+    - collectFiles: List image files from directories, files and glob patterns
+    - getDisplay: Get an HDR display configuration from its tag
+    - getDisplays: Get a list of HDR display configurations
+    - exportPath: Compute the output filename of an export
+    - fitShape: Compute the size of an image fitting (or covering) a display
+    - readMetadata: Read the stored metadata of an image without decoding it
+    - exportImageTargets: Export one image for several HDR displays (one decoding and processing)
+    - deriveTarget: Derive and write the output of one display from the processed image
+    - exportImage: Export one image for one HDR display
+    - exportAll: Export a list of images sequentially
+    - explainImage: Execution plan of the export of an image, without decoding it
+    - estimateShape: Estimate image size without decoding it
+    - physicalMemory: Get physical memory size
+    - exportParallel: Export a list of images in parallel worker processes
+
+Classes:
+    - exportManifest: Persistent state of the exports of an output directory
+    - exportQueue: Resumable queue of export jobs
+    - exportScheduler: Size-ordered, memory-bounded scheduling of export jobs
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import os, glob, copy, json, time, concurrent.futures
+import numpy as np
+import skimage.transform
+from . import image, processing, utils, metadata, cache, tiles, profiling, plan, worker
+import preferences.preferences as pref
+from timeit import default_timer as timer
+
+# -----------------------------------------------------------------------------
+# --- Package functions -------------------------------------------------------
+# -----------------------------------------------------------------------------
+imageExtensions = ('.jpg','.JPG','.hdr','.HDR','.arw','.ARW')
+# -----------------------------------------------------------------------------
+def collectFiles(inputs, extList=imageExtensions):
+    """
+    List image files from directories, files and glob patterns.
+
+    Args:
+        inputs (list of str): directories, files or glob patterns
+        extList (tuple of str, optional): image extensions
+
+    Returns:
+        list of str: image filenames (sorted, without duplicates)
+    """
+    res = []
+    for input in inputs:
+        if os.path.isdir(input):
+            res += [os.path.join(input,f) for f in utils.filterlistdir(input, extList)]
+        else:
+            res += [f for f in sorted(glob.glob(input)) if os.path.isfile(f) and f.endswith(extList)]
+    # remove duplicates keeping order
+    return list(dict.fromkeys(res))
+# -----------------------------------------------------------------------------
+def getDisplay(tag=None):
+    """
+    Get an HDR display configuration from its tag.
+
+    Args:
+        tag (str, optional): display tag (in prefs.json), default: current display
+
+    Returns:
+        dict: display configuration (shape, scaling, post, tag)
+    """
+    if tag == None: return pref.getHDRdisplay()
+    if not (tag in pref.getHDRdisplays()):
+        raise ValueError(f'unknown HDR display "{tag}" (available: {", ".join(pref.getHDRdisplays().keys())})')
+    return pref.getHDRdisplays()[tag]
+# -----------------------------------------------------------------------------
+def getDisplays(displays=None):
+    """
+    Get a list of HDR display configurations.
+
+    Args:
+        displays (dict, str or list of dict/str, optional): display configurations or tags,
+            'all': all displays of the preferences (except 'none'), default: current display
+
+    Returns:
+        list of dict: display configurations, without duplicates
+    """
+    if displays == 'all' or displays == ['all']:
+        return [display for tag, display in pref.getHDRdisplays().items() if tag != 'none']
+    if (displays == None) or isinstance(displays, (dict, str)): displays = [displays]
+    res = {}
+    for display in displays:
+        if not isinstance(display, dict): display = getDisplay(display)
+        res[display['tag']] = display
+    return list(res.values())
+# -----------------------------------------------------------------------------
+def exportPath(filename, dirName, display):
+    """
+    Compute the output filename of an export: <dirName>/<name><post>.hdr.
+
+    Args:
+        filename (str): source image filename
+        dirName (str or None): output directory, None: source directory
+        display (dict): display configuration
+
+    Returns:
+        str: output filename
+    """
+    path, name, ext = utils.filenamesplit(filename)
+    return os.path.join(dirName if dirName else path, name+display['post']+'.hdr')
+# -----------------------------------------------------------------------------
+def fitShape(shape, displayShape, cover=False):
+    """
+    Compute the size of an image fitting in (or covering) a display, images are never enlarged.
+
+    Args:
+        shape (tuple): image shape (height, width, ...)
+        displayShape (list): display shape [height, width]
+        cover (bool, optional): False: image fits in the display, True: image covers the display
+
+    Returns:
+        tuple: (height, width)
+    """
+    height, width = shape[0], shape[1]
+    factors = (displayShape[0]/height, displayShape[1]/width)
+    factor = min(1.0, max(factors) if cover else min(factors))
+    return (max(1, int(round(height*factor))), max(1, int(round(width*factor))))
+# -----------------------------------------------------------------------------
+def readMetadata(filename):
+    """
+    Read the stored metadata of an image (store or JSON sidecar) without decoding it.
+
+    Args:
+        filename (str): image filename
+
+    Returns:
+        dict or None: metadata, None if the image has no metadata yet
+    """
+    path, name, ext = utils.filenamesplit(filename)
+    meta = None
+    if pref.metadataStore: meta = metadata.metadataStore.open(path).get(os.path.basename(filename))
+    if meta == None: meta = metadata.metadataWriter.get().read(os.path.join(path, name+'.json'))
+    return meta
+# -----------------------------------------------------------------------------
+def exportImageTargets(filename, dirName=None, displays=None, processPipe=None, backend='python', fit=False, params=None, outputs=None, tiled=False):
+    """
+    Export one image for several HDR displays.
+
+    The image is decoded and processed once, then the output of each display
+    is derived from the processed image (deriveTarget) in parallel threads.
+    In fit mode, the input image is first reduced to the size covering the
+    largest display (so that the crop of the geometry node still covers it),
+    and each output is resized to fit its display.
+
+    Args:
+        filename (str): source image filename
+        dirName (str, optional): output directory, default: source directory
+        displays (dict or list of dict, optional): display configurations, default: current display
+        processPipe (hdrCore.processing.ProcessPipe, optional): pipeline to reuse,
+            default: a new ProcessPipe.buildDefault()
+        backend (str, optional): 'python' (ProcessPipe.compute) or 'cpp' (HDRip.dll)
+        fit (bool, optional): resize outputs to fit the display shapes (default: full size)
+        params (list, optional): process-pipe parameters (ProcessPipe.toDict() format),
+            override the 'processpipe' metadata of the image
+        outputs (list of str, optional): output filenames (in displays order),
+            default: exportPath(filename, dirName, display)
+        tiled (bool, optional): compute by tiles on all cores (hdrCore.tiles), for
+            sequential exports (default: False, the caller runs exports in parallel)
+
+    Returns:
+        list of str or None: output filenames (in displays order), None if export failed
+    """
+    displays = getDisplays(displays)
+    pathExports = outputs if outputs else [exportPath(filename, dirName, display) for display in displays]
+    if os.path.abspath(filename) in [os.path.abspath(pathExport) for pathExport in pathExports]:
+        print("ERROR[export.exportImage(",filename,"): export would overwrite the source image, choose another output directory!]")
+        return None
+    if pref.verbose: print(" [EXPORT] >> exportImage(",filename,"->",pathExports,")")
+    start = timer()
+    memory = profiling.profiler.memoryStart()
+
+    # full size image
+    img = image.Image.read(filename)
+
+    # fit: compute at the largest size required by displays
+    if fit:
+        ny, nx = max(fitShape(img.shape, display['shape'], cover=True) for display in displays)
+        if (ny, nx) != tuple(img.shape[:2]):
+            if tiled and backend != 'cpp': img = tiles.tileScheduler(processes=True).resize(img, (ny, nx))
+            else:                          img = img.process(processing.resize(), size=(ny, nx), anti_aliasing=True)
+
+    # process-pipe parameters are recovered from image metadata by setImage
+    if not processPipe: processPipe = processing.ProcessPipe.buildDefault()
+    # full size, node arrays are not kept after export: context of the caller restored after compute
+    context = processPipe.context
+    processPipe.context = context.derive(autoResize=False, reuseBuffers=False)
+    try:
+        processPipe.setImage(img)
+        if params: processPipe.setParametersFromDict(params)
+        if backend == 'cpp':
+            import hdrCore.coreC
+            res = hdrCore.coreC.coreCcompute(img, processPipe)
+        elif tiled:
+            res = tiles.tileScheduler(workers=processPipe.context.threads, processes=True).compute(processPipe, toneMap=False)
+        else:
+            processPipe.compute()
+            res = processPipe.getImage(toneMap=False)
+    finally:
+        processPipe.context = context
+
+    # clip
+    res = res.process(processing.clip())
+
+    res.type = image.imageType.HDR
+    res.metadata.metadata['processpipe'] = None
+
+    for directory in set(os.path.dirname(path) for path in pathExports):
+        if directory and not os.path.isdir(directory): os.makedirs(directory, exist_ok=True)
+
+    # derive display outputs
+    if len(displays) == 1:
+        deriveTarget(res, displays[0], pathExports[0], fit)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(displays), os.cpu_count() or 1)) as pool:
+            for future in [pool.submit(deriveTarget, res, d, path, fit) for d, path in zip(displays, pathExports)]: future.result()
+
+    memory = profiling.profiler.memoryEnd(memory)
+    if profiling.profiler.enabled:
+        profiling.profiler.record('export:'+os.path.basename(filename), start, timer()-start, category='export', nbytes=res.colorData.nbytes, shape=img.shape, backend=backend, memory=memory)
+    if pref.verbose: print(f" [EXPORT] >> exportImage({os.path.basename(filename)}): {timer()-start:.2f}s"+(f", peak: {memory['peak']/2**20:.0f}MB, RSS: {(memory['rss'] or 0)/2**20:.0f}MB (+{(memory['rssGrowth'] or 0)/2**20:.0f}MB)" if memory else ""))
+    return pathExports
+# -----------------------------------------------------------------------------
+def deriveTarget(img, display, pathExport, fit=False):
+    """
+    Derive and write the output of one display from the processed image.
+
+    The processed image is not modified, so that outputs of several displays
+    can be derived from it concurrently.
+
+    Args:
+        img (hdrCore.image.Image): processed image (clipped, linear)
+        display (dict): display configuration
+        pathExport (str): output filename
+        fit (bool, optional): resize output to fit the display shape
+    """
+    res = copy.copy(img)
+    res.metadata = copy.deepcopy(img.metadata)
+
+    colorData = img.colorData
+    if fit:
+        ny, nx = fitShape(img.shape, display['shape'])
+        if (ny, nx) != tuple(img.shape[:2]):
+            colorData = skimage.transform.resize(colorData, (ny, nx), anti_aliasing=True).astype(np.float32)
+
+    res.colorData = colorData*display['scaling']
+    res.shape = res.colorData.shape
+    res.metadata.metadata['display'] = display['tag']
+    res.write(pathExport)
+# -----------------------------------------------------------------------------
+def exportImage(filename, dirName=None, display=None, processPipe=None, backend='python'):
+    """
+    Export one image for one HDR display.
+
+    Args:
+        filename (str): source image filename
+        dirName (str, optional): output directory, default: source directory
+        display (dict, optional): display configuration, default: current display
+        processPipe (hdrCore.processing.ProcessPipe, optional): pipeline to reuse,
+            default: a new ProcessPipe.buildDefault()
+        backend (str, optional): 'python' (ProcessPipe.compute) or 'cpp' (HDRip.dll)
+
+    Returns:
+        str or None: output filename, None if export failed
+    """
+    res = exportImageTargets(filename, dirName, [display if display else getDisplay()], processPipe, backend)
+    return res[0] if res else None
+# -----------------------------------------------------------------------------
+def exportAll(filenames, dirName=None, displays=None, backend='python', progress=None, force=False, fit=False):
+    """
+    Export a list of images sequentially, errors do not stop the export.
+    Each image is computed by tiles on all cores (hdrCore.tiles).
+
+    Up-to-date outputs (see exportQueue) are not exported again.
+
+    Args:
+        filenames (list of str): source image filenames
+        dirName (str, optional): output directory, default: source directories
+        displays (dict or list of dict, optional): display configurations, default: current display
+        backend (str, optional): 'python' or 'cpp'
+        progress (function, optional): called with (done, total, filename, outputFilenames)
+        force (bool, optional): export up-to-date outputs again
+        fit (bool, optional): resize outputs to fit the display shapes
+
+    Returns:
+        dict: output filenames (list, None if failed) keyed by source filename
+    """
+    queue = exportQueue(filenames, dirName, displays, backend, force, fit)
+    res = {}
+    for filename, outputs in queue.skipped.items():
+        res[filename] = outputs
+        if progress: progress(len(res), len(filenames), filename, outputs)
+    for filename, todo in queue.jobs.items():
+        try:
+            res[filename] = queue.done(filename, exportImageTargets(filename, dirName, todo, backend=backend, fit=fit, tiled=True))
+        except Exception as e:
+            print("ERROR[export.exportAll(",filename,"):",e,"]")
+            res[filename] = queue.done(filename, None, str(e))
+        if progress: progress(len(res), len(filenames), filename, res[filename])
+    metadata.metadataWriter.flushAll()
+    return res
+# -----------------------------------------------------------------------------
+def explainImage(filename, displays=None, fit=False, tiled=False):
+    """
+    Get the execution plan of the export of an image, without decoding it.
+
+    The pipeline is configured from the stored metadata of the image, its
+    size is estimated (estimateShape()), reduced to the displays in fit mode.
+
+    Args:
+        filename (str): source image filename
+        displays (dict or list of dict, optional): display configurations, default: current display
+        fit (bool, optional): outputs fit the display shapes (default: full size)
+        tiled (bool, optional): estimates of a compute by tiles on all cores (exportAll(),
+            see hdrCore.plan.tiledPlan()), default: untiled compute on one core
+            (exportParallel(): one image per worker)
+
+    Returns:
+        dict or None: plan (see hdrCore.plan.explain()), last node is the clip of
+            the export, None if the size of the image is unknown
+    """
+    shape = estimateShape(filename)
+    if not shape: return None
+    if fit: shape = max(fitShape(shape, display['shape'], cover=True) for display in getDisplays(displays))
+
+    processPipe = processing.ProcessPipe.buildDefault()
+    processPipe.context = processPipe.context.derive(autoResize=False, reuseBuffers=False)
+    meta = readMetadata(filename)
+    if meta and meta.get('processpipe'): processPipe.setParametersFromDict(meta['processpipe'])
+    processPipe.append(processing.clip(), paramDict={}, name='clip')
+    res = processPipe.explain(shape=shape)
+    if tiled: res = plan.tiledPlan(res, processPipe.context.threads, tiles.tileScheduler.calibrationSize)
+    return res
+# -----------------------------------------------------------------------------
+def estimateShape(filename):
+    """
+    Estimate image size without decoding it.
+
+    Size is read from the metadata ('Image Width', 'Image Height') or from the
+    header of .hdr files.
+
+    Args:
+        filename (str): image filename
+
+    Returns:
+        tuple or None: (height, width), None if unknown
+    """
+    path, name, ext = utils.filenamesplit(filename)
+    meta = readMetadata(filename)
+    if meta and ('exif' in meta):
+        w, h = meta['exif'].get('Image Width', None), meta['exif'].get('Image Height', None)
+        if w and h: return (h, w)
+    if ext.lower() == 'hdr':
+        # radiance header ends with resolution line: -Y <height> +X <width>
+        with open(filename, 'rb') as file:
+            for _ in range(64):
+                line = file.readline().strip().split()
+                if len(line) == 4 and line[0] in (b'-Y', b'+Y') and line[2] in (b'+X', b'-X'):
+                    return (int(line[1]), int(line[3]))
+    return None
+# -----------------------------------------------------------------------------
+def physicalMemory():
+    """
+    Get physical memory size.
+
+    Returns:
+        int or None: size in bytes, None if unknown
+    """
+    try:
+        return os.sysconf('SC_PAGE_SIZE')*os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        pass
+    try: # windows
+        import ctypes
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong),
+                        ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                        ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                        ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                        ('sullAvailExtendedVirtual', ctypes.c_ulonglong)]
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)): return status.ullTotalPhys
+    except Exception:
+        pass
+    return None
+# -----------------------------------------------------------------------------
+# --- Class exportManifest ----------------------------------------------------
+# -----------------------------------------------------------------------------
+class exportManifest(object):
+    """
+    Persistent state of the exports of an output directory.
+
+    The manifest is a JSON file in the output directory with one entry per
+    (source image, display): source key, parameter key, output filename and
+    status of the last export. It is saved after each image (checkpoint).
+
+    Attributes:
+        - filename (str): manifest filename
+        - entries (dict): entries keyed by 'source filename|display tag'
+
+    Class Attributes:
+        name (str): manifest file name
+    """
+
+    name = 'uHDR-export.json'
+
+    def __init__(self, directory):
+        """
+        Load the manifest of an output directory (empty if it does not exist).
+
+        Args:
+            directory (str): output directory
+        """
+        self.filename = os.path.join(directory, exportManifest.name)
+        self.entries = {}
+        if os.path.isfile(self.filename):
+            try:
+                with open(self.filename, "r") as file: self.entries = json.load(file)['entries']
+            except (OSError, ValueError, KeyError) as e:
+                print("WARNING[exportManifest(",self.filename,"): invalid manifest, all images will be exported (",e,")]")
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def key(filename, display):
+        """
+        Returns:
+            str: key of the entry of (filename, display)
+        """
+        return os.path.abspath(filename)+'|'+display['tag']
+    # -------------------------------------------------------------------------
+    def upToDate(self, filename, display, sourceKey, paramKey):
+        """
+        Check if an output is up to date: exported from the same source file with the same parameters.
+
+        Args:
+            filename (str): source image filename
+            display (dict): display configuration
+            sourceKey (str): key of the source file
+            paramKey (str): key of the export parameters
+
+        Returns:
+            bool: True if the output does not need to be exported again
+        """
+        entry = self.entries.get(exportManifest.key(filename, display), None)
+        return bool(entry) and (entry['status'] == 'done') and (entry['source'] == sourceKey) \
+            and (entry['params'] == paramKey) and os.path.isfile(entry['output'])
+    # -------------------------------------------------------------------------
+    def update(self, filename, display, sourceKey, paramKey, output, status, error=None):
+        """
+        Record the result of an export.
+
+        Args:
+            filename (str): source image filename
+            display (dict): display configuration
+            sourceKey (str): key of the source file
+            paramKey (str): key of the export parameters
+            output (str): output filename
+            status (str): 'done' or 'failed'
+            error (str, optional): error message
+        """
+        key = exportManifest.key(filename, display)
+        previous = self.entries.get(key, {})
+        attempts = 1 if previous.get('status', None) != 'failed' else previous.get('attempts', 0)+1
+        self.entries[key] = {'filename': os.path.abspath(filename), 'display': display['tag'],
+                             'source': sourceKey, 'params': paramKey, 'output': output,
+                             'status': status, 'error': error, 'attempts': attempts,
+                             'date': time.strftime('%Y-%m-%d %H:%M:%S')}
+    # -------------------------------------------------------------------------
+    def save(self):
+        """
+        Write the manifest (atomically: an interrupted save keeps the previous manifest).
+        """
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        if not os.path.isdir(directory): os.makedirs(directory)
+        metadata.metadataWriter.atomicWrite(self.filename, json.dumps({'version': 1, 'entries': self.entries}, indent=1))
+# -----------------------------------------------------------------------------
+# --- Class exportQueue -------------------------------------------------------
+# -----------------------------------------------------------------------------
+class exportQueue(object):
+    """
+    Resumable queue of export jobs.
+
+    Jobs are planned from the manifests of the output directories: an
+    (image, display) output is skipped if it is up to date (same source file,
+    same parameters, output present); new, changed and failed ones are
+    exported. All displays of an image are exported by one job, so that the
+    image is decoded and processed once.
+
+    Attributes:
+        - dirName (str or None): output directory, None: source directories
+        - displays (list of dict): display configurations
+        - backend (str): 'python' or 'cpp'
+        - fit (bool): outputs are resized to fit the display shapes
+        - jobs (dict): displays to export keyed by source filename
+        - skipped (dict): output filenames of up-to-date images keyed by source filename
+        - keys (dict): (source key, {display tag: parameter key}) keyed by source filename
+        - manifests (dict): exportManifest keyed by output directory
+    """
+
+    def __init__(self, filenames, dirName=None, displays=None, backend='python', force=False, fit=False):
+        """
+        Plan the export jobs.
+
+        Args:
+            filenames (list of str): source image filenames
+            dirName (str, optional): output directory, default: source directories
+            displays (dict or list of dict, optional): display configurations, default: current display
+            backend (str, optional): 'python' or 'cpp'
+            force (bool, optional): export up-to-date outputs again
+            fit (bool, optional): resize outputs to fit the display shapes
+        """
+        self.dirName = dirName
+        self.displays = getDisplays(displays)
+        self.backend = backend
+        self.fit = fit
+        self.jobs, self.skipped, self.keys, self.manifests = {}, {}, {}, {}
+
+        for filename in filenames:
+            manifest = self.getManifest(filename)
+            meta = readMetadata(filename)
+            processpipe = meta.get('processpipe', None) if meta else None
+            sourceKey = cache.imageCache.sourceKey(filename)
+            paramKeys = {d['tag']: cache.imageCache.stageKey(processpipe, backend, d['scaling'], d['post'], d['shape'] if fit else None) 
+                         for d in self.displays}
+            self.keys[filename] = (sourceKey, paramKeys)
+
+            todo = [d for d in self.displays if force or not manifest.upToDate(filename, d, sourceKey, paramKeys[d['tag']])]
+            if todo: self.jobs[filename] = todo
+            else:    self.skipped[filename] = [exportPath(filename, dirName, d) for d in self.displays]
+
+        if pref.verbose: print(f" [EXPORT] >> exportQueue: {len(self.jobs)} images to export, {len(self.skipped)} up to date")
+    # -------------------------------------------------------------------------
+    def getManifest(self, filename):
+        """
+        Returns:
+            exportManifest: manifest of the output directory of an image
+        """
+        directory = self.dirName if self.dirName else (os.path.dirname(filename) or '.')
+        if not (directory in self.manifests): self.manifests[directory] = exportManifest(directory)
+        return self.manifests[directory]
+    # -------------------------------------------------------------------------
+    def done(self, filename, outputs, error=None):
+        """
+        Record the result of a job and save the manifest.
+
+        Args:
+            filename (str): source image filename
+            outputs (list of str or None): output filenames of the job, None if failed
+            error (str, optional): error message
+
+        Returns:
+            list of str or None: output filenames for all displays, None if failed
+        """
+        manifest = self.getManifest(filename)
+        sourceKey, paramKeys = self.keys[filename]
+        for i, display in enumerate(self.jobs[filename]):
+            if outputs: manifest.update(filename, display, sourceKey, paramKeys[display['tag']], outputs[i], 'done')
+            else:       manifest.update(filename, display, sourceKey, paramKeys[display['tag']], 
+                                        exportPath(filename, self.dirName, display), 'failed', error)
+        try:
+            manifest.save()
+        except OSError as e:
+            print("WARNING[exportQueue.done(",filename,"): cannot save export manifest (",e,")]")
+        return [exportPath(filename, self.dirName, d) for d in self.displays] if outputs else None
+# -----------------------------------------------------------------------------
+# --- Class exportScheduler ---------------------------------------------------
+# -----------------------------------------------------------------------------
+class exportScheduler(object):
+    """
+    Size-ordered, memory-bounded scheduling of export jobs.
+
+    Jobs are started largest first (the longest jobs do not end the batch alone)
+    while the estimated memory of running jobs stays below the budget. A job
+    larger than the budget is run alone.
+
+    Attributes:
+        - pending (list): (filename, memory) not started, sorted by decreasing memory
+        - running (dict): memory of running jobs keyed by filename
+        - maxMemory (int): memory budget in bytes
+
+    Class Attributes:
+        bytesPerPixel (int): estimated memory per pixel of an export: float32 RGB
+            image (12 bytes) times the number of copies alive in a ProcessPipe
+            (original, input, output and one per process node)
+        defaultPixels (int): pixel count used when the image size is unknown (24 Mpixels)
+    """
+
+    bytesPerPixel = 12*16
+    defaultPixels = 24*1000*1000
+
+    def __init__(self, filenames, maxMemory):
+        """
+        Create the scheduler.
+
+        Args:
+            filenames (list of str): images to export
+            maxMemory (int): memory budget in bytes
+        """
+        self.maxMemory = maxMemory
+        self.running = {}
+        self.pending = sorted([(f, exportScheduler.estimateMemory(f)) for f in filenames], key=lambda job: -job[1])
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def estimateMemory(filename):
+        """
+        Estimate the memory required to export an image.
+
+        Args:
+            filename (str): image filename
+
+        Returns:
+            int: memory in bytes
+        """
+        shape = estimateShape(filename)
+        pixels = shape[0]*shape[1] if shape else exportScheduler.defaultPixels
+        return pixels*exportScheduler.bytesPerPixel
+    # -------------------------------------------------------------------------
+    def next(self):
+        """
+        Get the next job that can start.
+
+        Returns:
+            str or None: filename, None if no job can start now
+        """
+        used = sum(self.running.values())
+        for i, (filename, memory) in enumerate(self.pending):
+            if (used + memory <= self.maxMemory) or (not self.running):
+                del self.pending[i]
+                self.running[filename] = memory
+                return filename
+        return None
+    # -------------------------------------------------------------------------
+    def done(self, filename):
+        """
+        Mark a job as done.
+
+        Args:
+            filename (str): image filename
+        """
+        self.running.pop(filename, None)
+    # -------------------------------------------------------------------------
+    def finished(self):
+        """
+        Returns:
+            bool: True if all jobs are done
+        """
+        return (not self.pending) and (not self.running)
+# -----------------------------------------------------------------------------
+# --- worker process ----------------------------------------------------------
+# -----------------------------------------------------------------------------
+def _exportWorker(filename, dirName, displays, backend, fit):
+    """
+    Export one image in a worker process, reusing the worker process-pipe.
+
+    Args:
+        filename (str): source image filename
+        dirName (str): output directory
+        displays (list of dict): display configurations
+        backend (str): 'python' or 'cpp'
+        fit (bool): resize outputs to fit the display shapes
+
+    Returns:
+        list of str or None: output filenames
+    """
+    try:
+        return exportImageTargets(filename, dirName, displays, processPipe=worker.workerProcessPipe(), backend=backend, fit=fit)
+    finally:
+        # worker processes do not run exit handlers: write metadata now
+        metadata.metadataWriter.flushAll()
+# -----------------------------------------------------------------------------
+def exportParallel(filenames, dirName=None, displays=None, backend='python', nbWorkers=None, maxMemory=None, progress=None, force=False, fit=False):
+    """
+    Export a list of images in parallel worker processes.
+
+    Each worker builds its process-pipe once and reuses it for all its images.
+    Jobs are planned by exportQueue (up-to-date outputs are skipped) and
+    scheduled by exportScheduler: largest images first and estimated memory of
+    running exports bounded by maxMemory. The manifest is written by the main
+    process only.
+
+    Args:
+        filenames (list of str): source image filenames
+        dirName (str, optional): output directory, default: source directories
+        displays (dict or list of dict, optional): display configurations, default: current display
+        backend (str, optional): 'python' or 'cpp'
+        nbWorkers (int, optional): number of worker processes, default: number of cores
+        maxMemory (int, optional): memory budget in bytes, default: half of physical memory
+        progress (function, optional): called with (done, total, filename, outputFilenames)
+        force (bool, optional): export up-to-date outputs again
+        fit (bool, optional): resize outputs to fit the display shapes
+
+    Returns:
+        dict: output filenames (list, None if failed) keyed by source filename
+    """
+    if not nbWorkers: nbWorkers = os.cpu_count() or 1
+    if not maxMemory: maxMemory = (physicalMemory() or 8*1024**3)//2
+    if pref.verbose: print(f" [EXPORT] >> exportParallel({len(filenames)} images, {nbWorkers} workers, {maxMemory/1024**3:.1f} GB)")
+
+    # metadata must be on disk before workers read it
+    metadata.metadataWriter.flushAll()
+
+    queue = exportQueue(filenames, dirName, displays, backend, force, fit)
+    res, futures = {}, {}
+    for filename, outputs in queue.skipped.items():
+        res[filename] = outputs
+        if progress: progress(len(res), len(filenames), filename, outputs)
+
+    scheduler = exportScheduler(list(queue.jobs.keys()), maxMemory)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=nbWorkers, initializer=worker.initWorker, initargs=(pref.verbose,)) as pool:
+        while not scheduler.finished():
+            # start as many jobs as workers and memory budget allow
+            while len(futures) < nbWorkers:
+                filename = scheduler.next()
+                if filename == None: break
+                futures[pool.submit(_exportWorker, filename, dirName, queue.jobs[filename], backend, fit)] = filename
+            doneFutures, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in doneFutures:
+                filename = futures.pop(future)
+                scheduler.done(filename)
+                try:
+                    res[filename] = queue.done(filename, future.result())
+                except Exception as e:
+                    print("ERROR[export.exportParallel(",filename,"):",e,"]")
+                    res[filename] = queue.done(filename, None, str(e))
+                if progress: progress(len(res), len(filenames), filename, res[filename])
+    return res
+# -----------------------------------------------------------------------------
@@ -30,6 +30,7 @@ systems for complete HDR imaging workflows.
 
 Classes:
     - imageType: Enumeration for different image types (SDR, ARW, HDR)
+    - rawDecode: Enumeration for raw decoding modes (FULL, HALF, PREVIEW)
     - channel: Channel identification and color space management
     - Image: Core image data structure with processing capabilities
     - ColorSpace: Color space definitions and transformations
@@ -47,9 +48,10 @@ Key Features:
 # -----------------------------------------------------------------------------
 # --- Import ------------------------------------------------------------------
 # -----------------------------------------------------------------------------
-import enum, rawpy, colour, imageio, copy, os, functools, skimage.transform
+import enum, colour, imageio, copy, os, functools, skimage.transform
 import numpy as np
-from . import utils, processing, metadata
+from . import utils, processing, metadata, cache
+from .context import ExecutionContext
 import preferences.preferences as pref
 
 imageio.plugins.freeimage.download()
@@ -74,6 +76,32 @@ class imageType(enum.Enum):
     ARW = 1 # raw image file: sony ARW  (.arw)
     HDR = 2 # hdr file:                 (.hdr)
 
+# -----------------------------------------------------------------------------
+# --- Class rawDecode --------------------------------------------------------
+# -----------------------------------------------------------------------------
+class rawDecode(enum.Enum):
+    """
+    Enumeration for raw file (.arw) decoding modes.
+
+    Full resolution demosaicing is only required for export: working images
+    (ExecutionContext.maxWorking) are decoded at half size, with the same raw
+    processing as export (linear sRGB, camera white balance) so that edits
+    match the export.
+
+    The embedded JPEG preview is rendered by the camera (its tone curve and
+    color processing, sRGB encoded): it is for display only (e.g. a quick
+    look), not for editing.
+
+    Attributes:
+        - FULL (int): full resolution demosaicing (export)
+        - HALF (int): half size demosaicing (2x2 binning, no interpolation), editing
+        - PREVIEW (int): embedded JPEG preview, display only, falls back to HALF if too small
+    """
+
+    FULL    = 0 # full resolution demosaicing
+    HALF    = 1 # half size: each 2x2 bayer block gives one pixel
+    PREVIEW = 2 # embedded jpeg preview
+
 # -----------------------------------------------------------------------------
 # --- Class channel ----------------------------------------------------------
 # -----------------------------------------------------------------------------
@@ -237,7 +265,7 @@ class Image(object):
         return process.compute(self,**kwargs)
 
     @staticmethod
-    def read(filename, thumb = False):
+    def read(filename, thumb = False, rawMode = None):
         """
         Load an image from file with automatic format detection.
         
@@ -249,44 +277,36 @@ class Image(object):
         Args:
             filename (str): Complete path to the image file
             thumb (bool, optional): Whether to load/create thumbnail version (default: False)
+            rawMode (rawDecode, optional): decoding mode for raw files, default: 
+                rawDecode.HALF if thumb else rawDecode.FULL
                 
         Returns:
             Image: Loaded image object with metadata and proper color space configuration
             
         Note:
             - For HDR images: Creates thumbnails in ./thumbnails/ directory when requested
-            - For RAW images: Uses rawpy with sRGB output and camera white balance
+            - For RAW images: Uses rawpy with sRGB output and camera white balance,
+              full resolution demosaicing is only done when thumb is False
             - Automatically loads existing metadata from .json files if available
+            - Full size decoded data is cached on disk when pref.diskCache is True
         """
 
-        imgDouble, imgDoubleFull = None, None
+        imgDouble, fullShape = None, None
         # image name
         path, name, ext = utils.filenamesplit(filename)
 
+        # full size decoded data from disk cache
+        useDiskCache = pref.diskCache and (not thumb) and (rawMode in (None, rawDecode.FULL))
+        cached = cache.imageCache.get(filename, 'decoded') if useDiskCache else None
+        if cached:
+            imgDouble = cached.toArray(np.float32)
+            scalingFactor, type, linear = cached.info['scalingFactor'], imageType[cached.info['type']], cached.info['linear']
+
         # load raw file using rawpy
-        if ext=="arw":
-            outBit = 16
-            raw = rawpy.imread(filename)
-            ppParams = rawpy.Params(demosaic_algorithm=None, half_size=False, 
-                                            four_color_rgb=False, dcb_iterations=0, 
-                                            dcb_enhance=False, fbdd_noise_reduction=rawpy.FBDDNoiseReductionMode.Off, 
-                                            noise_thr=None, median_filter_passes=0, 
-                                            use_camera_wb=True,                                 # default False
-                                            use_auto_wb=False, 
-                                            user_wb=None, 
-                                            output_color=rawpy.ColorSpace.sRGB,                 # output in SRGB
-                                            output_bps=outBit,                                  # default 8
-                                            user_flip=None, user_black=None, 
-                                            user_sat=None, no_auto_bright=False, 
-                                            auto_bright_thr=None, adjust_maximum_thr=0.75, 
-                                            bright=1.0, highlight_mode=rawpy.HighlightMode.Clip, 
-                                            exp_shift=None, exp_preserve_highlights=0.0, 
-                                            no_auto_scale=False,
-                                            gamma=None,                                         # linear output
-                                            chromatic_aberration=None, bad_pixels_path=None)
-            imgDouble = colour.utilities.as_float_array(raw.postprocess(ppParams))/(pow(2,16)-1)
-            raw.close()
-            scalingFactor, type, linear = 1.0, imageType.ARW, True
+        elif ext=="arw":
+            if rawMode == None: rawMode = rawDecode.HALF if thumb else rawDecode.FULL
+            imgDouble, linear, fullShape = Image.readRaw(filename, rawMode)
+            scalingFactor, type = 1.0, imageType.ARW
 
         # load jpg, tiff, hdr file using colour
         elif ext=="jpg":
@@ -311,7 +331,7 @@ class Image(object):
                     iY, iX, _ = imgDouble.shape
                     maxX = processing.ProcessPipe.maxSize
                     factor = maxX/iX
-                    imgDoubleFull = copy.deepcopy(imgDouble)
+                    fullShape = imgDouble.shape
                     imgThumbnail =  skimage.transform.resize(imgDouble, (int(iY * factor),maxX ))
                     # save thumbnail
                     colour.write_image(imgThumbnail,searchStr, method='Imageio')
@@ -326,15 +346,19 @@ class Image(object):
             linear = True
             scalingFactor = 1.0
 
+        if useDiskCache and not cached:
+            cache.imageCache.put(filename, 'decoded', imgDouble, {'scalingFactor': scalingFactor, 'type': type.name, 'linear': linear},
+                                   storage=ExecutionContext.current().storage)
+
         # create image object
-        res =  Image(path, name+'.'+ext, np.float32(imgDouble),type, linear, None, scalingFactor)           # colorspace = None will be set in metadata.metadata.build(res)
+        res =  Image(path, name+'.'+ext, np.asarray(imgDouble, dtype=np.float32),type, linear, None, scalingFactor) # colorspace = None will be set in metadata.metadata.build(res)
         res.metadata = metadata.metadata.build(res)                                                         # build metadata (read if json file exists, else recover from exif data)
 
         # update path
         res.metadata.metadata['path'] = copy.deepcopy(path)
         # update size
-        if thumb and isinstance(imgDoubleFull, np.ndarray):
-            h,w, c = imgDoubleFull.shape
+        if fullShape != None:
+            h,w = fullShape[0], fullShape[1]
             res.metadata.metadata['exif']['Image Width']    = w
             res.metadata.metadata['exif']['Image Height']   = h
 
@@ -354,6 +378,74 @@ class Image(object):
 
         return res
 
+    @staticmethod
+    def readRaw(filename, rawMode=rawDecode.FULL):
+        """
+        Decode a raw file (.arw) using rawpy.
+
+        Args:
+            filename (str): Complete path to the raw file
+            rawMode (rawDecode, optional): decoding mode (default: rawDecode.FULL)
+
+        Returns:
+            tuple: (colorData, linear, fullShape)
+                - colorData (numpy.ndarray): float32 color data in [0,1]
+                - linear (bool): False for the embedded preview (sRGB encoded), True otherwise
+                - fullShape (tuple or None): full resolution (height, width), None for rawDecode.FULL
+
+        Note:
+            The embedded preview is used only if it is at least as large as the
+            working image (ExecutionContext.current().maxWorking), otherwise half size is used.
+            It is rotated as the decoded raw (raw.sizes.flip).
+        """
+        if pref.verbose: print(" [IMAGE] >> Image.readRaw(",filename,",",rawMode,")")
+
+        import rawpy
+        # the LibRaw handle and its buffers are released on every path (gallery loader: many files at once)
+        with rawpy.imread(filename) as raw:
+            fullShape = None if rawMode == rawDecode.FULL else (raw.sizes.height, raw.sizes.width)
+            if raw.sizes.flip in (5, 6): fullShape = None if fullShape == None else (fullShape[1], fullShape[0])
+
+            if rawMode == rawDecode.PREVIEW:
+                try:
+                    thumbnail = raw.extract_thumb()
+                    if thumbnail.format == rawpy.ThumbFormat.JPEG: preview = imageio.imread(thumbnail.data)
+                    else: preview = thumbnail.data
+                    if max(preview.shape[0], preview.shape[1]) >= ExecutionContext.current().maxWorking:
+                        # libraw flip: 3 = 180 degrees, 5 = 90 degrees counterclockwise, 6 = 90 degrees clockwise
+                        turns = {3: 2, 5: 1, 6: -1}.get(raw.sizes.flip, 0)
+                        if turns: preview = np.rot90(preview, turns)
+                        # 8 bits sRGB encoded preview: scaling in place in float32
+                        colorData = preview[:,:,:3].astype(np.float32)
+                        colorData /= 255.0
+                        return colorData, False, fullShape
+                except (rawpy.LibRawNoThumbnailError, rawpy.LibRawUnsupportedThumbnailError): pass
+                rawMode = rawDecode.HALF
+
+            outBit = 16
+            ppParams = rawpy.Params(demosaic_algorithm=None, half_size=(rawMode == rawDecode.HALF), 
+                                            four_color_rgb=False, dcb_iterations=0, 
+                                            dcb_enhance=False, fbdd_noise_reduction=rawpy.FBDDNoiseReductionMode.Off, 
+                                            noise_thr=None, median_filter_passes=0, 
+                                            use_camera_wb=True,                                 # default False
+                                            use_auto_wb=False, 
+                                            user_wb=None, 
+                                            output_color=rawpy.ColorSpace.sRGB,                 # output in SRGB
+                                            output_bps=outBit,                                  # default 8
+                                            user_flip=None, user_black=None, 
+                                            user_sat=None, no_auto_bright=False, 
+                                            auto_bright_thr=None, adjust_maximum_thr=0.75, 
+                                            bright=1.0, highlight_mode=rawpy.HighlightMode.Clip, 
+                                            exp_shift=None, exp_preserve_highlights=0.0, 
+                                            no_auto_scale=False,
+                                            gamma=None,                                         # linear output
+                                            chromatic_aberration=None, bad_pixels_path=None)
+            # scaling in place in float32 (no float64 temporary)
+            colorData = raw.postprocess(ppParams).astype(np.float32)
+            colorData /= (pow(2,outBit)-1)
+
+            return colorData, True, fullShape
+
     def write(self,filename):
         """
         Save the image and its metadata to disk.
@@ -450,7 +542,8 @@ class Image(object):
         if percentile == None : Y_min, Y_max = np.amin(Y[Y>0]), np.amax(Y)                  # use min and max
         else: Y_min, Y_max = np.percentile(Y[Y>0],percentile), np.percentile(Y,100-percentile)   # percentile
 
-        return np.log2(Y_max)-np.log2(Y_min)
+        # float: float32 data gives numpy scalars, not JSON serializable (metadata)
+        return float(np.log2(Y_max)-np.log2(Y_min))
 
     def buildHistogram(self,channel):
         """
@@ -686,7 +779,8 @@ class Image(object):
         totalWidth= functools.reduce(lambda x,y: x+y, map(lambda img: img.colorData.shape[1],imgList[0]),0)
         totalHeight= functools.reduce(lambda x,y: x+y,map(lambda imgList: imgList[0].shape[0],imgList),0)
 
-        cData = np.zeros((totalHeight,totalWidth,3))
+        # type of the sub-images (float32): np.zeros default is float64
+        cData = np.zeros((totalHeight,totalWidth,3), dtype=imgList[0][0].colorData.dtype)
 
         y = 0
         for line in imgList:
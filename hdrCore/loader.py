@@ -0,0 +1,195 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+HDR Core Asynchronous Loader Module
+
+This module orchestrates the loading of images (gallery thumbnails) with
+asyncio: the steps of loading an image are dispatched to executors matching
+their nature, so that loading a page scales with the number of cores.
+
+    - I/O steps (file read, JSON sidecar, exiftool) run concurrently on a thread pool
+    - CPU steps (process-pipe computation) run on a process pool: pure Python
+      stages do not contend for the GIL
+
+The event loop runs in a background thread. Results are delivered through a
+callback called in the loop thread: GUI code forwards them to its own event
+loop (see guiQt.thread.AsyncLoadImage).
+
+Classes:
+    - asyncLoader: asyncio orchestration of image loading
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import os, atexit, asyncio, threading, concurrent.futures
+from . import image, processing, metadata, worker
+import preferences.preferences as pref
+
+# -----------------------------------------------------------------------------
+# --- worker process ----------------------------------------------------------
+# -----------------------------------------------------------------------------
+def _computeWorker(img):
+    """
+    Compute the process-pipe of an image (worker process or thread).
+
+    Node outputs are dropped before the process-pipe is sent back: they are
+    recomputed on the first edit, only the output image is needed to display
+    the thumbnail.
+
+    Args:
+        img (hdrCore.image.Image): image (thumbnail) with its metadata
+
+    Returns:
+        hdrCore.processing.ProcessPipe: computed process-pipe
+    """
+    # worker process: reused process-pipe, thread: a process-pipe per image
+    processPipe = worker.workerProcessPipe()
+    if not processPipe: processPipe = processing.ProcessPipe.buildDefault()
+    processPipe.setImage(img)
+    processPipe.compute()
+    for processNode in processPipe.processNodes:
+        processNode.outputImage = None
+        processNode.requireUpdate = True
+    return processPipe
+# -----------------------------------------------------------------------------
+# --- Class asyncLoader -------------------------------------------------------
+# -----------------------------------------------------------------------------
+class asyncLoader(object):
+    """
+    asyncio orchestration of image loading.
+
+    Attributes:
+        - loop (asyncio.AbstractEventLoop): event loop (runs in a background thread)
+        - ioExecutor (concurrent.futures.ThreadPoolExecutor): executor of I/O steps
+        - cpuExecutor (concurrent.futures.ProcessPoolExecutor or None): executor of
+          CPU steps, None: CPU steps run on the I/O executor
+
+    Class Attributes:
+        loader (asyncLoader): shared loader (see get())
+    """
+
+    loader = None
+
+    def __init__(self, ioWorkers=None, cpuWorkers=None):
+        """
+        Start the event loop and the executors.
+
+        Args:
+            ioWorkers (int, optional): number of I/O threads (default: cores+4, at most 32)
+            cpuWorkers (int, optional): number of compute processes (default: number of cores,
+                0: compute on I/O threads)
+        """
+        nbCores = os.cpu_count() or 1
+        if ioWorkers == None: ioWorkers = min(32, nbCores+4)
+        if cpuWorkers == None: cpuWorkers = nbCores
+
+        self.ioExecutor = concurrent.futures.ThreadPoolExecutor(max_workers=ioWorkers, thread_name_prefix='uHDR-io')
+        self.cpuExecutor = None
+        if cpuWorkers > 0:
+            self.cpuExecutor = concurrent.futures.ProcessPoolExecutor(max_workers=cpuWorkers, initializer=worker.initWorker, initargs=(pref.verbose,))
+
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name='uHDR-loader', daemon=True).start()
+        if pref.verbose: print(f" [LOADER] >> asyncLoader({ioWorkers} I/O threads, {cpuWorkers} compute processes)")
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def get():
+        """
+        Returns:
+            asyncLoader: shared loader, started on first call
+        """
+        if not asyncLoader.loader: asyncLoader.loader = asyncLoader()
+        return asyncLoader.loader
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def closeAll():
+        """Stop the shared loader (registered at exit)."""
+        if asyncLoader.loader:
+            asyncLoader.loader.close()
+            asyncLoader.loader = None
+    # -------------------------------------------------------------------------
+    def loadMany(self, filenames, callBack, retries=1):
+        """
+        Load images: read (thumbnail and metadata) then compute their process-pipe.
+
+        Can be called from any thread, returns immediately.
+
+        Args:
+            filenames (list of str): image filenames
+            callBack (function): called in the loop thread for each image with
+                (filename, processPipe, error), processPipe is None if loading failed
+            retries (int, optional): number of retries of a failed image
+
+        Returns:
+            concurrent.futures.Future: done when all images are loaded (can be cancelled)
+        """
+        return asyncio.run_coroutine_threadsafe(self.loadAll(list(filenames), callBack, retries), self.loop)
+    # -------------------------------------------------------------------------
+    async def loadAll(self, filenames, callBack, retries):
+        """
+        Coroutine: load images concurrently.
+
+        Args:
+            filenames (list of str): image filenames
+            callBack (function): see loadMany()
+            retries (int): number of retries of a failed image
+        """
+        loop = asyncio.get_running_loop()
+        # exif of images without metadata: a single exiftool round-trip
+        await loop.run_in_executor(self.ioExecutor, metadata.metadata.prefetchExif, filenames)
+        await asyncio.gather(*[self.loadOne(filename, callBack, retries) for filename in filenames])
+    # -------------------------------------------------------------------------
+    async def loadOne(self, filename, callBack, retries):
+        """
+        Coroutine: load one image, I/O step then compute step.
+
+        Args:
+            filename (str): image filename
+            callBack (function): see loadMany()
+            retries (int): number of retries if loading fails
+        """
+        loop = asyncio.get_running_loop()
+        for attempt in range(retries+1):
+            try:
+                img = await loop.run_in_executor(self.ioExecutor, lambda: image.Image.read(filename, thumb=True))
+                processPipe = await loop.run_in_executor(self.cpuExecutor if self.cpuExecutor else self.ioExecutor, _computeWorker, img)
+                callBack(filename, processPipe, None)
+                return
+            except asyncio.CancelledError:
+                raise
+            except concurrent.futures.process.BrokenProcessPool as e:
+                # compute processes cannot run: compute on I/O threads from now on
+                print("WARNING[asyncLoader: compute process pool is broken (",e,"), computing in threads]")
+                self.cpuExecutor = None
+                error = e
+            except Exception as e:
+                if pref.verbose: print(" [LOADER] >> asyncLoader.loadOne(",filename,"): attempt",attempt+1,"failed:",e)
+                error = e
+        print("ERROR[asyncLoader.loadOne(",filename,"):",error,"]")
+        callBack(filename, None, error)
+    # -------------------------------------------------------------------------
+    def close(self):
+        """Stop the event loop and the executors."""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.ioExecutor.shutdown(wait=False, cancel_futures=True)
+        if self.cpuExecutor: self.cpuExecutor.shutdown(wait=False, cancel_futures=True)
+# -----------------------------------------------------------------------------
+atexit.register(asyncLoader.closeAll)
@@ -28,13 +28,16 @@ for processed images.
 Classes:
     - tags: Manages tag definitions and hierarchical tag organization
     - metadata: Complete metadata management for HDR images including EXIF data
+    - metadataStore: Optional per-directory SQLite store replacing JSON sidecars
+    - exiftoolSession: Long-lived exiftool process extracting EXIF data by batch
+    - metadataWriter: Deferred, dirty-only and atomic writer of JSON sidecars
 """
 
 
 # -----------------------------------------------------------------------------
 # --- Import ------------------------------------------------------------------
 # -----------------------------------------------------------------------------
-import enum, rawpy, colour, imageio, json, os, subprocess, ast, copy
+import enum, colour, imageio, json, os, subprocess, ast, copy, sqlite3, threading, shutil, atexit, re, tempfile, time, hashlib, collections
 import numpy as np
 from . import utils, processing, image
 import preferences.preferences as pref
@@ -106,10 +109,16 @@ class metadata:
         
     Class Attributes:
         defaultColorSpaceName (str): Default color space name when undefined ('sRGB')
+        exifCache (dict): EXIF data extracted in advance by prefetchExif(), entries of the
+            last prefetched directories only, at most exifCacheSize entries
     """
 
     # colorspace used if unknown oe undefined color space
     defaultColorSpaceName = 'sRGB'
+    # exif data extracted in advance by prefetchExif, keyed by filename
+    exifCache = {}
+    exifCacheLock = threading.Lock()
+    exifCacheSize = 1024
 
     def __init__(self, _image):
         """
@@ -193,7 +202,8 @@ class metadata:
         Note:
             If a corresponding .json file exists, metadata is loaded from there.
             Otherwise, EXIF data is extracted using exiftool and a new JSON file
-            is created.
+            is created. When pref.metadataStore is True, the directory store is
+            queried first and JSON sidecars are only read to import them.
         """
 
         res = metadata(_image)
@@ -205,25 +215,32 @@ class metadata:
         filenameMetadata = filenameNoExt+'.json'
         JSONfilename = os.path.join(_image.path, filenameMetadata)   
 
-        if os.path.isfile(JSONfilename):
-            with open(JSONfilename, "r") as file:
-                metaInFile = json.load(file)
-                # copy all metadata from files
-                if pref.keepAllMeta:
-                    for keyInFile in metaInFile.keys():  self.metadata[keyInFile] = copy.deepcopy(metaInFile[keyInFile])
-                else:
-                    for keyInFile in metaInFile.keys():  
-                        if keyInFile in res.metadata :
-                            res.metadata[keyInFile] = copy.deepcopy(metaInFile[keyInFile])
-                        else:
-                            print(f'WARNING[metadata "{keyInFile}" not in "tags.json"  will be deleted! (consider changing "keepAllMeta" to "True" in  preferences.py)]')
-
-                if _image.isHDR(): res.metadata['exif']['Color Space']=   'scRGB'
+        # metadata from directory store (if enabled) or from JSON sidecar
+        metaInFile = None
+        store = metadataStore.open(_image.path) if pref.metadataStore else None
+        if store: metaInFile = store.get(_image.name)
+        if metaInFile == None:
+            metaInFile = metadataWriter.get().read(JSONfilename)
+            if store and (metaInFile != None): store.put(_image.name, metaInFile)
+
+        if metaInFile != None:
+            # copy all metadata from files
+            if pref.keepAllMeta:
+                for keyInFile in metaInFile.keys():  res.metadata[keyInFile] = copy.deepcopy(metaInFile[keyInFile])
+            else:
+                for keyInFile in metaInFile.keys():  
+                    if keyInFile in res.metadata :
+                        res.metadata[keyInFile] = copy.deepcopy(metaInFile[keyInFile])
+                    else:
+                        print(f'WARNING[metadata "{keyInFile}" not in "tags.json"  will be deleted! (consider changing "keepAllMeta" to "True" in  preferences.py)]')
+
+            if _image.isHDR(): res.metadata['exif']['Color Space']=   'scRGB'
 
         else:
             exifDict = metadata.readExif(os.path.join(_image.path,_image.name))
             res.recoverData(exifDict)
-            with open(JSONfilename, "w") as file: json.dump(res.metadata,file)
+            if store: store.put(_image.name, res.metadata)
+            else: metadataWriter.get().write(JSONfilename, res.metadata)
 
         return res
     # ---------------------------------------------------------------------------
@@ -234,12 +251,22 @@ class metadata:
         Creates a JSON file with the same name as the image (but with .json extension)
         containing all the metadata information. This allows metadata persistence
         and sharing between sessions.
+
+        Note:
+            Writing is deferred to the background metadataWriter and done only if
+            the JSON file content changes. When pref.metadataStore is True, metadata
+            is written to the directory store instead and only if processpipe or
+            tags changed.
         """
+        if pref.metadataStore:
+            metadataStore.open(self.image.path).put(self.image.name, self.metadata)
+            return
+
         filenameNoExt = '.'.join(self.image.name.split('.')[:-1])
         filenameMetadata = filenameNoExt+'.json'
         JSONfilename = os.path.join(self.image.path, filenameMetadata)   
 
-        with open(JSONfilename, "w") as file: json.dump(self.metadata,file)
+        metadataWriter.get().write(JSONfilename, self.metadata)
     # ---------------------------------------------------------------------------
     @staticmethod
     def readExif(filename):
@@ -256,32 +283,94 @@ class metadata:
             dict: Dictionary containing EXIF data with tag names as keys
             
         Note:
-            Requires exiftool.exe to be present in the current directory for
-            full functionality. Without exiftool, uses imageio with limited
-            EXIF support.
+            Requires exiftool.exe to be present in the current directory (or
+            exiftool in the PATH) for full functionality. The exiftool process
+            is kept alive between calls (see exiftoolSession). Without exiftool,
+            uses imageio with limited EXIF support.
         """
-        exifDict = dict()
-        if os.path.isfile(filename): # check if filename exists
-            if os.path.isfile('exiftool.exe'):# reading metadata with exiftool
-                try:
-                    exifdata = subprocess.check_output(['exiftool.exe','-a',filename],
-                        shell=True, universal_newlines=True,
-                        stdin=subprocess.PIPE, stderr=subprocess.PIPE)
-                    exifdata = exifdata.splitlines()
-                except:
-                    print("ERROR[metadata.readExif(",filename,"): error while reading!]")
-                    exifdata =[]
-                # buid exif dict
-                for each in exifdata:
-                    tag,val = each.split(':',1)# tags and values are separated by a semi colon
-                    exifDict[tag.strip()] = val.strip()
+        with metadata.exifCacheLock:
+            if filename in metadata.exifCache: return metadata.exifCache.pop(filename)
+        return metadata.readExifBatch([filename]).get(filename, {})
+    # ---------------------------------------------------------------------------
+    @staticmethod
+    def prefetchExif(filenames):
+        """
+        Extract in one exiftool round-trip the EXIF data of images without metadata.
+
+        Images that already have a JSON sidecar (or an entry in the metadata store)
+        are skipped. Results are consumed by the following readExif calls: entries
+        of other directories (never read, e.g. the user changed directory) are
+        dropped, and the oldest entries beyond exifCacheSize.
+
+        Args:
+            filenames (list of str): full paths of the image files
+        """
+        if not exiftoolSession.findExecutable(): return
+        toRead = []
+        for filename in filenames:
+            path, name = os.path.split(filename)
+            if metadataWriter.get().exists(os.path.join(path, '.'.join(name.split('.')[:-1])+'.json')): continue
+            if pref.metadataStore and metadataStore.open(path).get(name) != None: continue
+            toRead.append(filename)
+        if len(toRead) > 1: 
+            exifs = metadata.readExifBatch(toRead)
+            directories = {os.path.dirname(filename) for filename in filenames}
+            with metadata.exifCacheLock:
+                cache = metadata.exifCache
+                for filename in [f for f in cache if os.path.dirname(f) not in directories]: del cache[filename]
+                cache.update(exifs)
+                # dict keeps insertion order: oldest first
+                while len(cache) > metadata.exifCacheSize: del cache[next(iter(cache))]
+    # ---------------------------------------------------------------------------
+    @staticmethod
+    def readExifBatch(filenames):
+        """
+        Extract EXIF data of several image files in a single exiftool round-trip.
+
+        Args:
+            filenames (list of str): full paths of the image files
+                
+        Returns:
+            dict: EXIF data dict (see readExif) keyed by filename
+        """
+        res = {}
+        existing = []
+        for filename in filenames:
+            if os.path.isfile(filename): existing.append(filename)
             else: 
+                print("ERROR[metadata.readExif(",filename,"): file not found]")
+                res[filename] = {}
+        if not existing: return res
+
+        session = exiftoolSession.get()
+        if session: # reading metadata with exiftool
+            try:
+                res.update(session.execute(existing))
+            except Exception as e:
+                print("ERROR[metadata.readExifBatch(",len(existing),"files): error while reading! (",e,")]")
+                exiftoolSession.close()
+            for filename in existing: res.setdefault(filename, {})
+        else: 
+            for filename in existing:
                 print("ERROR[metadata.readExif(",filename,"): consider installing exiftool for better exif metadata, degraded mode with imageio!]")
                 img = imageio.imread(filename)
-                exifDict = img.meta['EXIF_MAIN'] if 'EXIF_MAIN' in img.meta else {}
-        else: print("ERROR[metadata.readExif(",filename,"): file not found]")
+                res[filename] = img.meta['EXIF_MAIN'] if 'EXIF_MAIN' in img.meta else {}
+        return res
+    # ---------------------------------------------------------------------------
+    @staticmethod
+    def readExifDirectory(path, extList=('.jpg','.JPG','.hdr','.HDR','.arw','.ARW')):
+        """
+        Extract EXIF data of all images of a directory in a single exiftool round-trip.
 
-        return exifDict
+        Args:
+            path (str): directory path
+            extList (tuple of str, optional): image extensions
+
+        Returns:
+            dict: EXIF data dict (see readExif) keyed by full filename
+        """
+        if pref.verbose: print(" [META] >> metadata.readExifDirectory(",path,")")
+        return metadata.readExifBatch([os.path.join(path,f) for f in utils.filterlistdir(path, extList)])
     # ---------------------------------------------------------------------------
     def recoverData(self, exif):
         """
@@ -410,3 +499,566 @@ class metadata:
         """
         return self.__repr__()
 # ---------------------------------------------------------------------------
+
+# -----------------------------------------------------------------------------
+# --- Class metadataStore -----------------------------------------------------
+# -----------------------------------------------------------------------------
+class metadataStore:
+    """
+    Per-directory metadata store backed by a SQLite database.
+
+    Replaces the one-JSON-file-per-image layout with a single database file
+    located in the image directory. Reads can be done for a whole gallery page
+    in one query, writes are batched in a single transaction, and an entry is
+    only rewritten when its processpipe or tags changed.
+
+    Attributes:
+        - directory (str): image directory the store belongs to
+        - filename (str): path of the SQLite database file
+        - cache (dict): metadata already read or written, keyed by image name
+        - tagsRootName (str): key of the user tags in metadata dicts
+        - connection (sqlite3.Connection): database connection
+        - lock (threading.Lock): serializes access from loading threads
+
+    Class Attributes:
+        dbName (str): database filename created in each image directory
+        stores (dict): opened stores, keyed by directory
+        storesLock (threading.Lock): protects stores
+
+    Note:
+        Enabled with pref.metadataStore. JSON sidecars can be imported with
+        importJSON() and written back with exportJSON().
+    """
+
+    dbName = 'uHDR-metadata.db'
+    stores = {}
+    storesLock = threading.Lock()
+
+    def __init__(self, directory):
+        """
+        Open (and create if required) the metadata store of a directory.
+
+        Args:
+            directory (str): image directory
+        """
+        if pref.verbose: print(" [META] >> metadataStore.__init__(",directory,")")
+
+        self.directory = directory
+        self.filename = os.path.join(directory, metadataStore.dbName)
+        self.cache = {}
+        self.tagsRootName = tags().getTagsRootName()
+        self.lock = threading.Lock()
+        # connection shared by loading threads, access protected by self.lock
+        self.connection = sqlite3.connect(self.filename, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS metadata ("
+                                    "name TEXT PRIMARY KEY, "
+                                    "processpipe TEXT, "
+                                    "tags TEXT, "
+                                    "meta TEXT NOT NULL)")
+    # ---------------------------------------------------------------------------
+    @staticmethod
+    def open(directory):
+        """
+        Return the store of a directory, opening it on first call.
+
+        Args:
+            directory (str): image directory
+
+        Returns:
+            metadataStore: store shared by every image of the directory
+        """
+        key = os.path.abspath(directory)
+        with metadataStore.storesLock:
+            if key not in metadataStore.stores: metadataStore.stores[key] = metadataStore(directory)
+            return metadataStore.stores[key]
+    # ---------------------------------------------------------------------------
+    @staticmethod
+    def closeAll():
+        """Close every opened store."""
+        with metadataStore.storesLock:
+            for store in metadataStore.stores.values(): store.close()
+            metadataStore.stores = {}
+    # ---------------------------------------------------------------------------
+    def _key(self, meta):
+        """
+        Compute the change detection key of a metadata dict.
+
+        Args:
+            meta (dict): metadata dict
+
+        Returns:
+            tuple (str, str): JSON of processpipe and JSON of tags
+        """
+        return (json.dumps(meta.get('processpipe', None), sort_keys=True),
+                json.dumps(meta.get(self.tagsRootName, None), sort_keys=True))
+    # ---------------------------------------------------------------------------
+    def getMany(self, names):
+        """
+        Read the metadata of several images in a single query.
+
+        Used to fetch a whole gallery page at once: results are kept in cache so
+        that the following metadata.build calls do not hit the database.
+
+        Args:
+            names (list of str): image filenames (without path)
+
+        Returns:
+            dict: metadata dict keyed by image name, missing images are omitted
+        """
+        names = [os.path.basename(n) for n in names]
+        with self.lock:
+            missing = [n for n in names if n not in self.cache]
+            # SQLite limits the number of host parameters: query by chunk
+            for i in range(0, len(missing), 500):
+                chunk = missing[i:i+500]
+                query = "SELECT name, meta FROM metadata WHERE name IN (" + ",".join("?"*len(chunk)) + ")"
+                for name, meta in self.connection.execute(query, chunk): 
+                    self.cache[name] = json.loads(meta)
+            return {n: copy.deepcopy(self.cache[n]) for n in names if n in self.cache}
+    # ---------------------------------------------------------------------------
+    def get(self, name):
+        """
+        Read the metadata of one image.
+
+        Args:
+            name (str): image filename (without path)
+
+        Returns:
+            dict or None: metadata dict, None if the image is not in the store
+        """
+        return self.getMany([name]).get(os.path.basename(name), None)
+    # ---------------------------------------------------------------------------
+    def putMany(self, metas):
+        """
+        Write the metadata of several images in a single transaction.
+
+        Only entries that are new or whose processpipe or tags changed are
+        written.
+
+        Args:
+            metas (dict): metadata dict keyed by image name
+
+        Returns:
+            int: number of entries written
+        """
+        with self.lock:
+            rows = []
+            for name, meta in metas.items():
+                name = os.path.basename(name)
+                ppJSON, tagsJSON = self._key(meta)
+                if name in self.cache and self._key(self.cache[name]) == (ppJSON, tagsJSON): continue
+                self.cache[name] = copy.deepcopy(meta)
+                rows.append((name, ppJSON, tagsJSON, json.dumps(meta)))
+            if rows:
+                with self.connection:
+                    self.connection.executemany("INSERT OR REPLACE INTO metadata (name, processpipe, tags, meta) VALUES (?,?,?,?)", rows)
+        if pref.verbose: print(" [META] >> metadataStore.putMany(",len(rows),"/",len(metas)," written)")
+        return len(rows)
+    # ---------------------------------------------------------------------------
+    def put(self, name, meta):
+        """
+        Write the metadata of one image (if changed).
+
+        Args:
+            name (str): image filename (without path)
+            meta (dict): metadata dict
+
+        Returns:
+            int: 1 if written, 0 if unchanged
+        """
+        return self.putMany({name: meta})
+    # ---------------------------------------------------------------------------
+    def importJSON(self, overwrite=False):
+        """
+        Import the JSON sidecars of the directory into the store.
+
+        Args:
+            overwrite (bool): replace entries already in the store
+
+        Returns:
+            int: number of entries written
+        """
+        metas = {}
+        stored = set(self.names())
+        for jsonName in utils.filterlistdir(self.directory, ('.json',)):
+            with open(os.path.join(self.directory, jsonName), "r") as file:
+                try: meta = json.load(file)
+                except json.JSONDecodeError: 
+                    print("WARNING[metadataStore.importJSON(",jsonName,"): invalid JSON file skipped!]")
+                    continue
+            # sidecars are identified by the filename they describe
+            if not (isinstance(meta, dict) and meta.get('filename', None)): continue
+            if overwrite or (meta['filename'] not in stored): metas[meta['filename']] = meta
+        return self.putMany(metas)
+    # ---------------------------------------------------------------------------
+    def exportJSON(self, names=None):
+        """
+        Write store entries back to JSON sidecars.
+
+        Args:
+            names (list of str, optional): images to export, all if None
+
+        Returns:
+            int: number of JSON files written
+        """
+        metas = self.getMany(names if names != None else self.names())
+        for name, meta in metas.items():
+            JSONfilename = os.path.join(self.directory, '.'.join(name.split('.')[:-1])+'.json')
+            with open(JSONfilename, "w") as file: json.dump(meta, file)
+        return len(metas)
+    # ---------------------------------------------------------------------------
+    def names(self):
+        """
+        Return the names of all images in the store.
+
+        Returns:
+            list of str: image filenames
+        """
+        with self.lock:
+            return [row[0] for row in self.connection.execute("SELECT name FROM metadata")]
+    # ---------------------------------------------------------------------------
+    def close(self):
+        """Close the database connection."""
+        with self.lock:
+            self.connection.close()
+# ---------------------------------------------------------------------------
+
+# -----------------------------------------------------------------------------
+# --- Class exiftoolSession ---------------------------------------------------
+# -----------------------------------------------------------------------------
+class exiftoolSession:
+    """
+    Long-lived exiftool process used in -stay_open mode.
+
+    Starting exiftool costs far more than reading the EXIF of one image: a single
+    process is started on first use and receives batches of filenames on its
+    standard input, results are returned as JSON.
+
+    Attributes:
+        - executable (str): exiftool executable
+        - process (subprocess.Popen): running exiftool process
+        - lock (threading.Lock): one batch at a time (loading threads)
+
+    Class Attributes:
+        executables (list of str): executables looked for (current directory first, then PATH)
+        session (exiftoolSession): shared session, None until first use
+
+    Note:
+        JSON output uses exiftool tag names (ExposureTime, FNumber, ...). They are
+        converted to the tag descriptions of the text output (Exposure Time,
+        F Number, ...) so that metadata.recoverData handles both.
+    """
+
+    executables = ['exiftool.exe', 'exiftool']
+    session = None
+    sessionLock = threading.Lock()
+    readyMarker = '{ready}'
+
+    def __init__(self, executable):
+        """
+        Start exiftool in -stay_open mode.
+
+        Args:
+            executable (str): exiftool executable
+        """
+        if pref.verbose: print(" [META] >> exiftoolSession.__init__(",executable,")")
+        self.executable = executable
+        self.lock = threading.Lock()
+        self.process = subprocess.Popen([executable, '-stay_open', 'True', '-@', '-'],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                        universal_newlines=True, encoding='utf-8')
+    # ---------------------------------------------------------------------------
+    @staticmethod
+    def findExecutable():
+        """
+        Look for exiftool.
+
+        Returns:
+            str or None: exiftool executable, None if not found
+        """
+        for executable in exiftoolSession.executables:
+            if os.path.isfile(executable): return executable
+            if shutil.which(executable): return shutil.which(executable)
+        return None
+    # ---------------------------------------------------------------------------
+    @staticmethod
+    def get():
+        """
+        Return the shared session, starting exiftool on first call.
+
+        Returns:
+            exiftoolSession or None: None if exiftool is not available
+        """
+        with exiftoolSession.sessionLock:
+            if exiftoolSession.session and exiftoolSession.session.process.poll() == None: 
+                return exiftoolSession.session
+            executable = exiftoolSession.findExecutable()
+            if not executable: return None
+            try:
+                exiftoolSession.session = exiftoolSession(executable)
+            except OSError as e:
+                print("ERROR[exiftoolSession.get(): cannot start",executable,"(",e,")]")
+                exiftoolSession.session = None
+            return exiftoolSession.session
+    # ---------------------------------------------------------------------------
+    @staticmethod
+    def close():
+        """Stop the shared session (if running)."""
+        with exiftoolSession.sessionLock:
+            if exiftoolSession.session: exiftoolSession.session.terminate()
+            exiftoolSession.session = None
+    # ---------------------------------------------------------------------------
+    @staticmethod
+    def tagDescription(tagName):
+        """
+        Convert an exiftool tag name to its text output description.
+
+        Args:
+            tagName (str): tag name, e.g. 'ExposureTime', 'FNumber', 'ISO'
+
+        Returns:
+            str: tag description, e.g. 'Exposure Time', 'F Number', 'ISO'
+        """
+        return re.sub(r'(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])', ' ', tagName)
+    # ---------------------------------------------------------------------------
+    def execute(self, filenames):
+        """
+        Extract EXIF data of a batch of files.
+
+        Args:
+            filenames (list of str): full paths of the image files
+
+        Returns:
+            dict: EXIF data dict keyed by filename, keys are tag descriptions and values strings
+        """
+        if pref.verbose: print(" [META] >> exiftoolSession.execute(",len(filenames),"files)")
+        args = ['-json', '-a', '-charset', 'filename=utf8'] + list(filenames) + ['-execute']
+        with self.lock:
+            self.process.stdin.write('\n'.join(args)+'\n')
+            self.process.stdin.flush()
+            lines = []
+            while True:
+                line = self.process.stdout.readline()
+                if line == '': raise IOError('exiftool process ended')
+                if line.strip() == exiftoolSession.readyMarker: break
+                lines.append(line)
+        output = ''.join(lines).strip()
+        entries = json.loads(output) if output else []
+
+        # match results with requested filenames (exiftool returns SourceFile with '/')
+        requested = {os.path.normcase(os.path.abspath(f)): f for f in filenames}
+        res = {}
+        for entry in entries:
+            sourceFile = entry.pop('SourceFile', None)
+            if sourceFile == None: continue
+            filename = requested.get(os.path.normcase(os.path.abspath(sourceFile)), sourceFile)
+            res[filename] = {exiftoolSession.tagDescription(tag): str(val) for tag, val in entry.items()}
+        return res
+    # ---------------------------------------------------------------------------
+    def terminate(self):
+        """Ask exiftool to exit and wait for it."""
+        try:
+            self.process.stdin.write('-stay_open\nFalse\n')
+            self.process.stdin.flush()
+            self.process.wait(timeout=5)
+        except Exception:
+            self.process.kill()
+# ---------------------------------------------------------------------------
+atexit.register(exiftoolSession.close)
+
+# -----------------------------------------------------------------------------
+# --- Class metadataWriter ----------------------------------------------------
+# -----------------------------------------------------------------------------
+class metadataWriter:
+    """
+    Deferred writer of JSON sidecars.
+
+    metadata.save() only records the JSON content to write: a background thread
+    writes pending files once no new request has been received for a short delay
+    (debounce). A file is written only if its content differs from the last
+    content read or written, and writing is atomic (temporary file then rename)
+    so that a crash never leaves a truncated sidecar.
+
+    Attributes:
+        - pending (dict): JSON text waiting to be written, keyed by filename
+        - clean (collections.OrderedDict): digest of the JSON text known to be on disk,
+          keyed by filename, least recently used first, at most cleanSize entries
+        - lastRequest (float): time of the last write request
+        - condition (threading.Condition): protects pending/clean, wakes up the thread
+        - writeLock (threading.Lock): serializes file writes (thread and flush)
+        - thread (threading.Thread): background writing thread
+
+    Class Attributes:
+        delay (float): debounce delay in seconds
+        cleanSize (int): maximum number of files in clean (a forgotten file is written again)
+        writer (metadataWriter): shared writer, None until first use
+    """
+
+    delay = 0.5
+    cleanSize = 4096
+    writer = None
+    writerLock = threading.Lock()
+
+    def __init__(self):
+        """Create the writer and start its background thread."""
+        self.pending = {}
+        self.clean = collections.OrderedDict()
+        self.lastRequest = 0.0
+        self.condition = threading.Condition()
+        self.writeLock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name='metadataWriter', daemon=True)
+        self.thread.start()
+    # ---------------------------------------------------------------------------
+    @staticmethod
+    def get():
+        """
+        Return the shared writer, creating it on first call.
+
+        Returns:
+            metadataWriter: shared writer
+        """
+        with metadataWriter.writerLock:
+            if metadataWriter.writer == None: metadataWriter.writer = metadataWriter()
+            return metadataWriter.writer
+    # ---------------------------------------------------------------------------
+    @staticmethod
+    def flushAll():
+        """Write all pending files now (if a writer exists)."""
+        if metadataWriter.writer: metadataWriter.writer.flush()
+    # ---------------------------------------------------------------------------
+    def read(self, filename):
+        """
+        Read a JSON sidecar, pending content has priority over file content.
+
+        Args:
+            filename (str): JSON filename
+
+        Returns:
+            dict or None: metadata dict, None if the file does not exist
+        """
+        with self.condition:
+            if filename in self.pending: return json.loads(self.pending[filename])
+        if not os.path.isfile(filename): return None
+        with open(filename, "r") as file: text = file.read()
+        with self.condition:
+            if not (filename in self.pending): self.setClean(filename, text)
+        return json.loads(text)
+    # ---------------------------------------------------------------------------
+    def setClean(self, filename, text):
+        """
+        Record the content on disk of a file (called with condition held).
+
+        Args:
+            filename (str): JSON filename
+            text (str): file content
+        """
+        self.clean[filename] = hashlib.sha1(text.encode()).digest()
+        self.clean.move_to_end(filename)
+        while len(self.clean) > metadataWriter.cleanSize: self.clean.popitem(last=False)
+    # ---------------------------------------------------------------------------
+    def isClean(self, filename, text):
+        """
+        Check that a content is the one on disk (called with condition held).
+
+        Args:
+            filename (str): JSON filename
+            text (str): file content
+
+        Returns:
+            bool
+        """
+        if self.clean.get(filename, None) != hashlib.sha1(text.encode()).digest(): return False
+        self.clean.move_to_end(filename)
+        return True
+    # ---------------------------------------------------------------------------
+    def exists(self, filename):
+        """
+        Check if a JSON sidecar exists or is waiting to be written.
+
+        Args:
+            filename (str): JSON filename
+
+        Returns:
+            bool
+        """
+        with self.condition:
+            if filename in self.pending: return True
+        return os.path.isfile(filename)
+    # ---------------------------------------------------------------------------
+    def write(self, filename, meta):
+        """
+        Request writing of a JSON sidecar.
+
+        Args:
+            filename (str): JSON filename
+            meta (dict): metadata dict, serialized immediately
+
+        Returns:
+            bool: True if a write is scheduled, False if content is unchanged
+        """
+        text = json.dumps(meta)
+        with self.condition:
+            if filename in self.pending: 
+                if self.pending[filename] == text: return False
+            elif self.isClean(filename, text): return False
+            self.pending[filename] = text
+            self.lastRequest = time.time()
+            self.condition.notify()
+        return True
+    # ---------------------------------------------------------------------------
+    def run(self):
+        """Background thread: write pending files after the debounce delay."""
+        while True:
+            with self.condition:
+                while not self.pending: self.condition.wait()
+                # debounce: wait until no new request during delay
+                while True:
+                    remaining = self.lastRequest + metadataWriter.delay - time.time()
+                    if remaining <= 0: break
+                    self.condition.wait(remaining)
+            self.flush()
+    # ---------------------------------------------------------------------------
+    def flush(self):
+        """
+        Write all pending files now.
+
+        Returns:
+            int: number of files written
+        """
+        with self.writeLock:
+            with self.condition: batch = dict(self.pending)
+            if pref.verbose and batch: print(" [META] >> metadataWriter.flush(",len(batch),"files)")
+            for filename, text in batch.items():
+                try:
+                    metadataWriter.atomicWrite(filename, text)
+                except OSError as e:
+                    print("ERROR[metadataWriter.flush(",filename,"): error while writing! (",e,")]")
+                    with self.condition:
+                        if self.pending.get(filename, None) == text: del self.pending[filename]
+                    continue
+                with self.condition:
+                    # remove only if no newer content has been requested meanwhile
+                    if self.pending.get(filename, None) == text: del self.pending[filename]
+                    self.setClean(filename, text)
+        return len(batch)
+    # ---------------------------------------------------------------------------
+    @staticmethod
+    def atomicWrite(filename, text):
+        """
+        Write a text file atomically: temporary file in the same directory then rename.
+
+        Args:
+            filename (str): file to write
+            text (str): file content
+        """
+        directory = os.path.dirname(os.path.abspath(filename))
+        fd, tmpFilename = tempfile.mkstemp(prefix='.'+os.path.basename(filename)+'.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, "w") as file: file.write(text)
+            os.replace(tmpFilename, filename)
+        except:
+            if os.path.exists(tmpFilename): os.remove(tmpFilename)
+            raise
+# ---------------------------------------------------------------------------
+atexit.register(metadataWriter.flushAll)
@@ -28,32 +28,198 @@ The functions implement sRGB color correction transfer functions (CCTF) for
 encoding and decoding, which are essential for proper HDR image display and
 color space transformations.
 
+CPU kernels are compiled with nogil=True: they run without the GIL, so that
+operators computed in several threads (QThreadPool workers, tiles of
+hdrCore.tiles) run in parallel. Kernels loop over pixels and fuse the steps
+of a conversion (no temporary arrays). They are used by operators when the
+computation backend is 'numba' (preferences or ExecutionContext).
+
+Kernels are compiled on first use (cache=True: compiled code is reloaded
+from __pycache__ by the next processes). warmup() compiles them ahead for
+the 3-channel images of uHDR, guiQt.thread.warmupNumba() runs it in a
+background thread at startup so that the first edit does not wait for the
+JIT. Compilations are reported to hdrCore.profiling (category 'jit'),
+apart from the time of the nodes that triggered them.
+
 Functions:
     - numba_cctf_sRGB_encoding: CPU-accelerated sRGB gamma encoding
     - numba_cctf_sRGB_decoding: CPU-accelerated sRGB gamma decoding  
+    - numba_sRGB_to_LCH: CPU-accelerated sRGB to Lch (CIE LCHab) conversion
+    - numba_LCH_to_sRGB: CPU-accelerated Lch (CIE LCHab) to sRGB conversion
+    - numba_sRGB_to_Y: CPU-accelerated sRGB to luminance Y conversion
+    - numba_Ycurve: CPU-accelerated luminance curve (Ycurve operator)
     - cuda_cctf_sRGB_encoding: GPU-accelerated sRGB gamma encoding
     - cuda_cctf_sRGB_decoding: GPU-accelerated sRGB gamma decoding
+    - warmup: compile kernels ahead of first use
 """
 
 # -----------------------------------------------------------------------------
 # --- Import ------------------------------------------------------------------
 # -----------------------------------------------------------------------------
-import numba
+import math, threading
+import numba, numba.core.event
 import numpy as np
+from timeit import default_timer as timer
+from . import profiling
+import preferences.preferences as pref
+# -----------------------------------------------------------------------------
+def sRGBmatrices():
+    """
+    Get the conversion matrices of uHDR (see hdrCore.processing.sRGBmatrices()):
+    kernels compute in float64.
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray, numpy.ndarray): linear sRGB to XYZ matrix (3x3),
+        XYZ to linear sRGB matrix (3x3), white point XYZ (3)
+    """
+    from . import processing
+    return processing.sRGBmatrices(np.float64)
+# -----------------------------------------------------------------------------
+def cudaVectorize(signature):
+    """
+    Decorator: numba.vectorize for CUDA if a CUDA device is available, otherwise
+    the function raises RuntimeError when called (the module can be imported
+    without CUDA).
+
+    Args:
+        signature (str): numba signature
+    """
+    def decorator(function):
+        try:
+            if numba.cuda.is_available(): return numba.vectorize(signature, target='cuda')(function)
+        except Exception:
+            pass
+        def unavailable(*args, **kwargs): raise RuntimeError(function.__name__+": CUDA is not available")
+        unavailable.__doc__ = function.__doc__
+        return unavailable
+    return decorator
+# -----------------------------------------------------------------------------
+class _compileListener(numba.core.event.Listener):
+    """
+    Listener of numba compilations (numba:compile events, not cache loads):
+    records them to hdrCore.profiling.profiler, category 'jit'. Compilations
+    are nested (kernels compile the functions they call).
+    """
+    def __init__(self):
+        self.local = threading.local()
+
+    def on_start(self, event):
+        self.local.__dict__.setdefault('starts', []).append(timer())
+
+    def on_end(self, event):
+        start = self.local.starts.pop()
+        if profiling.profiler.enabled:
+            dispatcher = event.data['dispatcher']
+            profiling.profiler.record(dispatcher.py_func.__name__, start, timer()-start, category='jit', backend='numba',
+                                      signature=str(event.data['args']))
+
+numba.core.event.register('numba:compile', _compileListener())
+# -----------------------------------------------------------------------------
+# --- Kernels: numba version (nogil) -------------------------------------------
+# -----------------------------------------------------------------------------
+@numba.njit(nogil=True, cache=True)
+def _encode(L):
+    if L <= 0.0031308: return L * 12.92
+    return 1.055 * L**(1 / 2.4) - 0.055
+# -----------------------------------------------------------------------------
+@numba.njit(nogil=True, cache=True)
+def _decode(V):
+    if V <= 0.040449936: return V / 12.92
+    return ((V + 0.055) / 1.055)**2.4
+# -----------------------------------------------------------------------------
+@numba.njit(nogil=True, cache=True)
+def _fLab(t):
+    if t > 0.008856451679035631: return t**(1/3)           # (24/116)**3
+    return (841/108)*t + 16/116
+# -----------------------------------------------------------------------------
+@numba.njit(nogil=True, cache=True)
+def _fLabInv(f):
+    if f > 24/116: return f*f*f
+    return (f - 16/116)*(108/841)
+# -----------------------------------------------------------------------------
+@numba.njit(nogil=True, cache=True)
+def _cctfKernel(data, out, encoding):
+    h, w, c = data.shape
+    for i in range(h):
+        for j in range(w):
+            for k in range(c):
+                out[i,j,k] = _encode(data[i,j,k]) if encoding else _decode(data[i,j,k])
+# -----------------------------------------------------------------------------
+@numba.njit(nogil=True, cache=True)
+def _sRGBtoLCHKernel(rgb, out, M, white, decoding):
+    h, w, _ = rgb.shape
+    for i in range(h):
+        for j in range(w):
+            r, g, b = rgb[i,j,0], rgb[i,j,1], rgb[i,j,2]
+            if decoding: r, g, b = _decode(r), _decode(g), _decode(b)
+            fx = _fLab((M[0,0]*r + M[0,1]*g + M[0,2]*b)/white[0])
+            fy = _fLab((M[1,0]*r + M[1,1]*g + M[1,2]*b)/white[1])
+            fz = _fLab((M[2,0]*r + M[2,1]*g + M[2,2]*b)/white[2])
+            A, B = 500*(fx - fy), 200*(fy - fz)
+            out[i,j,0] = 116*fy - 16
+            out[i,j,1] = math.hypot(A, B)
+            out[i,j,2] = math.degrees(math.atan2(B, A)) % 360
+# -----------------------------------------------------------------------------
+@numba.njit(nogil=True, cache=True)
+def _LCHtoSRGBKernel(lch, out, Minv, white, encoding, clip):
+    h, w, _ = lch.shape
+    for i in range(h):
+        for j in range(w):
+            hue = math.radians(lch[i,j,2])
+            fy = (lch[i,j,0] + 16)/116
+            fx = lch[i,j,1]*math.cos(hue)/500 + fy
+            fz = fy - lch[i,j,1]*math.sin(hue)/200
+            X, Y, Z = white[0]*_fLabInv(fx), white[1]*_fLabInv(fy), white[2]*_fLabInv(fz)
+            for k in range(3):
+                v = Minv[k,0]*X + Minv[k,1]*Y + Minv[k,2]*Z
+                if encoding: v = _encode(v)
+                if clip: v = min(max(v, 0.0), 1.0)
+                out[i,j,k] = v
+# -----------------------------------------------------------------------------
+@numba.njit(nogil=True, cache=True)
+def _sRGBtoYKernel(rgb, out, M, decoding):
+    h, w, _ = rgb.shape
+    for i in range(h):
+        for j in range(w):
+            r, g, b = rgb[i,j,0], rgb[i,j,1], rgb[i,j,2]
+            if decoding: r, g, b = _decode(r), _decode(g), _decode(b)
+            out[i,j] = M[1,0]*r + M[1,1]*g + M[1,2]*b
+# -----------------------------------------------------------------------------
+@numba.njit(nogil=True, cache=True)
+def _YcurveKernel(rgb, out, Y, M, curveY, curveFY):
+    # Y: luminance buffer (height, width): no allocation in the kernel
+    h, w, _ = rgb.shape
+    _sRGBtoYKernel(rgb, Y, M, False)
+    # pixels with Y == 0 are divided by the minimum positive Y (as Ycurve)
+    Ymin = np.inf
+    for i in range(h):
+        for j in range(w):
+            if Y[i,j] > 0 and Y[i,j] < Ymin: Ymin = Y[i,j]
+    if Ymin == np.inf: Ymin = 1.0
+    for i in range(h):
+        for j in range(w):
+            FY = np.interp(Y[i,j], curveY, curveFY)
+            y = Y[i,j] if Y[i,j] != 0 else Ymin
+            for k in range(3): out[i,j,k] = rgb[i,j,k]*FY/y
 # -----------------------------------------------------------------------------
 # --- Functions: numba version ------------------------------------------------
 # -----------------------------------------------------------------------------
-@numba.jit(cache=True, parallel=True)
-def numba_cctf_sRGB_encoding(L):
+def _output(a, shape, out):
+    """Output array of a kernel: out, or a new array of the float dtype of a."""
+    if out is not None: return out
+    return np.empty(shape, dtype=a.dtype if a.dtype.kind == 'f' else np.float64)
+# -----------------------------------------------------------------------------
+def numba_cctf_sRGB_encoding(L, out=None):
     """
     Apply sRGB color correction transfer function encoding with Numba acceleration.
     
     Converts linear RGB values to gamma-corrected sRGB values using the standard
-    sRGB transfer function. This function is optimized with Numba JIT compilation
-    for fast CPU processing with parallel execution support.
+    sRGB transfer function. The kernel is compiled with Numba (nogil): several
+    threads can encode images in parallel.
 
     Args:
         L (float or numpy.ndarray): Linear RGB values to encode, typically in [0,1] range
+        out (numpy.ndarray, optional): output array (shape of L, C-contiguous), can be L (default: new array)
 
     Returns:
         numpy.ndarray or float: Gamma-corrected sRGB values
@@ -63,20 +229,23 @@ def numba_cctf_sRGB_encoding(L):
         - For L ≤ 0.0031308: V = L × 12.92
         - For L > 0.0031308: V = 1.055 × L^(1/2.4) - 0.055
     """
-    v = np.where(L <= 0.0031308, L * 12.92, 1.055 * np.power(L, 1 / 2.4) - 0.055)
-    return v
+    if np.isscalar(L): return _encode(float(L))
+    L = np.asarray(L)
+    out = _output(L, L.shape, out)
+    _cctfKernel(L.reshape(L.shape[:2]+(-1,)) if L.ndim == 3 else L.reshape(1,1,-1), out.reshape(out.shape[:2]+(-1,)) if out.ndim == 3 else out.reshape(1,1,-1), True)
+    return out
 # -----------------------------------------------------------------------------
-@numba.jit(cache=True, parallel=True)
-def numba_cctf_sRGB_decoding(V):
+def numba_cctf_sRGB_decoding(V, out=None):
     """
     Apply sRGB color correction transfer function decoding with Numba acceleration.
     
     Converts gamma-corrected sRGB values to linear RGB values using the inverse
-    sRGB transfer function. This function is optimized with Numba JIT compilation
-    for fast CPU processing with parallel execution support.
+    sRGB transfer function. The kernel is compiled with Numba (nogil): several
+    threads can decode images in parallel.
 
     Args:
         V (float or numpy.ndarray): Gamma-corrected sRGB values to decode, typically in [0,1] range
+        out (numpy.ndarray, optional): output array (shape of V, C-contiguous), can be V (default: new array)
 
     Returns:
         numpy.ndarray or float: Linear RGB values
@@ -86,13 +255,126 @@ def numba_cctf_sRGB_decoding(V):
         - For V ≤ 0.04045: L = V / 12.92
         - For V > 0.04045: L = ((V + 0.055) / 1.055)^2.4
     """
-    L = np.where(V <= numba_cctf_sRGB_encoding(0.0031308), V / 12.92, np.power((V + 0.055) / 1.055, 2.4))
-    return L
+    if np.isscalar(V): return _decode(float(V))
+    V = np.asarray(V)
+    out = _output(V, V.shape, out)
+    _cctfKernel(V.reshape(V.shape[:2]+(-1,)) if V.ndim == 3 else V.reshape(1,1,-1), out.reshape(out.shape[:2]+(-1,)) if out.ndim == 3 else out.reshape(1,1,-1), False)
+    return out
+# -----------------------------------------------------------------------------
+def numba_sRGB_to_LCH(RGB, apply_cctf_decoding=True, out=None):
+    """
+    Convert an image from sRGB to Lch (CIE LCHab), as hdrCore.processing.sRGB_to_Lab
+    followed by colour.Lab_to_LCHab, in one pass without the GIL.
+
+    Args:
+        RGB (numpy.ndarray): image in sRGB (height, width, 3)
+        apply_cctf_decoding (bool, optional): RGB is gamma encoded (default: True)
+        out (numpy.ndarray, optional): output array, can be RGB (default: new array)
+
+    Returns:
+        numpy.ndarray: image in Lch
+    """
+    M, _, white = sRGBmatrices()
+    out = _output(RGB, RGB.shape, out)
+    _sRGBtoLCHKernel(RGB, out, M, white, apply_cctf_decoding)
+    return out
+# -----------------------------------------------------------------------------
+def numba_LCH_to_sRGB(Lch, apply_cctf_encoding=True, clip=False, out=None):
+    """
+    Convert an image from Lch (CIE LCHab) to sRGB, as hdrCore.processing.Lch_to_sRGB,
+    in one pass without the GIL.
+
+    Args:
+        Lch (numpy.ndarray): image in Lch (height, width, 3)
+        apply_cctf_encoding (bool, optional): gamma encode output (default: True)
+        clip (bool, optional): clip output to [0,1] (default: False)
+        out (numpy.ndarray, optional): output array, can be Lch (default: new array)
+
+    Returns:
+        numpy.ndarray: image in sRGB
+    """
+    _, Minv, white = sRGBmatrices()
+    out = _output(Lch, Lch.shape, out)
+    _LCHtoSRGBKernel(Lch, out, Minv, white, apply_cctf_encoding, clip)
+    return out
+# -----------------------------------------------------------------------------
+def numba_sRGB_to_Y(RGB, apply_cctf_decoding=True, out=None):
+    """
+    Compute the luminance Y (CIE XYZ) of an image in sRGB without the GIL.
+
+    Args:
+        RGB (numpy.ndarray): image in sRGB (height, width, 3)
+        apply_cctf_decoding (bool, optional): RGB is gamma encoded (default: True)
+        out (numpy.ndarray, optional): output array (height, width) (default: new array)
+
+    Returns:
+        numpy.ndarray: luminance (height, width)
+    """
+    M, _, _ = sRGBmatrices()
+    out = _output(RGB, RGB.shape[:2], out)
+    _sRGBtoYKernel(RGB, out, M, apply_cctf_decoding)
+    return out
+# -----------------------------------------------------------------------------
+def numba_Ycurve(RGB, curveY, curveFY, out=None, Y=None):
+    """
+    Apply a luminance curve to a gamma encoded sRGB image without the GIL:
+    each pixel is scaled by F(Y)/Y (see hdrCore.processing.Ycurve).
+
+    Args:
+        RGB (numpy.ndarray): image in sRGB, gamma encoded (height, width, 3)
+        curveY (numpy.ndarray): luminance of curve points (increasing)
+        curveFY (numpy.ndarray): curve values at curveY
+        out (numpy.ndarray, optional): output array, can be RGB (default: new array)
+        Y (numpy.ndarray, optional): luminance buffer (height, width), float64 (default: new array)
+
+    Returns:
+        numpy.ndarray: image in sRGB, gamma encoded
+    """
+    M, _, _ = sRGBmatrices()
+    out = _output(RGB, RGB.shape, out)
+    if Y is None: Y = np.empty(RGB.shape[:2])
+    _YcurveKernel(RGB, out, Y, M, np.ascontiguousarray(curveY, dtype=np.float64), np.ascontiguousarray(curveFY, dtype=np.float64))
+    return out
+# -----------------------------------------------------------------------------
+def warmup(dtypes=(np.float32, np.float64)):
+    """
+    Compile the kernels (or load them from the numba cache) for the images
+    of uHDR: 3 channels, C-contiguous images of each dtype and strided float32
+    images (views, e.g. cropped by the geometry operator). Kernels are
+    compiled once per process: later calls return immediately.
+
+    Args:
+        dtypes (tuple of numpy.dtype, optional): image dtypes (default: float32 and float64)
+
+    Returns:
+        dict: time per function (seconds), compilation or cache load
+    """
+    start = timer()
+    images = [np.full((2,2,3), 0.5, dtype=dtype) for dtype in dtypes]
+    if np.float32 in dtypes: images.append(np.full((2,4,3), 0.5, dtype=np.float32)[:,::2])
+    curve = np.linspace(0.0, 1.0, 8)
+
+    times = {}
+    functions = [('numba_cctf_sRGB_encoding', lambda rgb: numba_cctf_sRGB_encoding(rgb)),
+                 ('numba_cctf_sRGB_decoding', lambda rgb: numba_cctf_sRGB_decoding(rgb)),
+                 ('numba_sRGB_to_LCH', lambda rgb: numba_sRGB_to_LCH(rgb)),
+                 ('numba_LCH_to_sRGB', lambda rgb: numba_LCH_to_sRGB(rgb)),
+                 ('numba_sRGB_to_Y', lambda rgb: numba_sRGB_to_Y(rgb)),
+                 ('numba_Ycurve', lambda rgb: numba_Ycurve(rgb, curve, curve))]
+    for name, function in functions:
+        t0 = timer()
+        for rgb in images: function(rgb)
+        times[name] = timer()-t0
+    numba_cctf_sRGB_encoding(0.5), numba_cctf_sRGB_decoding(0.5)     # scalars
+
+    if profiling.profiler.enabled: profiling.profiler.record('warmup', start, timer()-start, category='jit', backend='numba')
+    if pref.verbose: print(" [NUMBA] >> warmup(",[np.dtype(dtype).name for dtype in dtypes],"):",f"{timer()-start:.2f}s")
+    return times
 
 # -----------------------------------------------------------------------------
 # --- Functions: cuda version ------------------------------------------------
 # -----------------------------------------------------------------------------
-@numba.vectorize('float32(float32)', target='cuda' )
+@cudaVectorize('float32(float32)')
 def cuda_cctf_sRGB_decoding(V):
     """
     Apply sRGB color correction transfer function decoding with CUDA acceleration.
@@ -118,7 +400,7 @@ def cuda_cctf_sRGB_decoding(V):
         L = ((V + 0.055) / 1.055)**( 2.4)
     return L
 # -----------------------------------------------------------------------------
-@numba.vectorize('float32(float32)', target='cuda' )
+@cudaVectorize('float32(float32)')
 def cuda_cctf_sRGB_encoding(L):
     """
     Apply sRGB color correction transfer function encoding with CUDA acceleration.
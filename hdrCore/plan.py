@@ -0,0 +1,448 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+HDR Core Execution Plan Module
+
+This module tells what a compute of a process-pipe will do before running it:
+for each node, whether it is dirty (requireUpdate) or kept from the previous
+compute, whether its parameters are the identity, the ordered kernels it runs
+with the current parameters (conversions of color space or encoding included)
+and estimates of time and memory.
+
+Kernels are listed by the operators (hdrCore.processing.Processing.plan()),
+which follow the branches of their compute(): the state of the image (shape,
+linear, color space) is propagated from node to node, so that the conversions
+inserted between nodes appear in the plan.
+
+Estimates are per-pixel costs of kernels: time (ns per pixel) and memory
+(bytes per pixel of the working arrays of the kernel, float32 data), per
+backend. Default costs have been measured at 960x540 on one core: they give
+orders of magnitude, calibrate() measures them on the current machine and
+saveCosts() stores them in preferences/costs.json, loaded by getCosts().
+
+explain() estimates an untiled compute on one core (ProcessPipe.compute()),
+tiledPlan() the same plan computed by tiles in worker processes, as the
+sequential export does (hdrCore.tiles).
+
+Example:
+    print(formatPlan(processPipe.explain()))                  # next compute, working size
+    print(formatPlan(processPipe.explain(shape=(4320,7680)))) # full compute of an 8K export
+    print(formatPlan(tiledPlan(processPipe.explain(shape=(4320,7680)), workers=8)))
+
+Functions:
+    - step: kernel of a plan
+    - explain: execution plan of a process-pipe
+    - tiledPlan: estimates of a plan computed by tiles
+    - formatPlan: text table of a plan
+    - getCosts: per-pixel costs of kernels of a backend
+    - calibrate: measure per-pixel costs of kernels
+    - saveCosts: store calibrated costs
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import os, json, copy, tracemalloc
+import numpy as np
+from .context import ExecutionContext
+from timeit import default_timer as timer
+
+# -----------------------------------------------------------------------------
+# --- Package variables -------------------------------------------------------
+# -----------------------------------------------------------------------------
+# calibrated costs file, read by getCosts(), written by saveCosts()
+costsFile = './preferences/costs.json'
+
+# per-pixel costs: backend -> kernel -> {'time': ns per pixel, 'memory': bytes per pixel}
+defaultCosts = {
+    'python': {'copy':          {'time':   1.1, 'memory':  12},
+               'cctf_encoding': {'time':  81.3, 'memory': 123},
+               'cctf_decoding': {'time':  95.0, 'memory': 147},
+               'exposure':      {'time':   0.6, 'memory':   0},
+               'contrast':      {'time':   1.7, 'memory':   0},
+               'sRGB_to_XYZ':   {'time': 162.1, 'memory':  72},
+               'Ycurve':        {'time':  67.9, 'memory':  20},
+               'lightnessMask': {'time':  65.8, 'memory':  16},
+               'sRGB_to_Lch':   {'time': 252.0, 'memory': 144},
+               'Lch_to_sRGB':   {'time': 288.8, 'memory': 144},
+               'saturation':    {'time':   3.7, 'memory':   0},
+               'colorMasks':    {'time':  10.5, 'memory':  16},
+               'lchEdit':       {'time':   3.5, 'memory':   4},
+               'rgbEdit':       {'time':  12.4, 'memory':  24},
+               'crop':          {'time':   0.0, 'memory':   0},
+               'rotate':        {'time':  84.8, 'memory':  24},
+               'resize':        {'time': 106.1, 'memory':  15},
+               'clip':          {'time':   1.9, 'memory':   3}},
+    'numba':  {'copy':          {'time':   1.1, 'memory':  12},
+               'cctf_encoding': {'time':  71.7, 'memory':   0},
+               'cctf_decoding': {'time':  75.6, 'memory':   0},
+               'exposure':      {'time':   0.7, 'memory':   0},
+               'contrast':      {'time':   1.8, 'memory':   0},
+               'sRGB_to_XYZ':   {'time': 159.2, 'memory':  72},
+               'Ycurve':        {'time': 245.3, 'memory':   8},
+               'lightnessMask': {'time':  64.7, 'memory':  16},
+               'sRGB_to_Lch':   {'time': 180.4, 'memory':  12},
+               'Lch_to_sRGB':   {'time':  20.5, 'memory':  12},
+               'saturation':    {'time':   2.6, 'memory':   0},
+               'colorMasks':    {'time':  11.3, 'memory':  16},
+               'lchEdit':       {'time':   3.8, 'memory':   4},
+               'rgbEdit':       {'time':  15.4, 'memory':  24},
+               'crop':          {'time':   0.0, 'memory':   0},
+               'rotate':        {'time':  97.8, 'memory':  24},
+               'resize':        {'time': 103.1, 'memory':  15},
+               'clip':          {'time':   1.9, 'memory':   3}}}
+
+# costs loaded from costsFile (None: not loaded yet)
+_loadedCosts = None
+
+# -----------------------------------------------------------------------------
+# --- Functions ---------------------------------------------------------------
+# -----------------------------------------------------------------------------
+def step(kernel, conversion=False, shape=None):
+    """
+    Build a kernel of a plan (see hdrCore.processing.Processing.plan()).
+
+    Args:
+        kernel (str): kernel name, key of the costs
+        conversion (bool, optional): color space or encoding conversion (default: False)
+        shape (tuple of int, optional): shape of the data processed by the kernel,
+            default: input shape of the node
+
+    Returns:
+        dict: {'kernel', 'conversion', 'shape'}
+    """
+    return {'kernel': kernel, 'conversion': conversion, 'shape': tuple(shape) if shape else None}
+# -----------------------------------------------------------------------------
+def explain(processPipe, shape=None):
+    """
+    Build the execution plan of a process-pipe, estimates are those of an
+    untiled compute on one core (see tiledPlan()).
+
+    Args:
+        processPipe (hdrCore.processing.ProcessPipe): pipeline
+        shape (tuple of int, optional): (height, width) of a new input image
+            (e.g. full size of an export): all nodes are dirty, default: input
+            image of the pipeline and requireUpdate of the nodes
+
+    Returns:
+        dict: plan
+            'shape': input shape, 'backend', 'dtype', 'storage' (type of node outputs), 'nodes': list of dict
+            {'name', 'operator', 'dirty', 'identity', 'steps', 'shape', 'linear', 'colorSpace' (output),
+            'time' (s), 'memory' (bytes of working arrays, output excluded), 'output' (bytes)},
+            each step {'kernel', 'conversion', 'shape', 'time', 'memory'},
+            'conversions': conversions of dirty nodes ('node: kernel'),
+            'uncalibrated': kernels without cost, 'time': estimated compute time (s),
+            'peak': estimated memory of the compute (bytes): input, outputs kept by
+            the nodes and largest working arrays
+
+    Raises:
+        ValueError: if the pipeline has no input image and shape is not given
+    """
+    ctx = processPipe.context
+    if shape:
+        state = {'shape': tuple(shape[:2])+(3,), 'linear': True, 'colorSpace': 'sRGB'}
+    else:
+        img = processPipe.getInputImage()
+        if img is None: raise ValueError("ProcessPipe.explain: no input image, give the shape of the image")
+        state = {'shape': tuple(img.colorData.shape), 'linear': img.linear, 'colorSpace': img.colorSpace.name}
+
+    costs = getCosts(ctx.computation)
+    itemsize = np.dtype(ctx.dtype).itemsize
+    # outputs kept in another type (context.storage): the output computed in dtype is a working array
+    storage = np.dtype(ctx.storage or ctx.dtype)
+    stored = storage != np.dtype(ctx.dtype)
+    inputShape = state['shape']
+    nodes, uncalibrated, conversions = [], [], []
+    with ctx.activate():
+        for processNode in processPipe.processNodes:
+            dirty = True if shape else processNode.requireUpdate
+            nodePlan = processNode.process.plan(dict(state), **copy.deepcopy(processNode.params or {}))
+            steps = []
+            for s in nodePlan['steps']:
+                s = dict(s)
+                if not s['shape']: s['shape'] = state['shape']
+                pixels = s['shape'][0]*s['shape'][1]
+                cost = costs.get(s['kernel'])
+                if cost is None:
+                    if s['kernel'] not in uncalibrated: uncalibrated.append(s['kernel'])
+                    s['time'], s['memory'] = 0.0, 0
+                else:
+                    s['time'] = cost['time']*pixels*1e-9
+                    s['memory'] = int(cost['memory']*pixels*itemsize/4)
+                if s['conversion'] and dirty: conversions.append(processNode.name+': '+s['kernel'])
+                steps.append(s)
+            state = nodePlan['state']
+            # kernel memory includes the output array of the node (copy, conversion): counted once, as output
+            working = int(np.prod(state['shape']))*itemsize
+            output = int(np.prod(state['shape']))*storage.itemsize
+            nodes.append({'name': processNode.name, 'operator': type(processNode.process).__name__,
+                          'dirty': dirty, 'identity': nodePlan['identity'], 'steps': steps,
+                          'shape': state['shape'], 'linear': state['linear'], 'colorSpace': state['colorSpace'],
+                          'time': sum(s['time'] for s in steps) if dirty else 0.0,
+                          'memory': max(0, max((s['memory'] for s in steps), default=0)-(0 if stored else working)),
+                          'output': output})
+
+    peak = int(np.prod(inputShape))*itemsize+sum(n['output'] for n in nodes)+max((n['memory'] for n in nodes if n['dirty']), default=0)
+    return {'shape': inputShape, 'backend': ctx.computation, 'dtype': np.dtype(ctx.dtype).name, 'storage': storage.name, 'nodes': nodes,
+            'conversions': conversions, 'uncalibrated': uncalibrated,
+            'time': sum(n['time'] for n in nodes), 'peak': peak}
+# -----------------------------------------------------------------------------
+def tiledPlan(plan, workers, tileSize=512):
+    """
+    Estimate a plan computed by tiles in worker processes (hdrCore.tiles.tileScheduler
+    with processes, as the sequential export).
+
+    Tiles of a stage are computed in parallel: time is divided by the workers.
+    Node outputs are not kept between computes, each worker holds the working
+    memory of a tile: tile input, output and working arrays of the largest
+    node, scaled to the pixels of the tile. The input and output frames of a
+    stage are shared (hdrCore.sharedmem), the output is copied from its frame.
+
+    Args:
+        plan (dict): plan returned by explain()
+        workers (int): number of worker processes
+        tileSize (int, optional): tile edge in pixels (default: 512, largest edge of
+            tileScheduler calibration)
+
+    Returns:
+        dict: copy of plan, 'time' and 'peak' of the tiled compute, 'tiled': {'workers',
+            'tileSize', 'tileMemory' (bytes per worker), 'frames' (bytes of shared frames),
+            'untiledTime', 'untiledPeak'}
+    """
+    res = dict(plan)
+    workers = max(1, workers)
+    itemsize = np.dtype(plan['dtype']).itemsize
+    pixels = plan['shape'][0]*plan['shape'][1]
+    inputBytes = int(np.prod(plan['shape']))*itemsize
+    outputBytes = int(np.prod(plan['nodes'][-1]['shape']))*itemsize if plan['nodes'] else inputBytes
+    scale = min(tileSize*tileSize, pixels)/pixels
+    dirty = [n for n in plan['nodes'] if n['dirty']]
+    tileMemory = int(scale*(inputBytes+max((n['memory']+n['output'] for n in dirty), default=0)))
+    # input and output frames of a stage
+    frames = inputBytes+max(inputBytes, outputBytes)
+    res['time'] = plan['time']/workers
+    res['peak'] = inputBytes+frames+outputBytes+workers*tileMemory
+    res['tiled'] = {'workers': workers, 'tileSize': tileSize, 'tileMemory': tileMemory, 'frames': frames,
+                    'untiledTime': plan['time'], 'untiledPeak': plan['peak']}
+    return res
+# -----------------------------------------------------------------------------
+def formatPlan(plan):
+    """
+    Format a plan as a text table, one line per node.
+
+    Args:
+        plan (dict): plan returned by explain() or tiledPlan()
+
+    Returns:
+        str: table
+    """
+    h, w = plan['shape'][:2]
+    dirty = [n for n in plan['nodes'] if n['dirty']]
+    tiled = plan.get('tiled')
+    mode = f"tiled: {tiled['workers']} workers" if tiled else 'untiled, one core'
+    lines = [f"plan {w}x{h} ({plan['backend']}, {plan['dtype']}{'' if plan['storage'] == plan['dtype'] else ', stored '+plan['storage']}, {mode}): {len(dirty)}/{len(plan['nodes'])} nodes to compute, "
+             f"estimated time: {plan['time']*1000:.0f}ms, peak memory: {plan['peak']/2**20:.0f}MB"]
+    if tiled:
+        lines.append(f"  tiles of {tiled['tileSize']}px: {tiled['tileMemory']/2**20:.1f}MB per worker, shared frames: {tiled['frames']/2**20:.0f}MB "
+                     f"(untiled: {tiled['untiledTime']*1000:.0f}ms, {tiled['untiledPeak']/2**20:.0f}MB), node estimates are untiled")
+    lines.append(f"  {'node':<16}{'state':<18}{'time (ms)':>10}{'work MB':>9}  kernels ([conversion])")
+    for n in plan['nodes']:
+        state = ('compute' if n['dirty'] else 'kept')+(', identity' if n['identity'] else '')
+        kernels = ' > '.join(('['+s['kernel']+']') if s['conversion'] else s['kernel'] for s in n['steps'])
+        lines.append(f"  {n['name']:<16}{state:<18}{n['time']*1000:>10.1f}{n['memory']/2**20:>9.1f}  {kernels}")
+    if plan['conversions']: lines.append("  conversions: "+', '.join(plan['conversions']))
+    if plan['uncalibrated']: lines.append("  WARNING: no cost for "+', '.join(plan['uncalibrated'])+" (not counted)")
+    return '\n'.join(lines)
+# -----------------------------------------------------------------------------
+def getCosts(backend):
+    """
+    Get per-pixel costs of kernels: calibrated costs (costsFile) if any, else defaults.
+
+    Args:
+        backend (str): 'python', 'numba' or 'cuda' (costs of numba)
+
+    Returns:
+        dict: kernel -> {'time': ns per pixel, 'memory': bytes per pixel}
+    """
+    global _loadedCosts
+    if _loadedCosts is None:
+        _loadedCosts = {}
+        if os.path.isfile(costsFile):
+            try:
+                with open(costsFile) as f: _loadedCosts = json.load(f)
+            except (OSError, ValueError) as e:
+                print("WARNING[plan.getCosts: cannot read",costsFile,":",e,"]")
+    if backend == 'cuda': backend = 'numba'
+    res = copy.deepcopy(defaultCosts.get(backend, defaultCosts['python']))
+    res.update(_loadedCosts.get(backend, {}))
+    return res
+# -----------------------------------------------------------------------------
+def _kernels(backend):
+    """
+    Build the kernels measured by calibrate(): functions of a float32 RGB frame
+    (values in [0,1]) doing the work of the kernel as the operators do it
+    (arrays allocated as without scratch buffers).
+
+    Args:
+        backend (str): 'python' or 'numba'
+
+    Returns:
+        dict: kernel -> function(rgb)
+    """
+    import colour, skimage.transform
+    from . import processing, utils
+    numba = backend == 'numba'
+    if numba: from . import numbafun
+
+    def encoding(rgb):
+        if numba:   numbafun.numba_cctf_sRGB_encoding(rgb, out=rgb)
+        else:       colour.cctf_encoding(rgb, function='sRGB')
+    def decoding(rgb):
+        if numba:   numbafun.numba_cctf_sRGB_decoding(rgb, out=rgb)
+        else:       colour.cctf_decoding(rgb, function='sRGB')
+    def contrast(rgb):
+        rgb -= 0.5
+        rgb *= 1.0
+        rgb += 0.5
+    def Ycurve(rgb):
+        curve = np.linspace(0, 2, 64)
+        if numba:
+            numbafun.numba_Ycurve(rgb, curve, curve, out=rgb, Y=np.empty(rgb.shape[:2]))
+        else:
+            Y = rgb[:,:,1]+0.1
+            FY = np.interp(Y, curve, curve)
+            for c in range(3): rgb[:,:,c] = rgb[:,:,c]*FY/Y
+    def lightnessMask(rgb):
+        Y = rgb[:,:,1]
+        mask = copy.deepcopy(rgb)
+        for low in (0, 0.2, 0.4, 0.6, 0.8): mask[(Y >= low)*(Y < low+0.2),:] = np.asarray([0,1,0])
+    def saturation(rgb):
+        chroma = rgb[:,:,1]
+        np.divide(chroma, 100, out=chroma)
+        np.power(chroma, 1.0, out=chroma)
+        np.multiply(chroma, 100, out=chroma)
+    def colorMasks(rgb):
+        shape = rgb.shape[:2]
+        tmp = np.empty(shape, rgb.dtype)
+        masks = [utils.NPlinearWeightMask(rgb[:,:,c], 0.2, 0.8, 0.1, out=np.empty(shape, rgb.dtype), tmp=tmp) for c in range(3)]
+        np.minimum(masks[0], np.minimum(masks[1], masks[2], out=masks[1]), out=masks[0])
+        np.subtract(1.0, masks[0], out=masks[2])
+    def lchEdit(rgb):
+        mask, tmp = rgb[:,:,0], np.empty(rgb.shape[:2], rgb.dtype)
+        shifted = np.add(rgb[:,:,2], 10.0, out=tmp)
+        shifted *= mask
+        rgb[:,:,2] *= mask
+        rgb[:,:,2] += shifted
+    def rgbEdit(rgb):
+        mask = rgb[:,:,0]
+        edited = np.multiply(rgb, 1.0, out=np.empty_like(rgb))
+        edited *= mask[:,:,np.newaxis]
+        rgb *= mask[:,:,np.newaxis]
+        rgb += edited
+    def clip(rgb):
+        rgb[rgb>1.0] = 1.0
+        rgb[rgb<0.0] = 0.0
+
+    return {'copy':          lambda rgb: rgb.copy(),
+            'cctf_encoding': encoding,
+            'cctf_decoding': decoding,
+            'exposure':      lambda rgb: rgb.__imul__(1.0),
+            'contrast':      contrast,
+            'sRGB_to_XYZ':   lambda rgb: processing.sRGB_to_XYZ(rgb, apply_cctf_decoding=False),
+            'Ycurve':        Ycurve,
+            'lightnessMask': lightnessMask,
+            'sRGB_to_Lch':   lambda rgb: processing.sRGB_to_Lch(rgb, apply_cctf_decoding=False),
+            'Lch_to_sRGB':   lambda rgb: processing.Lch_to_sRGB(rgb, apply_cctf_encoding=False),
+            'saturation':    saturation,
+            'colorMasks':    colorMasks,
+            'lchEdit':       lchEdit,
+            'rgbEdit':       rgbEdit,
+            'rotate':        lambda rgb: skimage.transform.rotate(rgb, 5.0, clip=False, resize=False),
+            'resize':        lambda rgb: skimage.transform.resize(rgb, (rgb.shape[0]//2, rgb.shape[1]//2), anti_aliasing=True),
+            'clip':          clip}
+# -----------------------------------------------------------------------------
+def calibrate(backends=('python', 'numba'), size=(540, 960), repeat=3, progress=None):
+    """
+    Measure per-pixel costs of kernels on a synthetic image.
+
+    Time is the best of repeat runs (after a first run: numba compilation),
+    memory the allocation high-water mark of a run (tracemalloc). A backend
+    that cannot run (numba not installed) is skipped.
+
+    Args:
+        backends (tuple of str, optional): backends to measure (default: python, numba)
+        size (tuple of int, optional): (height, width) of the synthetic image (default: 540x960)
+        repeat (int, optional): number of timed runs (default: 3)
+        progress (function, optional): called with (backend, kernel, cost) after each kernel
+
+    Returns:
+        dict: backend -> kernel -> {'time': ns per pixel, 'memory': bytes per pixel}
+    """
+    height, width = size
+    pixels = height*width
+    rng = np.random.default_rng(0)
+    frame = rng.uniform(0.01, 1.0, (height, width, 3)).astype(np.float32)
+    res = {}
+    for backend in backends:
+        try:
+            kernels = _kernels(backend)
+        except ImportError as e:
+            print("WARNING[plan.calibrate:",backend,"skipped:",e,"]")
+            continue
+        costs = {'crop':          {'time': 0.0, 'memory': 0}}
+        with ExecutionContext(autoResize=False, computation=backend, verbose=False, diskCache=False).activate():
+            for name, kernel in kernels.items():
+                kernel(frame.copy())
+                times = []
+                for _ in range(max(1, repeat)):
+                    rgb = frame.copy()
+                    start = timer()
+                    kernel(rgb)
+                    times.append(timer()-start)
+                rgb = frame.copy()
+                tracing = tracemalloc.is_tracing()
+                if not tracing: tracemalloc.start()
+                tracemalloc.reset_peak()
+                current, _ = tracemalloc.get_traced_memory()
+                kernel(rgb)
+                peak = tracemalloc.get_traced_memory()[1]-current
+                if not tracing: tracemalloc.stop()
+                costs[name] = {'time': round(min(times)/pixels*1e9, 2), 'memory': int(round(peak/pixels))}
+                if progress: progress(backend, name, costs[name])
+        res[backend] = costs
+    return res
+# -----------------------------------------------------------------------------
+def saveCosts(costs, filename=None):
+    """
+    Store calibrated costs, used by next plans (getCosts()).
+
+    Args:
+        costs (dict): costs returned by calibrate()
+        filename (str, optional): costs file (default: costsFile)
+    """
+    global _loadedCosts
+    filename = filename if filename else costsFile
+    stored = {}
+    if os.path.isfile(filename):
+        with open(filename) as f: stored = json.load(f)
+    stored.update(costs)
+    with open(filename, 'w') as f: json.dump(stored, f, indent=1)
+    if filename == costsFile: _loadedCosts = stored
+# -----------------------------------------------------------------------------
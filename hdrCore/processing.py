@@ -57,17 +57,14 @@ Key Features:
 # -----------------------------------------------------------------------------
 # --- Import ------------------------------------------------------------------
 # -----------------------------------------------------------------------------
-import copy, colour, skimage.transform, math, os
-import pathos.multiprocessing, multiprocessing, subprocess
+import copy, colour, skimage.transform, math, os, contextlib
+import multiprocessing, subprocess
 import numpy as np
 import skimage.transform
 import functools
-from geomdl import BSpline
-from geomdl import utilities
-from . import image, utils, aesthetics
-# RCZT 2023
-# from . import image, utils, numbafun, aesthetics
-import guiQt.controller as gc
+from . import image, utils, aesthetics, sharedmem, profiling, scratch, plan
+from .context import ExecutionContext
+# numbafun (numba backend) is imported by the numba/cuda branches: numba is only needed when selected
 import preferences.preferences as pref
 from timeit import default_timer as timer
 
@@ -172,7 +169,56 @@ def sRGB_to_Lab(RGB, apply_cctf_decoding=True):
     Lab = colour.XYZ_to_Lab(XYZ, illuminant=np.array([ 0.3127, 0.329 ]))
     return Lab
 
-def Lch_to_sRGB(Lch,apply_cctf_encoding=True, clip=False):
+def sRGB_to_Lch(RGB, apply_cctf_decoding=True, tag=None):
+    """
+    Convert pixel array from sRGB to LCH color space.
+
+    Args:
+        RGB (numpy.ndarray): Array of pixels in sRGB color space
+        apply_cctf_decoding (bool, optional): Apply sRGB CCTF decoding function (default: True)
+        tag (str, optional): scratch buffer of the result (see hdrCore.scratch),
+            default: new array
+            
+    Returns:
+        numpy.ndarray: Array of pixels in LCH color space
+
+    Note:
+        The python backend computes in the type of the result, its working
+        arrays are scratch buffers: no float64 temporaries of colour-science
+    """
+    out = scratch.empty(RGB.shape, RGB.dtype, tag) if tag else None
+    if ExecutionContext.current().computation == 'numba':
+        from . import numbafun
+        return numbafun.numba_sRGB_to_LCH(RGB, apply_cctf_decoding=apply_cctf_decoding, out=out)
+
+    if out is None: out = np.empty(RGB.shape, dtype=ExecutionContext.current().dtype)
+    shape, dtype = RGB.shape, out.dtype
+    M, _, white = sRGBmatrices(dtype)
+    xyz, tmp = scratch.empty(shape, dtype, 'xyz'), scratch.empty(shape, dtype, 'conversion')
+    mask = scratch.empty(shape, np.bool_, 'conversionMask')
+    rgb = sRGB_decoding(RGB, out=tmp) if apply_cctf_decoding else RGB
+    np.matmul(rgb, M.T, out=xyz)
+    xyz /= white
+    # Lab function: cube root, linear below (24/116)**3
+    np.greater(xyz, 0.008856451679035631, out=mask)
+    np.cbrt(xyz, out=tmp)
+    xyz *= 841/108
+    xyz += 16/116
+    np.copyto(xyz, tmp, where=mask)
+    # L = 116*fy-16, a = 500*(fx-fy), b = 200*(fy-fz): RGB is not read anymore, out can be RGB
+    a = np.subtract(xyz[:,:,0], xyz[:,:,1], out=tmp[:,:,0])
+    a *= 500
+    b = np.subtract(xyz[:,:,1], xyz[:,:,2], out=tmp[:,:,1])
+    b *= 200
+    np.multiply(xyz[:,:,1], 116, out=out[:,:,0])
+    out[:,:,0] -= 16
+    np.hypot(a, b, out=out[:,:,1])
+    hue = np.arctan2(b, a, out=out[:,:,2])
+    np.degrees(hue, out=hue)
+    np.mod(hue, 360, out=hue)
+    return out
+
+def Lch_to_sRGB(Lch,apply_cctf_encoding=True, clip=False, tag=None):
     """
     Convert pixel array from LCH to sRGB color space.
 
@@ -180,20 +226,144 @@ def Lch_to_sRGB(Lch,apply_cctf_encoding=True, clip=False):
         Lch (numpy.ndarray): Array of pixels in LCH color space
         apply_cctf_encoding (bool, optional): Apply sRGB CCTF encoding function (default: True)
         clip (bool, optional): Clip values beyond color space limits (default: False)
+        tag (str, optional): scratch buffer of the result (see hdrCore.scratch),
+            default: new array
             
     Returns:
         numpy.ndarray: Array of pixels in sRGB color space
+
+    Note:
+        The python backend computes in the type of the result, its working
+        arrays are scratch buffers: no float64 temporaries of colour-science
     """
-    Lab = colour.LCHab_to_Lab(Lch)
-    XYZ = colour.Lab_to_XYZ(Lab, illuminant=np.array([ 0.3127, 0.329 ]))
-    RGB = colour.XYZ_to_sRGB(
-        XYZ, illuminant=np.array([ 0.3127, 0.329 ]), 
-        chromatic_adaptation_transform='CAT02', 
-        apply_cctf_encoding = apply_cctf_encoding)
-    if clip:
-        RGB[RGB<0] = 0
-        RGB[RGB>1] = 1
+    out = scratch.empty(Lch.shape, Lch.dtype, tag) if tag else None
+    if ExecutionContext.current().computation == 'numba':
+        from . import numbafun
+        return numbafun.numba_LCH_to_sRGB(Lch, apply_cctf_encoding=apply_cctf_encoding, clip=clip, out=out)
+
+    if out is None: out = np.empty(Lch.shape, dtype=ExecutionContext.current().dtype)
+    shape, dtype = Lch.shape, out.dtype
+    _, Minv, white = sRGBmatrices(dtype)
+    xyz, tmp = scratch.empty(shape, dtype, 'xyz'), scratch.empty(shape, dtype, 'conversion')
+    mask = scratch.empty(shape, np.bool_, 'conversionMask')
+    # fy = (L+16)/116, fx = fy + C*cos(h)/500, fz = fy - C*sin(h)/200
+    hue = np.radians(Lch[:,:,2], out=tmp[:,:,0])
+    fy = np.add(Lch[:,:,0], 16, out=xyz[:,:,1])
+    fy /= 116
+    fx = np.cos(hue, out=xyz[:,:,0])
+    fx *= Lch[:,:,1]
+    fx /= 500
+    fx += fy
+    fz = np.sin(hue, out=xyz[:,:,2])
+    fz *= Lch[:,:,1]
+    fz /= -200
+    fz += fy
+    # inverse Lab function: cube, linear below 24/116
+    np.greater(xyz, 24/116, out=mask)
+    np.power(xyz, 3, out=tmp)
+    xyz -= 16/116
+    xyz *= 108/841
+    np.copyto(xyz, tmp, where=mask)
+    xyz *= white
+    # Lch is not read anymore: out can be Lch
+    RGB = np.matmul(xyz, Minv.T, out=out)
+    if apply_cctf_encoding: sRGB_encoding(RGB, out=RGB)
+    if clip: np.clip(RGB, 0, 1, out=RGB)
     return RGB
+
+def toWorkingType(data, out=None):
+    """
+    Cast the result of a colour-science function (float64) to the type of the
+    current context (ExecutionContext.dtype, float32).
+
+    Args:
+        data (numpy.ndarray): array
+        out (numpy.ndarray, optional): array of the result, e.g. a scratch buffer or the
+            input of an in-place edit, default: data if it has the type of the context,
+            else a new array
+
+    Returns:
+        numpy.ndarray: data in the type of the context (or of out)
+    """
+    if out is None: return np.asarray(data, dtype=ExecutionContext.current().dtype)
+    np.copyto(out, data)
+    return out
+
+# illuminant of uHDR conversions: D65
+_illuminant = np.array([ 0.3127, 0.329 ])
+# conversion matrices per dtype (see sRGBmatrices())
+_matrices = {}
+
+def sRGBmatrices(dtype=np.float64):
+    """
+    Get the conversion matrices of uHDR (same as sRGB_to_XYZ and XYZ_to_sRGB:
+    illuminant D65, CAT02) and the white point.
+
+    Args:
+        dtype (numpy.dtype, optional): type of the arrays (default: float64)
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray, numpy.ndarray): linear sRGB to XYZ matrix (3x3),
+        XYZ to linear sRGB matrix (3x3), white point XYZ (3)
+    """
+    key = np.dtype(dtype).str
+    if key not in _matrices:
+        # conversions are linear: converting the identity gives the transposed matrix
+        M = colour.sRGB_to_XYZ(np.eye(3), illuminant=_illuminant, chromatic_adaptation_transform='CAT02', apply_cctf_decoding=False).T
+        Minv = colour.XYZ_to_sRGB(np.eye(3), illuminant=_illuminant, chromatic_adaptation_transform='CAT02', apply_cctf_encoding=False).T
+        white = colour.xyY_to_XYZ(colour.xy_to_xyY(_illuminant))
+        _matrices[key] = tuple(np.ascontiguousarray(a, dtype=dtype) for a in (M, Minv, white))
+    return _matrices[key]
+
+def sRGB_encoding(data, out=None):
+    """
+    Apply the sRGB encoding (colour.cctf_encoding(function='sRGB')) in the type
+    of the result: working arrays are scratch buffers (see hdrCore.scratch).
+
+    Args:
+        data (numpy.ndarray): linear values
+        out (numpy.ndarray, optional): array of the result, can be data
+            (default: new array of the type of the context)
+
+    Returns:
+        numpy.ndarray: encoded values
+    """
+    if out is None: out = np.empty(data.shape, dtype=ExecutionContext.current().dtype)
+    high = scratch.empty(data.shape, out.dtype, 'cctf')
+    mask = scratch.empty(data.shape, np.bool_, 'cctfMask')
+    np.greater(data, 0.0031308, out=mask)
+    # 1.055*L**(1/2.4)-0.055 above 0.0031308 (negative values: linear segment)
+    with np.errstate(invalid='ignore'): np.power(data, 1/2.4, out=high)
+    high *= 1.055
+    high -= 0.055
+    np.multiply(data, 12.92, out=out)
+    np.copyto(out, high, where=mask)
+    return out
+
+def sRGB_decoding(data, out=None):
+    """
+    Apply the sRGB decoding (colour.cctf_decoding(function='sRGB')) in the type
+    of the result: working arrays are scratch buffers (see hdrCore.scratch).
+
+    Args:
+        data (numpy.ndarray): encoded values
+        out (numpy.ndarray, optional): array of the result, can be data
+            (default: new array of the type of the context)
+
+    Returns:
+        numpy.ndarray: linear values
+    """
+    if out is None: out = np.empty(data.shape, dtype=ExecutionContext.current().dtype)
+    high = scratch.empty(data.shape, out.dtype, 'cctf')
+    mask = scratch.empty(data.shape, np.bool_, 'cctfMask')
+    np.greater(data, 0.040449936, out=mask)
+    # ((V+0.055)/1.055)**2.4 above 0.040449936
+    np.add(data, 0.055, out=high)
+    high /= 1.055
+    with np.errstate(invalid='ignore'): np.power(high, 2.4, out=high)
+    np.divide(data, 12.92, out=out)
+    np.copyto(out, high, where=mask)
+    return out
      
 # -----------------------------------------------------------------------------
 # --- Class Processing -------------------------------------------------------
@@ -230,6 +400,14 @@ class Processing(object):
         - Parameters are validated before execution
         - Profiling is automatic if enabled
         - State is preserved between executions
+        - Settings (backend, verbosity, threads) are read from
+          hdrCore.context.ExecutionContext.current(): the context of the running pipeline
+        - Output images and working arrays are requested from hdrCore.scratch
+          (scratch.copyImage(), scratch.empty()): pipelines reuse them across computes
+        - plan() lists the kernels compute() runs (hdrCore.plan): operators
+          override it so that ProcessPipe.explain() follows their branches
+        - Output data has the type of the context (ExecutionContext.dtype, float32):
+          results of colour-science functions (float64) are cast with toWorkingType()
     """
 
     def compute(self, image, **kwargs):
@@ -248,6 +426,46 @@ class Processing(object):
         """
         raise NotImplementedError("compute() method must be implemented")
 
+    def needStatistics(self, **kwargs):
+        """Check if compute() uses image-wide statistics with these parameters.
+
+        Tiled computation (hdrCore.tiles) computes the statistics of the whole
+        input image (statistics()) and gives them to compute() of each tile.
+
+        Args:
+            **kwargs: Operation-specific parameters
+
+        Returns:
+            bool: True if compute() requires the statistics keyword argument
+        """
+        return False
+
+    def statistics(self, image):
+        """Compute the image-wide statistics used by compute().
+
+        Args:
+            image (hdrCore.image.Image): Input image (or tile of the input image)
+
+        Returns:
+            dict or None: statistics, each value is a maximum: statistics of tiles
+                are combined by maximum
+        """
+        return None
+
+    def plan(self, state, **kwargs):
+        """Describe the kernels compute() runs with these parameters (see hdrCore.plan).
+
+        Args:
+            state (dict): input image: 'shape', 'linear' (bool), 'colorSpace' (name)
+            **kwargs: Operation-specific parameters
+
+        Returns:
+            dict: 'identity' (bool): parameters do not change the image,
+                'steps' (list of dict): kernels in order (hdrCore.plan.step()),
+                'state' (dict): output image
+        """
+        return {'identity': False, 'steps': [plan.step(type(self).__name__)], 'state': state}
+
 # -----------------------------------------------------------------------------
 # --- Class tmo_cctf ---------------------------------------------------------
 # -----------------------------------------------------------------------------
@@ -288,7 +506,7 @@ class tmo_cctf(Processing):
         if (img.type == image.imageType.HDR):
 
             # encode
-            imgRGBprime = colour.cctf_encoding(res.colorData,function=function)
+            imgRGBprime = toWorkingType(colour.cctf_encoding(res.colorData,function=function))
 
             # update attributes
             res.colorData       = imgRGBprime
@@ -298,6 +516,37 @@ class tmo_cctf(Processing):
             res.colorSpace      = colour.models.RGB_COLOURSPACES[function].copy()
 
         return res
+
+    def plan(self, state, **kwargs):
+        """Kernels of compute(): copy, then encoding (see Processing.plan())."""
+        state['linear'] = False
+        return {'identity': False, 'steps': [plan.step('copy'), plan.step('cctf_encoding', conversion=True)], 'state': state}
+# -----------------------------------------------------------------------------
+def _exposureEval(frame, ev):
+    """
+    Evaluate exposure value by histogram analysis (exposure.auto worker).
+
+    Args:
+        frame (hdrCore.sharedmem.sharedFrame): linear RGB image in shared memory
+        ev (float): Exposure value to evaluate
+
+    Returns:
+        float: Quality metric for this exposure value
+    """
+    rgbLinear = frame.array
+    nbPix = rgbLinear.shape[0]*rgbLinear.shape[1]
+    bins = np.linspace(0,1,25+1)
+
+    rgb_ev = rgbLinear*math.pow(2,ev)
+    rgb_ev_prime = colour.cctf_encoding(rgb_ev,function='sRGB')
+    rgb_ev_prime[rgb_ev_prime>1] = 1
+    XYZ = colour.sRGB_to_XYZ(rgb_ev_prime, apply_cctf_decoding=False)
+    Y = utils.ndarray2vector(XYZ)[:,1]
+    nphist_ev_prime, npedges = np.histogram(Y, bins)
+    nphist_ev_prime = nphist_ev_prime/nbPix
+    sumH = np.cumsum(nphist_ev_prime[1:-1])[-1]
+
+    return sumH
 # -----------------------------------------------------------------------------
 # --- Class exposure ---------------------------------------------------------
 # -----------------------------------------------------------------------------
@@ -330,7 +579,7 @@ class exposure(Processing):
             images are automatically converted to linear, processed, and
             returned in linear space.
         """
-        start= timer()
+        ctx = ExecutionContext.current()
         defaultEV = 0.0
         if not kwargs: kwargs = {'EV': defaultEV}  # default value
         
@@ -338,36 +587,42 @@ class exposure(Processing):
         if 'EV' in kwargs : EV = kwargs['EV']
         else:               EV = defaultEV
  
-        res = copy.deepcopy(img)
+        res = scratch.copyImage(img)
 
         if EV != defaultEV:
             # exposure is done in linear RGB
             if not res.linear:
                 
-                if pref.computation == 'python':
-                    start = timer()
-                    res.colorData =     colour.cctf_decoding(res.colorData, function='sRGB')
+                if ctx.computation == 'python':
+                    res.colorData =     sRGB_decoding(res.colorData, out=res.colorData)
                     res.linear =        True
 
-                elif pref.computation == 'numba':
-                    start = timer()
-                    res.colorData =     numbafun.numba_cctf_sRGB_decoding(res.colorData) # encode to prime
+                elif ctx.computation == 'numba':
+
+                    from . import numbafun
+                    res.colorData =     numbafun.numba_cctf_sRGB_decoding(res.colorData, out=res.colorData) # encode to prime
                     res.linear =        True
 
-                elif pref.computation == 'cuda':
-                    start = timer()
+                elif ctx.computation == 'cuda':
+
+                    from . import numbafun
                     res.colorData =     numbafun.cuda_cctf_sRGB_decoding(res.colorData) # encode to prime
                     res.linear =        True
 
-                dt = timer() - start
-
-            res.colorData =     res.colorData*math.pow(2,EV)
 
-        end = timer()
-        if pref.verbose: print (" [PROCESS-PROFILING](",end - start,") >> exposure(",img.name,"):", kwargs)
+            res.colorData *=    math.pow(2,EV)
 
         return res
 
+    def plan(self, state, **kwargs):
+        """Kernels of compute(): copy, then decoding (non-linear input) and scaling if EV is not 0 (see Processing.plan())."""
+        steps = [plan.step('copy')]
+        if kwargs.get('EV', 0.0) == 0.0: return {'identity': True, 'steps': steps, 'state': state}
+        if not state['linear']: steps.append(plan.step('cctf_decoding', conversion=True))
+        steps.append(plan.step('exposure'))
+        state['linear'] = True
+        return {'identity': False, 'steps': steps, 'state': state}
+
     def auto(self,img):
         """
         Calculate optimal exposure using histogram analysis.
@@ -384,49 +639,29 @@ class exposure(Processing):
                   {'EV': optimal_exposure_value}
                   
         Note:
-            Uses multi-threaded histogram analysis across multiple exposure
+            Uses multi-process histogram analysis across multiple exposure
             values to find the exposure that maximizes histogram spread
-            without clipping highlights.
+            without clipping highlights. The image is shared with worker
+            processes through shared memory (hdrCore.sharedmem).
         """
+        ctx = ExecutionContext.current()
         minEV, maxEV, step =  -10,10,0.25
         evs = np.linspace(minEV,maxEV,num=int((maxEV-minEV)/step)+1)
 
-        rgb = copy.deepcopy(img.colorData)
-        nbPix = rgb.shape[0]*rgb.shape[1]
+        rgb = img.colorData
 
         if not img.linear:  rgbLinear = colour.cctf_decoding(rgb,function='sRGB')
         else:               rgbLinear = rgb
 
-        bins = np.linspace(0,1,25+1)
+        # rgbLinear is copied once into shared memory, workers map it: only the frame descriptor is pickled
+        import pathos.multiprocessing
+        with sharedmem.frameRegistry.fromArray(rgbLinear) as frame:
+            _pool = pathos.multiprocessing.ProcessPool(nodes=ctx.threads)
+            results = _pool.map(_exposureEval, [frame]*len(evs), evs)
+            sumsH  = list(results)
 
-        # local method for pool (not static!)
-        def evEval(ev):
-            """
-            Evaluate exposure value by histogram analysis.
-
-            Args:
-                ev (float): Exposure value to evaluate
-                    
-            Returns:
-                float: Quality metric for this exposure value
-            """
-            rgb_ev = rgbLinear*math.pow(2,ev)
-            rgb_ev_prime = colour.cctf_encoding(rgb_ev,function='sRGB')
-            rgb_ev_prime[rgb_ev_prime>1] = 1
-            XYZ = colour.sRGB_to_XYZ(rgb_ev_prime, apply_cctf_decoding=False)
-            Y = utils.ndarray2vector(XYZ)[:,1]
-            nphist_ev_prime, npedges = np.histogram(Y, bins)
-            nphist_ev_prime = nphist_ev_prime/nbPix
-            sumH = np.cumsum(nphist_ev_prime[1:-1])[-1]
-
-            return sumH
-
-        _pool = pathos.multiprocessing.ProcessPool()
-        results = _pool.map( evEval, evs)
-        sumsH  = list(results)
-        
         bestEV = evs[np.argmax(sumsH)]
-        if pref.verbose: print('  [PROCESS] >> exposure.auto(',img.name,'):BEST EV:',bestEV)
+        if ctx.verbose: print('  [PROCESS] >> exposure.auto(',img.name,'):BEST EV:',bestEV)
       
         return {'EV':bestEV}
 # -----------------------------------------------------------------------------
@@ -462,7 +697,7 @@ class contrast(Processing):
             Linear images are automatically converted to gamma space,
             processed, and returned in gamma space.
         """
-        start = timer()
+        ctx = ExecutionContext.current()
         defaultContrast =   0.0
         maxContrastFactor = 2.0     ###### 5.0
         if not kwargs: kwargs = { "contrast": defaultContrast }  # default value 
@@ -471,27 +706,27 @@ class contrast(Processing):
         if 'contrast' in kwargs :   contrastValue = kwargs['contrast']
         else:                       contrastValue = defaultContrast
 
-        res = copy.deepcopy(img)
+        res = scratch.copyImage(img)
 
         if contrastValue != defaultContrast:
             # contrast scaling is computed in prime colorspace
             if img.linear: 
-                if pref.computation == 'python':
-                    start = timer()
-                    res.colorData =     colour.cctf_encoding(res.colorData, function='sRGB') # encode to prime
+                if ctx.computation == 'python':
+                    res.colorData =     sRGB_encoding(res.colorData, out=res.colorData) # encode to prime
                     res.linear =        False
 
-                elif pref.computation == 'numba':
-                    start = timer()
-                    res.colorData =     numbafun.numba_cctf_sRGB_encoding(res.colorData) # encode to prime
+                elif ctx.computation == 'numba':
+
+                    from . import numbafun
+                    res.colorData =     numbafun.numba_cctf_sRGB_encoding(res.colorData, out=res.colorData) # encode to prime
                     res.linear =        False
 
-                elif pref.computation == 'cuda':
-                    start = timer()
+                elif ctx.computation == 'cuda':
+
+                    from . import numbafun
                     res.colorData =     numbafun.cuda_cctf_sRGB_encoding(res.colorData) # encode to prime
                     res.linear =        False
 
-                dt = timer() - start
 
             # scaling contrast
             contrastValue = contrastValue/100 
@@ -502,12 +737,21 @@ class contrast(Processing):
                 scalingFactor = 1*(1-contrastValue)+maxContrastFactor*contrastValue
                 scalingFactor = 1/scalingFactor
 
-            res.colorData = scalingFactor*(res.colorData-0.5)+0.5
-        
-        end=timer()    
-        if pref.verbose: print(" [PROCESS-PROFILING] (",end-start,")>> contrast(",img.name,"):", kwargs)
+            # in place: scalingFactor*(colorData-0.5)+0.5
+            res.colorData -= 0.5
+            res.colorData *= scalingFactor
+            res.colorData += 0.5
 
         return res
+
+    def plan(self, state, **kwargs):
+        """Kernels of compute(): copy, then encoding (linear input) and scaling if contrast is not 0 (see Processing.plan())."""
+        steps = [plan.step('copy')]
+        if kwargs.get('contrast', 0.0) == 0.0: return {'identity': True, 'steps': steps, 'state': state}
+        if state['linear']: steps.append(plan.step('cctf_encoding', conversion=True))
+        steps.append(plan.step('contrast'))
+        state['linear'] = False
+        return {'identity': False, 'steps': steps, 'state': state}
 # -----------------------------------------------------------------------------
 # --- Class clip -------------------------------------------------------------
 # -----------------------------------------------------------------------------
@@ -546,6 +790,10 @@ class clip(Processing):
         res.colorData[res.colorData<min] = min
 
         return res
+
+    def plan(self, state, **kwargs):
+        """Kernels of compute(): copy and clip (see Processing.plan())."""
+        return {'identity': False, 'steps': [plan.step('copy'), plan.step('clip')], 'state': state}
 # -----------------------------------------------------------------------------
 # --- Class ColorSpaceTransform ----------------------------------------------
 # -----------------------------------------------------------------------------
@@ -639,6 +887,7 @@ class ColorSpaceTransform(Processing):
                         XYZ = colour.Lab_to_XYZ(Lab, illuminant=np.array([ 0.3127, 0.329 ]))
                         res.colorData, res.linear, res.colorSpace = XYZ, True, image.ColorSpace.buildXYZ()
 
+        res.colorData = toWorkingType(res.colorData)
         return res
 # -----------------------------------------------------------------------------
 # --- Class resize -----------------------------------------------------------
@@ -693,10 +942,28 @@ class resize(Processing):
             res.colorData = skimage.transform.resize(res.colorData, (ny,int(x * factor)), anti_aliasing)
             res.shape = res.colorData.shape
         return res
+
+    def plan(self, state, size=(None,None), anti_aliasing=False):
+        """Kernels of compute(): copy and resize, output shape as compute() (see Processing.plan())."""
+        y, x, c = state['shape']
+        ny, nx = size
+        if nx and (not ny):     ny = int(y*nx/x)
+        elif (not nx) and ny:   nx = int(x*ny/y)
+        elif (not nx) and (not ny): ny, nx = 400, int(x*400/y)
+        state['shape'] = (ny, nx, c)
+        return {'identity': False, 'steps': [plan.step('copy', shape=(y, x, c)), plan.step('resize', shape=(y, x, c))], 'state': state}
 # -----------------------------------------------------------------------------
 # --- Class Ycurve -----------------------------------------------------------
 # -----------------------------------------------------------------------------
 class Ycurve(Processing):
+
+    defaultValue = {'start':[0,0], 
+                    'shadows': [10,10], 
+                    'blacks': [30,30], 
+                    'mediums': [50,50], 
+                    'whites': [70,70], 
+                    'highlights': [90,90], 
+                    'end': [100,100]}
     
     def compute(self,img,**kwargs):
         """
@@ -710,48 +977,42 @@ class Ycurve(Processing):
             (hdrCore.image.Image, Required): image
                 result of Ycurve processing
         """ 
-        start =  timer()
-        defaultControlPoints = {'start':[0,0], 
-                                'shadows': [10,10], 
-                                'blacks': [30,30], 
-                                'mediums': [50,50], 
-                                'whites': [70,70], 
-                                'highlights': [90,90], 
-                                'end': [100,100]}
+        ctx = ExecutionContext.current()
+        defaultControlPoints = Ycurve.defaultValue
 
         if not kwargs: kwargs = defaultControlPoints  # default value 
 
 
         # results image
-        res = copy.deepcopy(img)
+        res = scratch.copyImage(img)
 
         if kwargs != defaultControlPoints:
 
             if img.linear: 
-                if pref.computation == 'python':
-                    start = timer()
-                    res.colorData =     colour.cctf_encoding(res.colorData, function='sRGB') # encode to prime
+                if ctx.computation == 'python':
+                    res.colorData =     sRGB_encoding(res.colorData, out=res.colorData) # encode to prime
                     res.linear =        False
 
-                elif pref.computation == 'numba':
-                    start = timer()
-                    res.colorData =     numbafun.numba_cctf_sRGB_encoding(res.colorData) # encode to prime
+                elif ctx.computation == 'numba':
+
+                    from . import numbafun
+                    res.colorData =     numbafun.numba_cctf_sRGB_encoding(res.colorData, out=res.colorData) # encode to prime
                     res.linear =        False
 
-                elif pref.computation == 'cuda':
-                    start = timer()
+                elif ctx.computation == 'cuda':
+
+                    from . import numbafun
                     res.colorData =     numbafun.cuda_cctf_sRGB_encoding(res.colorData) # encode to prime
                     res.linear =        False
 
-                dt = timer() - start
 
-            colorDataY =    sRGB_to_XYZ(res.colorData, apply_cctf_decoding=False)[:,:,1] 
             # change for multi-threading computation
             # Ymax =          np.amax(colorDataY)*100
             # extendedEnd =   [Ymax, kwargs['end'][1]]
             extendedEnd =   [200, kwargs['end'][1]]
 
             # create curve adn get y-curve
+            from geomdl import BSpline, utilities
             curve =         BSpline.Curve()
             curve.degree =  2
             points =        None
@@ -763,22 +1024,40 @@ class Ycurve(Processing):
             FY = points[:,1]
 
             # check validity: same shape
-            if Y.shape == FY.shape:
-                colorDataFY = np.interp(colorDataY, Y,FY)
-
-                # remove zeros
-                Ymin = np.amin(colorDataY[colorDataY>0])
-                colorDataY[colorDataY==0] = Ymin
-
-                # transform colorData
-                res.colorData[:,:,0] = res.colorData[:,:,0]*colorDataFY/colorDataY
-                res.colorData[:,:,1] = res.colorData[:,:,1]*colorDataFY/colorDataY
-                res.colorData[:,:,2] = res.colorData[:,:,2]*colorDataFY/colorDataY
-        
-        end = timer()        
-        if pref.verbose: print(" [PROCESS-PROFILING] (",end - start,")>> Ycurve(",img.name,"):", kwargs)
+            if Y.shape == FY.shape and ctx.computation == 'numba':
+                from . import numbafun
+                res.colorData = numbafun.numba_Ycurve(res.colorData, Y, FY, out=res.colorData, Y=scratch.empty(res.colorData.shape[:2], np.float64, 'Y'))
+
+            elif Y.shape == FY.shape:
+                # luminance and curve in scratch buffers (see hdrCore.scratch)
+                shape, dtype = res.colorData.shape[:2], res.colorData.dtype
+                M, _, _ = sRGBmatrices(dtype)
+                colorDataY = np.matmul(res.colorData, M[1], out=scratch.empty(shape, dtype, 'Y'))
+                colorDataFY = scratch.empty(shape, dtype, 'FY')
+                # numpy.interp has no out argument: by bands of rows, its temporaries stay small
+                rows = max(1, 4096//shape[1])
+                for y0 in range(0, shape[0], rows): colorDataFY[y0:y0+rows] = np.interp(colorDataY[y0:y0+rows], Y, FY)
+
+                # remove zeros (a black tile has no positive Y)
+                mask = np.greater(colorDataY, 0, out=scratch.empty(shape, np.bool_, 'Ymask'))
+                Ymin = np.amin(colorDataY, where=mask, initial=np.inf)
+                if Ymin == np.inf: Ymin = 1.0
+                np.copyto(colorDataY, Ymin, where=np.equal(colorDataY, 0, out=mask))
+
+                # transform colorData: colorData*FY/Y
+                np.divide(colorDataFY, colorDataY, out=colorDataFY)
+                res.colorData *= colorDataFY[:,:,np.newaxis]
 
         return res
+
+    def plan(self, state, **kwargs):
+        """Kernels of compute(): copy, then encoding (linear input) and curve if control points are not default (see Processing.plan())."""
+        steps = [plan.step('copy')]
+        if (not kwargs) or kwargs == Ycurve.defaultValue: return {'identity': True, 'steps': steps, 'state': state}
+        if state['linear']: steps.append(plan.step('cctf_encoding', conversion=True))
+        steps.append(plan.step('Ycurve'))
+        state['linear'] = False
+        return {'identity': False, 'steps': steps, 'state': state}
 # -----------------------------------------------------------------------------
 # --- Class saturation -------------------------------------------------------
 # -----------------------------------------------------------------------------
@@ -798,42 +1077,47 @@ class saturation(Processing):
         Returns:
             (hdrCore.image.Image): output image
         """ 
-        start=timer()
+        ctx = ExecutionContext.current()
         defaultValue= {'saturation': 0.0, 'method': 'gamma'}
 
         if not kwargs: kwargs = defaultValue  # default value 
 
 
-        # results image
-        res = copy.deepcopy(img)
-
         value = kwargs["saturation"]
         if value != defaultValue['saturation']:
 
             # go to Lab then Lch
-            if img.linear: 
-                colorLab = sRGB_to_Lab(res.colorData, apply_cctf_decoding=False)
-            else:
-                colorLab = sRGB_to_Lab(res.colorData, apply_cctf_decoding=True)
-            colorLCH = colour.Lab_to_LCHab(colorLab)
+            colorLCH = sRGB_to_Lch(img.colorData, apply_cctf_decoding=not img.linear, tag='output')
 
-            # saturation in Lch (chroma as saturation)
+            # saturation in Lch (chroma as saturation), in place: power(chroma/100, gamma)*100
             gamma = 1/((value/25)+1) if value >= 0 else (-value/25)+1
-            colorLCH[:,:,1] =np.power(colorLCH[:,:,1]/100, gamma)*100
+            chroma = colorLCH[:,:,1]
+            np.divide(chroma, 100, out=chroma)
+            np.power(chroma, gamma, out=chroma)
+            np.multiply(chroma, 100, out=chroma)
 
 
             #colorRGB_sat = Lab_to_sRGB(colour.LCHab_to_Lab(colorLCH), apply_cctf_encoding=True)
             #res.colorData = colorRGB_sat
             #res.linear = False
-            res.colorData = colorLCH
+            # results image
+            res = scratch.copyImage(img, colorData=colorLCH)
             res.linear = False
             res.colorSpace = image.ColorSpace.build('Lch')
 
-
-        end = timer()
-        if pref.verbose: print(" [PROCESS-PROFILING] (",end - start,")>> saturation(",img.name,"):", kwargs)
+        else:
+            # results image
+            res = scratch.copyImage(img)
 
         return res
+
+    def plan(self, state, **kwargs):
+        """Kernels of compute(): conversion to Lch and chroma scaling if saturation is not 0, else copy (see Processing.plan())."""
+        if kwargs.get('saturation', 0.0) == 0.0: return {'identity': True, 'steps': [plan.step('copy')], 'state': state}
+        steps = [plan.step('cctf_decoding', conversion=True)] if not state['linear'] else []
+        steps += [plan.step('sRGB_to_Lch', conversion=True), plan.step('saturation')]
+        state['linear'], state['colorSpace'] = False, 'Lch'
+        return {'identity': False, 'steps': steps, 'state': state}
 # -----------------------------------------------------------------------------
 # --- Class colorEditor ------------------------------------------------------
 # -----------------------------------------------------------------------------
@@ -841,6 +1125,11 @@ class colorEditor(Processing):
     """
     TODO - Documentation de la classe colorEditor
     """
+
+    defaultValue= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)}, 
+                   'tolerance': 0.1,
+                   'edit': {'hue':0.0,'exposure':0.0,'contrast':0.0,'saturation':0.0}, 
+                   'mask': False}
     
     def compute(self,img, **kwargs):
         """color editor operator
@@ -852,16 +1141,16 @@ class colorEditor(Processing):
                                 'tolerance': 0.1,
                                 'edit': {'hue':0.0,'exposure':0.0,'contrast':0.0,'saturation':0.0}, 
                                 'mask': False}                
+                statistics (dict, optional): maxima of lightness and chroma of the whole
+                    image (see statistics()), default: computed on img
                 
         Returns:
             (hdrCore.image.Image): output image
                 
         """
-        start = timer()
-        defaultValue= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)}, 
-                       'tolerance': 0.1,
-                       'edit': {'hue':0.0,'exposure':0.0,'contrast':0.0,'saturation':0.0}, 
-                       'mask': False}
+        statistics = kwargs.pop('statistics', None)
+        ctx = ExecutionContext.current()
+        defaultValue= copy.deepcopy(colorEditor.defaultValue)
 
         if not kwargs: kwargs = defaultValue  # default value
         if not ('selection' in kwargs): kwargs['selection'] =   defaultValue['selection']
@@ -870,40 +1159,29 @@ class colorEditor(Processing):
         if not ('mask' in kwargs):      kwargs['mask'] =         defaultValue['mask']
 
 
-        # results image
-        res = copy.deepcopy(img)
-
-        # computing
+        # computing: working arrays are scratch buffers (see hdrCore.scratch), edits are done in place
         if kwargs != defaultValue:
             colorRGB = None
-            if res.colorSpace.name == 'Lch':
-                colorLCH = res.colorData
-            elif res.colorSpace.name == 'sRGB':
+            if img.colorSpace.name == 'Lch':
+                colorLCH = scratch.empty(img.colorData.shape, img.colorData.dtype, 'lch')
+                np.copyto(colorLCH, img.colorData)
+            elif img.colorSpace.name == 'sRGB':
 
-                covnStart = timer()
-                if res.linear: 
+                colorLCH = sRGB_to_Lch(img.colorData, apply_cctf_decoding=not img.linear, tag='lch')
 
-                    colorLab = sRGB_to_Lab(res.colorData, apply_cctf_decoding=False)
-                    colorLCH = colour.Lab_to_LCHab(colorLab)
-
-                else:
-
-                    colorLab = sRGB_to_Lab(res.colorData, apply_cctf_decoding=True)
-                    colorLCH = colour.Lab_to_LCHab(colorLab)
-                covnEnd = timer()
-
-            # selection from colorLCH
-            colorDataHue =          copy.deepcopy(colorLCH[:,:,2])
-            colorDataChroma =       copy.deepcopy(colorLCH[:,:,1])
-            colorDataLightness =    copy.deepcopy(colorLCH[:,:,0])
+            # selection from colorLCH (views: masks are computed before edits)
+            colorDataHue =          colorLCH[:,:,2]
+            colorDataChroma =       colorLCH[:,:,1]
+            colorDataLightness =    colorLCH[:,:,0]
 
             # selection mask
             hMin, hMax = kwargs['selection']['hue'] if 'hue' in kwargs['selection'].keys() else defaultValue['selection']['hue']
             cMin, cMax = kwargs['selection']['chroma'] if 'chroma' in kwargs['selection'].keys() else defaultValue['selection']['chroma']
             lMin, lMax = kwargs['selection']['lightness']if 'hue' in kwargs['selection'].keys() else defaultValue['selection']['lightness']
             # take into account Chroma, Lightness range
-            cMax = cMax*max(100.0,np.amax(colorDataChroma))/100.0
-            lMax = lMax*max(100.0,np.amax(colorDataLightness))/100.0
+            if not statistics: statistics = {'lightness': np.amax(colorDataLightness), 'chroma': np.amax(colorDataChroma)}
+            cMax = cMax*max(100.0,statistics['chroma'])/100.0
+            lMax = lMax*max(100.0,statistics['lightness'])/100.0
 
             # tolerance
             hueTolerance = kwargs['tolerance']*360      # hue range ~ 360
@@ -911,42 +1189,47 @@ class colorEditor(Processing):
             lightTolerance = kwargs['tolerance']*100    # lightness range ~ 100
 
 
-            maskStart = timer()
 
-            lightnessMask =     utils.NPlinearWeightMask(colorDataLightness, lMin, lMax, lightTolerance)
-            chromaMask =        utils.NPlinearWeightMask(colorDataChroma, cMin, cMax, chromaTolerance)
-            hueMask =           utils.NPlinearWeightMask(colorDataHue, hMin, hMax, hueTolerance)
+            shape, dtype = colorLCH.shape[:2], colorLCH.dtype
+            tmp =               scratch.empty(shape, dtype, 'tmp')
+            lightnessMask =     utils.NPlinearWeightMask(colorDataLightness, lMin, lMax, lightTolerance, out=scratch.empty(shape, dtype, 'lightnessMask'), tmp=tmp)
+            chromaMask =        utils.NPlinearWeightMask(colorDataChroma, cMin, cMax, chromaTolerance, out=scratch.empty(shape, dtype, 'chromaMask'), tmp=tmp)
+            hueMask =           utils.NPlinearWeightMask(colorDataHue, hMin, hMax, hueTolerance, out=scratch.empty(shape, dtype, 'hueMask'), tmp=tmp)
 
-            maskEnd = timer()
 
-            mask = np.minimum(lightnessMask, np.minimum(chromaMask,hueMask))
-            compMask = 1.0 - mask
-            # hueShift (in Lch)
+            mask = np.minimum(lightnessMask, np.minimum(chromaMask,hueMask, out=chromaMask), out=lightnessMask)
+            compMask = np.subtract(1.0, mask, out=hueMask)
+            # hueShift (in Lch): ((hue+hueShift)%360)*mask + hue*compMask
             hueShift =  kwargs['edit']['hue']  if 'hue' in kwargs['edit'].keys() else defaultValue['edit']['hue']
             if hueShift != 0.0:
-                colorLCH[:,:,2] = ((colorLCH[:,:,2]+hueShift)%360)*mask + colorLCH[:,:,2]*compMask
+                shifted = np.add(colorLCH[:,:,2], hueShift, out=tmp)
+                np.mod(shifted, 360, out=shifted)
+                shifted *= mask
+                colorLCH[:,:,2] *= compMask
+                colorLCH[:,:,2] += shifted
 
-            # saturation (in Lch)
+            # saturation (in Lch): power(chroma/100, gamma)*100*mask + chroma*compMask
             saturation = kwargs['edit']['saturation'] if 'saturation' in kwargs['edit'].keys() else defaultValue['edit']['saturation']
             if saturation != 0 :
                 gamma = 1/((saturation/25)+1) if saturation >= 0 else (-saturation/25)+1
-                colorLCH[:,:,1] =np.power(colorLCH[:,:,1]/100, gamma)*100*mask + colorLCH[:,:,1]*compMask
-
-            # exposure (in RGB)
+                saturated = np.divide(colorLCH[:,:,1], 100, out=tmp)
+                np.power(saturated, gamma, out=saturated)
+                saturated *= 100
+                saturated *= mask
+                colorLCH[:,:,1] *= compMask
+                colorLCH[:,:,1] += saturated
+
+            # exposure (in RGB): colorRGB*2^ev*mask + colorRGB*compMask
             ev =  kwargs['edit']['exposure'] if 'exposure' in kwargs['edit'].keys() else defaultValue['edit']['exposure']
             if ev != 0.0 :
-                colorRGB = Lch_to_sRGB(colorLCH,apply_cctf_encoding=False, clip=False)
-                colorRGBev = copy.deepcopy(colorRGB*math.pow(2,ev))
-                colorRGBev[:,:,0] = colorRGBev[:,:,0]*mask
-                colorRGBev[:,:,1] = colorRGBev[:,:,1]*mask
-                colorRGBev[:,:,2] = colorRGBev[:,:,2]*mask
-
-                colorRGB[:,:,0] = colorRGB[:,:,0]*compMask
-                colorRGB[:,:,1] = colorRGB[:,:,1]*compMask
-                colorRGB[:,:,2] = colorRGB[:,:,2]*compMask
-                colorRGB = colorRGB + colorRGBev
-
-            # contrast (in RGB prime)
+                colorRGB = Lch_to_sRGB(colorLCH,apply_cctf_encoding=False, clip=False, tag='output')
+                colorRGBev = np.multiply(colorRGB, math.pow(2,ev), out=scratch.empty(colorRGB.shape, colorRGB.dtype, 'rgbEdit'))
+                colorRGBev *= mask[:,:,np.newaxis]
+
+                colorRGB *= compMask[:,:,np.newaxis]
+                colorRGB += colorRGBev
+
+            # contrast (in RGB prime): ((colorRGB-pivot)*scalingFactor+pivot)*mask + colorRGB*compMask
             con =  kwargs['edit']['contrast'] if 'exposure' in kwargs['edit'].keys() else defaultValue['edit']['contrast']
             if con != 0 :
                 con = con/100
@@ -960,45 +1243,114 @@ class colorEditor(Processing):
 
                 pivot = math.pow(2,ev)*(lMin+lMax)/2/100
 
-                if not isinstance(colorRGB, np.ndarray):    colorRGB = Lch_to_sRGB(colorLCH,apply_cctf_encoding=True, clip=False)
-                else :                                      colorRGB = colour.cctf_encoding(colorRGB, function='sRGB')
+                if not isinstance(colorRGB, np.ndarray):    colorRGB = Lch_to_sRGB(colorLCH,apply_cctf_encoding=True, clip=False, tag='output')
+                elif ctx.computation == 'numba':
+                    from . import numbafun
+                    colorRGB = numbafun.numba_cctf_sRGB_encoding(colorRGB, out=colorRGB)
+                else :                                      colorRGB = sRGB_encoding(colorRGB, out=colorRGB)
                 
-                colorRGBcon = (colorRGB-pivot)*scalingFactor+pivot
+                colorRGBcon = np.subtract(colorRGB, pivot, out=scratch.empty(colorRGB.shape, colorRGB.dtype, 'rgbEdit'))
+                colorRGBcon *= scalingFactor
+                colorRGBcon += pivot
+                colorRGBcon *= mask[:,:,np.newaxis]
 
-                colorRGB[:,:,0] = colorRGBcon[:,:,0]*mask+ colorRGB[:,:,0]*compMask
-                colorRGB[:,:,1] = colorRGBcon[:,:,1]*mask+ colorRGB[:,:,1]*compMask
-                colorRGB[:,:,2] = colorRGBcon[:,:,2]*mask+ colorRGB[:,:,2]*compMask
+                colorRGB *= compMask[:,:,np.newaxis]
+                colorRGB += colorRGBcon
 
-                colorRGB = colour.cctf_decoding(colorRGB, function='sRGB')
+                if ctx.computation == 'numba':
+                    from . import numbafun
+                    colorRGB = numbafun.numba_cctf_sRGB_decoding(colorRGB, out=colorRGB)
+                else:
+                    colorRGB = sRGB_decoding(colorRGB, out=colorRGB)
 
             # final step
-            if not isinstance(colorRGB, np.ndarray): colorRGB = Lch_to_sRGB(colorLCH,apply_cctf_encoding=False, clip=False)
-            res.colorData = colorRGB
+            if not isinstance(colorRGB, np.ndarray): colorRGB = Lch_to_sRGB(colorLCH,apply_cctf_encoding=False, clip=False, tag='output')
+            # results image
+            res = scratch.copyImage(img, colorData=colorRGB)
+            res.colorSpace = image.ColorSpace.build('sRGB')
+            res.linear = True
+
+        elif img.colorSpace.name == 'Lch':
+            # return to RGB (linear)
+            colorRGB = Lch_to_sRGB(img.colorData,apply_cctf_encoding=False, clip=False, tag='output')
+            res = scratch.copyImage(img, colorData=colorRGB)
             res.colorSpace = image.ColorSpace.build('sRGB')
             res.linear = True
 
         else:
-            if res.colorSpace.name == 'Lch':
-                colorLCH = res.colorData
-                # return to RGB (linear)
-                colorRGB = Lch_to_sRGB(colorLCH,apply_cctf_encoding=False, clip=False)
-                res.colorData = colorRGB
-                res.colorSpace = image.ColorSpace.build('sRGB')
-                res.linear = True
+            # results image
+            res = scratch.copyImage(img)
 
         showMask = kwargs['mask']
         if showMask:
-            res.colorData[:,:,0] = copy.deepcopy(mask)
-            res.colorData[:,:,1] = copy.deepcopy(mask)
-            res.colorData[:,:,2] = copy.deepcopy(mask)
+            res.colorData[:,:,0] = mask
+            res.colorData[:,:,1] = mask
+            res.colorData[:,:,2] = mask
 
             res.colorSpace = image.ColorSpace.build('sRGB')
             res.linear = False
 
-        end = timer()
-        if pref.verbose: print(" [PROCESS-PROFILING](",end - start,") >> colorEditor(",img.name,"):", kwargs)
-
         return res
+
+    def needStatistics(self, **kwargs):
+        """Check if compute() uses image-wide statistics: selection range is
+        scaled by the maxima of lightness and chroma (parameters not default).
+
+        Args:
+            **kwargs: parameters (see compute())
+
+        Returns:
+            bool: True if compute() requires the statistics keyword argument
+        """
+        params = copy.deepcopy(colorEditor.defaultValue)
+        params.update(kwargs)
+        return params != colorEditor.defaultValue
+
+    def statistics(self, img):
+        """Compute maxima of lightness and chroma (Lch) of an image.
+
+        Args:
+            img (hdrCore.image.Image): input image (sRGB or Lch)
+
+        Returns:
+            dict: {'lightness': max lightness, 'chroma': max chroma}
+        """
+        if img.colorSpace.name == 'Lch':
+            colorLCH = img.colorData
+        else:
+            colorLCH = sRGB_to_Lch(img.colorData, apply_cctf_decoding=not img.linear)
+        return {'lightness': float(np.amax(colorLCH[:,:,0])), 'chroma': float(np.amax(colorLCH[:,:,1]))}
+
+    def plan(self, state, **kwargs):
+        """Kernels of compute(): conversion to Lch, masks, edits in Lch then in RGB, conversion
+        to linear sRGB (see Processing.plan())."""
+        kwargs.pop('statistics', None)
+        params = copy.deepcopy(colorEditor.defaultValue)
+        params.update(kwargs)
+        if params == colorEditor.defaultValue:
+            if state['colorSpace'] == 'Lch':
+                state['linear'], state['colorSpace'] = True, 'sRGB'
+                return {'identity': True, 'steps': [plan.step('Lch_to_sRGB', conversion=True)], 'state': state}
+            return {'identity': True, 'steps': [plan.step('copy')], 'state': state}
+
+        if state['colorSpace'] == 'Lch':    steps = [plan.step('copy')]
+        elif not state['linear']:           steps = [plan.step('cctf_decoding', conversion=True), plan.step('sRGB_to_Lch', conversion=True)]
+        else:                               steps = [plan.step('sRGB_to_Lch', conversion=True)]
+        steps.append(plan.step('colorMasks'))
+        edit = params['edit']
+        if edit.get('hue', 0.0) != 0.0:         steps.append(plan.step('lchEdit'))
+        if edit.get('saturation', 0.0) != 0.0:  steps.append(plan.step('lchEdit'))
+        rgb = False
+        if edit.get('exposure', 0.0) != 0.0:
+            steps += [plan.step('Lch_to_sRGB', conversion=True), plan.step('rgbEdit')]
+            rgb = True
+        if edit.get('contrast', 0.0) != 0.0:
+            if not rgb: steps.append(plan.step('Lch_to_sRGB', conversion=True))
+            steps += [plan.step('cctf_encoding', conversion=True), plan.step('rgbEdit'), plan.step('cctf_decoding', conversion=True)]
+            rgb = True
+        if not rgb: steps.append(plan.step('Lch_to_sRGB', conversion=True))
+        state['linear'], state['colorSpace'] = not params['mask'], 'sRGB'
+        return {'identity': False, 'steps': steps, 'state': state}
 # -----------------------------------------------------------------------------
 # --- Class lightnessMask ----------------------------------------------------
 # -----------------------------------------------------------------------------
@@ -1006,6 +1358,8 @@ class lightnessMask(Processing):
     """
     TODO - Documentation de la classe lightnessMask
     """
+
+    defaultValue = { 'shadows': False, 'blacks': False, 'mediums': False, 'whites': False, 'highlights': False}
     
     def compute(self, img, **kwargs):
         """
@@ -1022,8 +1376,8 @@ class lightnessMask(Processing):
             TODO
                 TODO
         """
-        start = timer()
-        defaultMask = { 'shadows': False, 'blacks': False, 'mediums': False, 'whites': False, 'highlights': False}
+        ctx = ExecutionContext.current()
+        defaultMask = lightnessMask.defaultValue
         rangeMask = {   'shadows': [0,20], 
                          'blacks': [20,40], 
                          'mediums': [40,60], 
@@ -1037,27 +1391,30 @@ class lightnessMask(Processing):
         if not kwargs: kwargs = defaultMask  # default value 
 
         # results image
-        res = copy.deepcopy(img)
+        res = scratch.copyImage(img)
 
         if kwargs != defaultMask:
 
             if img.linear: 
-                res.colorData = colour.cctf_encoding(res.colorData, function='sRGB') # encode to prime   
+                res.colorData = sRGB_encoding(res.colorData, out=res.colorData) # encode to prime   
                 res.linear = False
 
+            # mask in place: Y is computed before
             colorDataY = sRGB_to_XYZ(res.colorData, apply_cctf_decoding=False)[:,:,1]
-            mask = copy.deepcopy(res.colorData)
-
             for key in rangeMask.keys():
                 if kwargs[key]: # mask on
-                    mask[(colorDataY >= rangeMask[key][0]/100)*(colorDataY<rangeMask[key][1]/100),:] = np.asarray(maskColor[key])
-
-            res.colorData = mask
-        
-        end = timer()
-        if pref.verbose: print(" [PROCESS-PROFILING](",end - start,") >> lightnessMask(",res.name,"):", kwargs)
+                    res.colorData[(colorDataY >= rangeMask[key][0]/100)*(colorDataY<rangeMask[key][1]/100),:] = np.asarray(maskColor[key])
 
         return res
+
+    def plan(self, state, **kwargs):
+        """Kernels of compute(): copy, then encoding (linear input), luminance and mask if a range is on (see Processing.plan())."""
+        steps = [plan.step('copy')]
+        if (not kwargs) or kwargs == lightnessMask.defaultValue: return {'identity': True, 'steps': steps, 'state': state}
+        if state['linear']: steps.append(plan.step('cctf_encoding', conversion=True))
+        steps += [plan.step('sRGB_to_XYZ', conversion=True), plan.step('lightnessMask')]
+        state['linear'] = False
+        return {'identity': False, 'steps': steps, 'state': state}
 # -----------------------------------------------------------------------------
 # --- Class geometry ---------------------------------------------------------
 # -----------------------------------------------------------------------------
@@ -1104,7 +1461,7 @@ class geometry(Processing):
         Raises:
             ValueError: If transformation parameters are invalid
         """
-        start = timer()
+        ctx = ExecutionContext.current()
         defaultValue = { 'ratio': (16,9), 'up': 0,'rotation': 0.0}
         if not kwargs: kwargs = defaultValue  # default value 
         ratio =     kwargs['ratio']     if 'ratio' in kwargs.keys()     else defaultValue['ratio']
@@ -1112,36 +1469,80 @@ class geometry(Processing):
         rotation =  kwargs['rotation']  if 'rotation' in kwargs.keys()  else defaultValue['rotation']
 
         # results image
-        res = copy.deepcopy(img)
+        res = scratch.copyImage(img)
 
         ##if kwargs != defaultValue:
         h,w, c = res.colorData.shape
-        imgRatio = w/h
+        y0, y1, x0, x1 = geometry.cropWindow(h, w, ratio, up)
+        if (y0, y1, x0, x1) != (0, h, 0, w):
+            res.colorData = res.colorData[y0:y1,x0:x1,:]
+            res.shape = res.colorData.shape
 
+        if rotation != 0 :
+            res.colorData = skimage.transform.rotate(res.colorData, rotation, clip = False, resize=False)
+            h,w, _ = res.colorData.shape
+            y0, y1, x0, x1 = geometry.rotatedWindow(h, w, rotation)
+            res.colorData = res.colorData[y0:y1,x0:x1,:]
+            res.shape = res.colorData.shape
+
+        return res
+    # -------------------------------------------------------------------------
+    def plan(self, state, **kwargs):
+        """Kernels of compute(): copy, crop (view) and rotation, output shape as compute() (see Processing.plan())."""
+        h, w, c = state['shape']
+        steps = [plan.step('copy')]
+        y0, y1, x0, x1 = geometry.cropWindow(h, w, kwargs.get('ratio', (16,9)), kwargs.get('up', 0))
+        identity = (y0, y1, x0, x1) == (0, h, 0, w)
+        if not identity: steps.append(plan.step('crop'))
+        h, w = y1-y0, x1-x0
+        rotation = kwargs.get('rotation', 0.0)
+        if rotation != 0:
+            steps.append(plan.step('rotate', shape=(h, w, c)))
+            y0, y1, x0, x1 = geometry.rotatedWindow(h, w, rotation)
+            h, w, identity = y1-y0, x1-x0, False
+        state['shape'] = (h, w, c)
+        return {'identity': identity, 'steps': steps, 'state': state}
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def cropWindow(h, w, ratio, up):
+        """
+        Compute the window kept by the ratio crop (first step of geometry).
+
+        Args:
+            h, w (int): image height and width
+            ratio ((int,int)): target aspect ratio (width, height)
+            up (int): vertical offset of the window in percent
+
+        Returns:
+            (int,int,int,int): y0, y1, x0, x1 of the window
+        """
+        imgRatio = w/h
         if int(imgRatio*1000) != int(ratio[0]/ratio[1]*1000):
             if imgRatio < (ratio[0]/ratio[1]):
                 hh16x9 = int(w*ratio[1]/ratio[0]/2)
                 ch = h//2
                 up = int((h//2-hh16x9)*up/100)
-                res.colorData = res.colorData[(ch-hh16x9-up):(ch+hh16x9-up),:,:]
-                res.shape = res.colorData.shape
+                return max(0,ch-hh16x9-up), min(h,ch+hh16x9-up), 0, w
             else:
                 ww16x9 = int(h*ratio[0]/ratio[1]/2)
                 ch = w//2
-                res.colorData = res.colorData[:,(ch-ww16x9):(ch+ww16x9),:]
-                res.shape = res.colorData.shape
-
-        if rotation != 0 :
-            res.colorData = skimage.transform.rotate(res.colorData, rotation, clip = False, resize=False)
-            h,w, _ = res.colorData.shape
-            hh,ww = utils.croppRotated(h,w,rotation)
-            res.colorData = res.colorData[int(h/2-hh/2):int(h/2+hh/2), int(w/2-ww/2):int(w/2+ww/2),:]
-            res.shape = res.colorData.shape
+                return 0, h, max(0,ch-ww16x9), min(w,ch+ww16x9)
+        return 0, h, 0, w
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def rotatedWindow(h, w, rotation):
+        """
+        Compute the window kept after rotation (no black borders).
 
-        end = timer()
-        if pref.verbose: print(" [PROCESS-PROFILING] (",end-start,")>> geometry(",res.name,"):", kwargs)
+        Args:
+            h, w (int): image height and width
+            rotation (float): rotation angle in degrees
 
-        return res
+        Returns:
+            (int,int,int,int): y0, y1, x0, x1 of the window
+        """
+        hh,ww = utils.croppRotated(h,w,rotation)
+        return int(h/2-hh/2), int(h/2+hh/2), int(w/2-ww/2), int(w/2+ww/2)
 # -----------------------------------------------------------------------------
 
 # -----------------------------------------------------------------------------
@@ -1181,11 +1582,15 @@ class ProcessPipe(object):
         - processNodes ([ProcessNode]): List of processing nodes
         - previewHDR (bool): HDR preview state
         - previewHDR_process (): HDR preview process
+        - context (hdrCore.context.ExecutionContext): settings of the pipeline
+          (working size, backend, dtype, threads, verbosity, disk cache, buffer reuse)
+        - arena (hdrCore.scratch.ScratchArena): arrays of nodes reused across computes
+          (context.reuseBuffers): outputs are valid until the next compute
 
     Class Attributes:
-        autoResize (bool): Enables automatic resizing
-        maxSize (int): Maximum size for resizing
-        maxWorking (int): Maximum size for processing
+        autoResize (bool): Default autoResize setting of new pipelines
+        maxSize (int): Maximum size for resizing (thumbnails)
+        maxWorking (int): Default maxWorking setting of new pipelines
 
     Usage:
         # Create a pipeline
@@ -1283,10 +1688,49 @@ class ProcessPipe(object):
                 - Operation is executed only if update is required
                 - Output image is cached for subsequent calls
                 - Node state is updated after computation
+                - Wall time, bytes allocated (output data), input shape and backend are
+                  reported to hdrCore.profiling.profiler if enabled, and memory
+                  (allocations, high-water mark, RSS growth) if memory is traced
+                - Data type policy (see hdrCore.context): the operator computes in
+                  context.dtype, its output is kept in context.storage
+
+            Raises:
+                TypeError: if context.strictDtype is set and the operator emits data
+                    of another type than context.dtype
             """
-            self.outputImage = self.process.compute(img,**self.params)
+            start = timer()
+            memory = profiling.profiler.memoryStart() if profiling.profiler.traceMemory else None
+            ctx = ExecutionContext.current()
+            storage = np.dtype(ctx.storage or ctx.dtype)
+
+            # input of another type (output kept in storage type): computed in a working copy
+            if isinstance(img.colorData, np.ndarray) and img.colorData.dtype != ctx.dtype:
+                img = copy.copy(img)
+                img.colorData = toWorkingType(img.colorData, out=scratch.empty(img.colorData.shape, ctx.dtype, 'input'))
+
+            # output kept in storage type: the operator computes in an output shared by nodes (owner None)
+            active = scratch.ScratchArena.current()
+            with active[0].activate(None) if active and storage != ctx.dtype else contextlib.nullcontext():
+                self.outputImage = self.process.compute(img,**self.params)
             self.requireUpdate = False
 
+            data = self.outputImage.colorData
+            if isinstance(data, np.ndarray) and data.dtype != ctx.dtype:
+                message = type(self.process).__name__+" emits "+data.dtype.name+" data, context dtype is "+np.dtype(ctx.dtype).name
+                if ctx.strictDtype: raise TypeError("ProcessNode "+self.name+": "+message)
+                if ctx.verbose: print("WARNING[ProcessNode.compute(",self.name,"):", message, ">> cast]")
+            if isinstance(data, np.ndarray) and data.dtype != storage:
+                self.outputImage.colorData = toWorkingType(data, out=scratch.empty(data.shape, storage, 'output'))
+                self.outputImage.shape = data.shape
+
+            if profiling.profiler.enabled or ctx.verbose:
+                dt = timer() - start
+                if profiling.profiler.enabled:
+                    profiling.profiler.record(self.name, start, dt, nbytes=getattr(self.outputImage.colorData, 'nbytes', 0),
+                                              shape=getattr(img.colorData, 'shape', None), backend=ctx.computation,
+                                              memory=profiling.profiler.memoryEnd(memory))
+                if ctx.verbose: print(" [PROCESS-PROFILING] (",dt,")>>",self.name,"(",img.name,"):", self.params)
+
         def condCompute(self,img):
             """
             Conditionally execute the processing operation.
@@ -1348,13 +1792,18 @@ class ProcessPipe(object):
     # --- End of ProcessNode -------------------------------------------
     # -------------------------------------------------------------------------
     
-    def __init__(self):
+    def __init__(self, context=None):
         """
         Initialize a new processing pipeline.
 
         Creates an empty pipeline ready to accept processing operations.
         Initializes internal state and image storage.
 
+        Args:
+            context (hdrCore.context.ExecutionContext, optional): settings of the pipeline,
+                default: built from preferences with ProcessPipe.autoResize and ProcessPipe.maxWorking,
+                nodes reuse their arrays (reuseBuffers)
+
         Attributes:
             originalImage (hdrCore.image.Image): Original source image
             __inputImage (hdrCore.image.Image): Current input image
@@ -1376,6 +1825,112 @@ class ProcessPipe(object):
         self.previewHDR = True
         self.previewHDR_process = None
 
+        # per pipeline: an export does not change interactive pipelines
+        if not context: context = ExecutionContext(autoResize=ProcessPipe.autoResize, maxWorking=ProcessPipe.maxWorking, reuseBuffers=True)
+        self.context = context
+        # arrays of nodes: a recompute with other parameters does not allocate images
+        self.arena = scratch.ScratchArena()
+
+    @staticmethod
+    def buildDefault(context=None):
+        """
+        Create the default uHDR processing pipeline.
+
+        Builds a ProcessPipe with all editing stages configured with default
+        parameters: exposure, contrast, tone curve, lightness mask, saturation,
+        five color editors and geometry. This is the pipeline edited in the GUI
+        (guiQt.model.EditImageModel.buildProcessPipe) and whose parameters are
+        stored in the 'processpipe' metadata.
+
+        WARNING: The initial pipe does not have an input image and must be
+        configured with setImage() before use.
+
+        Args:
+            context (hdrCore.context.ExecutionContext, optional): settings of the pipeline
+
+        Returns:
+            ProcessPipe: Configured processing pipeline with default parameters
+        """
+        processPipe = ProcessPipe(context)
+
+        # exposure ---------------------------------------------------------------------------------------------------------
+        defaultParameterEV = {'EV': 0}                                              
+        idExposureProcessNode = processPipe.append(exposure(), paramDict=None,name="exposure")   
+        processPipe.setParameters(idExposureProcessNode, defaultParameterEV)                                        
+
+        # contrast ---------------------------------------------------------------------------------------------------------
+        defaultParameterContrast = {'contrast': 0}                                  
+        idContrastProcessNode = processPipe.append(contrast(), paramDict=None,  name="contrast") 
+        processPipe.setParameters(idContrastProcessNode, defaultParameterContrast)                                  
+
+        #tonecurve ---------------------------------------------------------------------------------------------------------
+        defaultParameterYcurve = {'start':[0,0], 
+                                  'shadows': [10,10],
+                                  'blacks': [30,30], 
+                                  'mediums': [50,50], 
+                                  'whites': [70,70], 
+                                  'highlights': [90,90], 
+                                  'end': [100,100]}                         
+        idYcurveProcessNode = processPipe.append(Ycurve(), paramDict=None,name="tonecurve")      
+        processPipe.setParameters(idYcurveProcessNode, defaultParameterYcurve)   
+        
+        # masklightness ---------------------------------------------------------------------------------------------------------
+        defaultMask = { 'shadows': False, 
+                       'blacks': False, 
+                       'mediums': False, 
+                       'whites': False, 
+                       'highlights': False}
+        idLightnessMaskProcessNode = processPipe.append(lightnessMask(), paramDict=None, name="lightnessmask")  
+        processPipe.setParameters(idLightnessMaskProcessNode, defaultMask)  
+
+        # saturation ---------------------------------------------------------------------------------------------------------
+        defaultValue = {'saturation': 0.0,  'method': 'gamma'}
+        idSaturationProcessNode = processPipe.append(saturation(), paramDict=None, name="saturation")    
+        processPipe.setParameters(idSaturationProcessNode, defaultValue)                     
+
+        # colorEditor0 ---------------------------------------------------------------------------------------------------------
+        defaultParameterColorEditor0= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
+                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
+                                       'mask': False}        
+        idColorEditor0ProcessNode = processPipe.append(colorEditor(), paramDict=None, name="colorEditor0")  
+        processPipe.setParameters(idColorEditor0ProcessNode, defaultParameterColorEditor0)
+
+        # colorEditor1 ---------------------------------------------------------------------------------------------------------
+        defaultParameterColorEditor1= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
+                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
+                                       'mask': False}        
+        idColorEditor1ProcessNode = processPipe.append(colorEditor(), paramDict=None, name="colorEditor1")  
+        processPipe.setParameters(idColorEditor1ProcessNode, defaultParameterColorEditor1)
+        
+        # colorEditor2 ---------------------------------------------------------------------------------------------------------
+        defaultParameterColorEditor2= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
+                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
+                                       'mask': False}        
+        idColorEditor2ProcessNode = processPipe.append(colorEditor(), paramDict=None, name="colorEditor2")  
+        processPipe.setParameters(idColorEditor2ProcessNode, defaultParameterColorEditor2)
+        
+        # colorEditor3 ---------------------------------------------------------------------------------------------------------
+        defaultParameterColorEditor3= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
+                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
+                                       'mask': False}        
+        idColorEditor3ProcessNode = processPipe.append(colorEditor(), paramDict=None, name="colorEditor3")  
+        processPipe.setParameters(idColorEditor3ProcessNode, defaultParameterColorEditor3)
+        
+        # colorEditor4 ---------------------------------------------------------------------------------------------------------
+        defaultParameterColorEditor4= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
+                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
+                                       'mask': False}        
+        idColorEditor4ProcessNode = processPipe.append(colorEditor(), paramDict=None, name="colorEditor4")  
+        processPipe.setParameters(idColorEditor4ProcessNode, defaultParameterColorEditor4)
+
+        # geometry ---------------------------------------------------------------------------------------------------------
+        defaultValue = { 'ratio': (16,9), 'up': 0,'rotation': 0.0}
+        idGeometryNode = processPipe.append(geometry(), paramDict=None, name="geometry")    
+        processPipe.setParameters(idGeometryNode, defaultValue)
+        # ------------ --------------------------------------------------------------------------------------------------------- 
+
+        return processPipe
+
     def append(self,process,paramDict=None,name=None):
         """
         Add a processing operation to the pipeline.
@@ -1410,12 +1965,14 @@ class ProcessPipe(object):
         """
         return self.__outputImage.name
 
-    def setImage(self,img):
+    def setImage(self,img,context=None):
         """
         Set the input image for the processing pipeline.
 
         Args:
             img (hdrCore.image.Image): Input image to process
+            context (hdrCore.context.ExecutionContext, optional): context of this call,
+                default: the pipeline context (self.context)
 
         Notes:
             - Creates deep copies of the image for safety
@@ -1424,16 +1981,17 @@ class ProcessPipe(object):
             - Initializes pipeline metadata from image
             - Marks all operations for update
         """
-        if pref.verbose: print(" [PROCESS] >> ProcessPipe.setImage(",img.name,")")
+        ctx = context if context else self.context
+        if ctx.verbose: print(" [PROCESS] >> ProcessPipe.setImage(",img.name,")")
 
         # resize input for faster computation
-        if ProcessPipe.autoResize:
+        if ctx.autoResize:
             height, width, channels = img.shape
-            if (height>= width) and (height>ProcessPipe.maxWorking):
-                img = img.process(resize(),size=(ProcessPipe.maxWorking,None))
+            if (height>= width) and (height>ctx.maxWorking):
+                img = img.process(resize(),size=(ctx.maxWorking,None))
 
-            elif (width>=height) and (width>ProcessPipe.maxWorking):   
-                img = img.process(resize(),size=(None,ProcessPipe.maxWorking))
+            elif (width>=height) and (width>ctx.maxWorking):   
+                img = img.process(resize(),size=(None,ctx.maxWorking))
 
         self.originalImage= copy.deepcopy(img)
 
@@ -1441,55 +1999,71 @@ class ProcessPipe(object):
         self.__outputImage = copy.deepcopy(img)
      
         if not img.linear: 
-            if pref.computation == 'python':
-                start = timer()
-                img.colorData =     np.float32(colour.cctf_decoding(img.colorData, function='sRGB'))
+            if ctx.computation == 'python':
+                img.colorData =     np.asarray(colour.cctf_decoding(img.colorData, function='sRGB'), dtype=ctx.dtype)
                 img.linear =        True
 
-            elif pref.computation == 'numba':
-                start = timer()
+            elif ctx.computation == 'numba':
+
+                from . import numbafun
                 img.colorData= numbafun.numba_cctf_sRGB_decoding(img.colorData)
                 img.linear =        True
 
-            elif pref.computation == 'cuda':
-                start = timer()
+            elif ctx.computation == 'cuda':
+
+                from . import numbafun
                 img.colorData =     numbafun.cuda_cctf_sRGB_decoding(img.colorData) # encode to prime
                 img.linear =        True
 
-            dt = timer() - start
 
         # input image is set as __inputImage
         self.__inputImage = img
+        # buffers of the previous image
+        self.arena.release()
 
         # requireUpdate is set to True
         for processNode in self.processNodes: processNode.requireUpdate = True
 
         # recover medata to initialize processPipe
         if 'processpipe' in img.metadata.metadata:
-            processpipeMetadata = img.metadata.metadata['processpipe']
+            self.setParametersFromDict(img.metadata.metadata['processpipe'])
+
+    def setParametersFromDict(self, processpipeMetadata):
+        """
+        Set parameters of processing nodes from a toDict() list.
+
+        Args:
+            processpipeMetadata (list): list of {node name: parameters}, as returned
+                by toDict() and stored in 'processpipe' metadata
 
-            if isinstance(processpipeMetadata,list):
-                for pMeta in processpipeMetadata:
+        Notes:
+            - Unknown node names are ignored
+            - Nodes not in the list keep their parameters
+        """
+        if isinstance(processpipeMetadata,list):
+            for pMeta in processpipeMetadata:
 
-                    key = list(pMeta.keys())[0]
-                    param = pMeta[key]
-                    idProcess = self.getProcessNodeByName(key)
-                    if idProcess != -1:
-                        self.setParameters(idProcess,param)
+                key = list(pMeta.keys())[0]
+                param = pMeta[key]
+                idProcess = self.getProcessNodeByName(key)
+                if idProcess != -1:
+                    self.setParameters(idProcess,param)
 
-    def setOutput(self, img):
+    def setOutput(self, img, share=False):
         """
         Set the output image of the pipeline.
 
         Args:
             img (hdrCore.image.Image): New output image
+            share (bool, optional): keep img, not a copy (e.g. result of coreCcompute
+                in the pipeline arena, valid until the next compute) (default: False)
 
         Notes:
-            - Creates a deep copy of the image
+            - Creates a deep copy of the image unless share is set
             - Updates pipeline state
             - Preserves original and input images
         """
-        self.__outputImage = copy.deepcopy(img)
+        self.__outputImage = img if share else copy.deepcopy(img)
         pass
 
     def getInputImage(self):
@@ -1501,7 +2075,7 @@ class ProcessPipe(object):
 
         Notes:
             - Returns None if no image has been set
-            - Image may be resized from original if autoResize is enabled
+            - Image may be resized from original if context.autoResize is enabled
         """
         return self.__inputImage
 
@@ -1525,42 +2099,44 @@ class ProcessPipe(object):
             # conditionnal encoding or decoding to prime, linear
 
             if (not self.originalImage.linear) and self.__outputImage.linear:
-                self.__outputImage.colorData = colour.cctf_encoding(self.__outputImage.colorData, function='sRGB')
+                self.__outputImage.colorData = np.asarray(colour.cctf_encoding(self.__outputImage.colorData, function='sRGB'), dtype=self.context.dtype)
                 self.__outputImage.linear =  False
 
-                if pref.verbose: print(" [PROCESS] >> ProcessPipe.getImage(",self.__outputImage.name,", toneMap:",toneMap,"): encode to sRGB !")
+                if self.context.verbose: print(" [PROCESS] >> ProcessPipe.getImage(",self.__outputImage.name,", toneMap:",toneMap,"): encode to sRGB !")
 
             elif self.__outputImage.isHDR() and self.__outputImage.linear and toneMap:
-                self.__outputImage.colorData = colour.cctf_encoding(self.__outputImage.colorData, function='sRGB')
+                self.__outputImage.colorData = np.asarray(colour.cctf_encoding(self.__outputImage.colorData, function='sRGB'), dtype=self.context.dtype)
                 self.__outputImage.linear =  False
 
-                if pref.verbose: print(" [PROCESS] >> ProcessPipe.getImage(",self.__outputImage.name,", ,toneMap:",toneMap,"): tone map using cctf encoding !")
+                if self.context.verbose: print(" [PROCESS] >> ProcessPipe.getImage(",self.__outputImage.name,", ,toneMap:",toneMap,"): tone map using cctf encoding !")
 
             elif self.__outputImage.isHDR() and (not self.__outputImage.linear) and (not toneMap):
-                self.__outputImage.colorData = colour.cctf_decoding(self.__outputImage.colorData, function='sRGB')
+                self.__outputImage.colorData = np.asarray(colour.cctf_decoding(self.__outputImage.colorData, function='sRGB'), dtype=self.context.dtype)
                 self.__outputImage.linear =  True
 
-                if pref.verbose: print(" [PROCESS] >> ProcessPipe.getImage(",self.__outputImage.name,", toneMap:",toneMap,"): decoding to linear colorspace !")
+                if self.context.verbose: print(" [PROCESS] >> ProcessPipe.getImage(",self.__outputImage.name,", toneMap:",toneMap,"): decoding to linear colorspace !")
 
             elif (not self.__outputImage.linear) and (not toneMap):
-                self.__outputImage.colorData = colour.cctf_decoding(self.__outputImage.colorData, function='sRGB')
+                self.__outputImage.colorData = np.asarray(colour.cctf_decoding(self.__outputImage.colorData, function='sRGB'), dtype=self.context.dtype)
                 self.__outputImage.linear =  True
 
-                if pref.verbose: print(" [PROCESS] >> ProcessPipe.getImage(",self.__outputImage.name,", toneMap:",toneMap,"): decoding to linear colorspace !")
+                if self.context.verbose: print(" [PROCESS] >> ProcessPipe.getImage(",self.__outputImage.name,", toneMap:",toneMap,"): decoding to linear colorspace !")
 
             else:
-                if pref.verbose: print(" [PROCESS] >> ProcessPipe.getImage(",self.__outputImage.name,", toneMap:",toneMap,"): just return output !")
+                if self.context.verbose: print(" [PROCESS] >> ProcessPipe.getImage(",self.__outputImage.name,", toneMap:",toneMap,"): just return output !")
 
             return self.__outputImage
         else: return None
 
-    def compute(self,progress=None):
+    def compute(self,progress=None,context=None):
         """
         Execute the processing pipeline.
 
         Args:
             progress (object, optional): Progress tracking object with showMessage
                 and repaint methods
+            context (hdrCore.context.ExecutionContext, optional): context of this compute,
+                default: the pipeline context (self.context)
 
         Notes:
             - Executes operations in sequence
@@ -1568,28 +2144,80 @@ class ProcessPipe(object):
             - Preserves original image
             - Handles operation dependencies
             - Updates output image after completion
+            - Operators run with the pipeline context (ExecutionContext.current())
+            - Output data has the type of the context (context.dtype), whatever the
+              type nodes keep their outputs in (context.storage)
         """
         if self.__inputImage:
+            ctx = context if context else self.context
 
-            if len(self.processNodes)>0: 
-                # first node
-                if progress:
-                    progress.showMessage('computing: '+self.processNodes[0].name+' start!')
-                    progress.repaint()
-                self.processNodes[0].condCompute(self.__inputImage)
-                if progress:
-                    progress.showMessage('computing: '+self.processNodes[0].name+' done!')
-                    progress.repaint()
-                # other nodes
-                for i,processNode in enumerate(self.processNodes[1:]):
+            with ctx.activate():
+                if len(self.processNodes)>0: 
+                    # first node
                     if progress:
-                        progress.showMessage('computing: '+processNode.name+' start!')
+                        progress.showMessage('computing: '+self.processNodes[0].name+' start!')
                         progress.repaint()
-                    processNode.condCompute(self.processNodes[i].outputImage)
+                    self.condComputeNode(0, self.__inputImage, ctx)
                     if progress:
-                        progress.showMessage('computing: '+processNode.name+' done!')
+                        progress.showMessage('computing: '+self.processNodes[0].name+' done!')
                         progress.repaint()
+                    # other nodes
+                    for i,processNode in enumerate(self.processNodes[1:]):
+                        if progress:
+                            progress.showMessage('computing: '+processNode.name+' start!')
+                            progress.repaint()
+                        self.condComputeNode(i+1, self.processNodes[i].outputImage, ctx)
+                        if progress:
+                            progress.showMessage('computing: '+processNode.name+' done!')
+                            progress.repaint()
             self.__outputImage=self.processNodes[-1].outputImage
+            # outputs kept in storage type: the output of the pipeline is in dtype
+            data = self.__outputImage.colorData
+            if isinstance(data, np.ndarray) and data.dtype != ctx.dtype:
+                self.__outputImage = copy.copy(self.__outputImage)
+                self.__outputImage.colorData = data.astype(ctx.dtype)
+
+    def condComputeNode(self, idx, img, context=None):
+        """
+        Conditionally execute a processing node, using the disk cache for full size images.
+
+        Args:
+            idx (int): index of the node
+            img (hdrCore.image.Image): input image of the node
+            context (hdrCore.context.ExecutionContext, optional): context of the compute,
+                default: the pipeline context (self.context)
+
+        Notes:
+            - Disk cache is used only if the context has a cache and autoResize is off
+              (export, HDR display): working size computations are fast enough
+            - Cache key: source file, input shape and parameters of nodes 0..idx
+            - Without disk cache, the node gets its arrays from the pipeline arena
+              if context.reuseBuffers is set (see hdrCore.scratch)
+        """
+        processNode = self.processNodes[idx]
+        if not processNode.requireUpdate: return
+
+        ctx = context if context else self.context
+        if not (ctx.cache and (not ctx.autoResize) and isinstance(self.originalImage, image.Image)):
+            with self.arena.activate(processNode.name) if ctx.reuseBuffers else contextlib.nullcontext():
+                processNode.compute(img)
+            return
+
+        sourceFilename = os.path.join(self.originalImage.path, self.originalImage.name)
+        stage = 'node-'+processNode.name+'-'+ctx.cache.stageKey(list(self.__inputImage.shape), [p.toDict() for p in self.processNodes[:idx+1]])
+        cached = ctx.cache.get(sourceFilename, stage)
+        if cached:
+            res = copy.copy(img)
+            res.colorData = cached.toArray(ctx.storage or ctx.dtype)
+            res.shape = res.colorData.shape
+            res.linear = cached.info['linear']
+            res.type = image.imageType[cached.info['type']]
+            processNode.outputImage = res
+            processNode.requireUpdate = False
+        else:
+            processNode.compute(img)
+            out = processNode.outputImage
+            ctx.cache.put(sourceFilename, stage, out.colorData, {'linear': out.linear, 'type': out.type.name}, storage=ctx.storage or ctx.dtype)
 
     def setParameters(self,id,paramDicts):
         """
@@ -1695,6 +2323,25 @@ class ProcessPipe(object):
         for p in self.processNodes: res.append(p.toDict())
         return res
 
+    def explain(self, shape=None):
+        """
+        Get the execution plan of the next compute, without computing.
+
+        Args:
+            shape (tuple of int, optional): (height, width) of a new input image, e.g.
+                full size of an export (all nodes are computed), default: current
+                input image, only dirty nodes (requireUpdate) are computed
+
+        Returns:
+            dict: plan (see hdrCore.plan.explain(), hdrCore.plan.formatPlan()):
+                per node: dirty, identity, kernels and conversions, estimated time
+                and memory
+
+        Example:
+            print(plan.formatPlan(processPipe.explain(shape=(4320,7680))))
+        """
+        return plan.explain(self, shape)
+
     def updateProcessPipeMetadata(self):
         """
         Update metadata for all images in the pipeline.
@@ -1705,7 +2352,7 @@ class ProcessPipe(object):
             - Handles missing images gracefully
         """
         ppMeta = self.toDict()
-        if pref.verbose: print(" [PROCESS] >> ProcessPipe.updateMetadata(","):",ppMeta)
+        if self.context.verbose: print(" [PROCESS] >> ProcessPipe.updateMetadata(","):",ppMeta)
         if isinstance(self.originalImage,image.Image):  self.originalImage.metadata.metadata['processpipe'] =   copy.deepcopy(ppMeta)
         if isinstance(self.__inputImage,image.Image):   self.__inputImage.metadata.metadata['processpipe'] =    copy.deepcopy(ppMeta)
         if isinstance(self.__outputImage,image.Image):  self.__outputImage.metadata.metadata['processpipe'] =   copy.deepcopy(ppMeta)
@@ -1723,7 +2370,7 @@ class ProcessPipe(object):
             - Preserves existing metadata
             - Handles missing images gracefully
         """
-        if pref.verbose: print(" [PROCESS] >> ProcessPipe.updateUserMeta(",")")
+        if self.context.verbose: print(" [PROCESS] >> ProcessPipe.updateUserMeta(",")")
         if isinstance(self.originalImage,image.Image):  self.originalImage.metadata.metadata[tagRootName] =   copy.deepcopy(meta)
         if isinstance(self.__inputImage,image.Image):   self.__inputImage.metadata.metadata[tagRootName] =    copy.deepcopy(meta)
         if isinstance(self.__outputImage,image.Image):  self.__outputImage.metadata.metadata[tagRootName] =   copy.deepcopy(meta)
@@ -1748,8 +2395,9 @@ class ProcessPipe(object):
             - Updates metadata for export
             - Restores pipeline state after export
         """
-        # recover input and processpipe metadata
-        input = copy.deepcopy(self.originalImage)
+        # recover input and processpipe metadata (save is deferred and done only if changed)
+        # setImage replaces originalImage: no copy is required to restore it
+        input = self.originalImage
         input.metadata.metadata['processpipe'] = self.toDict()
         input.metadata.save()
 
@@ -1757,11 +2405,12 @@ class ProcessPipe(object):
         img = image.Image.read(self.originalImage.path+'/'+self.originalImage.name)
         if size: img = img.process(resize(),size=(None, size[1]))
 
-        ProcessPipe.autoResize = False # set off autoresize
+        # full size: computed with a derived context, the pipeline context is unchanged
+        ctx = self.context.derive(autoResize=False)
 
-        self.setImage(img)
+        self.setImage(img, context=ctx)
 
-        self.compute(progress=progress)
+        self.compute(progress=progress, context=ctx)
         ###### res = hdrCore.coreC.coreCcompute(img, self)
 
         res = self.getImage(toneMap=False)
@@ -1770,7 +2419,6 @@ class ProcessPipe(object):
         res.metadata = copy.deepcopy(img.metadata)                  # exif, hdr use case, ...
         res.metadata.metadata['processpipe'] = None                  # reset process pipe  
         
-        ProcessPipe.autoResize = True# restore autoresize
         if to:
             res.colorData = res.colorData*to['scaling']
             res.metadata.metadata['display'] = to['tag']     # set display
@@ -0,0 +1,481 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+HDR Core Profiling Module
+
+This module records where computation time goes: process-pipe nodes, the C++
+core and tiles report events (name, wall time, bytes allocated, input shape,
+backend) to the profiler. Events are kept in a bounded buffer, summarized per
+name (rolling timings, see guiQt.view.ProfilingView) and exported to the
+Chrome trace format (chrome://tracing, https://ui.perfetto.dev).
+
+Profiling is disabled by default (pref.profiling): callers test
+profiler.enabled before measuring, so that a disabled profiler costs one
+attribute test per node.
+
+Memory tracing (profiler.enable(memory=True)) adds to node and export
+events the bytes allocated and the allocation high-water mark (tracemalloc,
+numpy arrays included), the RSS of the process after the step and its growth
+during the step (sampled before and after). It slows down computation: it is
+off unless requested.
+
+Interactive latency (class latency) measures the time from the GUI event of
+a control to the display of the image computed with its value (percentiles
+per control).
+
+Startup profiling (uHDR.py --profile-startup) records the imports of new
+modules (profiler.traceImports(), category 'import') and the construction
+of the main window (category 'startup').
+
+Example:
+    profiler.enable()
+    processPipe.compute()
+    profiler.exportChromeTrace('uHDR-trace.json')
+
+Classes:
+    - profiler: recorder of profiling events
+    - latency: event-to-display latency of interactive edits
+
+Functions:
+    - currentRSS: resident set size of a process, sampled now
+    - peakRSS: peak resident set size of the process
+    - percentile: percentile of values (nearest rank)
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import os, sys, json, math, builtins, threading, collections, contextlib, tracemalloc
+from timeit import default_timer as timer
+import preferences.preferences as pref
+
+# -----------------------------------------------------------------------------
+# --- Functions ---------------------------------------------------------------
+# -----------------------------------------------------------------------------
+def _windowsMemoryCounters():
+    """
+    Returns:
+        PROCESS_MEMORY_COUNTERS or None: memory counters of the process (Windows only)
+    """
+    try:
+        import ctypes, ctypes.wintypes
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', ctypes.wintypes.DWORD), ('PageFaultCount', ctypes.wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(PROCESS_MEMORY_COUNTERS)
+        if ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return counters
+    except Exception:
+        pass
+    return None
+# -----------------------------------------------------------------------------
+def currentRSS(pid=None, private=False):
+    """
+    Get the resident set size (physical memory in use) of a process, sampled now.
+
+    Args:
+        pid (int, optional): process identifier (default: this process)
+        private (bool, optional): only pages not shared with other processes
+            (shared memory frames and mapped files excluded)
+
+    Returns:
+        int or None: bytes, None if unknown
+    """
+    try: # linux: size resident shared ... (pages)
+        with open(f"/proc/{pid if pid else 'self'}/statm") as f: fields = f.read().split()
+        pages = int(fields[1])-int(fields[2]) if private else int(fields[1])
+        return pages*os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+        process = psutil.Process(pid)
+        return process.memory_full_info().uss if private else process.memory_info().rss
+    except Exception:
+        pass
+    if pid is None and not private:
+        counters = _windowsMemoryCounters()
+        if counters: return counters.WorkingSetSize
+    return None
+# -----------------------------------------------------------------------------
+def peakRSS():
+    """
+    Get the peak resident set size (high-water mark of physical memory) of the
+    process over its lifetime (see currentRSS for a step).
+
+    Returns:
+        int or None: bytes, None if unknown
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak*1024     # bytes on macOS, KiB on Linux
+    except ImportError:
+        pass
+    counters = _windowsMemoryCounters()
+    return counters.PeakWorkingSetSize if counters else None
+# -----------------------------------------------------------------------------
+def percentile(values, q):
+    """
+    Get a percentile of values (nearest rank method).
+
+    Args:
+        values (list of float): values
+        q (float): percentile in [0, 100]
+
+    Returns:
+        float or None: None if values is empty
+    """
+    if not values: return None
+    values = sorted(values)
+    return values[min(len(values), max(1, math.ceil(q/100*len(values))))-1]
+# -----------------------------------------------------------------------------
+# --- Class profiler ----------------------------------------------------------
+# -----------------------------------------------------------------------------
+class profiler(object):
+    """
+    Recorder of profiling events (class attributes and static methods: one
+    recorder per process).
+
+    An event is a dict:
+        - name (str): node name, 'coreCcompute', stage of a tile, ...
+        - category (str): 'node', 'core', 'tile', ...
+        - start (float): start time (timeit.default_timer, seconds)
+        - duration (float): wall time (seconds)
+        - nbytes (int): bytes allocated (output image data)
+        - shape (tuple or None): input image shape
+        - backend (str or None): computation backend
+        - thread (int): thread identifier
+        - allocated, peak, rss, rssGrowth (int): memory tracing only (see memoryEnd())
+
+    Class Attributes:
+        enabled (bool): events are recorded (default: pref.profiling)
+        traceMemory (bool): memory of nodes and exports is traced
+        events (collections.deque): last maxEvents events
+        maxEvents (int): size of the event buffer
+    """
+
+    enabled = getattr(pref, 'profiling', False)
+    traceMemory = False
+    maxEvents = 20000
+    events = collections.deque(maxlen=maxEvents)
+    lock = threading.Lock()
+    # memory spans in progress: [traced memory at start, highest traced memory seen]
+    memorySpans = []
+    startedTracemalloc = False
+
+    @staticmethod
+    def enable(enabled=True, memory=None):
+        """
+        Enable or disable recording.
+
+        Args:
+            enabled (bool, optional): True to record events (default: True)
+            memory (bool, optional): trace memory (tracemalloc), default: unchanged,
+                disabling the profiler stops memory tracing
+        """
+        profiler.enabled = enabled
+        if memory is None: memory = profiler.traceMemory and enabled
+        if memory and not profiler.traceMemory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                profiler.startedTracemalloc = True
+        elif not memory and profiler.traceMemory:
+            if profiler.startedTracemalloc: tracemalloc.stop()
+            profiler.startedTracemalloc = False
+            with profiler.lock: profiler.memorySpans.clear()
+        profiler.traceMemory = memory
+        if pref.verbose: print(" [PROFILING] >> profiler.enable(",enabled,", memory:",memory,")")
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def memoryStart():
+        """
+        Start a memory span (memory tracing only): the traced high-water mark
+        is reset, spans can be nested (export > nodes).
+
+        Returns:
+            list or None: span, given to memoryEnd(), None if memory is not traced
+        """
+        if not (profiler.traceMemory and tracemalloc.is_tracing()): return None
+        with profiler.lock:
+            current, peak = tracemalloc.get_traced_memory()
+            # enclosing spans keep the high-water mark reached before the reset
+            for span in profiler.memorySpans: span[1] = max(span[1], peak)
+            tracemalloc.reset_peak()
+            span = [current, current, currentRSS()]
+            profiler.memorySpans.append(span)
+        return span
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def memoryEnd(span):
+        """
+        End a memory span.
+
+        Args:
+            span (list or None): returned by memoryStart()
+
+        Returns:
+            dict: 'allocated': bytes still allocated since the start (output, caches),
+                'peak': high-water mark of allocations above the start, 'rss': RSS of the
+                process at the end, 'rssGrowth': RSS at the end minus RSS at the start
+                (bytes, None if unknown), empty if span is None
+        """
+        if span is None or not tracemalloc.is_tracing(): return {}
+        with profiler.lock:
+            current, peak = tracemalloc.get_traced_memory()
+            if span in profiler.memorySpans: profiler.memorySpans.remove(span)
+            high = max(span[1], peak)
+            for other in profiler.memorySpans: other[1] = max(other[1], high)
+        rss = currentRSS()
+        return {'allocated': current-span[0], 'peak': high-span[0], 'rss': rss,
+                'rssGrowth': rss-span[2] if (rss is not None and span[2] is not None) else None}
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def clear():
+        """Remove all recorded events."""
+        with profiler.lock: profiler.events.clear()
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def record(name, start, duration, category='node', nbytes=0, shape=None, backend=None, memory=None, **args):
+        """
+        Record an event (even if the profiler is disabled: callers test enabled).
+
+        Args:
+            name (str): event name
+            start (float): start time (timeit.default_timer)
+            duration (float): wall time (seconds)
+            category (str, optional): event category (default: 'node')
+            nbytes (int, optional): bytes allocated
+            shape (tuple, optional): input image shape
+            backend (str, optional): computation backend
+            memory (dict, optional): returned by memoryEnd()
+            **args: other values exported with the event
+        """
+        event = {'name': name, 'category': category, 'start': start, 'duration': duration,
+                 'nbytes': int(nbytes), 'shape': tuple(shape) if shape is not None else None,
+                 'backend': backend, 'thread': threading.get_ident()}
+        if memory: event.update(memory)
+        if args: event['args'] = args
+        with profiler.lock: profiler.events.append(event)
+    # -------------------------------------------------------------------------
+    @staticmethod
+    @contextlib.contextmanager
+    def span(name, category='node', **kwargs):
+        """
+        Context manager recording the wall time of its block (nothing if disabled).
+
+        Args:
+            name (str): event name
+            category (str, optional): event category (default: 'node')
+            **kwargs: see record()
+
+        Example:
+            with profiler.span('export', category='export', shape=img.shape):
+                ...
+        """
+        if not profiler.enabled:
+            yield
+            return
+        start = timer()
+        memory = profiler.memoryStart()
+        try: yield
+        finally: profiler.record(name, start, timer()-start, category=category, memory=profiler.memoryEnd(memory), **kwargs)
+    # -------------------------------------------------------------------------
+    @staticmethod
+    @contextlib.contextmanager
+    def traceImports():
+        """
+        Context manager recording the imports of modules not yet imported in its
+        block (category 'import', nothing if disabled). Times are cumulative:
+        nested imports are included and recorded as nested events. Relative
+        imports are counted in the time of the importing module.
+
+        Example:
+            with profiler.traceImports():
+                import guiQt.controller
+        """
+        if not profiler.enabled:
+            yield
+            return
+        original = builtins.__import__
+        def tracedImport(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in sys.modules: return original(name, globals, locals, fromlist, level)
+            start = timer()
+            try: return original(name, globals, locals, fromlist, level)
+            finally: profiler.record(name, start, timer()-start, category='import')
+        builtins.__import__ = tracedImport
+        try: yield
+        finally: builtins.__import__ = original
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def summary(window=20, category=None):
+        """
+        Summarize the last events of each name and category (rolling timings).
+
+        Args:
+            window (int, optional): number of last events per name (default: 20)
+            category (str, optional): only events of this category (default: all)
+
+        Returns:
+            list of dict: per name and category, in order of first appearance: name, category, count
+                (events in window), last, mean, max, p50, p95, p99 (seconds), nbytes, shape, backend (of the last event),
+                peak: highest allocation high-water mark in window (bytes, None if memory is not traced),
+                rss: RSS of the process after the last event, rssGrowth: highest RSS growth of an
+                event in window (bytes or None)
+        """
+        with profiler.lock: events = list(profiler.events)
+        byName = collections.OrderedDict()
+        for event in events:
+            if category and event['category'] != category: continue
+            byName.setdefault((event['category'], event['name']), collections.deque(maxlen=window)).append(event)
+
+        res = []
+        for (_, name), last in byName.items():
+            durations = [event['duration'] for event in last]
+            res.append({'name': name, 'category': last[-1]['category'], 'count': len(durations),
+                        'last': durations[-1], 'mean': sum(durations)/len(durations), 'max': max(durations),
+                        'p50': percentile(durations, 50), 'p95': percentile(durations, 95), 'p99': percentile(durations, 99),
+                        'nbytes': last[-1]['nbytes'], 'shape': last[-1]['shape'], 'backend': last[-1]['backend'],
+                        'peak': max((event['peak'] for event in last if 'peak' in event), default=None), 'rss': last[-1].get('rss'),
+                        'rssGrowth': max((event['rssGrowth'] for event in last if event.get('rssGrowth') is not None), default=None)})
+        return res
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def chromeTrace():
+        """
+        Get the recorded events in the Chrome trace event format (complete events).
+
+        Returns:
+            dict: {'traceEvents': [...], 'displayTimeUnit': 'ms'}
+        """
+        with profiler.lock: events = list(profiler.events)
+        origin = min((event['start'] for event in events), default=0.0)
+        pid = os.getpid()
+        traceEvents = []
+        for event in events:
+            args = {'nbytes': event['nbytes'], 'shape': list(event['shape']) if event['shape'] else None, 'backend': event['backend']}
+            for key in ('allocated', 'peak', 'rss', 'rssGrowth'):
+                if key in event: args[key] = event[key]
+            args.update(event.get('args', {}))
+            traceEvents.append({'name': event['name'], 'cat': event['category'], 'ph': 'X',
+                                'ts': (event['start']-origin)*1e6, 'dur': event['duration']*1e6,
+                                'pid': pid, 'tid': event['thread'], 'args': args})
+            if 'peak' in event:
+                # memory counters: shown as a graph by trace viewers
+                traceEvents.append({'name': 'memory (MB)', 'ph': 'C', 'ts': (event['start']+event['duration']-origin)*1e6, 'pid': pid,
+                                    'args': {'peak': event['peak']/2**20, 'rss': (event['rss'] or 0)/2**20}})
+        return {'traceEvents': traceEvents, 'displayTimeUnit': 'ms'}
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def exportChromeTrace(filename):
+        """
+        Write the recorded events to a Chrome trace JSON file.
+
+        Args:
+            filename (str): output file (.json)
+
+        Returns:
+            int: number of events written
+        """
+        trace = profiler.chromeTrace()
+        with open(filename, 'w') as f: json.dump(trace, f, default=str)
+        if pref.verbose: print(" [PROFILING] >> profiler.exportChromeTrace(",filename,"):",len(trace['traceEvents']),"events")
+        return len(trace['traceEvents'])
+# -----------------------------------------------------------------------------
+# --- Class latency -----------------------------------------------------------
+# -----------------------------------------------------------------------------
+class latency(object):
+    """
+    Event-to-display latency of interactive edits: time from the GUI event of
+    a control (slider, LCH selector) to the display of the image computed
+    with its value.
+
+    Controllers stamp their events with input(), the compute request takes
+    the stamp (take(), see guiQt.thread.RequestCompute) and, once the image
+    is displayed, displayed() records one event of category 'latency' per
+    stamp, named after the control. Requests coalesced in one computation
+    share its display time: their latency includes the wait for the previous
+    computation, as felt by the user. Nothing is stamped if the profiler is
+    disabled.
+
+    Class Attributes:
+        window (int): number of last events per control of percentiles
+        lastInput (tuple or None): (control, start, value) of the last GUI event not yet requested
+    """
+
+    window = 200
+    lastInput = None
+
+    @staticmethod
+    def input(control, value=None):
+        """
+        Stamp a GUI event (GUI thread).
+
+        Args:
+            control (str): control name, e.g. 'exposure', 'colorEditor0.hue'
+            value (optional): value of the control, kept to replay events (benchmarks.latency)
+        """
+        if profiler.enabled: latency.lastInput = (control, timer(), value)
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def take(default):
+        """
+        Take the stamp of the last GUI event for a compute request.
+
+        Args:
+            default (str): control name if no event was stamped (request stamped now)
+
+        Returns:
+            tuple or None: (control, start, value), None if the profiler is disabled
+        """
+        if not profiler.enabled: return None
+        stamp, latency.lastInput = latency.lastInput, None
+        return stamp if stamp else (default, timer(), None)
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def displayed(stamps, **stages):
+        """
+        Record the latency of the events whose image is displayed.
+
+        Args:
+            stamps (list of tuple): returned by take()
+            **stages: durations of the stages of the update (seconds), e.g. compute, toneMap, display
+        """
+        end = timer()
+        for control, start, value in stamps:
+            profiler.record(control, start, end-start, category='latency', value=value, **stages)
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def summary(window=None):
+        """
+        Latency percentiles per control.
+
+        Args:
+            window (int, optional): number of last events per control (default: latency.window)
+
+        Returns:
+            list of dict: see profiler.summary(), p50, p95, p99 are latencies (seconds)
+        """
+        return profiler.summary(window if window else latency.window, category='latency')
+# -----------------------------------------------------------------------------
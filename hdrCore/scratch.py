@@ -0,0 +1,204 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+HDR Core Scratch Buffer Module
+
+During a slider drag the same image is recomputed many times with other
+parameters: without reuse, each node allocates its output image and its
+working arrays (color conversions, masks, luminance) at every compute.
+A ScratchArena keeps these arrays between computes: each ProcessPipe owns
+one, operators request their arrays from it by tag, shape and dtype, and get
+the array of the previous compute when they match. After the first compute,
+a recompute with other parameters does not allocate image-sized arrays.
+
+The tag 'output' is the data of the output image of a node: one per node,
+kept by the node until its next compute. Other tags are working arrays,
+valid during the compute of a node: nodes computed one after the other
+share them.
+
+ProcessPipe activates its arena (per thread, with the name of the computed
+node) when its context has reuseBuffers set. Operators call empty() and
+copyImage(): they allocate new arrays when no arena is active (tiles,
+export, operators called outside of a pipeline).
+
+The arrays of a node are rewritten by its next compute: the output image of
+a pipeline is valid until the pipeline is computed again, callers that keep
+it longer keep a copy (guiQt displays convert it to pixmaps at once).
+
+Classes:
+    - ScratchArena: buffers of a processing pipeline
+
+Functions:
+    - empty: working array from the active arena or new array
+    - copyImage: copy of an image with its data in the active arena
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import copy, threading, contextlib
+import numpy as np
+
+# -----------------------------------------------------------------------------
+# --- Class ScratchArena ------------------------------------------------------
+# -----------------------------------------------------------------------------
+class ScratchArena(object):
+    """
+    Buffers of a processing pipeline, reused across computes.
+
+    An output buffer is identified by its owner (node name), a working buffer
+    by its tag (e.g. 'lch', 'tmp') and dtype: a request with another shape
+    replaces it, so that an arena holds one output per node and one set of
+    working arrays whatever the images computed. Arenas are not pickled nor
+    deep copied: copies start empty.
+
+    Attributes:
+        - buffers (dict): (owner, tag, dtype) -> numpy.ndarray, owner is None for working buffers
+        - hits (int): requests served by an existing buffer
+        - misses (int): requests that allocated a buffer
+
+    Class Attributes:
+        local (threading.local): stack of active (arena, owner) of each thread
+    """
+
+    local = threading.local()
+
+    def __init__(self):
+        """Initialize an empty arena."""
+        self.buffers = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+    # -------------------------------------------------------------------------
+    def get(self, owner, tag, shape, dtype):
+        """
+        Get a buffer, its content is undefined (as numpy.empty).
+
+        Args:
+            owner (str): node name
+            tag (str): 'output' or working array
+            shape (tuple of int): array shape
+            dtype (numpy.dtype): array type
+
+        Returns:
+            numpy.ndarray: C-contiguous array
+        """
+        shape, dtype = tuple(shape), np.dtype(dtype)
+        key = (owner if tag == 'output' else None, tag, dtype.str)
+        with self.lock:
+            buffer = self.buffers.get(key)
+            if buffer is not None and buffer.shape == shape:
+                self.hits += 1
+                return buffer
+            self.misses += 1
+            buffer = np.empty(shape, dtype=dtype)
+            self.buffers[key] = buffer
+            return buffer
+    # -------------------------------------------------------------------------
+    def nbytes(self):
+        """
+        Returns:
+            int: bytes held by the buffers
+        """
+        with self.lock: return sum(buffer.nbytes for buffer in self.buffers.values())
+    # -------------------------------------------------------------------------
+    def release(self):
+        """Free all buffers (e.g. when the image of the pipeline changes)."""
+        with self.lock: self.buffers.clear()
+    # -------------------------------------------------------------------------
+    @contextlib.contextmanager
+    def activate(self, owner):
+        """
+        Make the arena the current one of the calling thread, buffers are
+        requested for owner.
+
+        Args:
+            owner (str): node name
+
+        Example:
+            with processPipe.arena.activate(processNode.name):
+                processNode.compute(img)
+        """
+        stack = ScratchArena.local.__dict__.setdefault('stack', [])
+        stack.append((self, owner))
+        try: yield self
+        finally: stack.pop()
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def current():
+        """
+        Return the active arena of the calling thread.
+
+        Returns:
+            (ScratchArena, str) or None: arena and owner, None if no arena is active
+        """
+        stack = getattr(ScratchArena.local, 'stack', None)
+        return stack[-1] if stack else None
+    # -------------------------------------------------------------------------
+    def __getstate__(self): return {}
+    def __setstate__(self, state): self.__init__()
+    # -------------------------------------------------------------------------
+    def __repr__(self):
+        return "<class ScratchArena: buffers: "+str(len(self.buffers))+", nbytes: "+str(self.nbytes())+ \
+               ", hits: "+str(self.hits)+", misses: "+str(self.misses)+">"
+# -----------------------------------------------------------------------------
+# --- Functions ---------------------------------------------------------------
+# -----------------------------------------------------------------------------
+def empty(shape, dtype, tag):
+    """
+    Get an array of the computed node: from the active arena, or a new array
+    if no arena is active. Its content is undefined (as numpy.empty).
+
+    Args:
+        shape (tuple of int): array shape
+        dtype (numpy.dtype): array type
+        tag (str): 'output' (data of the output image) or working array, unique in the node
+
+    Returns:
+        numpy.ndarray: C-contiguous array
+    """
+    active = ScratchArena.current()
+    if not active: return np.empty(shape, dtype=dtype)
+    arena, owner = active
+    return arena.get(owner, tag, shape, dtype)
+# -----------------------------------------------------------------------------
+def copyImage(img, colorData=None):
+    """
+    Copy an image (as copy.deepcopy) with its data in the 'output' buffer of
+    the active arena.
+
+    Args:
+        img (hdrCore.image.Image): image
+        colorData (numpy.ndarray, optional): data of the copy, used as is (not
+            copied): default: copy of img.colorData
+
+    Returns:
+        hdrCore.image.Image: copy of img
+    """
+    data = img.colorData
+    if not isinstance(data, np.ndarray): return copy.deepcopy(img)
+    if colorData is None:
+        colorData = empty(data.shape, data.dtype, 'output')
+        np.copyto(colorData, data)
+    # memo: deepcopy uses colorData for img.colorData, metadata and attributes are copied
+    res = copy.deepcopy(img, {id(data): colorData})
+    res.shape = colorData.shape
+    return res
+# -----------------------------------------------------------------------------
@@ -0,0 +1,467 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+HDR Core Render Server Module
+
+This module provides a render server: a local HTTP service rendering images
+at full resolution with the uHDR pipeline, so that parameters edited on a
+laptop can be rendered on a workstation. It does not depend on the GUI.
+
+API (JSON):
+    POST /render
+        request: {"image": image filename (on the server),
+                  "processpipe": process-pipe parameters (ProcessPipe.toDict() format, optional),
+                  "display": HDR display tag (optional, default: current display),
+                  "fit": resize to the display shape (optional, default: false),
+                  "output": output filename (optional)}
+        response: with "output": {"key", "output", "cached"}
+                  without "output": the rendered image (Radiance .hdr)
+    GET /status
+        response: {"workers", "queueSize", "inflight", "rendered", "hits", "failed", ...}
+
+Requests must be sent to localhost (Host header: localhost, 127.0.0.1 or the
+server address) with Content-Type application/json, so that a web page cannot
+post renders to the server. Images are read under the image root directories
+and outputs written under the output root directories only (HTTP 403).
+
+Renders run in worker processes (hdrCore.export workers). At most queueSize
+renders are queued or running, further requests are rejected (HTTP 503).
+Results are cached by key (source file, stored and requested parameters,
+display, backend), the same request is rendered once.
+
+Functions:
+    - requestRender: Send a render request to a server (client side)
+
+Classes:
+    - renderError: Error of a render request (with HTTP status)
+    - renderServer: Render server
+    - renderRequestHandler: HTTP request handler of the render server
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import os, json, shutil, tempfile, threading, concurrent.futures
+import http.server, urllib.request
+from . import export, cache, metadata, utils, worker
+import preferences.preferences as pref
+
+# -----------------------------------------------------------------------------
+# --- worker process ----------------------------------------------------------
+# -----------------------------------------------------------------------------
+def _renderWorker(filename, params, output, display, backend, fit):
+    """
+    Render one image in a worker process (initialized by hdrCore.worker.initWorker).
+
+    The image is written in a temporary file then renamed, so that the cache
+    never contains partial files.
+
+    Args:
+        filename (str): source image filename
+        params (list or None): process-pipe parameters
+        output (str): output filename
+        display (dict): display configuration
+        backend (str): 'python' or 'cpp'
+        fit (bool): resize output to fit the display shape
+
+    Returns:
+        str: output filename
+    """
+    path, name, ext = utils.filenamesplit(output)
+    tmpOutput = os.path.join(path, name+'.tmp.hdr')
+    try:
+        res = export.exportImageTargets(filename, None, [display], worker.workerProcessPipe(), backend, fit,
+                                        params=params, outputs=[tmpOutput])
+    finally:
+        # worker processes do not run exit handlers: write metadata now
+        metadata.metadataWriter.flushAll()
+    if not res: raise RuntimeError("render of "+filename+" failed")
+
+    os.replace(tmpOutput, output)
+    tmpMeta = os.path.join(path, name+'.tmp.json')
+    if os.path.isfile(tmpMeta): os.replace(tmpMeta, os.path.join(path, name+'.json'))
+    return output
+# -----------------------------------------------------------------------------
+# --- Class renderError -------------------------------------------------------
+# -----------------------------------------------------------------------------
+class renderError(Exception):
+    """
+    Error of a render request.
+
+    Attributes:
+        - status (int): HTTP status code
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+# -----------------------------------------------------------------------------
+# --- Class renderServer ------------------------------------------------------
+# -----------------------------------------------------------------------------
+class renderServer(object):
+    """
+    Render server: renders requests in worker processes, caches results.
+
+    Attributes:
+        - host (str): server address
+        - port (int): server port (0: any free port, updated by start())
+        - workers (int): number of worker processes
+        - queueSize (int): maximum number of renders queued or running
+        - backend (str): 'python' or 'cpp'
+        - cacheDir (str): directory of rendered images (<key>.hdr)
+        - imageRoots (list of str): directories images are read from (real paths)
+        - outputRoots (list of str): directories outputs are written to (real paths)
+        - maxCacheFiles (int): maximum number of rendered images kept in cache
+        - inflight (dict): futures of renders queued or running keyed by key
+        - stats (dict): counters (rendered, hits, failed, rejected)
+
+    Class Attributes:
+        defaultPort (int): default server port
+    """
+
+    defaultPort = 8765
+
+    def __init__(self, host='127.0.0.1', port=None, workers=None, queueSize=16, backend='python', cacheDir=None, maxCacheFiles=256,
+                 imageRoots=None, outputRoots=None):
+        """
+        Create the server (not started).
+
+        Args:
+            host (str, optional): server address (default: localhost only)
+            port (int, optional): server port (default: renderServer.defaultPort, 0: any free port)
+            workers (int, optional): number of worker processes (default: number of cores)
+            queueSize (int, optional): maximum number of renders queued or running
+            backend (str, optional): 'python' or 'cpp'
+            cacheDir (str, optional): directory of rendered images (default: <temp>/uHDR-render)
+            maxCacheFiles (int, optional): maximum number of rendered images kept in cache
+            imageRoots (list of str, optional): directories images are read from (default: current directory)
+            outputRoots (list of str, optional): directories outputs are written to (default: imageRoots)
+        """
+        self.host = host
+        self.port = renderServer.defaultPort if port == None else port
+        self.workers = workers if workers else (os.cpu_count() or 1)
+        self.queueSize = queueSize
+        self.backend = backend
+        self.cacheDir = cacheDir if cacheDir else os.path.join(tempfile.gettempdir(), 'uHDR-render')
+        self.maxCacheFiles = maxCacheFiles
+        self.imageRoots = [os.path.realpath(root) for root in (imageRoots if imageRoots else [os.getcwd()])]
+        self.outputRoots = [os.path.realpath(root) for root in outputRoots] if outputRoots else list(self.imageRoots)
+
+        # re-entrant: a done callback can run in the thread that adds it
+        self.lock = threading.RLock()
+        self.inflight = {}
+        self.stats = {'rendered': 0, 'hits': 0, 'failed': 0, 'rejected': 0}
+        self.pool = None
+        self.httpd = None
+    # -------------------------------------------------------------------------
+    def start(self):
+        """
+        Start worker processes and the HTTP server (in a background thread).
+
+        Returns:
+            tuple: (host, port) the server listens to
+        """
+        os.makedirs(self.cacheDir, exist_ok=True)
+        # metadata must be on disk before workers read it
+        metadata.metadataWriter.flushAll()
+        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers, initializer=worker.initWorker, initargs=(pref.verbose,))
+        self.httpd = http.server.ThreadingHTTPServer((self.host, self.port), renderRequestHandler)
+        self.httpd.renderServer = self
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        if pref.verbose: print(f" [SERVER] >> renderServer.start(): http://{self.host}:{self.port} ({self.workers} workers, queue: {self.queueSize})")
+        return (self.host, self.port)
+    # -------------------------------------------------------------------------
+    def stop(self):
+        """
+        Stop the HTTP server and worker processes.
+        """
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+        if self.pool:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def confine(filename, roots):
+        """
+        Resolve a filename (symbolic links, '..') and check it is under a root directory.
+
+        Args:
+            filename (str): file name
+            roots (list of str): root directories (real paths)
+
+        Returns:
+            str or None: real path, None if it is outside the roots
+        """
+        path = os.path.realpath(filename)
+        for root in roots:
+            if os.path.commonpath([root, path]) == root: return path
+        return None
+    # -------------------------------------------------------------------------
+    def render(self, request):
+        """
+        Render a request, or get it from cache.
+
+        Args:
+            request (dict): render request (see module documentation)
+
+        Returns:
+            dict: {'key', 'file' (rendered image in cache), 'cached',
+                'output' (if requested) or 'data' (rendered image content)}
+
+        Raises:
+            renderError: invalid request (400), image or output outside the roots (403),
+                image not found (404), render failed (500), queue full (503)
+        """
+        if not isinstance(request, dict): raise renderError(400, "request must be a JSON object")
+        filename = request.get('image', None)
+        if not isinstance(filename, str): raise renderError(400, "'image' is required")
+        path = renderServer.confine(filename, self.imageRoots)
+        if not path: raise renderError(403, "image outside the image directories: "+filename)
+        if not os.path.isfile(path): raise renderError(404, "image not found: "+filename)
+        filename = path
+        params = request.get('processpipe', None)
+        if not (params == None or isinstance(params, list)): raise renderError(400, "'processpipe' must be a list (ProcessPipe.toDict() format)")
+        try:
+            display = export.getDisplay(request.get('display', None))
+        except ValueError as e:
+            raise renderError(400, str(e))
+        fit = bool(request.get('fit', False))
+        output = request.get('output', None)
+        if output:
+            if not isinstance(output, str): raise renderError(400, "'output' must be a filename")
+            path = renderServer.confine(output, self.outputRoots)
+            if not path: raise renderError(403, "output outside the output directories: "+output)
+            output = path
+
+        # requested parameters override the stored ones: both are part of the key
+        meta = export.readMetadata(filename)
+        stored = meta.get('processpipe', None) if meta else None
+        key = cache.imageCache.stageKey(cache.imageCache.sourceKey(filename), stored, params, display, self.backend, fit)
+        cached = os.path.join(self.cacheDir, key+'.hdr')
+
+        res = {'key': key, 'file': cached}
+        for attempt in range(2):
+            res['cached'] = self.renderCached(key, filename, params, display, fit)
+            try:
+                if output:
+                    os.makedirs(os.path.dirname(output), exist_ok=True)
+                    shutil.copyfile(cached, output)
+                    res['output'] = output
+                else:
+                    with open(cached, 'rb') as file: res['data'] = file.read()
+                return res
+            except FileNotFoundError:
+                # removed by pruneCache since lookup: render again
+                if pref.verbose: print(f" [SERVER] >> renderServer.render(): {key} pruned from cache, render again")
+        raise renderError(500, "rendered image removed from cache: "+key)
+    # -------------------------------------------------------------------------
+    def renderCached(self, key, filename, params, display, fit):
+        """
+        Render an image in cache (<cacheDir>/<key>.hdr) if it is not there yet.
+
+        Args:
+            key (str): render key
+            filename (str): source image filename
+            params (list or None): process-pipe parameters
+            display (dict): display configuration
+            fit (bool): resize output to fit the display shape
+
+        Returns:
+            bool: True if the image was in cache
+
+        Raises:
+            renderError: render failed (500), queue full (503)
+        """
+        cached = os.path.join(self.cacheDir, key+'.hdr')
+        future, hit = None, False
+        with self.lock:
+            if os.path.isfile(cached):
+                hit = True
+                self.stats['hits'] += 1
+            else:
+                future = self.inflight.get(key, None)
+                if not future:
+                    if len(self.inflight) >= self.queueSize:
+                        self.stats['rejected'] += 1
+                        raise renderError(503, "render queue is full, retry later")
+                    future = self.pool.submit(_renderWorker, filename, params, cached, display, self.backend, fit)
+                    self.inflight[key] = future
+                    future.add_done_callback(lambda f, key=key: self.renderDone(key, f))
+        if future:
+            try:
+                future.result()
+            except Exception as e:
+                raise renderError(500, "render failed: "+str(e))
+        return hit
+    # -------------------------------------------------------------------------
+    def renderDone(self, key, future):
+        """
+        Called when a render ends: update counters and prune cache.
+
+        Args:
+            key (str): render key
+            future (concurrent.futures.Future): render future
+        """
+        with self.lock:
+            self.inflight.pop(key, None)
+            if future.cancelled() or future.exception(): self.stats['failed'] += 1
+            else:                                        self.stats['rendered'] += 1
+        self.pruneCache()
+    # -------------------------------------------------------------------------
+    def pruneCache(self):
+        """
+        Remove the oldest rendered images beyond maxCacheFiles.
+        """
+        try:
+            files = [os.path.join(self.cacheDir, f) for f in os.listdir(self.cacheDir) if f.endswith('.hdr') and not f.endswith('.tmp.hdr')]
+            files.sort(key=os.path.getmtime)
+            for f in files[:max(0, len(files)-self.maxCacheFiles)]:
+                os.remove(f)
+                if os.path.isfile(f[:-4]+'.json'): os.remove(f[:-4]+'.json')
+        except OSError as e:
+            print("WARNING[renderServer.pruneCache(): ",e,"]")
+    # -------------------------------------------------------------------------
+    def status(self):
+        """
+        Returns:
+            dict: server state and counters
+        """
+        with self.lock:
+            return dict(self.stats, workers=self.workers, queueSize=self.queueSize, inflight=len(self.inflight),
+                        backend=self.backend, cacheDir=self.cacheDir)
+# -----------------------------------------------------------------------------
+# --- Class renderRequestHandler ----------------------------------------------
+# -----------------------------------------------------------------------------
+class renderRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    HTTP request handler of the render server (self.server.renderServer).
+    """
+
+    server_version = 'uHDRrender/1.0'
+
+    # Host header values accepted besides the server address
+    localHosts = ('localhost', '127.0.0.1')
+
+    def checkHost(self):
+        """
+        Reject requests whose Host header is not localhost or the server address
+        (DNS rebinding: a web page posting to a name resolved to 127.0.0.1).
+
+        Returns:
+            bool: True if the request can be served, False if an error was sent
+        """
+        host = self.headers.get('Host', '')
+        if host.startswith('['): host = host[1:].split(']')[0]     # [IPv6]:port
+        else:                    host = host.rsplit(':', 1)[0]
+        if host.lower() in renderRequestHandler.localHosts + (self.server.renderServer.host,): return True
+        self.sendJSON(403, {'error': 'invalid Host header: '+self.headers.get('Host', '')})
+        return False
+    # -------------------------------------------------------------------------
+    def do_GET(self):
+        """GET /status"""
+        if not self.checkHost(): return
+        if self.path == '/status': self.sendJSON(200, self.server.renderServer.status())
+        else:                      self.sendJSON(404, {'error': 'unknown path: '+self.path})
+    # -------------------------------------------------------------------------
+    def do_POST(self):
+        """POST /render"""
+        if not self.checkHost(): return
+        if self.path != '/render':
+            self.sendJSON(404, {'error': 'unknown path: '+self.path})
+            return
+        if self.headers.get_content_type() != 'application/json':
+            self.sendJSON(415, {'error': 'Content-Type must be application/json'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length).decode('utf-8'))
+        except (ValueError, UnicodeDecodeError) as e:
+            self.sendJSON(400, {'error': 'invalid JSON request: '+str(e)})
+            return
+        try:
+            res = self.server.renderServer.render(request)
+        except renderError as e:
+            self.sendJSON(e.status, {'error': str(e)})
+            return
+
+        if 'output' in res:
+            self.sendJSON(200, res)
+        else:
+            data = res['data']
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/vnd.radiance')
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('X-uHDR-Key', res['key'])
+            self.send_header('X-uHDR-Cached', str(res['cached']).lower())
+            self.end_headers()
+            self.wfile.write(data)
+    # -------------------------------------------------------------------------
+    def sendJSON(self, status, obj):
+        """
+        Send a JSON response.
+
+        Args:
+            status (int): HTTP status code
+            obj (dict): response
+        """
+        data = json.dumps(obj).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    # -------------------------------------------------------------------------
+    def log_message(self, format, *args):
+        if pref.verbose: print(" [SERVER] >> "+(format % args))
+# -----------------------------------------------------------------------------
+# --- Client ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+def requestRender(filename, processpipe=None, display=None, output=None, fit=False, host='127.0.0.1', port=None, timeout=None):
+    """
+    Send a render request to a render server.
+
+    Args:
+        filename (str): image filename (on the server)
+        processpipe (list, optional): process-pipe parameters (ProcessPipe.toDict() format)
+        display (str, optional): HDR display tag
+        output (str, optional): output filename (on the server)
+        fit (bool, optional): resize to the display shape
+        host (str, optional): server address
+        port (int, optional): server port (default: renderServer.defaultPort)
+        timeout (float, optional): timeout in seconds
+
+    Returns:
+        dict or bytes: response if output is set, rendered image (.hdr data) otherwise
+
+    Raises:
+        urllib.error.HTTPError: request failed (error message in JSON body)
+    """
+    if port == None: port = renderServer.defaultPort
+    request = {'image': filename, 'processpipe': processpipe, 'display': display, 'fit': fit}
+    if output: request['output'] = output
+    req = urllib.request.Request(f'http://{host}:{port}/render', data=json.dumps(request).encode('utf-8'),
+                                 headers={'Content-Type': 'application/json'}, method='POST')
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        data = response.read()
+        return json.loads(data.decode('utf-8')) if output else data
+# -----------------------------------------------------------------------------
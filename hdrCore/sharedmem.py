@@ -0,0 +1,265 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+HDR Core Shared Memory Frames Module
+
+This module provides image frames in shared memory (multiprocessing.shared_memory),
+so that worker processes access image data without copies: a frame is
+allocated once by the main process, sent to workers as a descriptor (name,
+shape, dtype: a few bytes when pickled) and mapped by workers.
+
+    - frameRegistry (main process): allocates frames and releases them
+      deterministically (release(), context manager, at exit)
+    - sharedFrame (any process): descriptor of a frame, its array attribute
+      maps the frame in the calling process
+
+Example:
+    with frameRegistry.fromArray(rgb) as frame:      # one copy into shared memory
+        results = pool.map(worker, [frame]*n)        # workers use frame.array
+
+Worker processes must be started by the owner after startTracker(): they
+share its resource tracker, so that frames stay registered to the owner only
+(the owner unlinks them).
+
+Functions:
+    - startTracker: Start the resource tracker shared with worker processes
+
+Classes:
+    - sharedFrame: descriptor of a shared memory frame
+    - frameRegistry: allocation and release of shared memory frames
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import atexit, threading, collections
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+import preferences.preferences as pref
+
+# -----------------------------------------------------------------------------
+# --- resource tracker --------------------------------------------------------
+# -----------------------------------------------------------------------------
+def startTracker():
+    """
+    Start the resource tracker of this process (no-op if running), before
+    starting worker processes: workers inherit it. A block a worker attaches
+    is then already registered by the owner (registration is a no-op) and
+    unregistered when the owner unlinks it. A worker started before the
+    tracker would start its own one, which unlinks attached blocks at exit.
+    """
+    resource_tracker.ensure_running()
+# -----------------------------------------------------------------------------
+# --- Class sharedFrame -------------------------------------------------------
+# -----------------------------------------------------------------------------
+class sharedFrame(object):
+    """
+    Descriptor of a frame (numpy array) in shared memory.
+
+    Pickling a sharedFrame only pickles its descriptor: the frame is mapped by
+    the process using it (array attribute). Processes other than the owner
+    keep the last maxAttached frames mapped, older ones are unmapped.
+
+    Attributes:
+        - name (str): shared memory block name
+        - shape (tuple): array shape
+        - dtype (str): array type
+
+    Class Attributes:
+        attached (collections.OrderedDict): (SharedMemory, array) of frames mapped by
+            this process (not owner) keyed by name
+        maxAttached (int): maximum number of frames kept mapped by a process
+    """
+
+    attached = collections.OrderedDict()
+    attachedLock = threading.Lock()
+    maxAttached = 4
+
+    def __init__(self, name, shape, dtype, shm=None):
+        """
+        Create a descriptor.
+
+        Args:
+            name (str): shared memory block name
+            shape (tuple): array shape
+            dtype (str or numpy.dtype): array type
+            shm (SharedMemory, optional): block, only for the owner (frameRegistry)
+        """
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype).str
+        self.shm = shm
+        self._array = np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf) if shm else None
+    # -------------------------------------------------------------------------
+    def __getstate__(self):
+        return {'name': self.name, 'shape': self.shape, 'dtype': self.dtype}
+    # -------------------------------------------------------------------------
+    def __setstate__(self, state):
+        self.__init__(state['name'], state['shape'], state['dtype'])
+    # -------------------------------------------------------------------------
+    @property
+    def array(self):
+        """
+        numpy.ndarray: frame data (mapped, no copy), writable
+        """
+        if self._array is None: self._array = sharedFrame.attach(self.name, self.shape, self.dtype)
+        return self._array
+    # -------------------------------------------------------------------------
+    def region(self, y0, y1, x0, x1):
+        """
+        Get a region of the frame (view, no copy).
+
+        Args:
+            y0, y1 (int): first and last+1 rows
+            x0, x1 (int): first and last+1 columns
+
+        Returns:
+            numpy.ndarray: view of the region
+        """
+        return self.array[y0:y1, x0:x1, ...]
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def attach(name, shape, dtype):
+        """
+        Map a frame in the calling process (reused if already mapped).
+
+        Args:
+            name (str): shared memory block name
+            shape (tuple): array shape
+            dtype (str): array type
+
+        Returns:
+            numpy.ndarray: frame data
+        """
+        # frame of this process (thread workers): already mapped
+        with frameRegistry.lock: frame = frameRegistry.frames.get(name, None)
+        if frame: return frame.array
+
+        with sharedFrame.attachedLock:
+            if name in sharedFrame.attached:
+                sharedFrame.attached.move_to_end(name)
+                return sharedFrame.attached[name][1]
+            try:
+                shm = shared_memory.SharedMemory(name=name, track=False)   # python >= 3.13
+            except TypeError:
+                # registered to the resource tracker shared with the owner (see startTracker):
+                # already registered by the owner, not to be unregistered by this process
+                shm = shared_memory.SharedMemory(name=name)
+            array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+            sharedFrame.attached[name] = (shm, array)
+
+            # unmap older frames: their arrays are no longer used by this process
+            while len(sharedFrame.attached) > sharedFrame.maxAttached:
+                _, (oldShm, oldArray) = sharedFrame.attached.popitem(last=False)
+                del oldArray
+                try: oldShm.close()
+                except BufferError: pass        # still referenced: unmapped when collected
+            return array
+# -----------------------------------------------------------------------------
+# --- Class frameRegistry -----------------------------------------------------
+# -----------------------------------------------------------------------------
+class frameRegistry(object):
+    """
+    Allocation and release of shared memory frames (owner process).
+
+    Frames are released by release(), at the end of a with block, or at exit.
+
+    Class Attributes:
+        frames (dict): frames allocated by this process keyed by name
+    """
+
+    frames = {}
+    lock = threading.Lock()
+
+    @staticmethod
+    def create(shape, dtype=np.float32):
+        """
+        Allocate a frame.
+
+        Args:
+            shape (tuple): array shape
+            dtype (numpy.dtype, optional): array type (default: float32)
+
+        Returns:
+            frameRegistry.ownedFrame: frame (content not initialized)
+        """
+        nbytes = max(1, int(np.prod(shape))*np.dtype(dtype).itemsize)
+        shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        frame = frameRegistry.ownedFrame(shm.name, shape, dtype, shm)
+        with frameRegistry.lock: frameRegistry.frames[shm.name] = frame
+        if pref.verbose: print(" [SHM] >> frameRegistry.create(",shm.name,shape,np.dtype(dtype).name,")")
+        return frame
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def fromArray(array, dtype=None):
+        """
+        Allocate a frame and copy an array into it.
+
+        Args:
+            array (numpy.ndarray): data
+            dtype (numpy.dtype, optional): frame type (default: type of array)
+
+        Returns:
+            frameRegistry.ownedFrame: frame
+        """
+        frame = frameRegistry.create(array.shape, dtype if dtype else array.dtype)
+        frame.array[...] = array
+        return frame
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def release(frame):
+        """
+        Release a frame: unmap and free its shared memory block.
+
+        Args:
+            frame (sharedFrame): frame allocated by this process
+        """
+        with frameRegistry.lock: frameRegistry.frames.pop(frame.name, None)
+        if frame.shm is None: return
+        frame._array = None
+        try: frame.shm.close()
+        except BufferError: pass                # still referenced: unmapped when collected
+        try: frame.shm.unlink()
+        except FileNotFoundError: pass
+        frame.shm = None
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def nbytes():
+        """
+        Returns:
+            int: bytes of the frames allocated by this process
+        """
+        with frameRegistry.lock: return sum(frame.shm.size for frame in frameRegistry.frames.values())
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def releaseAll():
+        """Release all frames allocated by this process (registered at exit)."""
+        for frame in list(frameRegistry.frames.values()): frameRegistry.release(frame)
+    # -------------------------------------------------------------------------
+    class ownedFrame(sharedFrame):
+        """
+        Frame allocated by this process: released at the end of a with block.
+        Pickled as a sharedFrame descriptor.
+        """
+        def __enter__(self): return self
+        def __exit__(self, *args): frameRegistry.release(self)
+        def __reduce__(self): return (sharedFrame, (self.name, self.shape, self.dtype))
+# -----------------------------------------------------------------------------
+atexit.register(frameRegistry.releaseAll)
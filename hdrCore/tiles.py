@@ -0,0 +1,743 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+HDR Core Tiled Computation Module
+
+This module computes process-pipes on full size images by tiles: the frame is
+split into many small tiles (sized to fit the CPU cache), tiles are
+distributed dynamically to workers and each finished tile is written directly
+to the output frame (no merge step).
+
+    - work stealing: each worker starts with a contiguous band of tiles and,
+      when its band is done, steals tiles from the worker with the most
+      remaining, so that a slow tile does not delay the end of the computation
+    - tile size: derived from the cache size and tuned by a short calibration
+      run (once per process and pipeline)
+    - stages: pixel-wise nodes are computed on tiles without overlap; the
+      geometry node (rotation) and resizing with anti-aliasing read, for each
+      output tile, the source region it depends on plus a halo
+    - workers are threads, or processes sharing input and output frames
+      through shared memory (hdrCore.sharedmem)
+
+Classes:
+    - pixelStage: pixel-wise nodes of a process-pipe
+    - geometryStage: geometry node (ratio crop and rotation)
+    - resizeStage: resize with anti-aliasing
+    - tileQueues: work-stealing queues of tiles
+    - tileScheduler: tiled computation of process-pipes
+
+Functions:
+    - cacheSize
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import os, copy, math, glob, atexit, threading, collections, concurrent.futures
+import numpy as np
+import scipy.ndimage
+import skimage.transform
+from . import processing, sharedmem, profiling
+from .context import ExecutionContext
+import preferences.preferences as pref
+from timeit import default_timer as timer
+
+# -----------------------------------------------------------------------------
+# --- Functions ---------------------------------------------------------------
+# -----------------------------------------------------------------------------
+def cacheSize(default=1024*1024):
+    """
+    Get the size of the per-core cache (L2) of the CPU.
+
+    Args:
+        default (int, optional): size returned if it cannot be read (default: 1 MiB)
+
+    Returns:
+        int: cache size in bytes
+    """
+    # linux: /sys/devices/system/cpu/cpu0/cache/index*/{level,size}
+    for index in sorted(glob.glob('/sys/devices/system/cpu/cpu0/cache/index*')):
+        try:
+            with open(os.path.join(index,'level')) as f: level = int(f.read())
+            with open(os.path.join(index,'size')) as f: size = f.read().strip()
+            if level == 2:
+                factor = {'K': 1024, 'M': 1024*1024}.get(size[-1].upper(), 1)
+                return int(size.rstrip('KkMm'))*factor
+        except (OSError, ValueError):
+            pass
+    return default
+# -----------------------------------------------------------------------------
+def tileImage(img, colorData):
+    """
+    Build an image on a tile: attributes of img, pixels colorData (no copy).
+
+    Args:
+        img (hdrCore.image.Image): template image (its colorData is not used)
+        colorData (numpy.ndarray): pixels of the tile
+
+    Returns:
+        hdrCore.image.Image: tile image (without metadata)
+    """
+    res = copy.copy(img)
+    res.colorData = colorData
+    res.shape = colorData.shape
+    res.metadata = None
+    res.histogram = None
+    return res
+# -----------------------------------------------------------------------------
+# --- Class pixelStage --------------------------------------------------------
+# -----------------------------------------------------------------------------
+class pixelStage(object):
+    """
+    Pixel-wise nodes of a process-pipe: an output tile only depends on the
+    same input tile (no halo).
+
+    Operators using image-wide statistics (Processing.needStatistics()) start
+    a new stage: the tiles of the previous stage reduce the statistics of
+    their output (statisticsOf), the combined statistics are given to the
+    operator for every tile (statistics).
+
+    Attributes:
+        - nodes (list of (Processing, dict)): operators and their parameters
+        - template (hdrCore.image.Image): input image attributes (without pixels)
+        - statistics (dict or None): image-wide statistics given to the first operator
+        - statisticsOf (Processing or None): operator whose statistics are reduced from the output
+        - names (list of str): node names
+        - timed (bool): node timings are returned with tiles (profiler enabled at creation)
+    """
+    def __init__(self, processNodes, img, statisticsOf=None):
+        """
+        Args:
+            processNodes (list of ProcessPipe.ProcessNode): pixel-wise nodes
+            img (hdrCore.image.Image): input image
+            statisticsOf (Processing, optional): operator of the next stage using statistics
+        """
+        self.nodes = [(node.process, copy.deepcopy(node.params)) for node in processNodes]
+        self.template = tileImage(img, np.zeros((1,1,img.colorData.shape[2]), dtype=img.colorData.dtype))
+        self.inputShape = tuple(img.colorData.shape)
+        self.statistics = None
+        self.statisticsOf = statisticsOf
+        self.names = [node.name for node in processNodes]
+        self.timed = profiling.profiler.enabled
+    # -------------------------------------------------------------------------
+    def key(self):
+        """str: stage signature (calibration cache key)"""
+        return 'pixel:'+','.join(type(process).__name__ for process, _ in self.nodes)
+    # -------------------------------------------------------------------------
+    def outputShape(self): return self.inputShape
+    # -------------------------------------------------------------------------
+    def sourceRegion(self, tile): return tile
+    # -------------------------------------------------------------------------
+    def computeTile(self, data, tile, region):
+        """
+        Compute an output tile.
+
+        Args:
+            data (numpy.ndarray): input pixels of region
+            tile ((int,int,int,int)): y0, y1, x0, x1 of the output tile
+            region ((int,int,int,int)): y0, y1, x0, x1 of the input region
+
+        Returns:
+            (numpy.ndarray, dict): tile pixels, image attributes (linear, type, colorSpace),
+                statistics of the tile output (if statisticsOf) and node timings (if timed)
+
+        Raises:
+            TypeError: if context.strictDtype is set and an operator emits data of
+                another type than context.dtype (as ProcessNode.compute), otherwise
+                the data is cast
+        """
+        ctx = ExecutionContext.current()
+        img = tileImage(self.template, data)
+        timings = []
+        for idx, (process, params) in enumerate(self.nodes):
+            start = timer()
+            if idx == 0 and self.statistics: img = process.compute(img, statistics=self.statistics, **params)
+            else:                            img = process.compute(img, **params)
+            if isinstance(img.colorData, np.ndarray) and img.colorData.dtype != ctx.dtype:
+                message = type(process).__name__+" emits "+img.colorData.dtype.name+" data, context dtype is "+np.dtype(ctx.dtype).name
+                if ctx.strictDtype: raise TypeError("pixelStage "+self.names[idx]+": "+message)
+                img.colorData = processing.toWorkingType(img.colorData)
+            if self.timed: timings.append((self.names[idx], start, timer()-start))
+        attrs = {'linear': img.linear, 'type': img.type, 'colorSpace': img.colorSpace}
+        if self.statisticsOf: attrs['statistics'] = self.statisticsOf.statistics(img)
+        if timings: attrs['timings'] = timings
+        return img.colorData, attrs
+# -----------------------------------------------------------------------------
+# --- Class geometryStage -----------------------------------------------------
+# -----------------------------------------------------------------------------
+class geometryStage(object):
+    """
+    Geometry node (see hdrCore.processing.geometry): ratio crop, rotation and
+    crop of the rotated image. An output tile reads the bounding box of its
+    rotated footprint in the input plus a halo of bilinear interpolation.
+
+    Attributes:
+        - crop ((int,int,int,int)): window of the ratio crop in the input
+        - rotation (float): rotation angle in degrees
+        - window ((int,int,int,int)): window kept in the rotated image
+        - matrix (numpy.ndarray): 3x3 inverse mapping, rotated image -> cropped input (x,y)
+    """
+    halo = 2
+
+    def __init__(self, processNode, inputShape):
+        """
+        Args:
+            processNode (ProcessPipe.ProcessNode): geometry node
+            inputShape (tuple): shape of the input image
+        """
+        params = processNode.params if processNode.params else {}
+        ratio =     params.get('ratio', (16,9))
+        up =        params.get('up', 0)
+        self.rotation = params.get('rotation', 0.0)
+
+        h, w = inputShape[:2]
+        self.channels = inputShape[2]
+        self.crop = processing.geometry.cropWindow(h, w, ratio, up)
+        self.cropShape = (self.crop[1]-self.crop[0], self.crop[3]-self.crop[2])
+        hA, wA = self.cropShape
+        self.window = processing.geometry.rotatedWindow(hA, wA, self.rotation) if self.rotation != 0 else (0, hA, 0, wA)
+
+        # same mapping as skimage.transform.rotate: rotation around (w/2-0.5, h/2-0.5)
+        cx, cy = wA/2-0.5, hA/2-0.5
+        a = math.radians(self.rotation)
+        toCenter = np.array([[1,0,-cx],[0,1,-cy],[0,0,1]], dtype=np.float64)
+        rotate = np.array([[math.cos(a),-math.sin(a),0],[math.sin(a),math.cos(a),0],[0,0,1]], dtype=np.float64)
+        fromCenter = np.array([[1,0,cx],[0,1,cy],[0,0,1]], dtype=np.float64)
+        self.matrix = fromCenter @ rotate @ toCenter
+    # -------------------------------------------------------------------------
+    def key(self): return 'geometry'
+    # -------------------------------------------------------------------------
+    def outputShape(self):
+        y0, y1, x0, x1 = self.window
+        return (y1-y0, x1-x0, self.channels)
+    # -------------------------------------------------------------------------
+    def tileMatrix(self, tile):
+        """numpy.ndarray: 3x3 mapping, tile coordinates (x,y) -> cropped input (x,y)"""
+        ty0, _, tx0, _ = tile
+        wy0, _, wx0, _ = self.window
+        return self.matrix @ np.array([[1,0,tx0+wx0],[0,1,ty0+wy0],[0,0,1]], dtype=np.float64)
+    # -------------------------------------------------------------------------
+    def sourceRegion(self, tile):
+        """
+        Get the input region an output tile depends on.
+
+        Args:
+            tile ((int,int,int,int)): y0, y1, x0, x1 of the output tile
+
+        Returns:
+            (int,int,int,int) or None: y0, y1, x0, x1 in the input, None if the tile is
+            outside of the input (black)
+        """
+        ty0, ty1, tx0, tx1 = tile
+        cy0, _, cx0, _ = self.crop
+        hA, wA = self.cropShape
+        if self.rotation == 0:
+            wy0, _, wx0, _ = self.window
+            return (ty0+wy0+cy0, ty1+wy0+cy0, tx0+wx0+cx0, tx1+wx0+cx0)
+
+        corners = np.array([[0, tx1-tx0-1, 0, tx1-tx0-1], [0, 0, ty1-ty0-1, ty1-ty0-1], [1, 1, 1, 1]], dtype=np.float64)
+        xs, ys, _ = self.tileMatrix(tile) @ corners
+        y0 = max(0, int(math.floor(ys.min()))-self.halo)
+        y1 = min(hA, int(math.ceil(ys.max()))+self.halo+1)
+        x0 = max(0, int(math.floor(xs.min()))-self.halo)
+        x1 = min(wA, int(math.ceil(xs.max()))+self.halo+1)
+        if y0 >= y1 or x0 >= x1: return None
+        return (y0+cy0, y1+cy0, x0+cx0, x1+cx0)
+    # -------------------------------------------------------------------------
+    def computeTile(self, data, tile, region):
+        """
+        Compute an output tile (see pixelStage.computeTile).
+        """
+        ty0, ty1, tx0, tx1 = tile
+        if self.rotation == 0: return data, None
+        if data is None: return np.zeros((ty1-ty0, tx1-tx0, self.channels), dtype=ExecutionContext.current().dtype), None
+
+        cy0, _, cx0, _ = self.crop
+        ry0, _, rx0, _ = region
+        toRegion = np.array([[1,0,-(rx0-cx0)],[0,1,-(ry0-cy0)],[0,0,1]], dtype=np.float64)
+        transform = skimage.transform.AffineTransform(matrix=toRegion @ self.tileMatrix(tile))
+        res = skimage.transform.warp(data, transform, output_shape=(ty1-ty0, tx1-tx0, self.channels), order=1, mode='constant', cval=0, clip=False)
+        return res, None
+# -----------------------------------------------------------------------------
+# --- Class resizeStage -------------------------------------------------------
+# -----------------------------------------------------------------------------
+class resizeStage(object):
+    """
+    Resize with anti-aliasing (as skimage.transform.resize(anti_aliasing=True)):
+    Gaussian filter then bilinear interpolation. An output tile reads its
+    footprint in the input plus a halo covering the Gaussian kernel.
+
+    Attributes:
+        - inputShape (tuple): shape of the input image
+        - shape ((int,int)): output height and width
+        - factors ((float,float)): input/output size ratios
+        - sigmas ((float,float)): standard deviations of the anti-aliasing filter
+    """
+    def __init__(self, inputShape, shape):
+        """
+        Args:
+            inputShape (tuple): shape of the input image
+            shape ((int,int)): output height and width
+        """
+        self.inputShape = tuple(inputShape)
+        self.shape = tuple(shape)
+        self.factors = (inputShape[0]/shape[0], inputShape[1]/shape[1])
+        self.sigmas = tuple(max(0, (f-1)/2) for f in self.factors)
+        self.halos = tuple(int(4*s+0.5)+2 for s in self.sigmas)
+    # -------------------------------------------------------------------------
+    def key(self): return 'resize'
+    # -------------------------------------------------------------------------
+    def outputShape(self): return self.shape+self.inputShape[2:]
+    # -------------------------------------------------------------------------
+    def sourceRegion(self, tile):
+        """
+        Get the input region an output tile depends on (see geometryStage.sourceRegion).
+        """
+        ty0, ty1, tx0, tx1 = tile
+        (fy, fx), (hy, hx) = self.factors, self.halos
+        y0 = max(0, int(math.floor((ty0+0.5)*fy-0.5))-hy)
+        y1 = min(self.inputShape[0], int(math.ceil((ty1-0.5)*fy-0.5))+hy+1)
+        x0 = max(0, int(math.floor((tx0+0.5)*fx-0.5))-hx)
+        x1 = min(self.inputShape[1], int(math.ceil((tx1-0.5)*fx-0.5))+hx+1)
+        return (y0, y1, x0, x1)
+    # -------------------------------------------------------------------------
+    def computeTile(self, data, tile, region):
+        """
+        Compute an output tile (see pixelStage.computeTile).
+        """
+        ty0, ty1, tx0, tx1 = tile
+        ry0, _, rx0, _ = region
+        fy, fx = self.factors
+        if any(self.sigmas): data = scipy.ndimage.gaussian_filter(data, self.sigmas+(0,)*(data.ndim-2), mode='mirror')
+        ys = (np.arange(ty0, ty1)+0.5)*fy-0.5-ry0
+        xs = (np.arange(tx0, tx1)+0.5)*fx-0.5-rx0
+        coords = np.meshgrid(ys, xs, indexing='ij')
+        res = np.empty((ty1-ty0, tx1-tx0)+data.shape[2:], dtype=ExecutionContext.current().dtype)
+        for c in range(data.shape[2]):
+            res[...,c] = scipy.ndimage.map_coordinates(data[...,c], coords, order=1, mode='mirror')
+        return res, None
+# -----------------------------------------------------------------------------
+# --- Class tileQueues --------------------------------------------------------
+# -----------------------------------------------------------------------------
+class tileQueues(object):
+    """
+    Work-stealing queues of tiles: one queue per worker, filled with a
+    contiguous band of tiles (memory locality). A worker takes tiles from the
+    front of its queue, then steals from the back of the longest queue.
+
+    Attributes:
+        - queues (list of collections.deque): tiles of each worker
+        - steals (int): number of stolen tiles
+    """
+    def __init__(self, tiles, nbWorkers):
+        """
+        Args:
+            tiles (list): tiles in row-major order
+            nbWorkers (int): number of workers
+        """
+        bands = np.array_split(np.arange(len(tiles)), nbWorkers)
+        self.queues = [collections.deque(tiles[i] for i in band) for band in bands]
+        self.lock = threading.Lock()
+        self.steals = 0
+    # -------------------------------------------------------------------------
+    def next(self, worker):
+        """
+        Get the next tile of a worker.
+
+        Args:
+            worker (int): worker index
+
+        Returns:
+            tile or None: None when all tiles are taken
+        """
+        with self.lock:
+            if self.queues[worker]: return self.queues[worker].popleft()
+            victim = max(self.queues, key=len)
+            if not victim: return None
+            self.steals += 1
+            return victim.pop()
+# -----------------------------------------------------------------------------
+# --- worker process ----------------------------------------------------------
+# -----------------------------------------------------------------------------
+def _tileWorker(stage, context, inFrame, outFrame, tile):
+    """
+    Compute a tile in a worker process: read from and write to shared frames.
+
+    Args:
+        stage (pixelStage, geometryStage or resizeStage): stage to compute
+        context (hdrCore.context.ExecutionContext): context of operators
+        inFrame (hdrCore.sharedmem.sharedFrame): input frame
+        outFrame (hdrCore.sharedmem.sharedFrame): output frame
+        tile ((int,int,int,int)): y0, y1, x0, x1 of the output tile
+
+    Returns:
+        dict or None: image attributes (see pixelStage.computeTile)
+    """
+    with context.activate():
+        return tileScheduler.computeTile(stage, inFrame.array, outFrame.array, tile)
+# -----------------------------------------------------------------------------
+# --- Class tileScheduler -----------------------------------------------------
+# -----------------------------------------------------------------------------
+class tileScheduler(object):
+    """
+    Tiled computation of process-pipes on full size images.
+
+    Pixel-wise nodes are computed in a first stage, the geometry node (if it
+    is the last node, as in ProcessPipe.buildDefault()) in a second stage.
+
+    Attributes:
+        - workers (int): number of workers
+        - tileSize (int, (int,int) or None): tile edge or (height, width) in pixels, None: calibrated
+        - split (bool): tiles are made smaller to have at least 4 tiles per worker
+        - processes (bool): workers are processes (True) or threads (False)
+        - steals (int): number of stolen tiles of the last computation
+
+    Class Attributes:
+        tileSizes (dict): calibrated tile edges keyed by stage signature
+        candidates (list of float): tile edges tried by calibration (factors of the cache-derived edge)
+        calibrationSize (int): edge of the image sample timed by calibration
+        pool (concurrent.futures.ProcessPoolExecutor): worker processes, shared by schedulers
+        poolWorkers (int): number of worker processes
+    """
+
+    tileSizes = {}
+    candidates = [0.5, 1, 2, 4]
+    calibrationSize = 512
+    pool = None
+    poolWorkers = 0
+    poolLock = threading.Lock()
+
+    def __init__(self, workers=None, tileSize=None, processes=False, split=True):
+        """
+        Args:
+            workers (int, optional): number of workers (default: number of cores)
+            tileSize (int or (int,int), optional): tile edge or (height, width) in pixels (default: calibrated)
+            processes (bool, optional): compute in worker processes (default: threads)
+            split (bool, optional): make tiles smaller to have at least 4 tiles per worker
+                (default: True, False: the tiles of tileSize are kept)
+        """
+        self.workers = workers if workers else (os.cpu_count() or 1)
+        self.tileSize = tileSize
+        self.split = split
+        self.processes = processes
+        self.steals = 0
+    # -------------------------------------------------------------------------
+    def compute(self, processPipe, toneMap=True, progress=None, tileDone=None):
+        """
+        Compute a process-pipe by tiles, its output image is set.
+
+        Args:
+            processPipe (hdrCore.processing.ProcessPipe): process-pipe with an input image
+            toneMap (bool, optional): see ProcessPipe.getImage()
+            progress (function, optional): called with (done, total) after each tile
+            tileDone (function, optional): called with (stage index, tile) after each tile,
+                the tile is already written to the output
+
+        Returns:
+            hdrCore.image.Image: output image (ProcessPipe.getImage(toneMap))
+        """
+        start = timer()
+        ctx = processPipe.context
+        img = processPipe.getInputImage()
+        nodes = processPipe.processNodes
+
+        geometryNode = nodes[-1] if nodes and isinstance(nodes[-1].process, processing.geometry) else None
+        pixelNodes = nodes[:-1] if geometryNode else nodes
+        if any(isinstance(node.process, (processing.geometry, processing.resize)) for node in pixelNodes):
+            # node with halo in the middle of the pipe: not tiled
+            processPipe.compute()
+            return processPipe.getImage(toneMap=toneMap)
+
+        # a node using image-wide statistics starts a new stage
+        stages, segment, statistics = [], [], None
+        for node in pixelNodes:
+            if node.process.needStatistics(**node.params):
+                if segment: stages.append(pixelStage(segment, img, statisticsOf=node.process))
+                else:       statistics = node.process.statistics(img)   # first node: statistics of the input
+                segment = []
+            segment.append(node)
+        stages.append(pixelStage(segment, img))
+        stages[0].statistics = statistics
+        if geometryNode: stages.append(geometryStage(geometryNode, img.colorData.shape))
+
+        colorData, attrs = self.run(stages, img.colorData, ctx, progress, tileDone)
+
+        res = tileImage(img, colorData)
+        for key, value in attrs.items(): setattr(res, key, value)
+        res.metadata = img.metadata
+        processPipe.setOutput(res)
+        for node in nodes: node.requireUpdate = True
+
+        if ctx.verbose: print(f" [TILES] >> tileScheduler.compute({img.name}): {timer()-start:.2f}s, {self.workers} {'processes' if self.processes else 'threads'}, tile:{self.tileSize}, steals:{self.steals}")
+        return processPipe.getImage(toneMap=toneMap)
+    # -------------------------------------------------------------------------
+    def resize(self, img, shape, context=None):
+        """
+        Resize an image with anti-aliasing by tiles.
+
+        Args:
+            img (hdrCore.image.Image): image
+            shape ((int,int)): output height and width
+            context (hdrCore.context.ExecutionContext, optional): context (dtype)
+
+        Returns:
+            hdrCore.image.Image: resized image
+        """
+        ctx = context if context else ExecutionContext.current()
+        colorData, _ = self.run([resizeStage(img.colorData.shape, shape)], img.colorData, ctx)
+        res = tileImage(img, colorData)
+        res.metadata = img.metadata
+        return res
+    # -------------------------------------------------------------------------
+    def run(self, stages, colorData, context, progress=None, tileDone=None):
+        """
+        Compute stages by tiles, the output of a stage is the input of the next one.
+
+        Args:
+            stages (list): stages (pixelStage, geometryStage, resizeStage)
+            colorData (numpy.ndarray): input pixels
+            context (hdrCore.context.ExecutionContext): context of operators
+            progress (function, optional): called with (done, total) after each tile
+            tileDone (function, optional): called with (stage index, tile) after each tile
+
+        Returns:
+            (numpy.ndarray, dict): output pixels, image attributes
+        """
+        # operators of tiles are quiet and do not use the disk cache
+        tileContext = context.derive(verbose=False, diskCache=False, threads=1)
+        dtype = np.dtype(context.dtype)
+
+        if self.tileSize: edge = self.tileSize
+        else:             edge = self.calibrate(stages[0], colorData, tileContext)
+
+        tilesOfStages = [tileScheduler.tiles(stage.outputShape(), edge, self.workers if self.split else 0) for stage in stages]
+        total, done = sum(len(tiles) for tiles in tilesOfStages), [0]
+        attrs = {}
+        self.tileSize, self.steals = edge, 0
+
+        def onTile(idx, tile):
+            with lockDone:
+                done[0] += 1
+                if progress: progress(done[0], total)
+            if tileDone: tileDone(idx, tile)
+        lockDone = threading.Lock()
+
+        def endStage(idx, stageAttrs):
+            # attributes and statistics of the output are those of the input of the next stage
+            statistics = stageAttrs.pop('statistics', None)
+            attrs.update(stageAttrs)
+            if idx+1 < len(stages) and isinstance(stages[idx+1], pixelStage):
+                for key, value in attrs.items(): setattr(stages[idx+1].template, key, value)
+                if statistics: stages[idx+1].statistics = statistics
+
+        if not self.processes:
+            inArray = np.asarray(colorData, dtype=dtype)
+            for idx, (stage, tiles) in enumerate(zip(stages, tilesOfStages)):
+                outArray = np.empty(stage.outputShape(), dtype=dtype)
+                endStage(idx, self.runStage(tiles, lambda tile: tileScheduler.computeTile(stage, inArray, outArray, tile, tileContext), lambda tile: onTile(idx, tile), stage.key()))
+                inArray = outArray
+            return inArray, attrs
+
+        pool = tileScheduler.getPool(self.workers)
+        frames = [sharedmem.frameRegistry.fromArray(colorData, dtype)]
+        try:
+            for idx, (stage, tiles) in enumerate(zip(stages, tilesOfStages)):
+                inFrame, outFrame = frames[-1], sharedmem.frameRegistry.create(stage.outputShape(), dtype)
+                frames.append(outFrame)
+                endStage(idx, self.runStage(tiles, lambda tile: pool.submit(_tileWorker, stage, tileContext, inFrame, outFrame, tile).result(), lambda tile: onTile(idx, tile), stage.key()))
+                # input frame of this stage is no longer needed
+                sharedmem.frameRegistry.release(frames.pop(-2))
+            return np.array(frames[-1].array), attrs
+        finally:
+            for frame in frames: sharedmem.frameRegistry.release(frame)
+    # -------------------------------------------------------------------------
+    def runStage(self, tiles, computeTile, onTile, stageName='tile'):
+        """
+        Compute the tiles of a stage: one driver thread per worker takes tiles
+        from the work-stealing queues.
+
+        Args:
+            tiles (list): tiles of the stage
+            computeTile (function): computes a tile (in the driver thread or in a worker process),
+                returns image attributes or None
+            onTile (function): called after each tile
+            stageName (str, optional): name of tile events (hdrCore.profiling)
+
+        Returns:
+            dict: image attributes, 'statistics': statistics of tiles combined by maximum
+        """
+        queues = tileQueues(tiles, self.workers)
+        results, errors = [], []
+
+        def driver(worker):
+            try:
+                while not errors:
+                    tile = queues.next(worker)
+                    if tile is None: return
+                    start = timer()
+                    res = computeTile(tile)
+                    # node timings of the tile (measured in the worker: same monotonic clock)
+                    timings = res.pop('timings', []) if res else []
+                    if profiling.profiler.enabled:
+                        profiling.profiler.record(stageName, start, timer()-start, category='tile', shape=(tile[1]-tile[0], tile[3]-tile[2]), worker=worker)
+                        for name, nodeStart, dt in timings: profiling.profiler.record(name, nodeStart, dt, shape=(tile[1]-tile[0], tile[3]-tile[2]), worker=worker)
+                    if res: results.append(res)
+                    onTile(tile)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=driver, args=(i,), name='uHDR-tile-'+str(i), daemon=True) for i in range(min(self.workers, len(tiles)))]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        self.steals += queues.steals
+        if errors: raise errors[0]
+
+        attrs, statistics = {}, None
+        for res in results:
+            res = dict(res)
+            stats = res.pop('statistics', None)
+            attrs.update(res)
+            if stats: statistics = {key: max(value, statistics[key]) for key, value in stats.items()} if statistics else stats
+        if statistics: attrs['statistics'] = statistics
+        return attrs
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def computeTile(stage, inArray, outArray, tile, context=None):
+        """
+        Compute a tile of a stage: read its source region, write the output tile.
+
+        Args:
+            stage: stage to compute
+            inArray (numpy.ndarray): input pixels
+            outArray (numpy.ndarray): output pixels
+            tile ((int,int,int,int)): y0, y1, x0, x1 of the output tile
+            context (hdrCore.context.ExecutionContext, optional): context activated
+                during the computation (threads)
+
+        Returns:
+            dict or None: image attributes
+
+        Raises:
+            TypeError: if context.strictDtype is set and the stage emits data of another
+                type than context.dtype, otherwise the tile is cast to the output frame
+        """
+        if context:
+            with context.activate(): return tileScheduler.computeTile(stage, inArray, outArray, tile)
+
+        region = stage.sourceRegion(tile)
+        data = inArray[region[0]:region[1], region[2]:region[3], ...] if region else None
+        res, attrs = stage.computeTile(data, tile, region)
+        ctx = ExecutionContext.current()
+        if res.dtype != ctx.dtype and ctx.strictDtype:
+            raise TypeError(type(stage).__name__+" "+stage.key()+": tile emits "+res.dtype.name+" data, context dtype is "+np.dtype(ctx.dtype).name)
+        outArray[tile[0]:tile[1], tile[2]:tile[3], ...] = res
+        return attrs
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def tiles(shape, edge, workers=1):
+        """
+        Split a frame in tiles, in row-major order.
+
+        Args:
+            shape (tuple): frame shape
+            edge (int or (int,int)): tile edge or (height, width) in pixels
+            workers (int, optional): tiles are made smaller to have at least 4 tiles per worker (0: never)
+
+        Returns:
+            list of (int,int,int,int): y0, y1, x0, x1 of tiles
+        """
+        h, w = shape[:2]
+        th, tw = edge if isinstance(edge, (tuple, list)) else (edge, edge)
+        while min(th, tw) > 16 and math.ceil(h/th)*math.ceil(w/tw) < 4*workers: th, tw = th//2, tw//2
+        return [(y, min(h, y+th), x, min(w, x+tw)) for y in range(0, h, th) for x in range(0, w, tw)]
+    # -------------------------------------------------------------------------
+    def calibrate(self, stage, colorData, context):
+        """
+        Get the tile edge of a stage: edges derived from the cache size are
+        timed on a sample of the image, the fastest one is kept (once per
+        process and stage signature).
+
+        Args:
+            stage: stage to calibrate (first stage)
+            colorData (numpy.ndarray): input pixels
+            context (hdrCore.context.ExecutionContext): context of operators
+
+        Returns:
+            int: tile edge in pixels
+        """
+        key = stage.key()+':'+np.dtype(context.dtype).name
+        if key in tileScheduler.tileSizes: return tileScheduler.tileSizes[key]
+
+        # pixels of a tile and its temporary images (~8 float copies per operator) fit in cache
+        bytesPerPixel = 8*colorData.shape[2]*np.dtype(context.dtype).itemsize
+        base = 2**int(round(math.log2(math.sqrt(cacheSize()/bytesPerPixel))))
+        edges = sorted(set(min(tileScheduler.calibrationSize, max(32, int(base*c))) for c in tileScheduler.candidates))
+
+        if not isinstance(stage, pixelStage): return base
+
+        # sample: center of the image
+        h, w = colorData.shape[:2]
+        sh, sw = min(h, tileScheduler.calibrationSize), min(w, tileScheduler.calibrationSize)
+        y0, x0 = (h-sh)//2, (w-sw)//2
+        sample = np.asarray(colorData[y0:y0+sh, x0:x0+sw, ...], dtype=context.dtype)
+        out = np.empty(sample.shape, dtype=context.dtype)
+        best, bestRate = base, 0
+        with context.activate():
+            for edge in edges:
+                start = timer()
+                for tile in tileScheduler.tiles(sample.shape, edge, 0): tileScheduler.computeTile(stage, sample, out, tile)
+                rate = sh*sw/max(timer()-start, 1e-9)
+                if rate > bestRate: best, bestRate = edge, rate
+
+        tileScheduler.tileSizes[key] = best
+        if pref.verbose: print(f" [TILES] >> tileScheduler.calibrate({key}): edges {edges}, best: {best} ({bestRate/1e6:.1f} Mpixel/s)")
+        return best
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def getPool(workers):
+        """
+        Get the worker processes (started on first call, restarted if the number of workers changes).
+
+        Args:
+            workers (int): number of processes
+
+        Returns:
+            concurrent.futures.ProcessPoolExecutor: worker processes
+        """
+        with tileScheduler.poolLock:
+            if tileScheduler.pool and tileScheduler.poolWorkers != workers:
+                tileScheduler.pool.shutdown(wait=True)
+                tileScheduler.pool = None
+            if not tileScheduler.pool:
+                # workers share the resource tracker of frames (see hdrCore.sharedmem)
+                sharedmem.startTracker()
+                tileScheduler.pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+                tileScheduler.poolWorkers = workers
+            return tileScheduler.pool
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def closePool():
+        """Stop the worker processes (registered at exit)."""
+        with tileScheduler.poolLock:
+            if tileScheduler.pool:
+                tileScheduler.pool.shutdown(wait=False, cancel_futures=True)
+                tileScheduler.pool = None
+# -----------------------------------------------------------------------------
+atexit.register(tileScheduler.closePool)
@@ -125,7 +125,7 @@ def ndarray2vector(nda):
 
 # ------------------------------------------------------------------------------------------
 
-def NPlinearWeightMask(x, xMin, xMax, xTolerance):
+def NPlinearWeightMask(x, xMin, xMax, xTolerance, out=None, tmp=None):
     """
     Generate a linear weight mask with smooth transitions at boundaries.
 
@@ -138,6 +138,9 @@ def NPlinearWeightMask(x, xMin, xMax, xTolerance):
         xMin (float): Lower bound where mask transitions from 0 to 1
         xMax (float): Upper bound where mask transitions from 1 to 0
         xTolerance (float): Width of transition regions
+        out (numpy.ndarray, optional): output mask (shape of x): computed without
+            temporary arrays, with tmp (default: new float64 array)
+        tmp (numpy.ndarray, optional): working array (shape of x), required with out
             
     Returns:
         numpy.ndarray: 2D weight mask with same dimensions as input x
@@ -150,6 +153,16 @@ def NPlinearWeightMask(x, xMin, xMax, xTolerance):
         - Values between xMax and (xMax + xTolerance): linear transition 1→0
         - Values above (xMax + xTolerance): weight = 0
     """
+    if out is not None and xMin <= xMax and xTolerance > 0:
+        # same trapezoid: min(rising edge, falling edge) clipped to [0,1]
+        np.subtract(x, xMin - xTolerance, out=out)
+        np.divide(out, xTolerance, out=out)
+        np.subtract(xMax, x, out=tmp)
+        np.divide(tmp, xTolerance, out=tmp)
+        np.add(tmp, 1, out=tmp)
+        np.minimum(out, tmp, out=out)
+        return np.clip(out, 0, 1, out=out)
+
     # reshape x
     h,w  = x.shape  # 2D array
     xv = np.reshape(x,(h*w,1))
@@ -160,6 +173,9 @@ def NPlinearWeightMask(x, xMin, xMax, xTolerance):
     y = np.where((xv > (xMax))&(xv <= xMax + xTolerance),   1 - (xv - xMax)/xTolerance,y)               # (3)     --------+                 +-------
     y = np.where((xv > (xMax + xTolerance)),                0,y)                                        # (4)         (0)   (1)  (2)    (3)    (4)
 
+    if out is not None:
+        out[...] = np.reshape(y,(h,w))
+        return out
     return np.reshape(y,(h,w))
 
 def croppRotated(h, w, alpha):
@@ -0,0 +1,78 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+HDR Core Worker Process Module
+
+This module holds the process-pipe of a compute worker process (exports,
+render server, thumbnail loading): it is built once by the initializer of
+the process pool and reused for every image, its parameters are reset to
+the defaults before each image.
+
+Example:
+    pool = concurrent.futures.ProcessPoolExecutor(initializer=worker.initWorker, initargs=(pref.verbose,))
+    ...
+    processPipe = worker.workerProcessPipe()             # in a task of the pool
+
+Functions:
+    - initWorker: Initialize a worker process, build its process-pipe
+    - workerProcessPipe: Get the process-pipe of the worker, with default parameters
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import copy
+from . import processing
+import preferences.preferences as pref
+
+# -----------------------------------------------------------------------------
+# --- worker process ----------------------------------------------------------
+# -----------------------------------------------------------------------------
+# process-pipe of the worker process, built once and reused for every image
+_processPipe = None
+_defaultParameters = None
+# -----------------------------------------------------------------------------
+def initWorker(verbose):
+    """
+    Initialize a worker process: build its process-pipe.
+
+    Args:
+        verbose (bool): verbose mode of the worker
+    """
+    global _processPipe, _defaultParameters
+    pref.verbose = verbose
+    _processPipe = processing.ProcessPipe.buildDefault()
+    _defaultParameters = copy.deepcopy(_processPipe.toDict())
+# -----------------------------------------------------------------------------
+def workerProcessPipe():
+    """
+    Get the process-pipe of the worker process.
+
+    Parameters are reset to the defaults: images without some parameters must
+    not inherit the previous image ones.
+
+    Returns:
+        hdrCore.processing.ProcessPipe or None: process-pipe of the worker, None
+            if the process is not initialized by initWorker() (e.g. main process)
+    """
+    if not _processPipe: return None
+    _processPipe.setParametersFromDict(copy.deepcopy(_defaultParameters))
+    return _processPipe
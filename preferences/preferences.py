@@ -36,6 +36,12 @@ Global Variables:
     maxWorking (int): Maximum image resolution for editing operations
     imagePath (str): Default directory path for image operations
     keepAllMeta (bool): Whether to preserve all metadata during processing
+    metadataStore (bool): Store metadata in a per-directory database instead of JSON sidecars
+    diskCache (bool): Cache full size decoded images and node outputs on disk (float32, tiled float16 if storage is 'float16')
+    diskCacheSize (int): Maximum size of the disk cache of an image directory in MB
+    profiling (bool): Record per-node timings at startup (hdrCore.profiling)
+    storage (str or None): Type of process node outputs kept between computes (e.g. 'float16')
+    strictDtype (bool): Raise when a process node emits another type than float32 (debug)
 
 Functions:
     loadPref: Load preferences from JSON configuration file
@@ -85,6 +91,28 @@ maxWorking = 1200
 imagePath ="."
 # keep all metadata
 keepAllMeta = False
+# metadata store: 
+#   True: metadata of a directory are stored in a single SQLite file (uHDR-metadata.db)
+#   False: one JSON file per image
+metadataStore = False
+# disk cache: 
+#   True: full size decoded images and process node outputs are cached in <image dir>/cache (float32, memory-mapped)
+#   reopening an image for export or HDR display maps the cache instead of decoding and processing again
+diskCache = False
+# disk cache size: maximum size of <image dir>/cache in MB, least recently used entries are removed
+diskCacheSize = 4096
+# profiling: 
+#   True: process nodes, C++ core, tiles and exports report timings to hdrCore.profiling.profiler
+#   (can also be enabled from the Dock menu or with uHDRexport.py --trace)
+profiling = False
+# storage: type of process node outputs kept between computes
+#   None: float32 (type of computations), 'float16': half the memory of a process-pipe, 11 bits of precision
+#   (also selects the layout of the disk cache: 'float16' stores float16 tiles)
+storage = None
+# strict dtype: 
+#   True: a process node that emits another type than float32 (e.g. float64 of a colour-science conversion) raises TypeError
+#   usefull for debug, False: the output is cast to float32
+strictDtype = False
 # -----------------------------------------------------------------------------
 # --- Functions preferences --------------------------------------------------
 # -----------------------------------------------------------------------------
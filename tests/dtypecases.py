@@ -0,0 +1,198 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+
+
+"""
+uHDR v6 - data type cases
+
+Cases and checks of the data type policy of hdrCore.context, shared by
+tests/test_dtypes.py and benchmarks.dtypes: operator cases, their inputs,
+tile stages computing them (hdrCore.tiles) and the edited process-pipe
+computed with strictDtype set, directly and by tiles.
+
+Functions:
+    - inputImages: Build the inputs of the operator cases
+    - tileStage: Build the tile stage computing an operator case
+    - computeTiles: Compute a stage by tiles
+    - checkTiledPipe: Compute the edited process-pipe by tiles with strictDtype set
+    - checkRaw: Decode a raw file in each mode
+    - checkPipe: Compute the edited process-pipe with strictDtype set
+"""
+
+import copy
+from tests.fixtures import editedProcessPipe
+
+# operator cases: operator, parameters, inputs ('linear', 'encoded', 'Lch')
+cases = [
+    ('tmo_cctf',            {'function': 'sRGB'},                                           ['linear']),
+    ('exposure',            {'EV': 1.0},                                                    ['linear', 'encoded']),
+    ('contrast',            {'contrast': 20},                                               ['linear', 'encoded']),
+    ('clip',                {'min': 0.0, 'max': 1.0},                                       ['linear']),
+    ('ColorSpaceTransform', {'dest': 'Lab'},                                                ['linear', 'encoded']),
+    ('ColorSpaceTransform', {'dest': 'XYZ'},                                                ['linear']),
+    ('resize',              {'size': (None, 600), 'anti_aliasing': True},                   ['linear']),
+    ('Ycurve',              {'start':[0,0], 'shadows': [10,12], 'blacks': [30,33], 'mediums': [50,52], 'whites': [70,72], 'highlights': [90,90], 'end': [100,100]},
+                                                                                            ['linear', 'encoded']),
+    ('saturation',          {'saturation': 20.0, 'method': 'gamma'},                        ['linear', 'encoded']),
+    ('colorEditor',         {'selection': {'lightness': (20,80), 'chroma': (10,100), 'hue': (0,120)}, 'tolerance': 0.1,
+                             'edit': {'hue': 10.0, 'exposure': 0.5, 'contrast': 10.0, 'saturation': 10.0}, 'mask': False},
+                                                                                            ['linear', 'encoded', 'Lch']),
+    ('colorEditor',         {'selection': {'lightness': (20,80), 'chroma': (10,100), 'hue': (0,120)}, 'tolerance': 0.1,
+                             'edit': {'hue': 0.0, 'exposure': 0.0, 'contrast': 10.0, 'saturation': 0.0}, 'mask': True},
+                                                                                            ['linear']),
+    ('colorEditor',         {},                                                             ['Lch']),
+    ('lightnessMask',       {'shadows': True, 'blacks': False, 'mediums': True, 'whites': False, 'highlights': True},
+                                                                                            ['linear', 'encoded']),
+    ('geometry',            {'ratio': (16,9), 'up': 10, 'rotation': 2.0},                   ['linear']),
+]
+# ------------------------------------------------------------------------------------------
+def inputImages(img):
+    """
+    Build the inputs of the operator cases from a linear image.
+
+    Args:
+        img (hdrCore.image.Image): linear HDR image, float32
+
+    Returns:
+        dict: 'linear', 'encoded' (sRGB encoded), 'Lch' (output of saturation) images
+    """
+    import numpy as np, colour
+    from hdrCore import processing
+    from hdrCore.context import ExecutionContext
+
+    encoded = copy.deepcopy(img)
+    encoded.colorData = np.asarray(colour.cctf_encoding(img.colorData, function='sRGB'), dtype=np.float32)
+    encoded.linear = False
+    with ExecutionContext(computation='python', diskCache=False, verbose=False).activate():
+        lch = processing.saturation().compute(copy.deepcopy(img), saturation=10.0, method='gamma')
+    lch.colorData = lch.colorData.astype(np.float32)
+    return {'linear': img, 'encoded': encoded, 'Lch': lch}
+# ------------------------------------------------------------------------------------------
+def tileStage(name, params, img):
+    """
+    Build the tile stage computing an operator case (hdrCore.tiles).
+
+    Args:
+        name (str): operator
+        params (dict): parameters
+        img (hdrCore.image.Image): input image
+
+    Returns:
+        pixelStage, geometryStage or resizeStage: stage
+    """
+    from hdrCore import processing, tiles
+
+    node = processing.ProcessPipe.ProcessNode(getattr(processing, name)(), copy.deepcopy(params), name)
+    if name == 'geometry': return tiles.geometryStage(node, img.colorData.shape)
+    if name == 'resize':
+        state = {'shape': img.colorData.shape, 'linear': img.linear, 'colorSpace': img.colorSpace.name}
+        return tiles.resizeStage(img.colorData.shape, node.process.plan(state, **node.params)['state']['shape'][:2])
+    return tiles.pixelStage([node], img)
+# ------------------------------------------------------------------------------------------
+def computeTiles(stage, img, tileSize=64):
+    """
+    Compute a stage by tiles on two threads in the current context.
+
+    Args:
+        stage: stage (see tileStage())
+        img (hdrCore.image.Image): input image
+        tileSize (int, optional): tile edge (default: 64)
+
+    Returns:
+        numpy.ndarray: output frame
+
+    Raises:
+        TypeError: if context.strictDtype is set and the stage emits another type
+    """
+    from hdrCore import tiles
+    from hdrCore.context import ExecutionContext
+
+    colorData, _ = tiles.tileScheduler(workers=2, tileSize=tileSize).run([stage], img.colorData, ExecutionContext.current())
+    return colorData
+# ------------------------------------------------------------------------------------------
+def checkTiledPipe(img, backend):
+    """
+    Compute the edited default process-pipe, with a rotation, by tiles with strictDtype set.
+
+    Args:
+        img (hdrCore.image.Image): input image
+        backend (str): computation backend
+
+    Returns:
+        list of str: errors
+    """
+    import numpy as np
+    from hdrCore import tiles
+
+    processPipe = editedProcessPipe(img, backend)
+    processPipe.setParameters(processPipe.getProcessNodeByName('geometry'), {'ratio': (16,9), 'up': 10, 'rotation': 2.0})
+    processPipe.context = processPipe.context.derive(strictDtype=True)
+    try:
+        output = tiles.tileScheduler(workers=2, tileSize=64).compute(processPipe, toneMap=False)
+    except TypeError as e:
+        return [str(e)]
+    return [] if output.colorData.dtype == np.float32 else [f"output of the tiled pipeline is {output.colorData.dtype.name}"]
+# ------------------------------------------------------------------------------------------
+def checkRaw(filename):
+    """
+    Decode a raw file in each mode (Image.readRaw()).
+
+    Args:
+        filename (str): raw file
+
+    Returns:
+        list of str: errors
+    """
+    import numpy as np
+    from hdrCore import image
+
+    errors = []
+    for mode in image.rawDecode:
+        colorData, _, _ = image.Image.readRaw(filename, rawMode=mode)
+        print(f"  {'readRaw':<20} {mode.name:<6} {colorData.dtype.name}")
+        if colorData.dtype != np.float32: errors.append(f"Image.readRaw({mode.name}) emits {colorData.dtype.name}")
+    return errors
+# ------------------------------------------------------------------------------------------
+def checkPipe(img, backend, storage):
+    """
+    Compute the edited default process-pipe with strictDtype set.
+
+    Args:
+        img (hdrCore.image.Image): input image
+        backend (str): computation backend
+        storage (numpy.dtype or None): type of node outputs
+
+    Returns:
+        list of str: errors
+    """
+    import numpy as np
+
+    processPipe = editedProcessPipe(img, backend)
+    processPipe.context = processPipe.context.derive(strictDtype=True, storage=storage, reuseBuffers=True)
+    try:
+        processPipe.compute()
+        output = processPipe.getImage(toneMap=False)
+    except TypeError as e:
+        return [str(e)]
+    errors = []
+    stored = np.dtype(storage or np.float32)
+    for processNode in processPipe.processNodes:
+        if processNode.outputImage.colorData.dtype != stored:
+            errors.append(f"{processNode.name} keeps {processNode.outputImage.colorData.dtype.name} output, storage is {stored.name}")
+    if output.colorData.dtype != np.float32:
+        errors.append(f"output of the pipeline is {output.colorData.dtype.name}")
+    return errors
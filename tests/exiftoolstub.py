@@ -0,0 +1,65 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+
+"""
+uHDR v6 - exiftool stub
+
+Answers as exiftool in -stay_open mode (hdrCore.metadata.exiftoolSession):
+reads arguments from its standard input, and on -execute prints JSON EXIF
+data of the listed files followed by {ready}. Each batch is appended to the
+log file given as first argument, so that tests count exiftool round-trips.
+
+Usage:
+    python tests/exiftoolstub.py LOGFILE -stay_open True -@ -
+"""
+
+import json, os, sys
+
+# options of exiftoolSession.execute() followed by a value
+optionsWithValue = ['-charset']
+# ------------------------------------------------------------------------------------------
+def main(argv):
+    """
+    Serve batches until -stay_open False or end of input.
+
+    Args:
+        argv (list of str): log file, then exiftool arguments (ignored)
+    """
+    logFile = argv[0]
+    args = []
+    for line in sys.stdin:
+        arg = line.rstrip('\n')
+        if arg == '-execute':
+            filenames, skip = [], False
+            for a in args:
+                if skip: skip = False
+                elif a in optionsWithValue: skip = True
+                elif not a.startswith('-'): filenames.append(a)
+            with open(logFile, 'a') as f: f.write(json.dumps(filenames)+'\n')
+            entries = [{'SourceFile': f.replace(os.sep, '/'), 'Make': 'uHDR', 'ExposureTime': '1/100', 'FNumber': 8, 'ISO': 100}
+                       for f in filenames]
+            sys.stdout.write(json.dumps(entries)+'\n{ready}\n')
+            sys.stdout.flush()
+            args = []
+        elif args[-1:] == ['-stay_open'] and arg == 'False':
+            return
+        else:
+            args.append(arg)
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    main(sys.argv[1:])
+# ------------------------------------------------------------------------------------------
@@ -0,0 +1,98 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+
+
+"""
+uHDR v6 - test fixtures
+
+Synthetic inputs shared by the tests and the benchmarks: a synthetic HDR
+image, the default process-pipe with edits on the per-pixel operators and
+the computation backends available on the machine.
+
+Modules are imported by the functions: benchmarks import this module before
+parsing their arguments.
+
+Functions:
+    - syntheticImage: Build a synthetic HDR image
+    - editedProcessPipe: Build the default process-pipe with edits
+    - availableBackends: Backends that can run on this machine
+"""
+
+import copy
+
+# ------------------------------------------------------------------------------------------
+def syntheticImage(width, height):
+    """
+    Build a synthetic HDR image: smooth gradients of luminance and hue, values up to 16.
+
+    Args:
+        width, height (int): image size
+
+    Returns:
+        hdrCore.image.Image: linear HDR image
+    """
+    import numpy as np, colour
+    from hdrCore import image, metadata
+
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    luminance = np.power(2.0, 8*x/width - 4).astype(np.float32)
+    hue = 2*np.pi*y/height
+    colorData = np.stack([luminance*(1+np.cos(hue))/2, luminance*(1+np.cos(hue-2*np.pi/3))/2, luminance*(1+np.cos(hue+2*np.pi/3))/2], axis=-1)
+
+    img = image.Image('.', 'synthetic.hdr', colorData.astype(np.float32), image.imageType.HDR, True, colour.RGB_COLOURSPACES['sRGB'])
+    img.metadata = metadata.metadata(img)
+    return img
+# ------------------------------------------------------------------------------------------
+def editedProcessPipe(img, backend):
+    """
+    Build the default process-pipe with edits on the per-pixel operators.
+
+    Args:
+        img (hdrCore.image.Image): input image
+        backend (str): computation backend
+
+    Returns:
+        hdrCore.processing.ProcessPipe: process-pipe (not computed)
+    """
+    from hdrCore import processing
+
+    processPipe = processing.ProcessPipe.buildDefault()
+    processPipe.context = processPipe.context.derive(autoResize=False, computation=backend, diskCache=False, verbose=False)
+    processPipe.setImage(copy.deepcopy(img))
+    processPipe.setParameters(processPipe.getProcessNodeByName('exposure'), {'EV': 0.5})
+    processPipe.setParameters(processPipe.getProcessNodeByName('contrast'), {'contrast': 20})
+    processPipe.setParameters(processPipe.getProcessNodeByName('tonecurve'), {'start':[0,0], 'shadows': [10,12], 'blacks': [30,33], 'mediums': [50,52], 'whites': [70,72], 'highlights': [90,90], 'end': [100,100]})
+    processPipe.setParameters(processPipe.getProcessNodeByName('saturation'), {'saturation': 15.0, 'method': 'gamma'})
+    processPipe.setParameters(processPipe.getProcessNodeByName('colorEditor0'), {'selection': {'lightness': (20,80),'chroma': (10,100),'hue':(0,120)},
+                                                                                  'edit': {'hue': 10.0, 'exposure': 0.5, 'contrast': 0.0, 'saturation': 10.0}, 'mask': False})
+    return processPipe
+# ------------------------------------------------------------------------------------------
+def availableBackends():
+    """
+    Returns:
+        list of str: backends that can run on this machine
+    """
+    backends = ['python']
+    try:
+        import numba
+        backends.append('numba')
+    except ImportError:
+        pass
+    import hdrCore.coreC
+    if hdrCore.coreC.available(): backends.append('cpp')
+    return backends
+# ------------------------------------------------------------------------------------------
@@ -0,0 +1,141 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+
+"""
+uHDR v6 - steady state allocations
+
+Replays slider edits on a synthetic image (exposure, contrast, tone curve,
+saturation, color editor), as a drag does: each edit changes parameters and
+recomputes the process-pipe. The first round warms up the scratch buffers of
+the pipeline (hdrCore.scratch), the next rounds are traced (hdrCore.profiling
+memory tracing, numpy arrays included): a compute whose allocation
+high-water mark is over the threshold is a large allocation. After warm-up,
+a recompute makes no large allocation and allocates no new scratch buffer,
+with every backend.
+
+benchmarks.allocations runs the same replay from the command line (other
+sizes, backend of the GUI, per-node peaks).
+"""
+
+import copy, unittest
+
+from tests.fixtures import syntheticImage, editedProcessPipe, availableBackends
+
+# size of the synthetic image
+size = (640, 360)
+
+# ------------------------------------------------------------------------------------------
+def frameSize(width, height):
+    """
+    Returns:
+        int: size of a float32 frame of the image (bytes)
+    """
+    return width*height*3*4
+# ------------------------------------------------------------------------------------------
+def edits(k):
+    """
+    Build a round of edits: parameters of a node changed as by its slider.
+
+    Args:
+        k (int): round number, parameters differ between rounds
+
+    Returns:
+        list of (str, dict): node name, parameters
+    """
+    return [('exposure', {'EV': 0.5+0.25*k}),
+            ('contrast', {'contrast': 20+5*k}),
+            ('tonecurve', {'start':[0,0], 'shadows': [10,12+k], 'blacks': [30,33], 'mediums': [50,52+k], 'whites': [70,72], 'highlights': [90,90], 'end': [100,100]}),
+            ('saturation', {'saturation': 15.0+5*k, 'method': 'gamma'}),
+            ('colorEditor0', {'selection': {'lightness': (20,80),'chroma': (10,100),'hue':(0,120+10*k)},
+                              'edit': {'hue': 10.0+k, 'exposure': 0.5, 'contrast': 10.0+k, 'saturation': 10.0}, 'mask': False})]
+# ------------------------------------------------------------------------------------------
+def steadyAllocations(width, height, backend, threshold=None, rounds=2):
+    """
+    Replay the edits on a synthetic image and trace the allocations of the
+    rounds after warm-up.
+
+    Args:
+        width, height (int): image size
+        backend (str): 'python', 'numba' or 'cpp' (C++ core, as the GUI: its
+            result is kept in the arena of the pipeline)
+        threshold (int, optional): large allocation (bytes), default: 1/16 of a float32 frame
+        rounds (int, optional): number of traced rounds (default: 2)
+
+    Returns:
+        dict: 'large' (profiler events over the threshold), 'misses' (new scratch
+            buffers), 'threshold' (bytes), 'nodes' (per-compute profiler summary),
+            'arena' (bytes of scratch buffers)
+    """
+    import preferences.preferences as pref
+    import hdrCore.coreC
+    from hdrCore import profiling
+
+    if threshold is None: threshold = frameSize(width, height)/16
+    verbose, pref.verbose = pref.verbose, False
+    try:
+        processPipe = editedProcessPipe(syntheticImage(width, height), 'python' if backend == 'cpp' else backend)
+        processPipe.context = processPipe.context.derive(reuseBuffers=True)
+
+        def compute():
+            if backend == 'cpp':
+                # as RunCompute: the result is kept in the arena of the pipeline
+                imgRes = hdrCore.coreC.coreCcompute(processPipe.getInputImage(), processPipe)
+                processPipe.setOutput(imgRes, share=True)
+            else: processPipe.compute()
+
+        category = 'core' if backend == 'cpp' else 'node'
+        compute()
+
+        large, misses = [], 0
+        for k in range(1+max(1, rounds)):
+            traced = k > 0
+            if traced:
+                profiling.profiler.clear()
+                profiling.profiler.enable(memory=True)
+                before = processPipe.arena.misses
+            try:
+                for name, params in edits(k):
+                    processPipe.setParameters(processPipe.getProcessNodeByName(name), copy.deepcopy(params))
+                    compute()
+            finally:
+                if traced: profiling.profiler.enable(False)
+            if traced:
+                misses += processPipe.arena.misses-before
+                with profiling.profiler.lock: events = [e for e in profiling.profiler.events if e['category'] == category]
+                large += [e for e in events if e.get('peak', 0) >= threshold]
+    finally:
+        pref.verbose = verbose
+
+    return {'large': large, 'misses': misses, 'threshold': threshold,
+            'nodes': profiling.profiler.summary(window=len(edits(0)), category=category),
+            'arena': processPipe.arena.nbytes()}
+# ------------------------------------------------------------------------------------------
+class steadyAllocationsTest(unittest.TestCase):
+    """No large allocation and no new scratch buffer when recomputing after warm-up."""
+
+    def test_backends(self):
+        width, height = size
+        for backend in availableBackends():
+            with self.subTest(backend=backend):
+                res = steadyAllocations(width, height, backend)
+                large = ', '.join(f"{e['name']} {e['peak']/frameSize(width, height):.2f} frames" for e in res['large'])
+                self.assertEqual(res['large'], [], f"large allocations ({backend}): {large}")
+                self.assertEqual(res['misses'], 0, f"scratch buffers allocated after warm-up ({backend})")
+
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+
+"""
+uHDR v6 - tests of hdrCore.cache
+
+Plain (float32, bit-exact) and tiled (float16) layouts of cached images, and
+layout selection of imageCache from the storage type.
+"""
+
+import os, tempfile, unittest
+import numpy as np
+
+import preferences.preferences as pref
+from hdrCore import cache
+
+# ------------------------------------------------------------------------------------------
+class cachedImageTest(unittest.TestCase):
+    """Round trip and region reads of both layouts."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        # not a multiple of the tile size: border tiles are partial
+        self.img = (rng.random((70, 90, 3))*100).astype(np.float32)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_plain(self):
+        filename = os.path.join(self.tmp.name, 'plain')
+        cache.cachedImage.write(filename, self.img, source='src', info={'linear': True})
+        cached = cache.cachedImage.open(filename)
+        self.assertEqual(cached.layout, 'plain')
+        self.assertEqual(cached.shape, self.img.shape)
+        self.assertEqual(cached.info, {'linear': True})
+        self.assertTrue(np.array_equal(cached.toArray(), self.img))
+        region = cached.getRegion(10, 50, 20, 85)
+        self.assertIsInstance(region, np.memmap)
+        self.assertTrue(np.array_equal(region, self.img[10:50, 20:85]))
+
+    def test_tiled(self):
+        filename = os.path.join(self.tmp.name, 'tiled')
+        img = self.img.copy()
+        img[0, 0, 0] = 1e6                                          # beyond float16 range: clipped
+        cache.cachedImage.write(filename, img, storage=np.float16, tileSize=32)
+        cached = cache.cachedImage.open(filename)
+        self.assertEqual(cached.layout, 'tiled')
+        self.assertEqual(cached.tileSize, 32)
+        self.assertEqual(cached.data.shape, (3, 3, 32, 32, 3))
+        self.assertEqual(cached.data.dtype, np.float16)
+
+        whole = cached.toArray(np.float32)
+        self.assertEqual(whole.shape, img.shape)
+        self.assertEqual(whole.dtype, np.float32)
+        self.assertEqual(whole[0, 0, 0], cache.cachedImage.maxValue)
+        whole[0, 0, 0] = img[0, 0, 0] = 0.0
+        self.assertTrue(np.allclose(whole, img, rtol=2**-10))
+
+        # region across tile borders, ending in partial border tiles
+        region = cached.getRegion(10, 70, 20, 90, np.float32)
+        self.assertTrue(np.array_equal(region, whole[10:70, 20:90]))
+        self.assertEqual(cached.getRegion(33, 34, 40, 41).dtype, np.float16)
+
+# ------------------------------------------------------------------------------------------
+class imageCacheTest(unittest.TestCase):
+    """Layout of cache entries selected by the storage type."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, 'img.jpg')
+        open(self.source, 'wb').close()
+        self.verbose, pref.verbose = pref.verbose, False
+        self.storage = pref.storage
+        self.img = np.linspace(0, 1, 40*50*3, dtype=np.float32).reshape(40, 50, 3)
+
+    def tearDown(self):
+        pref.verbose, pref.storage = self.verbose, self.storage
+        self.tmp.cleanup()
+
+    def test_storage(self):
+        for storage, layout in ((None, 'plain'), (np.float32, 'plain'), ('float16', 'tiled')):
+            with self.subTest(storage=storage):
+                pref.storage = None
+                cache.imageCache.put(self.source, 'stage', self.img, storage=storage)
+                cached = cache.imageCache.get(self.source, 'stage')
+                self.assertEqual(cached.layout, layout)
+                self.assertTrue(np.allclose(cached.toArray(np.float32), self.img, rtol=2**-10))
+
+    def test_prefStorage(self):
+        pref.storage = 'float16'
+        cache.imageCache.put(self.source, 'stage', self.img)
+        self.assertEqual(cache.imageCache.get(self.source, 'stage').layout, 'tiled')
+
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    unittest.main()
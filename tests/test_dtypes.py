@@ -0,0 +1,159 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+
+"""
+uHDR v6 - tests of the data type policy (hdrCore.context)
+
+Each operator of hdrCore.processing is computed on the cases of
+tests/dtypecases.py with strictDtype set, directly and by the tile stages of
+export (hdrCore.tiles), with each available backend: outputs are float32,
+a stage that emits another type raises TypeError. Raw decoding is checked on
+the file given by the environment variable UHDR_TEST_RAW (requires rawpy).
+"""
+
+import os, copy, unittest
+import numpy as np
+
+import preferences.preferences as pref
+from hdrCore import processing, tiles, image
+from hdrCore.context import ExecutionContext
+from tests import dtypecases
+from tests.fixtures import syntheticImage, availableBackends
+
+backends = [b for b in availableBackends() if b in ('python', 'numba')]
+
+# ------------------------------------------------------------------------------------------
+class dtypeTest(unittest.TestCase):
+    """Synthetic inputs of the operator cases, quiet preferences."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.verbose, pref.verbose = pref.verbose, False
+        cls.img = syntheticImage(96, 54)
+        cls.inputs = dtypecases.inputImages(cls.img)
+
+    @classmethod
+    def tearDownClass(cls):
+        pref.verbose = cls.verbose
+
+    def context(self, backend, strictDtype=True):
+        return ExecutionContext(computation=backend, autoResize=False, diskCache=False, verbose=False, strictDtype=strictDtype)
+
+    def cases(self, operator):
+        """(backend, kind, params, input) of the cases of an operator."""
+        cases = [(params, kind) for name, params, kinds in dtypecases.cases if name == operator for kind in kinds]
+        self.assertTrue(cases, f"operator {operator} has no case")
+        return [(backend, kind, params, self.inputs[kind]) for backend in backends for params, kind in cases]
+# ------------------------------------------------------------------------------------------
+class operatorDtypeTest(dtypeTest):
+    """Operators computed directly: output data is float32."""
+
+    def checkOperator(self, operator):
+        for backend, kind, params, img in self.cases(operator):
+            with self.subTest(backend=backend, input=kind, params=params), self.context(backend).activate():
+                res = getattr(processing, operator)().compute(copy.deepcopy(img), **copy.deepcopy(params))
+                self.assertEqual(res.colorData.dtype, np.float32)
+
+    def test_cases(self):
+        operators = [cls.__name__ for cls in processing.Processing.__subclasses__()]
+        self.assertEqual([name for name in operators if name not in [case[0] for case in dtypecases.cases]], [])
+
+    def test_tmo_cctf(self):            self.checkOperator('tmo_cctf')
+    def test_exposure(self):            self.checkOperator('exposure')
+    def test_contrast(self):            self.checkOperator('contrast')
+    def test_clip(self):                self.checkOperator('clip')
+    def test_ColorSpaceTransform(self): self.checkOperator('ColorSpaceTransform')
+    def test_resize(self):              self.checkOperator('resize')
+    def test_Ycurve(self):              self.checkOperator('Ycurve')
+    def test_saturation(self):          self.checkOperator('saturation')
+    def test_colorEditor(self):         self.checkOperator('colorEditor')
+    def test_lightnessMask(self):       self.checkOperator('lightnessMask')
+    def test_geometry(self):            self.checkOperator('geometry')
+
+    def test_processpipe(self):
+        for backend in backends:
+            for storage in (None, np.float16):
+                with self.subTest(backend=backend, storage=storage):
+                    self.assertEqual(dtypecases.checkPipe(self.img, backend, storage), [])
+# ------------------------------------------------------------------------------------------
+class tileDtypeTest(dtypeTest):
+    """Operators computed by tile stages: no stage emits another type than float32."""
+
+    def checkStage(self, operator, stageType):
+        for backend, kind, params, img in self.cases(operator):
+            with self.subTest(backend=backend, input=kind, params=params), self.context(backend).activate():
+                stage = dtypecases.tileStage(operator, params, img)
+                self.assertIsInstance(stage, stageType)
+                self.assertEqual(dtypecases.computeTiles(stage, img).dtype, np.float32)
+
+    def test_tmo_cctf(self):            self.checkStage('tmo_cctf', tiles.pixelStage)
+    def test_exposure(self):            self.checkStage('exposure', tiles.pixelStage)
+    def test_contrast(self):            self.checkStage('contrast', tiles.pixelStage)
+    def test_clip(self):                self.checkStage('clip', tiles.pixelStage)
+    def test_ColorSpaceTransform(self): self.checkStage('ColorSpaceTransform', tiles.pixelStage)
+    def test_resize(self):              self.checkStage('resize', tiles.resizeStage)
+    def test_Ycurve(self):              self.checkStage('Ycurve', tiles.pixelStage)
+    def test_saturation(self):          self.checkStage('saturation', tiles.pixelStage)
+    def test_colorEditor(self):         self.checkStage('colorEditor', tiles.pixelStage)
+    def test_lightnessMask(self):       self.checkStage('lightnessMask', tiles.pixelStage)
+    def test_geometry(self):            self.checkStage('geometry', tiles.geometryStage)
+
+    def test_processpipe(self):
+        for backend in backends:
+            with self.subTest(backend=backend): self.assertEqual(dtypecases.checkTiledPipe(self.img, backend), [])
+
+    def test_strictNode(self):
+        # float64 input: exposure emits float64, raises with strictDtype, cast otherwise
+        img = copy.deepcopy(self.img)
+        img.colorData = img.colorData.astype(np.float64)
+        stage = dtypecases.tileStage('exposure', {'EV': 1.0}, img)
+        with self.context('python').activate(), self.assertRaisesRegex(TypeError, 'exposure emits float64'):
+            stage.computeTile(img.colorData, (0, 54, 0, 96), (0, 54, 0, 96))
+        with self.context('python', strictDtype=False).activate():
+            res, _ = stage.computeTile(img.colorData, (0, 54, 0, 96), (0, 54, 0, 96))
+        self.assertEqual(res.dtype, np.float32)
+
+    def test_strictStage(self):
+        # a stage emitting float64 tiles raises with strictDtype, is cast to the frame otherwise
+        class promote(object):
+            def key(self): return 'promote'
+            def sourceRegion(self, tile): return tile
+            def computeTile(self, data, tile, region): return data.astype(np.float64), None
+        inArray = self.img.colorData
+        outArray = np.empty_like(inArray)
+        with self.assertRaisesRegex(TypeError, 'promote: tile emits float64'):
+            tiles.tileScheduler.computeTile(promote(), inArray, outArray, (0, 16, 0, 16), self.context('python'))
+        tiles.tileScheduler.computeTile(promote(), inArray, outArray, (0, 16, 0, 16), self.context('python', strictDtype=False))
+        np.testing.assert_array_equal(outArray[:16,:16], inArray[:16,:16])
+# ------------------------------------------------------------------------------------------
+@unittest.skipUnless(os.environ.get('UHDR_TEST_RAW'), 'no raw file (UHDR_TEST_RAW)')
+class rawDtypeTest(unittest.TestCase):
+    """Raw decoding (rawpy postprocess, embedded preview): float32 in each mode."""
+
+    def test_readRaw(self):
+        try:
+            import rawpy
+        except ImportError:
+            self.skipTest('rawpy is not installed')
+        for mode in image.rawDecode:
+            with self.subTest(mode=mode.name):
+                colorData, _, _ = image.Image.readRaw(os.environ['UHDR_TEST_RAW'], rawMode=mode)
+                self.assertEqual(colorData.dtype, np.float32)
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    unittest.main()
+# ------------------------------------------------------------------------------------------
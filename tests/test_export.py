@@ -0,0 +1,84 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+
+"""
+uHDR v6 - tests of hdrCore.export
+
+Full size exports of a small .jpg file, its EXIF data is read with the
+exiftool stub (tests/exiftoolstub.py).
+"""
+
+import os, sys, tempfile, unittest
+import numpy as np, imageio
+
+import preferences.preferences as pref
+from hdrCore import export, image, metadata, processing
+
+# ------------------------------------------------------------------------------------------
+@unittest.skipIf(os.name == 'nt', 'the exiftool stub is started through a shell wrapper')
+class exportContextTest(unittest.TestCase):
+    """Exports compute full size without changing the context of the caller pipeline."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        stub = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exiftoolstub.py')
+        wrapper = os.path.join(self.tmp.name, 'exiftool')
+        with open(wrapper, 'w') as f: f.write(f'#!/bin/sh\nexec "{sys.executable}" "{stub}" "{os.devnull}" "$@"\n')
+        os.chmod(wrapper, 0o755)
+
+        self.verbose, pref.verbose = pref.verbose, False
+        self.executables = metadata.exiftoolSession.executables
+        metadata.exiftoolSession.close()
+        metadata.exiftoolSession.executables = [wrapper]
+
+        self.image = os.path.join(self.tmp.name, 'a.jpg')
+        imageio.imwrite(self.image, (np.random.default_rng(0).random((48, 64, 3))*255).astype(np.uint8))
+        self.outputs = os.path.join(self.tmp.name, 'outputs')
+
+        self.processPipe = processing.ProcessPipe.buildDefault()
+        self.processPipe.context.maxWorking = 32
+        self.context = self.processPipe.context
+
+    def tearDown(self):
+        metadata.metadataWriter.flushAll()
+        metadata.exiftoolSession.close()
+        metadata.exiftoolSession.executables = self.executables
+        pref.verbose = self.verbose
+        self.tmp.cleanup()
+
+    def assertContextUnchanged(self):
+        self.assertIs(self.processPipe.context, self.context)
+        self.assertTrue(self.context.autoResize)
+        self.assertTrue(self.context.reuseBuffers)
+
+    def test_exportImageTargets(self):
+        outputs = export.exportImageTargets(self.image, self.outputs, processPipe=self.processPipe)
+        self.assertTrue(os.path.isfile(outputs[0]))
+        self.assertContextUnchanged()
+
+    def test_processPipeExport(self):
+        self.processPipe.setImage(image.Image.read(self.image))
+        self.assertEqual(self.processPipe.originalImage.shape[:2], (24, 32))
+        res = self.processPipe.export(None)
+        self.assertEqual(res.shape[1], 64)                          # full size (height cropped by geometry)
+        self.assertContextUnchanged()
+        # working size input restored
+        self.assertEqual(self.processPipe.originalImage.shape[:2], (24, 32))
+
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+
+
+"""
+uHDR v6 - import budget of hdrCore.processing
+
+hdrCore.processing is imported by every worker process: it is imported in a
+fresh interpreter (-X importtime), it must not import the GUI nor the
+optional packages (loaded on first use), and its own import time, above the
+packages it requires, is within budget.
+"""
+
+import os, subprocess, sys, unittest
+
+# modules that hdrCore must not import at load
+forbidden = ['guiQt', 'PyQt5', 'torch', 'sklearn', 'rawpy', 'geomdl', 'pathos']
+# packages imported by hdrCore.processing at load
+dependencies = ['numpy', 'colour', 'skimage.transform', 'imageio']
+# import time of hdrCore.processing above its dependencies, in seconds
+budget = 0.5
+# imports per measure, the fastest is kept
+repeat = 3
+
+# ------------------------------------------------------------------------------------------
+def importTime(code):
+    """
+    Run code in a fresh interpreter (-X importtime).
+
+    Args:
+        code (str): python code (imports)
+
+    Returns:
+        (float, str): total import time in seconds (top level imports, interpreter
+            start up included), standard output of code
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    res = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=root, capture_output=True, text=True)
+    if res.returncode != 0: raise ImportError(res.stderr.strip().splitlines()[-1] if res.stderr.strip() else code)
+
+    # 'import time: self [us] | cumulative | name', nested imports are indented
+    total = 0
+    for line in res.stderr.splitlines():
+        if not line.startswith('import time:'): continue
+        fields = line[len('import time:'):].split('|')
+        if fields[1].strip().isdigit() and not fields[2].startswith('  '): total += int(fields[1])
+    return total/1e6, res.stdout
+# ------------------------------------------------------------------------------------------
+class importTest(unittest.TestCase):
+    """Modules and import time of hdrCore.processing in a fresh interpreter."""
+
+    def test_forbidden(self):
+        _, stdout = importTime("import sys, hdrCore.processing; print('modules:', ' '.join(sorted(set(name.split('.')[0] for name in sys.modules))))")
+        modules = [line for line in stdout.splitlines() if line.startswith('modules:')][0].split()[1:]
+        self.assertIn('hdrCore', modules)
+        for name in forbidden:
+            with self.subTest(module=name): self.assertFalse(name in modules, name+' is imported by hdrCore.processing')
+
+    def test_budget(self):
+        processing = min(importTime('import hdrCore.processing')[0] for _ in range(repeat))
+        required = min(importTime('import '+', '.join(dependencies))[0] for _ in range(repeat))
+        self.assertLess(processing-required, budget,
+                        f"hdrCore.processing: {processing:.3f}s, its dependencies: {required:.3f}s")
+
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    unittest.main()
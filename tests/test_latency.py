@@ -0,0 +1,74 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+
+
+"""
+uHDR v6 - interactive latency budgets
+
+Replays the default sequence of benchmarks.latency (slider sweeps) on uHDR
+started headless (QT_QPA_PLATFORM=offscreen) in a subprocess: the p95
+latency of each control is within its default budget. The image is a .jpg
+file, its EXIF data is read with the exiftool stub (tests/exiftoolstub.py).
+Skipped if PyQt5 is not installed.
+"""
+
+import os, sys, json, importlib.util, subprocess, tempfile, unittest
+import numpy as np, imageio
+
+# controls of the default sequence
+controls = ['exposure', 'contrast', 'saturation', 'colorEditor0.hue', 'colorEditor0.exposure']
+
+# ------------------------------------------------------------------------------------------
+@unittest.skipIf(importlib.util.find_spec('PyQt5') is None, 'PyQt5 is not installed')
+@unittest.skipIf(os.name == 'nt', 'the exiftool stub is started through a shell wrapper')
+class latencyTest(unittest.TestCase):
+    """p95 latency of the controls of the editing dock."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        stub = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exiftoolstub.py')
+        wrapper = os.path.join(self.tmp.name, 'exiftool')
+        with open(wrapper, 'w') as f: f.write(f'#!/bin/sh\nexec "{sys.executable}" "{stub}" "{os.devnull}" "$@"\n')
+        os.chmod(wrapper, 0o755)
+
+        self.image = os.path.join(self.tmp.name, 'images', 'a.jpg')
+        os.makedirs(os.path.dirname(self.image))
+        imageio.imwrite(self.image, (np.random.default_rng(0).random((720, 1080, 3))*255).astype(np.uint8))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_p95(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = os.path.join(self.tmp.name, 'latency.json')
+        env = dict(os.environ, QT_QPA_PLATFORM='offscreen', PATH=self.tmp.name+os.pathsep+os.environ.get('PATH', ''))
+        res = subprocess.run([sys.executable, '-m', 'benchmarks.latency', '--image', self.image, '-o', output],
+                             cwd=root, env=env, capture_output=True, text=True, timeout=600)
+        errors = [line for line in res.stdout.splitlines() if line.startswith('ERROR')]
+        self.assertTrue(os.path.isfile(output), res.stdout+res.stderr)
+        with open(output) as f: results = {r['control']: r for r in json.load(f)['results']}
+
+        self.assertEqual(sorted(results), sorted(controls))
+        for control in controls:
+            with self.subTest(control=control):
+                self.assertGreater(results[control]['count'], 0)
+                self.assertLessEqual(results[control]['p95'], results[control]['budget'])
+        self.assertEqual(res.returncode, 0, '\n'.join(errors))
+
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+
+
+"""
+uHDR v6 - export memory ceiling
+
+Exports a synthetic edited 4K image as uHDRexport does: by tiles in worker
+processes (hdrCore.tiles), and checks the memory high-water mark of the
+export against a ceiling. Memory is sampled during the export: private RSS
+of this process and of the tile workers, plus the shared memory frames
+(counted once), above the memory before the export.
+
+The untiled export is computed in this process with memory tracing
+(hdrCore.profiling): the allocation high-water mark is checked.
+
+benchmarks.memory runs the same export from the command line (other sizes
+and ceilings, per-node peaks).
+"""
+
+import os, tempfile, threading, unittest
+
+import preferences.preferences as pref
+from hdrCore import export, metadata, profiling, sharedmem, tiles
+from hdrCore.context import ExecutionContext
+from tests.fixtures import syntheticImage, editedProcessPipe
+
+# size of the synthetic image
+size = (3840, 2160)
+# ceilings in float32 frames of the image, plus working memory per tile worker
+# (measured at 4K: tiled 10.7 frames with 1 worker, +55MB per worker; untiled 27.3 frames)
+tiledFrames = 11
+workerMB = 64
+untiledFrames = 30
+
+# ------------------------------------------------------------------------------------------
+class memorySampler(object):
+    """
+    Sample, in a thread, the memory of an export computed by tile worker
+    processes: private RSS of this process and of the workers, plus the shared
+    memory frames of this process (mapped by workers: counted once).
+
+    Attributes:
+        - base (int): memory at start (bytes)
+        - peak (int): highest memory sampled (bytes)
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.base = self.peak = memorySampler.sample()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+    # --------------------------------------------------------------------------------------
+    @staticmethod
+    def sample():
+        """
+        Returns:
+            int: private RSS of this process and tile workers plus shared frames (bytes)
+        """
+        pool = tiles.tileScheduler.pool
+        pids = [None]+(list(pool._processes) if pool else [])
+        return sum(profiling.currentRSS(pid, private=True) or 0 for pid in pids)+sharedmem.frameRegistry.nbytes()
+    # --------------------------------------------------------------------------------------
+    def run(self):
+        while not self.stopped.wait(self.interval): self.peak = max(self.peak, memorySampler.sample())
+    # --------------------------------------------------------------------------------------
+    def __enter__(self):
+        self.thread.start()
+        return self
+    # --------------------------------------------------------------------------------------
+    def __exit__(self, *args):
+        self.stopped.set()
+        self.thread.join()
+        self.peak = max(self.peak, memorySampler.sample())
+# ------------------------------------------------------------------------------------------
+def frameSize(width, height):
+    """
+    Returns:
+        int: size of a float32 frame of the image (bytes)
+    """
+    return width*height*3*4
+# ------------------------------------------------------------------------------------------
+def ceiling(width, height, untiled=False):
+    """
+    Default memory ceiling of an export.
+
+    Args:
+        width, height (int): image size
+        untiled (bool, optional): export computed in this process without tiles
+
+    Returns:
+        int: ceiling (bytes)
+    """
+    if untiled: return untiledFrames*frameSize(width, height)
+    return tiledFrames*frameSize(width, height)+workerMB*2**20*ExecutionContext().threads
+# ------------------------------------------------------------------------------------------
+def exportPeak(width, height, untiled=False):
+    """
+    Export a synthetic edited image and measure its memory peak.
+
+    Args:
+        width, height (int): image size
+        untiled (bool, optional): export in this process without tiles, with memory
+            tracing (default: by tiles in worker processes, memory sampled)
+
+    Returns:
+        dict: 'peak' (bytes), 'workers' (tiled) or 'rssGrowth' and 'nodes'
+            (untiled: per-node profiler summary)
+
+    Raises:
+        RuntimeError: if the export fails
+    """
+    verbose, pref.verbose = pref.verbose, False
+    try:
+        with tempfile.TemporaryDirectory(prefix='uHDR-memory-') as directory:
+            def source(name, w, h):
+                # source image with edited process-pipe parameters in its metadata
+                img = syntheticImage(w, h)
+                img.metadata.metadata['processpipe'] = editedProcessPipe(img, 'python').toDict()
+                filename = os.path.join(directory, name)
+                img.write(filename)
+                return filename
+            filename = source('synthetic.hdr', width, height)
+            output = os.path.join(directory, 'export')
+
+            if untiled:
+                profiling.profiler.enable(memory=True)
+                try:
+                    outputs = export.exportImageTargets(filename, output, tiled=False)
+                finally:
+                    profiling.profiler.enable(False)
+            else:
+                # warm-up: tile workers are started and import their modules before the measure
+                export.exportImageTargets(source('warmup.hdr', 256, 144), output, tiled=True)
+                with memorySampler() as sampler:
+                    outputs = export.exportImageTargets(filename, output, tiled=True)
+            metadata.metadataWriter.flushAll()    # sidecars are written before the directory is removed
+    finally:
+        pref.verbose = verbose
+    if not outputs: raise RuntimeError("export of the synthetic image failed")
+
+    if untiled:
+        entry = profiling.profiler.summary(window=1, category='export')[0]
+        return {'peak': entry['peak'], 'rssGrowth': entry['rssGrowth'] or 0, 'nodes': profiling.profiler.summary(window=1, category='node')}
+    return {'peak': sampler.peak-sampler.base, 'workers': tiles.tileScheduler.poolWorkers}
+# ------------------------------------------------------------------------------------------
+class exportMemoryTest(unittest.TestCase):
+    """Memory peak of the 4K export against its ceiling."""
+
+    def checkPeak(self, untiled):
+        width, height = size
+        peak, limit = exportPeak(width, height, untiled)['peak'], ceiling(width, height, untiled)
+        self.assertLessEqual(peak, limit, f"export peak {peak/2**20:.1f}MB ({peak/frameSize(width, height):.1f} frames), "
+                                          f"ceiling {limit/2**20:.0f}MB")
+
+    def test_tiled(self):   self.checkPeak(untiled=False)
+    def test_untiled(self): self.checkPeak(untiled=True)
+
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+
+"""
+uHDR v6 - tests of hdrCore.metadata
+
+EXIF extraction with a persistent exiftool session, against a local exiftool
+stub (tests/exiftoolstub.py) started through a shell wrapper.
+"""
+
+import os, sys, json, tempfile, unittest
+
+import preferences.preferences as pref
+from hdrCore import metadata
+
+# ------------------------------------------------------------------------------------------
+@unittest.skipIf(os.name == 'nt', 'the exiftool stub is started through a shell wrapper')
+class exiftoolSessionTest(unittest.TestCase):
+    """Batch extraction and prefetch cache with the exiftool stub."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.tmp.name, 'exiftool.log')
+        stub = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exiftoolstub.py')
+        wrapper = os.path.join(self.tmp.name, 'exiftool')
+        with open(wrapper, 'w') as f: f.write(f'#!/bin/sh\nexec "{sys.executable}" "{stub}" "{self.log}" "$@"\n')
+        os.chmod(wrapper, 0o755)
+
+        self.verbose, pref.verbose = pref.verbose, False
+        self.executables = metadata.exiftoolSession.executables
+        metadata.exiftoolSession.close()
+        metadata.exiftoolSession.executables = [wrapper]
+        metadata.metadata.exifCache.clear()
+
+    def tearDown(self):
+        metadata.exiftoolSession.close()
+        metadata.exiftoolSession.executables = self.executables
+        metadata.metadata.exifCache.clear()
+        pref.verbose = self.verbose
+        self.tmp.cleanup()
+
+    def images(self, directory, count):
+        """Create count empty .jpg files in directory (under the temporary directory)."""
+        path = os.path.join(self.tmp.name, directory)
+        os.makedirs(path, exist_ok=True)
+        filenames = [os.path.join(path, f'img{i}.jpg') for i in range(count)]
+        for filename in filenames: open(filename, 'w').close()
+        return filenames
+
+    def batches(self):
+        """Batches received by the stub."""
+        if not os.path.isfile(self.log): return []
+        with open(self.log) as f: return [json.loads(line) for line in f]
+
+    def test_batch(self):
+        filenames = self.images('a', 3)
+        exifs = metadata.metadata.readExifBatch(filenames)
+        self.assertEqual(sorted(exifs.keys()), sorted(filenames))
+        self.assertEqual(exifs[filenames[0]]['Exposure Time'], '1/100')
+        self.assertEqual(exifs[filenames[0]]['F Number'], '8')
+        # the session is kept: a second batch is sent to the same process
+        process = metadata.exiftoolSession.get().process
+        metadata.metadata.readExifBatch(filenames[:1])
+        self.assertIs(metadata.exiftoolSession.get().process, process)
+        self.assertEqual(len(self.batches()), 2)
+
+    def test_prefetch(self):
+        filenames = self.images('a', 3)
+        metadata.metadata.prefetchExif(filenames)
+        self.assertEqual(len(self.batches()), 1)
+        # readExif consumes the prefetched entries without a new round-trip
+        for filename in filenames: self.assertEqual(metadata.metadata.readExif(filename)['ISO'], '100')
+        self.assertEqual(len(self.batches()), 1)
+        self.assertEqual(metadata.metadata.exifCache, {})
+
+    def test_prefetchBound(self):
+        # entries of a directory never read are dropped when another directory is prefetched
+        first, second = self.images('a', 3), self.images('b', 3)
+        metadata.metadata.prefetchExif(first)
+        metadata.metadata.prefetchExif(second)
+        self.assertEqual(sorted(metadata.metadata.exifCache.keys()), sorted(second))
+        # at most exifCacheSize entries
+        size, metadata.metadata.exifCacheSize = metadata.metadata.exifCacheSize, 2
+        try:
+            metadata.metadata.prefetchExif(self.images('c', 5))
+            self.assertEqual(len(metadata.metadata.exifCache), 2)
+        finally:
+            metadata.metadata.exifCacheSize = size
+# ------------------------------------------------------------------------------------------
+class metadataWriterTest(unittest.TestCase):
+    """Deferred JSON writer: unchanged content is not written, known contents are bounded."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.verbose, pref.verbose = pref.verbose, False
+        self.writer = metadata.metadataWriter()
+
+    def tearDown(self):
+        self.writer.flush()
+        pref.verbose = self.verbose
+        self.tmp.cleanup()
+
+    def test_unchanged(self):
+        filename = os.path.join(self.tmp.name, 'a.json')
+        self.assertTrue(self.writer.write(filename, {'a': 1}))
+        self.assertEqual(self.writer.flush(), 1)
+        self.assertFalse(self.writer.write(filename, {'a': 1}))
+        self.assertTrue(self.writer.write(filename, {'a': 2}))
+        self.assertEqual(self.writer.flush(), 1)
+        with open(filename) as f: self.assertEqual(json.load(f), {'a': 2})
+
+    def test_cleanBound(self):
+        size, metadata.metadataWriter.cleanSize = metadata.metadataWriter.cleanSize, 2
+        try:
+            filenames = [os.path.join(self.tmp.name, f'{i}.json') for i in range(3)]
+            for filename in filenames: self.writer.write(filename, {'name': filename})
+            self.writer.flush()
+            # least recently used file is forgotten: written again
+            self.assertEqual(list(self.writer.clean.keys()), filenames[1:])
+            self.assertTrue(self.writer.write(filenames[0], {'name': filenames[0]}))
+            self.assertFalse(self.writer.write(filenames[2], {'name': filenames[2]}))
+        finally:
+            metadata.metadataWriter.cleanSize = size
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    unittest.main()
+# ------------------------------------------------------------------------------------------
@@ -0,0 +1,127 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+
+"""
+uHDR v6 - tests of hdrCore.server
+
+A render server is started on an ephemeral localhost port with one worker
+process. Images are small .jpg files, their EXIF data is read with the
+exiftool stub (tests/exiftoolstub.py).
+"""
+
+import os, sys, http.client, json, tempfile, unittest, urllib.error
+import numpy as np, imageio
+
+import preferences.preferences as pref
+from hdrCore import metadata, processing, server
+
+# ------------------------------------------------------------------------------------------
+@unittest.skipIf(os.name == 'nt', 'the exiftool stub is started through a shell wrapper')
+class renderServerTest(unittest.TestCase):
+    """Renders, cache and request checks of a local render server."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        stub = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exiftoolstub.py')
+        wrapper = os.path.join(self.tmp.name, 'exiftool')
+        with open(wrapper, 'w') as f: f.write(f'#!/bin/sh\nexec "{sys.executable}" "{stub}" "{os.devnull}" "$@"\n')
+        os.chmod(wrapper, 0o755)
+
+        self.verbose, pref.verbose = pref.verbose, False
+        self.executables = metadata.exiftoolSession.executables
+        metadata.exiftoolSession.close()
+        metadata.exiftoolSession.executables = [wrapper]
+
+        self.images = os.path.join(self.tmp.name, 'images')
+        self.outputs = os.path.join(self.tmp.name, 'outputs')
+        os.makedirs(self.images)
+        self.image = os.path.join(self.images, 'a.jpg')
+        imageio.imwrite(self.image, (np.random.default_rng(0).random((48, 64, 3))*255).astype(np.uint8))
+
+        self.server = server.renderServer(port=0, workers=1, cacheDir=os.path.join(self.tmp.name, 'cache'),
+                                          imageRoots=[self.images], outputRoots=[self.outputs])
+        self.host, self.port = self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+        metadata.exiftoolSession.close()
+        metadata.exiftoolSession.executables = self.executables
+        pref.verbose = self.verbose
+        self.tmp.cleanup()
+
+    def post(self, body, headers):
+        """Send a raw POST /render, return (status, JSON response)."""
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            connection.request('POST', '/render', body=body, headers=headers)
+            response = connection.getresponse()
+            return response.status, json.loads(response.read().decode('utf-8'))
+        finally:
+            connection.close()
+
+    def test_render(self):
+        output = os.path.join(self.outputs, 'a.hdr')
+        res = server.requestRender(self.image, output=output, port=self.port, timeout=60)
+        self.assertFalse(res['cached'])
+        self.assertTrue(os.path.isfile(output))
+        # same request: from cache, as image data
+        data = server.requestRender(self.image, port=self.port, timeout=60)
+        with open(output, 'rb') as f: self.assertEqual(data, f.read())
+        self.assertEqual(self.server.status()['hits'], 1)
+        # removed from cache (pruneCache): rendered again
+        os.remove(res['file'])
+        res = server.requestRender(self.image, output=output, port=self.port, timeout=60)
+        self.assertFalse(res['cached'])
+        self.assertEqual(self.server.status()['rendered'], 2)
+
+    def test_storedParameters(self):
+        output = os.path.join(self.outputs, 'a.hdr')
+        first = server.requestRender(self.image, output=output, port=self.port, timeout=60)
+        # edited in the GUI: the sidecar parameters change, the request does not
+        sidecar = os.path.join(self.images, 'a.json')
+        with open(sidecar) as f: meta = json.load(f)
+        meta['processpipe'] = processing.ProcessPipe.buildDefault().toDict()
+        meta['processpipe'][0]['exposure']['EV'] = 1.0
+        with open(sidecar, 'w') as f: json.dump(meta, f)
+        second = server.requestRender(self.image, output=output, port=self.port, timeout=60)
+        self.assertNotEqual(first['key'], second['key'])
+        self.assertFalse(second['cached'])
+
+    def test_outsideRoots(self):
+        outside = os.path.join(self.tmp.name, 'a.hdr')
+        for output in (outside, os.path.join(self.outputs, '..', 'a.hdr')):
+            with self.assertRaises(urllib.error.HTTPError) as e:
+                server.requestRender(self.image, output=output, port=self.port, timeout=60)
+            self.assertEqual(e.exception.code, 403)
+        self.assertFalse(os.path.exists(outside))
+        # image outside the image directories
+        with self.assertRaises(urllib.error.HTTPError) as e:
+            server.requestRender(os.path.join(self.tmp.name, 'exiftool'), port=self.port, timeout=60)
+        self.assertEqual(e.exception.code, 403)
+        self.assertEqual(self.server.status()['rendered'], 0)
+
+    def test_requestHeaders(self):
+        body = json.dumps({'image': self.image, 'output': os.path.join(self.outputs, 'a.hdr')})
+        status, res = self.post(body, {'Content-Type': 'text/plain'})
+        self.assertEqual(status, 415)
+        status, res = self.post(body, {'Content-Type': 'application/json', 'Host': f'example.com:{self.port}'})
+        self.assertEqual(status, 403)
+        self.assertEqual(self.server.status()['rendered'], 0)
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    unittest.main()
+# ------------------------------------------------------------------------------------------
@@ -16,32 +16,102 @@ Features:
     - Advanced HDR tone mapping
     - Multiprocessing support
 
+The main window and the image gallery are shown first: editing docks and the
+HDR display splash are built once the event loop runs, the tone curve figure
+(matplotlib) and the Info and MIAM panels on first use.
+
+Usage:
+    python uHDR.py [--profile-startup [TRACE]] [Qt options]
+
+Options:
+    --profile-startup [TRACE]: print the startup time breakdown (module imports,
+        construction of the main window) when the window is shown, and write it
+        to the Chrome trace file TRACE (chrome://tracing) if given
+
 Author: remi.cozot@univ-littoral.fr
 Copyright (C) 2021 Remi Cozot
 License: GNU General Public License v3.0
 """
 
-
-from PyQt5.QtCore import Qt
-from PyQt5.QtWidgets import QApplication, QDesktopWidget
-import guiQt.controller
+import argparse, sys
+from timeit import default_timer as timer
 from multiprocessing import freeze_support
 
-import sys
 # ------------------------------------------------------------------------------------------
-if __name__ == '__main__':
+def parseArgs(argv=None):
+    """
+    Parse command line arguments, other arguments are left to Qt.
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        (argparse.Namespace, list of str): parsed arguments, Qt arguments
+    """
+    parser = argparse.ArgumentParser(prog='uHDR', description='uHDR v6 HDR image editing')
+    parser.add_argument('--profile-startup', nargs='?', const='', default=None, metavar='TRACE',
+                        help='print startup timings (imports, main window) and write them to a Chrome trace file if given')
+    return parser.parse_known_args(argv)
+# ------------------------------------------------------------------------------------------
+def reportStartup(start, trace):
+    """
+    Print the startup time breakdown: construction steps and slowest imports.
+    Called by the event loop once the main window is shown.
+
+    Args:
+        start (float): start time of uHDR (timeit.default_timer)
+        trace (str): Chrome trace file, '' for none
+    """
+    import preferences.preferences as pref
+    from hdrCore.profiling import profiler
+
+    profiler.record('uHDR startup', start, timer()-start, category='startup')
+    with profiler.lock: events = list(profiler.events)
+    print(f"uHDRv6 startup: {timer()-start:.3f}s")
+    for event in events:
+        if event['category'] == 'startup': print(f"  {event['name']:<32} {event['duration']*1000:9.1f}ms")
+    imports = sorted((event for event in events if event['category'] == 'import'), key=lambda event: -event['duration'])
+    print(f"  imports: {len(imports)} modules, slowest (cumulative):")
+    for event in imports[:15]: print(f"    {event['name']:<30} {event['duration']*1000:9.1f}ms")
+    if trace: print(f"  {profiler.exportChromeTrace(trace)} events written to {trace}")
+    # back to the profiling preference of the Profiling dock
+    profiler.clear()
+    profiler.enable(pref.profiling)
+# ------------------------------------------------------------------------------------------
+def main(argv=None):
     """
     Main entry point for the uHDR v6 application.
     
     Initializes the PyQt5 application, creates the main controller, and starts the
     event loop. Includes multiprocessing freeze support for Windows compatibility.
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        int: exit code of the event loop
     """
     freeze_support()
+    start = timer()
+    args, qtArgs = parseArgs(argv)
+
+    from hdrCore.profiling import profiler
+    if args.profile_startup is not None: profiler.enable()
+
+    with profiler.traceImports():
+        from PyQt5.QtWidgets import QApplication
+        from PyQt5.QtCore import QTimer
+        import guiQt.controller
     print("uHDRv6 (C++ core)")
 
-    app = QApplication(sys.argv)
+    app = QApplication(sys.argv[:1]+qtArgs)
 
-    mcQt = guiQt.controller.AppController(app)
+    with profiler.span('AppController', category='startup'), profiler.traceImports():
+        mcQt = guiQt.controller.AppController(app)
 
-    sys.exit(app.exec_())
+    if args.profile_startup is not None: QTimer.singleShot(0, lambda: reportStartup(start, args.profile_startup))
+    return app.exec_()
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    sys.exit(main())
 # ------------------------------------------------------------------------------------------
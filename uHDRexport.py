@@ -0,0 +1,151 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+"""
+uHDR v6 - headless batch export
+
+Exports edited images without GUI: each image is read at full resolution,
+processed with the uHDR pipeline configured from its metadata (JSON sidecar
+'processpipe') and written as '<name><post>.hdr' for one or several HDR
+displays of preferences/prefs.json (one decoding and processing per image,
+--all-displays exports every display of prefs.json, --fit resizes outputs to
+the display shapes).
+PyQt5, matplotlib and torch are never imported, so that export can run on
+render nodes.
+
+Export is resumable: the manifest uHDR-export.json of the output directory
+records each export, running the command again only exports new, changed
+or failed images (--force exports everything).
+
+--explain prints the execution plan of each export instead of exporting:
+kernels and conversions of each node with estimated time and memory
+(hdrCore.plan), from the image size and metadata, without decoding.
+Estimates are those of the compute of -j: by tiles on all cores (-j 1),
+untiled on one core per image otherwise.
+--calibrate measures the per-pixel costs of the estimates on this machine.
+
+Usage:
+    python uHDRexport.py <dir|file|glob> [...] [-o OUTPUT] [-d DISPLAY [-d DISPLAY ...] | --all-displays] [--fit]
+                         [--cpp] [-j JOBS] [--max-memory GB] [--force] [--trace FILE] [--memory] [-q]
+                         [--explain] [--calibrate]
+
+Examples:
+    python uHDRexport.py ./images -o ./export
+    python uHDRexport.py "./images/*.hdr" -d vesaDisplayHDR400
+    python uHDRexport.py ./images -o ./export -d vesaDisplayHDR1000 -d vesaDisplayHDR400
+    python uHDRexport.py ./images -o ./export --all-displays --fit
+    python uHDRexport.py ./images -o ./export -j 0 --max-memory 16
+    python uHDRexport.py ./images -o ./export --trace export-trace.json
+    python uHDRexport.py ./images/8k.hdr --explain --calibrate
+"""
+
+import argparse, sys
+from multiprocessing import freeze_support
+
+# ------------------------------------------------------------------------------------------
+def parseArgs(argv=None):
+    """
+    Parse command line arguments.
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(prog='uHDRexport', description='uHDR v6 headless batch export')
+    parser.add_argument('inputs', nargs='+', help='image directories, files or glob patterns')
+    parser.add_argument('-o', '--output', default=None, help='output directory (default: image directory)')
+    parser.add_argument('-d', '--display', action='append', default=None, help='HDR display tag from prefs.json, can be repeated (default: current display)')
+    parser.add_argument('--all-displays', action='store_true', help='export for all HDR displays of prefs.json')
+    parser.add_argument('--fit', action='store_true', help='resize outputs to fit the display shapes (default: full size)')
+    parser.add_argument('--cpp', action='store_true', help='compute with the C++ core (HDRip.dll)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of images exported in parallel by worker processes (0: number of cores, default: 1: one image at a time, computed by tiles on all cores)')
+    parser.add_argument('--max-memory', type=float, default=None, help='memory budget of parallel export in GB (default: half of physical memory)')
+    parser.add_argument('--force', action='store_true', help='export up-to-date images again (ignore manifest)')
+    parser.add_argument('--trace', default=None, help='write per-node and per-tile timings to a Chrome trace JSON file (chrome://tracing), sequential export only (nodes of tiled exports: one event per tile)')
+    parser.add_argument('--memory', action='store_true', help='trace memory: peak allocations and RSS growth of each export (slower), sequential export only')
+    parser.add_argument('-q', '--quiet', action='store_true', help='no verbose output')
+    parser.add_argument('--explain', action='store_true', help='print the execution plan of each export (kernels, estimated time and memory) and exit')
+    parser.add_argument('--calibrate', action='store_true', help='measure the per-pixel costs of plan estimates on this machine first (saved in preferences/costs.json)')
+    return parser.parse_args(argv)
+# ------------------------------------------------------------------------------------------
+def main(argv=None):
+    """
+    Run the headless batch export.
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        int: exit code, 0 if all images have been exported
+    """
+    args = parseArgs(argv)
+
+    import preferences.preferences as pref
+    import hdrCore.export, hdrCore.profiling, hdrCore.plan
+    pref.verbose = not args.quiet
+    if args.trace or args.memory: hdrCore.profiling.profiler.enable(memory=args.memory)
+
+    try:
+        displays = hdrCore.export.getDisplays('all' if args.all_displays else args.display)
+    except ValueError as e:
+        print("ERROR[uHDRexport:",e,"]")
+        return 2
+
+    filenames = hdrCore.export.collectFiles(args.inputs)
+    print(f"uHDRv6 export: {len(filenames)} images, displays: {', '.join(d['tag'] for d in displays)}")
+
+    if args.calibrate:
+        hdrCore.plan.saveCosts(hdrCore.plan.calibrate())
+        print(f"uHDRv6 export: kernel costs calibrated, saved to {hdrCore.plan.costsFile}")
+    if args.explain:
+        if args.cpp: print("WARNING[uHDRexport: plans describe the python pipeline, not the C++ core]")
+        for filename in filenames:
+            plan = hdrCore.export.explainImage(filename, displays, fit=args.fit, tiled=args.jobs == 1 and not args.cpp)
+            if plan: print(f"{filename}: {hdrCore.plan.formatPlan(plan)}")
+            else:    print(f"WARNING[uHDRexport: {filename}: unknown image size, no plan]")
+        return 0
+
+    def progress(done, total, filename, outputFilenames):
+        print(f"  [{done}/{total}] {filename} -> {', '.join(outputFilenames) if outputFilenames else 'FAILED'}")
+
+    backend = 'cpp' if args.cpp else 'python'
+    if args.jobs == 1:
+        res = hdrCore.export.exportAll(filenames, args.output, displays, backend=backend, progress=progress, force=args.force, fit=args.fit)
+    else:
+        maxMemory = int(args.max_memory*1024**3) if args.max_memory else None
+        res = hdrCore.export.exportParallel(filenames, args.output, displays, backend=backend, 
+                                            nbWorkers=args.jobs if args.jobs > 0 else None, maxMemory=maxMemory, 
+                                            progress=progress, force=args.force, fit=args.fit)
+
+    # headless guarantee: GUI dependencies must not have been imported
+    for module in ('PyQt5', 'matplotlib', 'torch'):
+        if module in sys.modules: print(f"WARNING[uHDRexport: {module} has been imported!]")
+
+    if args.trace: hdrCore.profiling.profiler.exportChromeTrace(args.trace)
+    if args.memory:
+        for entry in hdrCore.profiling.profiler.summary(window=1, category='export'):
+            if entry['peak'] is not None: print(f"  {entry['name']}: peak {entry['peak']/2**20:.0f}MB, RSS growth {(entry['rssGrowth'] or 0)/2**20:.0f}MB")
+
+    failed = [f for f, out in res.items() if out == None]
+    print(f"uHDRv6 export: {len(res)-len(failed)} exported, {len(failed)} failed")
+    return 1 if failed else 0
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    freeze_support()
+    sys.exit(main())
+# ------------------------------------------------------------------------------------------
@@ -0,0 +1,92 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+"""
+uHDR v6 - render server
+
+Runs a local HTTP render server (hdrCore.server): clients send an image
+filename and process-pipe parameters (ProcessPipe.toDict() format), the
+server renders the image at full resolution in worker processes and returns
+it or writes it to a path. PyQt5, matplotlib and torch are never imported.
+
+Usage:
+    python uHDRserver.py [--host HOST] [-p PORT] [-j WORKERS] [--queue N] [--cache DIR] [--root DIR ...] [--output-root DIR ...] [--cpp] [-q]
+
+Examples:
+    python uHDRserver.py -p 8765 -j 4 --root ./images
+    curl -X POST http://127.0.0.1:8765/render -H 'Content-Type: application/json' -d '{"image": "./images/a.hdr", "processpipe": [{"exposure": {"EV": 1.0}}], "output": "./images/a_render.hdr"}'
+    curl http://127.0.0.1:8765/status
+"""
+
+import argparse, sys, time
+from multiprocessing import freeze_support
+
+# ------------------------------------------------------------------------------------------
+def parseArgs(argv=None):
+    """
+    Parse command line arguments.
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(prog='uHDRserver', description='uHDR v6 render server')
+    parser.add_argument('--host', default='127.0.0.1', help='server address (default: 127.0.0.1, localhost only)')
+    parser.add_argument('-p', '--port', type=int, default=None, help='server port (default: 8765)')
+    parser.add_argument('-j', '--workers', type=int, default=0, help='number of worker processes (0: number of cores, default: 0)')
+    parser.add_argument('--queue', type=int, default=16, help='maximum number of renders queued or running (default: 16)')
+    parser.add_argument('--cache', default=None, help='directory of rendered images (default: <temp>/uHDR-render)')
+    parser.add_argument('--root', action='append', help='directory images are read from, can be repeated (default: current directory)')
+    parser.add_argument('--output-root', action='append', help='directory outputs are written to, can be repeated (default: --root directories)')
+    parser.add_argument('--cpp', action='store_true', help='compute with the C++ core (HDRip.dll)')
+    parser.add_argument('-q', '--quiet', action='store_true', help='no verbose output')
+    return parser.parse_args(argv)
+# ------------------------------------------------------------------------------------------
+def main(argv=None):
+    """
+    Run the render server until interrupted (Ctrl+C).
+
+    Args:
+        argv (list of str, optional): arguments, default: sys.argv[1:]
+
+    Returns:
+        int: exit code
+    """
+    args = parseArgs(argv)
+
+    import preferences.preferences as pref
+    import hdrCore.server
+    pref.verbose = not args.quiet
+
+    server = hdrCore.server.renderServer(host=args.host, port=args.port, workers=args.workers if args.workers > 0 else None,
+                                         queueSize=args.queue, backend='cpp' if args.cpp else 'python', cacheDir=args.cache,
+                                         imageRoots=args.root, outputRoots=args.output_root)
+    host, port = server.start()
+    print(f"uHDRv6 render server: http://{host}:{port} ({server.workers} workers), Ctrl+C to stop")
+    try:
+        while True: time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+# ------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    freeze_support()
+    sys.exit(main())
+# ------------------------------------------------------------------------------------------